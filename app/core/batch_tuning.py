@@ -0,0 +1,176 @@
+"""
+تنظیم تطبیقی اندازه بچ برای نوشتن در Google Sheets (AIMD)
+
+تا وقتی زمان پاسخ و نرخ خطا سالم است اندازه بچ به صورت جمعی بزرگ می‌شود و
+در صورت timeout یا پاسخ‌های 429/5xx به صورت ضربی کوچک می‌شود. اندازه یادگرفته شده
+برای هر Spreadsheet در فایل ذخیره می‌شود تا اجرای بعدی از همان نقطه شروع کند.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.core.logger import app_logger
+
+
+# انواع خطا برای تصمیم‌گیری کنترل‌کننده
+ERROR_TIMEOUT = 'timeout'
+ERROR_THROTTLED = 'throttled'
+ERROR_SERVER = 'server'
+ERROR_OTHER = 'other'
+
+
+def classify_sheets_error(error: Exception) -> str:
+    """
+    دسته‌بندی خطای Google Sheets
+
+    Returns:
+        timeout | throttled (429) | server (5xx) | other
+    """
+    status = getattr(error, 'code', None)
+    response = getattr(error, 'response', None)
+    if status is None and response is not None:
+        status = getattr(response, 'status_code', None)
+
+    if isinstance(status, int):
+        if status == 429:
+            return ERROR_THROTTLED
+        if status >= 500:
+            return ERROR_SERVER
+
+    message = str(error).lower()
+    if '429' in message or 'rate_limit' in message or 'quota' in message:
+        return ERROR_THROTTLED
+    if 'timeout' in message or 'timed out' in message or 'connection' in message or 'aborted' in message:
+        return ERROR_TIMEOUT
+    if 'internal error' in message or 'backend error' in message or 'service unavailable' in message:
+        return ERROR_SERVER
+    return ERROR_OTHER
+
+
+class AdaptiveBatchSizer:
+    """
+    کنترل‌کننده AIMD اندازه بچ به ازای هر Spreadsheet
+    """
+
+    DEFAULT_STATE_FILE = 'data/sheets_batch_tuning.json'
+
+    def __init__(
+        self,
+        state_file: Optional[str] = None,
+        initial_size: Optional[int] = None,
+        min_size: int = 50,
+        max_size: int = 20000,
+        additive_step: int = 500,
+        decrease_factor: float = 0.5,
+        target_latency: float = 10.0,
+        max_error_rate: float = 0.1
+    ):
+        """
+        Args:
+            state_file: مسیر فایل ذخیره اندازه‌های یادگرفته شده
+            initial_size: اندازه اولیه (سلول در هر درخواست - پیش‌فرض: BATCH_SIZE یا 1000)
+            min_size: حداقل اندازه
+            max_size: حداکثر اندازه
+            additive_step: افزایش جمعی پس از هر درخواست سالم
+            decrease_factor: ضریب کاهش پس از timeout یا 429/5xx
+            target_latency: حداکثر زمان پاسخ سالم (ثانیه)
+            max_error_rate: حداکثر نرخ خطای سالم (میانگین نمایی)
+        """
+        self.logger = app_logger
+        self.state_file = Path(state_file or self.DEFAULT_STATE_FILE)
+        self.initial_size = initial_size or int(os.getenv("BATCH_SIZE", "1000"))
+        self.min_size = min_size
+        self.max_size = max_size
+        self.additive_step = additive_step
+        self.decrease_factor = decrease_factor
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+
+        self._state: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    # ==================== Persistence ====================
+
+    def _load(self):
+        try:
+            if self.state_file.exists():
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    self._state = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"⚠️ خطا در بارگذاری تنظیمات بچ: {str(e)}")
+            self._state = {}
+
+    def save(self):
+        """ذخیره اندازه‌های یادگرفته شده در فایل"""
+        with self._lock:
+            snapshot = json.dumps(self._state, ensure_ascii=False, indent=2)
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.state_file, 'w', encoding='utf-8') as f:
+                f.write(snapshot)
+        except Exception as e:
+            self.logger.warning(f"⚠️ خطا در ذخیره تنظیمات بچ: {str(e)}")
+
+    # ==================== Controller ====================
+
+    def _entry(self, key: str) -> Dict:
+        entry = self._state.get(key)
+        if entry is None:
+            entry = {'size': self.initial_size, 'error_rate': 0.0}
+            self._state[key] = entry
+        return entry
+
+    def current_size(self, key: str) -> int:
+        """اندازه فعلی بچ برای یک Spreadsheet"""
+        with self._lock:
+            return int(self._entry(key)['size'])
+
+    def record_success(self, key: str, cells: int, latency: float):
+        """
+        ثبت یک درخواست موفق
+
+        Args:
+            key: کلید Spreadsheet
+            cells: تعداد سلول‌های ارسال شده
+            latency: زمان پاسخ (ثانیه)
+        """
+        with self._lock:
+            entry = self._entry(key)
+            entry['error_rate'] = entry['error_rate'] * 0.8
+            # فقط وقتی بچ کامل ارسال شده و پاسخ سریع بوده بزرگ کن
+            if (
+                latency <= self.target_latency
+                and entry['error_rate'] <= self.max_error_rate
+                and cells >= entry['size']
+            ):
+                entry['size'] = min(self.max_size, entry['size'] + self.additive_step)
+
+    def record_failure(self, key: str, error_kind: str) -> int:
+        """
+        ثبت یک درخواست ناموفق
+
+        Returns:
+            اندازه جدید بچ
+        """
+        with self._lock:
+            entry = self._entry(key)
+            entry['error_rate'] = entry['error_rate'] * 0.8 + 0.2
+            if error_kind in (ERROR_TIMEOUT, ERROR_THROTTLED, ERROR_SERVER):
+                entry['size'] = max(self.min_size, int(entry['size'] * self.decrease_factor))
+            return int(entry['size'])
+
+
+_shared_sizer: Optional[AdaptiveBatchSizer] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_batch_sizer() -> AdaptiveBatchSizer:
+    """کنترل‌کننده مشترک کل برنامه"""
+    global _shared_sizer
+    with _shared_lock:
+        if _shared_sizer is None:
+            _shared_sizer = AdaptiveBatchSizer()
+        return _shared_sizer
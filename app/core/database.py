@@ -2,20 +2,137 @@
 مدیریت دیتابیس - Database Manager
 """
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func
-from typing import List, Optional, Dict, Tuple, Any
-from datetime import datetime
+from sqlalchemy import and_, or_, func, case, cast, literal_column, select, String
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from typing import List, Optional, Dict, Set, Tuple, Any, Iterator
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+import functools
+import hashlib
+import json
+import threading
 import traceback
 
 from app.models import (
-    SessionLocal, SheetConfig, SalesData, ExportTemplate,
-    ProcessLog, ExportLog
+    SessionLocal, WriteSessionLocal, SheetConfig, SalesData, ExportTemplate,
+    ProcessLog, ExportLog, SheetWriteOutbox, SheetSyncState,
+    ExtractionRun, ExtractionCheckpoint, DuplicateCandidate, SheetStats, engine
 )
+from app.models.sheet_stats import is_sheet_stats_supported, rebuild_sheet_stats
+from app.models.sales_data_fts import (
+    FTS_TABLE, sales_data_fts, build_match_query, has_sales_data_fts, optimize_sales_data_fts
+)
+from app.core.json_field_index import build_json_filters, normalize_indexed_fields, sync_json_field_indexes
 from app.core.logger import app_logger
+from app.core.sales_data_rows import SalesDataRow, SALES_DATA_ROW_COLUMNS
+from app.core.sheet_key_index import SheetKeyIndex
 from app.utils.constants import ProcessStatus, ProcessType
 from app.utils.helpers import generate_unique_key, compare_dicts
 
 
+# session فعال unit of work در هر thread (مشترک بین تمام نمونه‌های DatabaseManager)
+_unit_of_work = threading.local()
+
+
+class _UnitOfWorkSession:
+    """
+    نمای session مشترک unit of work برای یک فراخوانی متد
+    
+    هر متد داخل یک SAVEPOINT اجرا می‌شود: commit فقط savepoint را ثبت و rollback فقط
+    تغییرات همان متد را برمی‌گرداند؛ close اتصال را نمی‌بندد. تراکنش اصلی در پایان
+    unit_of_work ثبت می‌شود.
+    
+    savepoint ای که متد نه commit و نه close کرده باشد (مثلاً خطا را گرفته و False
+    برگردانده) در پایان همان متد برگردانده می‌شود (ن.ک. _scoped_to_unit_of_work)؛
+    درست مانند session جدا که بدون commit دور انداخته می‌شود.
+    """
+    
+    def __init__(self, session: Session):
+        self._session = session
+        self._savepoint = session.begin_nested()
+        self._open = True
+        _unit_of_work.open_sessions.append(self)
+    
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+    
+    @property
+    def is_failed(self) -> bool:
+        """آیا savepoint پس از خطای flush/دیتابیس فقط قابل rollback است؟"""
+        return self._open and (not self._savepoint.is_active or not self._session.is_active)
+    
+    def _finish(self):
+        self._open = False
+        if self in _unit_of_work.open_sessions:
+            _unit_of_work.open_sessions.remove(self)
+    
+    def commit(self):
+        if self._open:
+            try:
+                self._savepoint.commit()
+            except Exception:
+                self.rollback()
+                raise
+            self._finish()
+        else:
+            # تغییرات پس از اولین commit در تراکنش اصلی می‌مانند
+            self._session.flush()
+    
+    def rollback(self):
+        if self._open:
+            self._finish()
+            self._savepoint.rollback()
+    
+    def close(self):
+        if not self._open:
+            return
+        if self.is_failed:
+            self.rollback()
+        else:
+            self.commit()
+
+
+def in_unit_of_work() -> bool:
+    """آیا unit of work در همین thread فعال است؟"""
+    return getattr(_unit_of_work, 'session', None) is not None
+
+
+def _rollback_failed_sessions():
+    """برگرداندن savepoint های خطادار باز (از داخلی‌ترین) تا session مشترک قابل استفاده بماند"""
+    for proxy in reversed(list(_unit_of_work.open_sessions)):
+        if proxy.is_failed:
+            proxy.rollback()
+
+
+def _scoped_to_unit_of_work(method):
+    """
+    داخل unit of work: savepoint هایی که متد باز کرده و نبسته در پایان متد برگردانده می‌شوند
+    
+    بیشتر متدها خطا را می‌گیرند و بدون rollback/close مقدار خطا برمی‌گردانند؛ بدون این
+    محدوده savepoint خطادار باز می‌ماند و همه فراخوانی‌های بعدی و commit نهایی با
+    PendingRollbackError شکست می‌خورند.
+    
+    روی هر متد DatabaseManager که get_session را مستقیم فراخوانی می‌کند قرار می‌گیرد
+    (به جز generatorها که session را پس از بازگشت متد باز می‌کنند).
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if getattr(_unit_of_work, 'session', None) is None:
+            return method(self, *args, **kwargs)
+        
+        opened_before = list(_unit_of_work.open_sessions)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            for proxy in reversed(list(_unit_of_work.open_sessions)):
+                if proxy not in opened_before:
+                    proxy.rollback()
+    
+    return wrapper
+
+
 class DatabaseManager:
     """
     کلاس مدیریت عملیات دیتابیس
@@ -25,12 +142,65 @@ class DatabaseManager:
         """راه‌اندازی مدیر دیتابیس"""
         self.logger = app_logger
     
-    def get_session(self) -> Session:
-        """دریافت session جدید"""
-        return SessionLocal()
+    def get_session(self, write: bool = False) -> Session:
+        """
+        دریافت session جدید (یا session مشترک unit of work فعال در همین thread)
+
+        Args:
+            write: تراکنش نوشتنی - روی SQLite با BEGIN IMMEDIATE شروع می‌شود تا خواندن اول
+                تراکنش بعداً به نوشتن ارتقا پیدا نکند (ارتقا پس از commit نویسنده دیگر بدون
+                انتظار busy_timeout با database is locked رد می‌شود)
+        """
+        session = getattr(_unit_of_work, 'session', None)
+        if session is not None:
+            _rollback_failed_sessions()
+            return _UnitOfWorkSession(session)
+        return WriteSessionLocal() if write else SessionLocal()
+    
+    @contextmanager
+    def unit_of_work(self):
+        """
+        اجرای چند متد روی یک session و یک تراکنش
+        
+        متدهای DatabaseManager که داخل این context (در همان thread) فراخوانی شوند به جای
+        باز کردن session جدید به همین session می‌پیوندند. unit of work تو در تو به بیرونی
+        می‌پیوندد. در پایان تراکنش ثبت و در صورت خطا برگردانده می‌شود.
+        
+        Example:
+            with db_manager.unit_of_work():
+                for data_id in ids:
+                    db_manager.mark_as_transferred(data_id)
+        
+        Yields:
+            Session مشترک
+        """
+        session = getattr(_unit_of_work, 'session', None)
+        if session is not None:
+            yield session
+            return
+        
+        session = WriteSessionLocal()
+        _unit_of_work.session = session
+        _unit_of_work.open_sessions = []
+        try:
+            yield session
+            # savepoint هایی که خارج از متدهای DatabaseManager باز مانده‌اند
+            for proxy in reversed(list(_unit_of_work.open_sessions)):
+                proxy.close()
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            _unit_of_work.session = None
+            _unit_of_work.open_sessions = []
+            session.close()
+            # لاگ‌های دیتابیس این unit of work (مستقل از commit یا rollback آن)
+            self.logger.flush_deferred_logs()
     
     # ==================== Sheet Config ====================
     
+    @_scoped_to_unit_of_work
     def get_all_sheet_configs(self, active_only: bool = False) -> List[SheetConfig]:
         """
         دریافت تمام تنظیمات شیت‌ها
@@ -56,6 +226,7 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت تنظیمات شیت‌ها: {str(e)}")
             return []
     
+    @_scoped_to_unit_of_work
     def get_sheet_config(self, config_id: int) -> Optional[SheetConfig]:
         """دریافت یک تنظیمات بر اساس ID"""
         try:
@@ -67,6 +238,7 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت تنظیمات شیت: {str(e)}")
             return None
     
+    @_scoped_to_unit_of_work
     def get_sheet_config_by_name(self, sheet_name: str) -> Optional[SheetConfig]:
         """دریافت تنظیمات شیت بر اساس نام"""
         try:
@@ -78,6 +250,7 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت تنظیمات شیت با نام '{sheet_name}': {str(e)}")
             return None
     
+    @_scoped_to_unit_of_work
     def create_sheet_config(self, data: Dict) -> Tuple[bool, Optional[SheetConfig], str]:
         """
         ایجاد تنظیمات جدید
@@ -89,7 +262,7 @@ class DatabaseManager:
             (موفقیت, شیء تنظیمات, پیام)
         """
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             
             # بررسی تکراری بودن نام
             existing = db.query(SheetConfig).filter_by(name=data['name']).first()
@@ -97,6 +270,9 @@ class DatabaseManager:
                 db.close()
                 return False, None, "نام تنظیمات تکراری است."
             
+            if 'indexed_fields' in data:
+                data = {**data, 'indexed_fields': normalize_indexed_fields(data['indexed_fields'])}
+            
             # ایجاد رکورد جدید
             config = SheetConfig(**data)
             db.add(config)
@@ -106,6 +282,9 @@ class DatabaseManager:
             config_id = config.id
             db.close()
             
+            if config.indexed_fields:
+                self.sync_json_field_indexes()
+            
             self.logger.log_to_db(
                 ProcessType.UPDATE,
                 ProcessStatus.SUCCESS,
@@ -119,6 +298,7 @@ class DatabaseManager:
             self.logger.error(f"خطا در ایجاد تنظیمات: {str(e)}")
             return False, None, f"خطا: {str(e)}"
     
+    @_scoped_to_unit_of_work
     def update_sheet_config(self, config_id: int, data: Dict) -> Tuple[bool, str]:
         """
         بروزرسانی تنظیمات
@@ -131,22 +311,41 @@ class DatabaseManager:
             (موفقیت, پیام)
         """
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             
             config = db.query(SheetConfig).filter_by(id=config_id).first()
             if not config:
                 db.close()
                 return False, "تنظیمات یافت نشد."
             
+            if 'indexed_fields' in data:
+                data = {**data, 'indexed_fields': normalize_indexed_fields(data['indexed_fields'])}
+            indexed_fields_changed = (
+                'indexed_fields' in data and data['indexed_fields'] != (config.indexed_fields or None)
+            )
+            
+            # تغییر ستون‌های کلیدی، hash محتوای رکوردهای قبلی را نامعتبر می‌کند
+            unique_columns_changed = (
+                'unique_key_columns' in data
+                and (data['unique_key_columns'] or None) != (config.unique_key_columns or None)
+            )
+            
             # بروزرسانی فیلدها
             for key, value in data.items():
                 if hasattr(config, key):
                     setattr(config, key, value)
             
             config.updated_at = datetime.now()
+            if unique_columns_changed:
+                db.query(SalesData).filter_by(sheet_config_id=config_id).update(
+                    {'content_hash': None}, synchronize_session=False
+                )
             db.commit()
             db.close()
             
+            if indexed_fields_changed:
+                self.sync_json_field_indexes()
+            
             self.logger.log_to_db(
                 ProcessType.UPDATE,
                 ProcessStatus.SUCCESS,
@@ -160,10 +359,11 @@ class DatabaseManager:
             self.logger.error(f"خطا در بروزرسانی تنظیمات: {str(e)}")
             return False, f"خطا: {str(e)}"
     
+    @_scoped_to_unit_of_work
     def delete_sheet_config(self, config_id: int) -> Tuple[bool, str]:
         """حذف تنظیمات"""
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             
             config = db.query(SheetConfig).filter_by(id=config_id).first()
             if not config:
@@ -171,10 +371,14 @@ class DatabaseManager:
                 return False, "تنظیمات یافت نشد."
             
             config_name = config.name
+            had_indexed_fields = bool(config.indexed_fields)
             db.delete(config)
             db.commit()
             db.close()
             
+            if had_indexed_fields:
+                self.sync_json_field_indexes()
+            
             self.logger.log_to_db(
                 ProcessType.DELETE,
                 ProcessStatus.SUCCESS,
@@ -187,8 +391,36 @@ class DatabaseManager:
             self.logger.error(f"خطا در حذف تنظیمات: {str(e)}")
             return False, f"خطا: {str(e)}"
     
+    @_scoped_to_unit_of_work
+    def sync_json_field_indexes(self) -> Tuple[bool, str]:
+        """
+        همگام‌سازی ایندکس‌های json_extract با indexed_fields همه شیت‌ها
+        
+        Returns:
+            (موفقیت, پیام)
+        """
+        try:
+            db = self.get_session()
+            keys = []
+            for (fields,) in db.query(SheetConfig.indexed_fields).all():
+                for field in fields or []:
+                    if field not in keys:
+                        keys.append(field)
+            db.close()
+            
+            created, dropped = sync_json_field_indexes(engine, keys)
+            if created or dropped:
+                self.logger.info(f"🗂️ ایندکس فیلدهای JSON: {len(created)} ایجاد، {len(dropped)} حذف")
+            
+            return True, f"{len(keys)} فیلد ایندکس شده ({len(created)} ایندکس جدید، {len(dropped)} حذف شده)"
+            
+        except Exception as e:
+            self.logger.error(f"خطا در همگام‌سازی ایندکس فیلدهای JSON: {str(e)}")
+            return False, str(e)
+    
     # ==================== Sales Data ====================
     
+    @_scoped_to_unit_of_work
     def save_sales_data(
         self,
         sheet_config_id: int,
@@ -211,7 +443,7 @@ class DatabaseManager:
             (موفقیت, رکورد, جدید بودن, پیام)
         """
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             
             # جستجوی رکورد موجود
             existing = db.query(SalesData).filter_by(unique_key=unique_key).first()
@@ -220,6 +452,7 @@ class DatabaseManager:
                 if update_if_exists:
                     # بروزرسانی
                     existing.data = data
+                    existing.content_hash = None  # در استخراج بعدی دوباره محاسبه می‌شود
                     existing.row_number = row_number
                     existing.is_updated = True
                     existing.update_count += 1
@@ -253,6 +486,257 @@ class DatabaseManager:
             self.logger.error(f"خطا در ذخیره داده: {str(e)}")
             return False, None, False, f"خطا: {str(e)}"
     
+    @_scoped_to_unit_of_work
+    def bulk_upsert_sales_data(
+        self,
+        sheet_config_id: int,
+        rows: List[Dict],
+        update_existing: bool = False,
+        chunk_size: int = 500,
+        progress_callback=None,
+        key_index: Optional[SheetKeyIndex] = None
+    ) -> Tuple[bool, Dict[str, List[Dict]], str]:
+        """
+        ذخیره دسته‌ای داده‌های فروش در یک تراکنش
+        
+        ردیف‌ها در بسته‌های chunk_size تایی با یک کوئری برای کلیدهای موجود و یک دستور
+        INSERT ... ON CONFLICT(unique_key) ذخیره می‌شوند. اگر بسته‌ای به محدودیت دیگری
+        (مثلاً uq_sheet_row) برخورد کند، فقط همان بسته ردیف به ردیف (با savepoint) تکرار
+        می‌شود و ردیف‌های مشکل‌دار در failed برگردانده می‌شوند. savepoint داخل تراکنش روی
+        SQLite به تنظیمات درایور در sqlite_profile (isolation_level=None و BEGIN صریح) وابسته است.
+        
+        ردیفی که کلیدش در این فاصله توسط نوشتن دیگری درج شده (ON CONFLICT DO NOTHING آن را
+        رد می‌کند) جدید حساب نمی‌شود: با update_existing بروز و در غیر این صورت تکراری گزارش می‌شود.
+        
+        اگر key_index داده شود، وضعیت هر ردیف (جدید/تکراری/بروزرسانی) در حافظه تعیین
+        می‌شود و کوئری کلیدهای موجود اجرا نمی‌شود؛ ایندکس پس از ذخیره بروز می‌شود.
+        
+        Args:
+            sheet_config_id: شناسه تنظیمات
+            rows: لیست {'row_number', 'unique_key', 'data', 'content_hash' (اختیاری)}
+            update_existing: بروزرسانی رکوردهای موجود (در غیر این صورت تکراری گزارش می‌شوند)
+            chunk_size: تعداد ردیف هر بسته
+            progress_callback: تابع (current, total)
+            key_index: ایندکس کلیدهای موجود همین شیت (get_sheet_key_index)
+            
+        Returns:
+            (موفقیت, {'new', 'updated', 'duplicates', 'failed'}, پیام)
+            هر مورد duplicates شامل existing_id و existing_data است
+        """
+        result = {'new': [], 'updated': [], 'duplicates': [], 'failed': []}
+        if not rows:
+            return True, result, "هیچ ردیفی برای ذخیره نیست."
+        
+        db = self.get_session(write=True)
+        try:
+            dialect = db.bind.dialect.name
+            now = datetime.now()
+            seen = {}  # کلیدهای ذخیره شده در همین فراخوانی: {unique_key: ردیف}
+            
+            for chunk_start in range(0, len(rows), chunk_size):
+                chunk = rows[chunk_start:chunk_start + chunk_size]
+                
+                if key_index is not None:
+                    # کلید شامل شناسه شیت است، پس ایندکس همین شیت کافی است
+                    existing_keys = {row['unique_key'] for row in chunk if row['unique_key'] in key_index}
+                else:
+                    # کلیدهای موجود این بسته با یک کوئری
+                    existing_keys = {
+                        item.unique_key
+                        for item in db.query(SalesData.unique_key).filter(
+                            SalesData.unique_key.in_([row['unique_key'] for row in chunk])
+                        )
+                    }
+                
+                # داده رکوردهای موجود فقط برای تکراری‌ها (نمایش به کاربر) خوانده می‌شود
+                existing = {}
+                if existing_keys and not update_existing:
+                    existing = {
+                        item.unique_key: item
+                        for item in db.query(SalesData.id, SalesData.unique_key, SalesData.data).filter(
+                            SalesData.unique_key.in_(existing_keys)
+                        )
+                    }
+                
+                to_insert, to_update = [], []
+                for row in chunk:
+                    key = row['unique_key']
+                    if key in existing_keys or key in seen:
+                        if update_existing:
+                            to_update.append(row)
+                        else:
+                            found = existing.get(key)
+                            result['duplicates'].append({
+                                **row,
+                                'existing_id': found.id if found else None,
+                                'existing_data': found.data if found else seen[key]['data'],
+                            })
+                    else:
+                        to_insert.append(row)
+                    seen.setdefault(key, row)
+                
+                skipped = []
+                savepoint = db.begin_nested()
+                try:
+                    saved = self._save_sales_chunk(
+                        db, dialect, sheet_config_id, to_insert, to_update, update_existing, now
+                    )
+                    savepoint.commit()
+                    result['new'].extend(saved[0])
+                    result['updated'].extend(saved[1])
+                    skipped.extend(saved[2])
+                except IntegrityError:
+                    savepoint.rollback()
+                    # تکرار ردیف به ردیف برای جدا کردن ردیف‌های مشکل‌دار
+                    for row, is_new in [(row, True) for row in to_insert] + [(row, False) for row in to_update]:
+                        row_savepoint = db.begin_nested()
+                        try:
+                            saved = self._save_sales_chunk(
+                                db, dialect, sheet_config_id,
+                                [row] if is_new else [], [] if is_new else [row], update_existing, now
+                            )
+                            row_savepoint.commit()
+                            result['new'].extend(saved[0])
+                            result['updated'].extend(saved[1])
+                            skipped.extend(saved[2])
+                        except IntegrityError as e:
+                            row_savepoint.rollback()
+                            result['failed'].append({**row, 'error': str(e.orig)})
+                
+                if skipped:
+                    existing = {
+                        item.unique_key: item
+                        for item in db.query(SalesData.id, SalesData.unique_key, SalesData.data).filter(
+                            SalesData.unique_key.in_([row['unique_key'] for row in skipped])
+                        )
+                    }
+                    for row in skipped:
+                        found = existing.get(row['unique_key'])
+                        result['duplicates'].append({
+                            **row,
+                            'existing_id': found.id if found else None,
+                            'existing_data': found.data if found else None,
+                        })
+                
+                if progress_callback:
+                    progress_callback(min(chunk_start + chunk_size, len(rows)), len(rows))
+            
+            db.commit()
+            
+            if key_index is not None:
+                for row in result['new'] + result['updated']:
+                    key_index.add(row['unique_key'], None, row['row_number'], row.get('content_hash'))
+            
+            if result['failed']:
+                self.logger.warning(f"⚠️ {len(result['failed'])} ردیف به دلیل تداخل ذخیره نشد")
+            
+            return True, result, (
+                f"{len(result['new'])} جدید، {len(result['updated'])} بروز شد، "
+                f"{len(result['duplicates'])} تکراری"
+            )
+            
+        except Exception as e:
+            db.rollback()
+            self.logger.error(f"خطا در ذخیره دسته‌ای داده: {str(e)}")
+            return False, {'new': [], 'updated': [], 'duplicates': [], 'failed': list(rows)}, f"خطا: {str(e)}"
+        finally:
+            db.close()
+    
+    def _save_sales_chunk(
+        self,
+        db: Session,
+        dialect: str,
+        sheet_config_id: int,
+        to_insert: List[Dict],
+        to_update: List[Dict],
+        update_existing: bool,
+        now: datetime
+    ) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """
+        ذخیره یک بسته و جدا کردن ردیف‌هایی که واقعاً درج شدند
+        
+        Returns:
+            (جدید, بروز شده, رد شده به دلیل درج همزمان همان کلید)
+        """
+        inserted_keys = self._upsert_sales_rows(db, dialect, sheet_config_id, to_insert, to_update, now)
+        new_rows = [row for row in to_insert if row['unique_key'] in inserted_keys]
+        skipped = [row for row in to_insert if row['unique_key'] not in inserted_keys]
+        if skipped and update_existing:
+            self._upsert_sales_rows(db, dialect, sheet_config_id, [], skipped, now)
+            return new_rows, to_update + skipped, []
+        return new_rows, to_update, skipped
+    
+    def _upsert_sales_rows(
+        self,
+        db: Session,
+        dialect: str,
+        sheet_config_id: int,
+        to_insert: List[Dict],
+        to_update: List[Dict],
+        now: datetime
+    ) -> Set[str]:
+        """
+        اجرای INSERT/UPDATE یک بسته با دستور بومی دیتابیس (executemany)
+        
+        Returns:
+            کلیدهای to_insert که واقعاً درج شدند (ON CONFLICT DO NOTHING بقیه را رد کرده است)
+        """
+        def values(row):
+            return {
+                'sheet_config_id': sheet_config_id,
+                'row_number': row['row_number'],
+                'unique_key': row['unique_key'],
+                'data': row['data'],
+                'content_hash': row.get('content_hash'),
+            }
+        
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+            
+            inserted_keys = set()
+            if to_insert:
+                stmt = insert(SalesData).on_conflict_do_nothing(index_elements=['unique_key'])
+                if db.bind.dialect.insert_executemany_returning:
+                    inserted_keys.update(
+                        db.execute(stmt.returning(SalesData.unique_key), [values(row) for row in to_insert]).scalars()
+                    )
+                else:
+                    # SQLite قدیمی (پیش از 3.35) بدون RETURNING: rowcount هر ردیف
+                    for row in to_insert:
+                        if db.execute(stmt, values(row)).rowcount:
+                            inserted_keys.add(row['unique_key'])
+            
+            if to_update:
+                stmt = insert(SalesData)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['unique_key'],
+                    set_={
+                        'data': stmt.excluded.data,
+                        'content_hash': stmt.excluded.content_hash,
+                        'row_number': stmt.excluded.row_number,
+                        'is_updated': True,
+                        'update_count': SalesData.update_count + 1,
+                        'updated_at': now,
+                    }
+                )
+                db.execute(stmt, [values(row) for row in to_update])
+            return inserted_keys
+        else:
+            # سایر دیتابیس‌ها: ORM در همان تراکنش
+            db.add_all([SalesData(**values(row)) for row in to_insert])
+            for row in to_update:
+                db.query(SalesData).filter_by(unique_key=row['unique_key']).update({
+                    'data': row['data'],
+                    'content_hash': row.get('content_hash'),
+                    'row_number': row['row_number'],
+                    'is_updated': True,
+                    'update_count': SalesData.update_count + 1,
+                    'updated_at': now,
+                }, synchronize_session=False)
+            db.flush()
+            return {row['unique_key'] for row in to_insert}
+    
+    @_scoped_to_unit_of_work
     def get_unexported_data(
         self,
         export_type: Optional[str] = None,
@@ -292,6 +776,10 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت داده‌های خروجی نگرفته: {str(e)}")
             return []
     
+    # حداکثر id در هر UPDATE ... WHERE id IN (...)
+    MARK_CHUNK_SIZE = 500
+    
+    @_scoped_to_unit_of_work
     def mark_as_exported(
         self,
         data_ids: List[int],
@@ -308,13 +796,18 @@ class DatabaseManager:
             (موفقیت, پیام)
         """
         try:
-            db = self.get_session()
-            
-            db.query(SalesData).filter(SalesData.id.in_(data_ids)).update({
-                'is_exported': True,
-                'export_type': export_type,
-                'exported_at': datetime.now()
-            }, synchronize_session=False)
+            db = self.get_session(write=True)
+            exported_at = datetime.now()
+            
+            # دسته‌ای (حد تعداد پارامترهای SQLite) - همه در یک تراکنش
+            for start in range(0, len(data_ids), self.MARK_CHUNK_SIZE):
+                db.query(SalesData).filter(
+                    SalesData.id.in_(data_ids[start:start + self.MARK_CHUNK_SIZE])
+                ).update({
+                    'is_exported': True,
+                    'export_type': export_type,
+                    'exported_at': exported_at
+                }, synchronize_session=False)
             
             db.commit()
             db.close()
@@ -327,6 +820,7 @@ class DatabaseManager:
     
     # ==================== Sales Data Queries ====================
     
+    @_scoped_to_unit_of_work
     def get_all_sales_data(self) -> List[SalesData]:
         """دریافت تمام داده‌های فروش"""
         try:
@@ -347,6 +841,7 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت داده‌ها: {str(e)}")
             return []
     
+    @_scoped_to_unit_of_work
     def get_sales_data_by_export_status(self, is_exported: bool) -> List[SalesData]:
         """دریافت داده‌ها بر اساس وضعیت Export"""
         try:
@@ -367,6 +862,7 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت داده‌ها: {str(e)}")
             return []
     
+    @_scoped_to_unit_of_work
     def get_sales_data_by_unique_key(self, unique_key: str) -> Optional[SalesData]:
         """دریافت داده بر اساس کلید یکتا"""
         try:
@@ -388,6 +884,7 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت داده: {str(e)}")
             return None
     
+    @_scoped_to_unit_of_work
     def get_updated_sales_data(self) -> List[SalesData]:
         """دریافت داده‌های ویرایش شده (نیاز به Re-export)"""
         try:
@@ -408,6 +905,154 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت داده‌ها: {str(e)}")
             return []
     
+    # ==================== Streaming Readers ====================
+    
+    # تعداد ردیف هر دسته خواننده‌های جریانی
+    STREAM_BATCH_SIZE = 1000
+    
+    def _iter_sales_data_rows(
+        self,
+        conditions: List,
+        order_by: Tuple,
+        limit: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[List[SalesDataRow]]:
+        """
+        خواندن جریانی رکوردها به صورت دسته‌های SalesDataRow
+        
+        ستون‌ها (نه شیء ORM) با yield_per/stream_results از cursor خوانده می‌شوند؛ در هر
+        لحظه فقط یک دسته در حافظه است. session تا پایان پیمایش (یا بستن generator) باز
+        می‌ماند.
+        
+        Raises:
+            خطای دیتابیس - برخلاف متدهای لیستی، خطا بلعیده نمی‌شود تا Export/انتقال
+            ناقص کامل به نظر نرسد
+        """
+        batch_size = batch_size or self.STREAM_BATCH_SIZE
+        
+        statement = select(*SALES_DATA_ROW_COLUMNS)
+        if conditions:
+            statement = statement.where(*conditions)
+        statement = statement.order_by(*order_by)
+        if limit:
+            statement = statement.limit(limit)
+        statement = statement.execution_options(yield_per=batch_size, stream_results=True)
+        
+        db = self.get_session()
+        try:
+            for partition in db.execute(statement).partitions():
+                yield [SalesDataRow(*row) for row in partition]
+        except Exception as e:
+            self.logger.error(f"خطا در خواندن جریانی داده‌ها: {str(e)}")
+            raise
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _sheet_conditions(sheet_config_ids: Optional[List[int]]) -> List:
+        """شرط فیلتر شیت‌ها (None/خالی = همه)"""
+        return [SalesData.sheet_config_id.in_(sheet_config_ids)] if sheet_config_ids else []
+    
+    def iter_all_sales_data(
+        self,
+        sheet_config_ids: Optional[List[int]] = None,
+        limit: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[List[SalesDataRow]]:
+        """
+        نسخه جریانی get_all_sales_data (جدیدترین استخراج اول)
+        
+        Args:
+            sheet_config_ids: فقط این شیت‌ها (None = همه)
+            limit: حداکثر تعداد
+            batch_size: تعداد ردیف هر دسته
+            
+        Yields:
+            دسته‌های SalesDataRow
+        """
+        return self._iter_sales_data_rows(
+            self._sheet_conditions(sheet_config_ids),
+            (SalesData.extracted_at.desc(), SalesData.id.desc()),
+            limit, batch_size
+        )
+    
+    def iter_sales_data_by_export_status(
+        self,
+        is_exported: bool,
+        sheet_config_ids: Optional[List[int]] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[List[SalesDataRow]]:
+        """نسخه جریانی get_sales_data_by_export_status (ن.ک. iter_all_sales_data)"""
+        return self._iter_sales_data_rows(
+            [SalesData.is_exported == is_exported] + self._sheet_conditions(sheet_config_ids),
+            (SalesData.extracted_at.desc(), SalesData.id.desc()),
+            batch_size=batch_size
+        )
+    
+    def iter_updated_sales_data(
+        self,
+        sheet_config_ids: Optional[List[int]] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[List[SalesDataRow]]:
+        """نسخه جریانی get_updated_sales_data (ن.ک. iter_all_sales_data)"""
+        return self._iter_sales_data_rows(
+            [SalesData.is_updated == True] + self._sheet_conditions(sheet_config_ids),
+            (SalesData.updated_at.desc(), SalesData.id.desc()),
+            batch_size=batch_size
+        )
+    
+    def iter_unexported_data(
+        self,
+        export_type: Optional[str] = None,
+        limit: Optional[int] = None,
+        max_id: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[List[SalesDataRow]]:
+        """
+        نسخه جریانی get_unexported_data (به ترتیب id)
+        
+        Args:
+            export_type: نوع خروجی
+            limit: محدودیت تعداد
+            max_id: فقط رکوردهای با id کوچک‌تر/مساوی (تکرار پیمایش بدون رکوردهای تازه استخراج شده)
+            batch_size: تعداد ردیف هر دسته
+        """
+        conditions = [SalesData.is_exported == False]
+        if export_type:
+            conditions.append(or_(SalesData.export_type == None, SalesData.export_type != export_type))
+        if max_id is not None:
+            conditions.append(SalesData.id <= max_id)
+        return self._iter_sales_data_rows(conditions, (SalesData.id,), limit, batch_size)
+    
+    def iter_extracted_data(
+        self,
+        sheet_config_id: int,
+        include_exported: bool = False,
+        only_non_transferred: bool = False,
+        batch_size: Optional[int] = None
+    ) -> Iterator[List[SalesDataRow]]:
+        """
+        نسخه جریانی get_extracted_data (به ترتیب id)
+        
+        Args:
+            sheet_config_id: شناسه تنظیمات شیت
+            include_exported: شامل داده‌های Export شده
+            only_non_transferred: فقط رکوردهایی که هنوز به Stage 2 منتقل نشده‌اند
+            batch_size: تعداد ردیف هر دسته
+        """
+        conditions = [SalesData.sheet_config_id == sheet_config_id]
+        if not include_exported:
+            conditions.append(SalesData.is_exported == False)
+        if only_non_transferred:
+            conditions.append(or_(SalesData.transferred == None, SalesData.transferred != 1))
+        return self._iter_sales_data_rows(conditions, (SalesData.id,), batch_size=batch_size)
+    
+    def count_non_transferred_data(self, sheet_config_id: int) -> int:
+        """تعداد رکوردهای یک شیت که هنوز به Stage 2 منتقل نشده‌اند (از شمارنده‌های شیت)"""
+        stats = self.get_sheet_statistics(sheet_config_id)
+        return stats['total'] - stats['transferred_count']
+    
+    @_scoped_to_unit_of_work
     def get_sales_data_by_id(self, data_id: int) -> Optional[SalesData]:
         """دریافت یک رکورد بر اساس ID"""
         try:
@@ -429,6 +1074,7 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت داده: {str(e)}")
             return None
     
+    @_scoped_to_unit_of_work
     def get_sales_data_by_sheet_config(self, sheet_config_id: int) -> List[SalesData]:
         """دریافت تمام رکوردهای یک شیت"""
         try:
@@ -448,6 +1094,75 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت داده‌های شیت: {str(e)}")
             return []
     
+    @_scoped_to_unit_of_work
+    def get_sheet_key_index(self, sheet_config_id: int) -> SheetKeyIndex:
+        """
+        بارگذاری یکباره کلیدهای یکتای یک شیت در حافظه
+        
+        فقط ستون‌های لازم خوانده می‌شوند (بدون JSON داده‌ها و بدون ساخت شیء ORM).
+        
+        Returns:
+            SheetKeyIndex (در صورت خطا خالی)
+        """
+        db = self.get_session()
+        try:
+            records = db.query(
+                SalesData.id, SalesData.unique_key, SalesData.row_number, SalesData.content_hash
+            ).filter(SalesData.sheet_config_id == sheet_config_id)
+            return SheetKeyIndex(sheet_config_id, records)
+        except Exception as e:
+            self.logger.error(f"خطا در بارگذاری کلیدهای شیت: {str(e)}")
+            return SheetKeyIndex(sheet_config_id)
+        finally:
+            db.close()
+    
+    @_scoped_to_unit_of_work
+    def backfill_content_hashes(
+        self,
+        sheet_config_id: int,
+        unique_columns: Optional[List[str]] = None,
+        chunk_size: int = 1000
+    ) -> int:
+        """
+        محاسبه content_hash رکوردهایی که hash ندارند
+        
+        (رکوردهای قدیمی پیش از migration یا پس از تغییر ستون‌های کلیدی)
+        
+        Returns:
+            تعداد رکوردهای بروز شده
+        """
+        from app.utils.unique_key_generator import UniqueKeyBatch
+        
+        key_batch = UniqueKeyBatch(sheet_config_id, unique_columns=unique_columns)
+        db = self.get_session(write=True)
+        updated = 0
+        try:
+            while True:
+                items = db.query(SalesData.id, SalesData.data).filter(
+                    SalesData.sheet_config_id == sheet_config_id,
+                    SalesData.content_hash.is_(None)
+                ).limit(chunk_size).all()
+                if not items:
+                    break
+                
+                db.bulk_update_mappings(SalesData, [
+                    {'id': item.id, 'content_hash': key_batch.hash_record(item.data or {})}
+                    for item in items
+                ])
+                db.commit()
+                updated += len(items)
+            
+            if updated:
+                self.logger.info(f"🔑 hash محتوای {updated:,} رکورد محاسبه شد")
+            return updated
+        except Exception as e:
+            db.rollback()
+            self.logger.error(f"خطا در محاسبه hash محتوا: {str(e)}")
+            return updated
+        finally:
+            db.close()
+    
+    @_scoped_to_unit_of_work
     def get_sales_data_by_unique_key(self, unique_key: str) -> Optional[SalesData]:
         """دریافت یک رکورد بر اساس Unique Key"""
         try:
@@ -469,6 +1184,7 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت داده: {str(e)}")
             return None
     
+    @_scoped_to_unit_of_work
     def get_sales_data_count(self, is_exported: Optional[bool] = None) -> int:
         """شمارش داده‌ها"""
         try:
@@ -483,109 +1199,299 @@ class DatabaseManager:
             self.logger.error(f"خطا در شمارش: {str(e)}")
             return 0
     
-    # 🚀 Paginated Methods برای سرعت بالا
+    # فیلترهای مرور داده‌ها: وضعیت -> (شرط، کلید شمارنده در آمار شیت)
+    SALES_DATA_FILTERS = {
+        'all': (None, 'total'),
+        'exported': (SalesData.is_exported == True, 'exported'),
+        'not_exported': (SalesData.is_exported == False, 'not_exported'),
+        'updated': (SalesData.is_updated == True, 'updated_count'),
+    }
     
-    def get_all_sales_data_paginated(
-        self, 
-        limit: int = 100, 
-        offset: int = 0,
-        sheet_config_id: Optional[int] = None
-    ) -> Tuple[List[SalesData], int]:
-        """دریافت داده‌ها با pagination"""
+    @_scoped_to_unit_of_work
+    def get_sales_data_page(
+        self,
+        status: str = 'all',
+        sheet_config_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        limit: int = 100,
+        field_filters: Optional[List[Tuple[str, str, Any]]] = None
+    ) -> Tuple[List[SalesData], bool]:
+        """
+        دریافت یک صفحه داده با صفحه‌بندی keyset روی id (جدیدترین اول)
+        
+        به جای OFFSET از آخرین/اولین id صفحه فعلی ادامه می‌دهد؛ هزینه هر صفحه مستقل از
+        عمق آن است. تعداد کل از get_sales_data_filter_count خوانده می‌شود.
+        
+        Args:
+            status: all | exported | not_exported | updated
+            sheet_config_id: فیلتر شیت (None = همه)
+            after_id: صفحه بعد - رکوردهای با id کوچک‌تر از آخرین id صفحه فعلی
+            before_id: صفحه قبل - رکوردهای با id بزرگ‌تر از اولین id صفحه فعلی
+            limit: تعداد رکورد صفحه
+            field_filters: فیلتر کلیدهای داده JSON [(کلید, عملگر, مقدار)] (ن.ک. find_sales_data)
+            
+        Returns:
+            (رکوردهای صفحه به ترتیب id نزولی, آیا در همان جهت صفحه دیگری هست)
+        """
         try:
             db = self.get_session()
             
-            query = db.query(SalesData).options(joinedload(SalesData.sheet_config))
+            query = self._filter_sales_data_query(db, status, sheet_config_id, field_filters)
             
-            if sheet_config_id is not None:
-                query = query.filter_by(sheet_config_id=sheet_config_id)
+            if before_id is not None:
+                query = query.filter(SalesData.id > before_id).order_by(SalesData.id.asc())
+            else:
+                if after_id is not None:
+                    query = query.filter(SalesData.id < after_id)
+                query = query.order_by(SalesData.id.desc())
             
-            # شمارش کل
-            total = query.count()
+            # یک رکورد اضافه برای تشخیص وجود صفحه بعدی
+            data_list = query.limit(limit + 1).all()
+            db.close()
             
-            # دریافت صفحه فعلی
-            data_list = query.order_by(SalesData.id.desc()).limit(limit).offset(offset).all()
+            has_more = len(data_list) > limit
+            data_list = data_list[:limit]
+            if before_id is not None:
+                data_list.reverse()
             
-            # Force load and detach
-            result = []
-            for data in data_list:
-                _ = data.data
-                if data.sheet_config:
-                    _ = data.sheet_config.name
-                db.expunge(data)
-                result.append(data)
+            return data_list, has_more
             
-            db.close()
-            return result, total
         except Exception as e:
-            self.logger.error(f"خطا در دریافت داده‌ها (paginated): {str(e)}")
-            return [], 0
+            self.logger.error(f"خطا در دریافت صفحه داده‌ها: {str(e)}")
+            return [], False
     
-    def get_sales_data_by_export_status_paginated(
+    def _filter_sales_data_query(
         self,
-        is_exported: bool,
-        limit: int = 100,
-        offset: int = 0,
-        sheet_config_id: Optional[int] = None
-    ) -> Tuple[List[SalesData], int]:
-        """دریافت داده‌ها بر اساس وضعیت Export با pagination"""
-        try:
-            db = self.get_session()
-            
-            query = db.query(SalesData).options(joinedload(SalesData.sheet_config)).filter_by(is_exported=is_exported)
-            
-            if sheet_config_id is not None:
-                query = query.filter_by(sheet_config_id=sheet_config_id)
-            
-            total = query.count()
-            data_list = query.order_by(SalesData.id.desc()).limit(limit).offset(offset).all()
-            
-            result = []
-            for data in data_list:
-                _ = data.data
-                if data.sheet_config:
-                    _ = data.sheet_config.name
-                db.expunge(data)
-                result.append(data)
-            
-            db.close()
-            return result, total
-        except Exception as e:
-            self.logger.error(f"خطا در دریافت داده‌ها (paginated): {str(e)}")
-            return [], 0
+        db: Session,
+        status: str = 'all',
+        sheet_config_id: Optional[int] = None,
+        field_filters: Optional[List[Tuple[str, str, Any]]] = None
+    ):
+        """کوئری SalesData با فیلتر وضعیت، شیت و کلیدهای داده JSON"""
+        query = db.query(SalesData)
+        
+        condition = self.SALES_DATA_FILTERS[status][0]
+        if condition is not None:
+            query = query.filter(condition)
+        
+        if sheet_config_id is not None:
+            query = query.filter(SalesData.sheet_config_id == sheet_config_id)
+        
+        if field_filters:
+            query = query.filter(build_json_filters(field_filters, db.get_bind().dialect.name))
+        
+        return query
     
-    def get_updated_sales_data_paginated(
+    @_scoped_to_unit_of_work
+    def get_sales_data_filter_count(
         self,
-        limit: int = 100,
-        offset: int = 0,
-        sheet_config_id: Optional[int] = None
-    ) -> Tuple[List[SalesData], int]:
-        """دریافت داده‌های ویرایش شده با pagination"""
-        try:
-            db = self.get_session()
-            
-            query = db.query(SalesData).options(joinedload(SalesData.sheet_config)).filter_by(is_updated=True)
-            
-            if sheet_config_id is not None:
-                query = query.filter_by(sheet_config_id=sheet_config_id)
-            
-            total = query.count()
-            data_list = query.order_by(SalesData.id.desc()).limit(limit).offset(offset).all()
+        status: str = 'all',
+        sheet_config_id: Optional[int] = None,
+        field_filters: Optional[List[Tuple[str, str, Any]]] = None
+    ) -> int:
+        """
+        تعداد رکوردهای یک فیلتر مرور داده‌ها
+        
+        بدون فیلتر کلیدهای JSON از شمارنده‌های هر شیت و با آن با COUNT روی ایندکس کلیدها.
+        
+        Args:
+            status: all | exported | not_exported | updated
+            sheet_config_id: فیلتر شیت (None = همه)
+            field_filters: فیلتر کلیدهای داده JSON
+        """
+        if field_filters:
+            try:
+                db = self.get_session()
+                count = self._filter_sales_data_query(db, status, sheet_config_id, field_filters).count()
+                db.close()
+                return count
+            except Exception as e:
+                self.logger.error(f"خطا در شمارش: {str(e)}")
+                return 0
+        
+        counter = self.SALES_DATA_FILTERS[status][1]
+        if sheet_config_id is not None:
+            return self.get_sheet_statistics(sheet_config_id)[counter]
+        return sum(stat[counter] for stat in self.get_all_sheets_statistics())
+    
+    @_scoped_to_unit_of_work
+    def find_sales_data(
+        self,
+        field_filters: List[Tuple[str, str, Any]],
+        sheet_config_id: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[SalesData]:
+        """
+        جستجوی داده‌ها بر اساس مقدار کلیدهای داده JSON
+        
+        برای کلیدهای indexed_fields از ایندکس json_extract استفاده می‌شود (بدون پیمایش
+        کل جدول و بدون خواندن JSON در پایتون).
+        
+        Args:
+            field_filters: [(کلید, عملگر, مقدار)] - عملگرها: = != < <= > >= between in
+                مثال: [('TR_ID', '=', '12345'), ('Sold_Date', 'between', ('1403/01/01', '1403/01/31'))]
+            sheet_config_id: فیلتر شیت (None = همه)
+            limit: حداکثر تعداد
             
-            result = []
-            for data in data_list:
-                _ = data.data
-                if data.sheet_config:
-                    _ = data.sheet_config.name
-                db.expunge(data)
-                result.append(data)
+        Returns:
+            لیست رکوردها (جدیدترین اول)
+        """
+        try:
+            db = self.get_session()
+            query = self._filter_sales_data_query(db, 'all', sheet_config_id, field_filters)
+            query = query.order_by(SalesData.id.desc())
+            if limit:
+                query = query.limit(limit)
+            data_list = query.all()
+            db.close()
+            return data_list
+        except Exception as e:
+            self.logger.error(f"خطا در جستجوی داده‌ها: {str(e)}")
+            return []
+    
+    def _search_sales_data_query(
+        self,
+        db: Session,
+        search_text: str,
+        status: str = 'all',
+        sheet_config_id: Optional[int] = None,
+        field_filters: Optional[List[Tuple[str, str, Any]]] = None
+    ):
+        """
+        کوئری id رکوردهای منطبق با متن جستجو (None اگر متن کلمه‌ای نداشته باشد)
+        
+        روی SQLite با جدول FTS5 مرتب بر اساس رتبه؛ در غیر این صورت LIKE روی متن JSON
+        (کند، جدیدترین اول).
+        """
+        query = self._filter_sales_data_query(db, status, sheet_config_id, field_filters)
+        query = query.with_entities(SalesData.id)
+        
+        if has_sales_data_fts(db.get_bind()):
+            match = build_match_query(search_text)
+            if match is None:
+                return None
+            return query.join(
+                sales_data_fts, sales_data_fts.c.rowid == SalesData.id
+            ).filter(
+                literal_column(FTS_TABLE).op('MATCH')(match)
+            ).order_by(sales_data_fts.c.rank)
+        
+        words = (search_text or '').split()
+        if not words:
+            return None
+        for word in words:
+            query = query.filter(cast(SalesData.data, String).ilike(f"%{word}%"))
+        return query.order_by(SalesData.id.desc())
+    
+    @_scoped_to_unit_of_work
+    def search_sales_data(
+        self,
+        search_text: str,
+        sheet_config_id: Optional[int] = None,
+        status: str = 'all',
+        field_filters: Optional[List[Tuple[str, str, Any]]] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> Tuple[List[int], bool]:
+        """
+        جستجوی متن کامل در مقادیر داده‌ها
+        
+        فقط id ها خوانده می‌شوند (بدون بارگذاری رکوردها در پایتون)؛ رکوردهای صفحه با
+        get_sales_data_by_ids دریافت می‌شوند.
+        
+        Args:
+            search_text: متن جستجو - همه کلمات باید در ردیف باشند (جستجوی پیشوندی)
+                مثال: "ali@gmail" یا "علی رضایی"
+            sheet_config_id: فیلتر شیت (None = همه)
+            status: all | exported | not_exported | updated
+            field_filters: فیلتر کلیدهای داده JSON (ن.ک. find_sales_data)
+            limit: تعداد id صفحه
+            offset: شروع صفحه در نتایج مرتب شده
             
+        Returns:
+            (id ها به ترتیب رتبه, آیا صفحه بعدی هست)
+        """
+        try:
+            db = self.get_session()
+            query = self._search_sales_data_query(db, search_text, status, sheet_config_id, field_filters)
+            if query is None:
+                db.close()
+                return [], False
+            
+            # یک id اضافه برای تشخیص وجود صفحه بعدی
+            ids = [row[0] for row in query.limit(limit + 1).offset(offset).all()]
             db.close()
-            return result, total
+            
+            return ids[:limit], len(ids) > limit
+            
         except Exception as e:
-            self.logger.error(f"خطا در دریافت داده‌ها (paginated): {str(e)}")
-            return [], 0
+            self.logger.error(f"خطا در جستجوی متن: {str(e)}")
+            return [], False
+    
+    @_scoped_to_unit_of_work
+    def get_sales_data_search_count(
+        self,
+        search_text: str,
+        sheet_config_id: Optional[int] = None,
+        status: str = 'all',
+        field_filters: Optional[List[Tuple[str, str, Any]]] = None
+    ) -> int:
+        """تعداد رکوردهای منطبق با متن جستجو (ن.ک. search_sales_data)"""
+        try:
+            db = self.get_session()
+            query = self._search_sales_data_query(db, search_text, status, sheet_config_id, field_filters)
+            count = query.order_by(None).count() if query is not None else 0
+            db.close()
+            return count
+        except Exception as e:
+            self.logger.error(f"خطا در شمارش نتایج جستجو: {str(e)}")
+            return 0
+    
+    @_scoped_to_unit_of_work
+    def get_sales_data_by_ids(self, data_ids: List[int]) -> List[SalesData]:
+        """
+        دریافت رکوردها بر اساس لیست id (با همان ترتیب لیست)
+        
+        Args:
+            data_ids: لیست id ها (مثلاً یک صفحه نتایج search_sales_data)
+        """
+        if not data_ids:
+            return []
+        try:
+            db = self.get_session()
+            records = {
+                data.id: data
+                for data in db.query(SalesData).filter(SalesData.id.in_(data_ids)).all()
+            }
+            db.close()
+            return [records[data_id] for data_id in data_ids if data_id in records]
+        except Exception as e:
+            self.logger.error(f"خطا در دریافت داده‌ها: {str(e)}")
+            return []
     
+    def optimize_search_index(self) -> Tuple[bool, str]:
+        """
+        ادغام ایندکس جستجوی متن کامل (پس از استخراج/حذف‌های زیاد)
+        
+        Returns:
+            (موفقیت, پیام)
+        """
+        try:
+            if not has_sales_data_fts(engine):
+                return True, "ایندکس جستجوی متن کامل روی این دیتابیس وجود ندارد"
+            
+            with engine.begin() as connection:
+                optimize_sales_data_fts(connection)
+            
+            self.logger.info("🔎 ایندکس جستجوی متن کامل بهینه شد")
+            return True, "ایندکس جستجو بهینه شد"
+            
+        except Exception as e:
+            self.logger.error(f"خطا در بهینه‌سازی ایندکس جستجو: {str(e)}")
+            return False, str(e)
+    
+    @_scoped_to_unit_of_work
     def get_updated_sales_data_count(self) -> int:
         """شمارش داده‌های ویرایش شده"""
         try:
@@ -597,6 +1503,97 @@ class DatabaseManager:
             self.logger.error(f"خطا در شمارش: {str(e)}")
             return 0
     
+    def _query_sheet_statistics(self, db: Session, sheet_config_id: Optional[int] = None) -> List[Dict]:
+        """
+        آمار شیت‌ها
+        
+        روی SQLite از شمارنده‌های sheet_stats (O(تعداد شیت‌ها)) و روی دیتابیس‌های دیگر
+        با یک کوئری GROUP BY (شمارش‌های شرطی با SUM(CASE ...)) خوانده می‌شود.
+        
+        Args:
+            db: session
+            sheet_config_id: فقط یک شیت (None = همه شیت‌هایی که داده دارند)
+            
+        Returns:
+            لیست آمار هر شیت (ترتیب نامشخص)
+        """
+        if is_sheet_stats_supported(db.get_bind()):
+            query = db.query(
+                SheetStats.sheet_config_id,
+                SheetConfig.name,
+                SheetStats.total,
+                SheetStats.exported,
+                SheetStats.not_exported,
+                SheetStats.need_reexport,
+                SheetStats.updated,
+                SheetStats.transferred,
+                SheetStats.last_extract
+            ).outerjoin(
+                SheetConfig, SheetConfig.id == SheetStats.sheet_config_id
+            ).filter(SheetStats.total > 0)
+            
+            if sheet_config_id is not None:
+                query = query.filter(SheetStats.sheet_config_id == sheet_config_id)
+        else:
+            def count_where(condition):
+                return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+            
+            query = db.query(
+                SalesData.sheet_config_id,
+                SheetConfig.name,
+                func.count(SalesData.id).label('total'),
+                count_where(SalesData.is_exported == True).label('exported'),
+                count_where(SalesData.is_exported == False).label('not_exported'),
+                count_where(and_(SalesData.is_exported == True, SalesData.is_updated == True)).label('need_reexport'),
+                count_where(SalesData.is_updated == True).label('updated'),
+                count_where(SalesData.transferred == 1).label('transferred'),
+                func.max(SalesData.extracted_at).label('last_extract')
+            ).outerjoin(
+                SheetConfig, SheetConfig.id == SalesData.sheet_config_id
+            )
+            
+            if sheet_config_id is not None:
+                query = query.filter(SalesData.sheet_config_id == sheet_config_id)
+            
+            query = query.group_by(SalesData.sheet_config_id, SheetConfig.name)
+        
+        return [
+            {
+                'sheet_config_id': row.sheet_config_id,
+                'name': row.name or "نامشخص",
+                'total': row.total,
+                'exported': row.exported,
+                'not_exported': row.not_exported,
+                'need_reexport': row.need_reexport,
+                'updated_count': row.updated,
+                'transferred_count': row.transferred,
+                'last_extract': row.last_extract
+            }
+            for row in query.all()
+        ]
+    
+    def rebuild_sheet_stats(self) -> Tuple[bool, str]:
+        """
+        بازسازی شمارنده‌های sheet_stats از روی sales_data
+        
+        Returns:
+            (موفقیت, پیام)
+        """
+        try:
+            if not is_sheet_stats_supported(engine):
+                return True, "شمارنده‌ها روی این دیتابیس مستقیم محاسبه می‌شوند"
+            
+            with engine.begin() as connection:
+                sheets = rebuild_sheet_stats(connection)
+            
+            self.logger.info(f"🔄 شمارنده‌های {sheets} شیت بازسازی شد")
+            return True, f"شمارنده‌های {sheets} شیت بازسازی شد"
+            
+        except Exception as e:
+            self.logger.error(f"خطا در بازسازی شمارنده‌ها: {str(e)}")
+            return False, str(e)
+    
+    @_scoped_to_unit_of_work
     def get_sheet_statistics(self, sheet_config_id: int) -> Dict:
         """
         دریافت آمار کامل یک شیت
@@ -617,69 +1614,28 @@ class DatabaseManager:
         try:
             db = self.get_session()
             
-            # دریافت نام شیت
-            sheet_config = db.query(SheetConfig).filter_by(id=sheet_config_id).first()
-            sheet_name = sheet_config.name if sheet_config else "نامشخص"
-            
-            # آمار کلی
-            total = db.query(SalesData).filter_by(sheet_config_id=sheet_config_id).count()
-            
-            # Export شده
-            exported = db.query(SalesData).filter_by(
-                sheet_config_id=sheet_config_id,
-                is_exported=True
-            ).count()
-            
-            # Export نشده
-            not_exported = db.query(SalesData).filter_by(
-                sheet_config_id=sheet_config_id,
-                is_exported=False
-            ).count()
-            
-            # نیاز به Re-export (export شده ولی update شده)
-            need_reexport = db.query(SalesData).filter_by(
-                sheet_config_id=sheet_config_id,
-                is_exported=True,
-                is_updated=True
-            ).count()
-            
-            # منتقل شده به Stage 2
-            transferred_count = db.query(SalesData).filter(
-                and_(
-                    SalesData.sheet_config_id == sheet_config_id,
-                    SalesData.transferred == 1
-                )
-            ).count()
-            
-            # آخرین استخراج
-            last_data = db.query(SalesData).filter_by(
-                sheet_config_id=sheet_config_id
-            ).order_by(SalesData.extracted_at.desc()).first()
-            
-            last_extract = last_data.extracted_at if last_data else None
-            
-            # تعداد منتقل شده به Stage 2
-            try:
-                transferred_count = db.query(SalesData).filter_by(
-                    sheet_config_id=sheet_config_id,
-                    transferred=1
-                ).count()
-            except:
-                # اگر فیلد transferred وجود نداره
-                transferred_count = 0
+            stats = self._query_sheet_statistics(db, sheet_config_id)
+            
+            if stats:
+                stat = stats[0]
+            else:
+                # شیت بدون داده
+                sheet_config = db.query(SheetConfig).filter_by(id=sheet_config_id).first()
+                stat = {
+                    'sheet_config_id': sheet_config_id,
+                    'name': sheet_config.name if sheet_config else "نامشخص",
+                    'total': 0,
+                    'exported': 0,
+                    'not_exported': 0,
+                    'need_reexport': 0,
+                    'updated_count': 0,
+                    'transferred_count': 0,
+                    'last_extract': None
+                }
             
             db.close()
             
-            return {
-                'sheet_config_id': sheet_config_id,
-                'name': sheet_name,
-                'total': total,
-                'exported': exported,
-                'not_exported': not_exported,
-                'need_reexport': need_reexport,
-                'transferred_count': transferred_count,
-                'last_extract': last_extract
-            }
+            return stat
             
         except Exception as e:
             self.logger.error(f"خطا در دریافت آمار شیت: {str(e)}")
@@ -690,27 +1646,19 @@ class DatabaseManager:
                 'exported': 0,
                 'not_exported': 0,
                 'need_reexport': 0,
+                'updated_count': 0,
                 'transferred_count': 0,
                 'last_extract': None
             }
     
+    @_scoped_to_unit_of_work
     def get_all_sheets_statistics(self) -> List[Dict]:
-        """دریافت آمار همه شیت‌ها"""
+        """دریافت آمار همه شیت‌هایی که داده دارند (یک کوئری برای همه)"""
         try:
             db = self.get_session()
-            
-            # شیت‌هایی که داده دارند
-            sheet_ids = db.query(SalesData.sheet_config_id).distinct().all()
-            sheet_ids = [sid[0] for sid in sheet_ids]
-            
+            stats = self._query_sheet_statistics(db)
             db.close()
             
-            stats = []
-            for sheet_id in sheet_ids:
-                stat = self.get_sheet_statistics(sheet_id)
-                if stat['total'] > 0:
-                    stats.append(stat)
-            
             # مرتب‌سازی بر اساس تعداد (بیشترین اول)
             stats.sort(key=lambda x: x['total'], reverse=True)
             
@@ -720,10 +1668,11 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت آمار همه شیت‌ها: {str(e)}")
             return []
     
+    @_scoped_to_unit_of_work
     def delete_sales_data(self, data_id: int) -> Tuple[bool, str]:
         """حذف یک رکورد"""
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             data = db.query(SalesData).filter_by(id=data_id).first()
             if data:
                 db.delete(data)
@@ -736,6 +1685,7 @@ class DatabaseManager:
             self.logger.error(f"خطا در حذف: {str(e)}")
             return False, str(e)
     
+    @_scoped_to_unit_of_work
     def delete_sheet_data(self, sheet_config_id: int) -> Tuple[bool, str]:
         """
         حذف تمام داده‌های یک شیت (بدون حذف تنظیمات شیت)
@@ -747,7 +1697,7 @@ class DatabaseManager:
             (موفقیت, پیام)
         """
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             
             # شمارش رکوردها قبل از حذف
             count = db.query(SalesData).filter_by(sheet_config_id=sheet_config_id).count()
@@ -758,6 +1708,8 @@ class DatabaseManager:
             
             # حذف تمام داده‌های شیت
             db.query(SalesData).filter_by(sheet_config_id=sheet_config_id).delete()
+            # اجرای بعدی بدون توجه به اثر انگشت قبلی انجام شود
+            db.query(SheetSyncState).filter_by(sheet_config_id=sheet_config_id).delete()
             db.commit()
             db.close()
             
@@ -773,10 +1725,14 @@ class DatabaseManager:
             self.logger.error(f"خطا در حذف داده‌های شیت: {str(e)}")
             return False, f"خطا: {str(e)}"
     
+    @_scoped_to_unit_of_work
     def update_sales_data(self, data_id: int, update_data: Dict) -> bool:
         """بروزرسانی یک رکورد"""
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
+            if 'data' in update_data and 'content_hash' not in update_data:
+                # hash محتوای قدیمی نامعتبر است و در استخراج بعدی دوباره محاسبه می‌شود
+                update_data = {**update_data, 'content_hash': None}
             db.query(SalesData).filter_by(id=data_id).update(update_data)
             db.commit()
             db.close()
@@ -787,10 +1743,11 @@ class DatabaseManager:
     
     # ==================== Export Template Management ====================
     
+    @_scoped_to_unit_of_work
     def create_export_template(self, data: Dict) -> bool:
         """ایجاد Template جدید"""
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             template = ExportTemplate(**data)
             db.add(template)
             db.commit()
@@ -800,10 +1757,11 @@ class DatabaseManager:
             self.logger.error(f"خطا در ایجاد Template: {str(e)}")
             return False
     
+    @_scoped_to_unit_of_work
     def update_export_template(self, template_id: int, data: Dict) -> bool:
         """بروزرسانی Template"""
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             db.query(ExportTemplate).filter_by(id=template_id).update(data)
             db.commit()
             db.close()
@@ -812,6 +1770,7 @@ class DatabaseManager:
             self.logger.error(f"خطا در بروزرسانی Template: {str(e)}")
             return False
     
+    @_scoped_to_unit_of_work
     def get_all_export_templates(self, active_only: bool = False) -> List[ExportTemplate]:
         """دریافت تمام Template ها"""
         try:
@@ -826,10 +1785,11 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت Template ها: {str(e)}")
             return []
     
+    @_scoped_to_unit_of_work
     def delete_export_template(self, template_id: int) -> Tuple[bool, str]:
         """حذف Template"""
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             template = db.query(ExportTemplate).filter_by(id=template_id).first()
             if template:
                 db.delete(template)
@@ -844,18 +1804,22 @@ class DatabaseManager:
     
     # ==================== Statistics ====================
     
+    @_scoped_to_unit_of_work
     def get_statistics(self) -> Dict:
         """دریافت آمار کلی"""
         try:
             db = self.get_session()
             
+            # جمع شمارنده‌های شیت‌ها
+            sheet_stats = self._query_sheet_statistics(db)
+            
             stats = {
                 'total_configs': db.query(SheetConfig).count(),
                 'active_configs': db.query(SheetConfig).filter_by(is_active=True).count(),
-                'total_records': db.query(SalesData).count(),
-                'exported_records': db.query(SalesData).filter_by(is_exported=True).count(),
-                'pending_records': db.query(SalesData).filter_by(is_exported=False).count(),
-                'updated_records': db.query(SalesData).filter_by(is_updated=True).count(),
+                'total_records': sum(stat['total'] for stat in sheet_stats),
+                'exported_records': sum(stat['exported'] for stat in sheet_stats),
+                'pending_records': sum(stat['not_exported'] for stat in sheet_stats),
+                'updated_records': sum(stat['updated_count'] for stat in sheet_stats),
                 'total_templates': db.query(ExportTemplate).count(),
                 'active_templates': db.query(ExportTemplate).filter_by(is_active=True).count(),
                 'total_exports': db.query(ExportLog).count(),
@@ -870,6 +1834,7 @@ class DatabaseManager:
     
     # ==================== Export Template Management ====================
     
+    @_scoped_to_unit_of_work
     def get_all_templates(self, active_only: bool = False) -> List[ExportTemplate]:
         """دریافت تمام Template ها"""
         try:
@@ -887,6 +1852,7 @@ class DatabaseManager:
             self.logger.error(f"Error getting templates: {e}")
             return []
     
+    @_scoped_to_unit_of_work
     def get_template(self, template_id: int) -> Optional[ExportTemplate]:
         """دریافت یک Template"""
         try:
@@ -899,10 +1865,11 @@ class DatabaseManager:
             self.logger.error(f"Error getting template: {e}")
             return None
     
+    @_scoped_to_unit_of_work
     def create_template(self, data: Dict) -> Tuple[bool, Optional[ExportTemplate], str]:
         """ساخت Template جدید"""
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             
             # بررسی تکراری
             existing = db.query(ExportTemplate).filter_by(name=data['name']).first()
@@ -924,10 +1891,11 @@ class DatabaseManager:
             self.logger.error(f"Error creating template: {e}")
             return False, None, str(e)
     
+    @_scoped_to_unit_of_work
     def update_template(self, template_id: int, data: Dict) -> Tuple[bool, str]:
         """به‌روزرسانی Template"""
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             
             template = db.query(ExportTemplate).filter_by(id=template_id).first()
             if not template:
@@ -948,10 +1916,11 @@ class DatabaseManager:
             self.logger.error(f"Error updating template: {e}")
             return False, str(e)
     
+    @_scoped_to_unit_of_work
     def delete_template(self, template_id: int) -> Tuple[bool, str]:
         """حذف Template"""
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             
             template = db.query(ExportTemplate).filter_by(id=template_id).first()
             if not template:
@@ -972,6 +1941,7 @@ class DatabaseManager:
     
     # ==================== Transfer to Stage 2 ====================
     
+    @_scoped_to_unit_of_work
     def get_extracted_data(self, sheet_config_id: int, include_exported: bool = False) -> List[Dict]:
         """
         دریافت داده‌های استخراج شده از یک شیت
@@ -989,7 +1959,7 @@ class DatabaseManager:
             query = db.query(SalesData).filter_by(sheet_config_id=sheet_config_id)
             
             if not include_exported:
-                query = query.filter_by(exported=0)
+                query = query.filter_by(is_exported=False)
             
             data_rows = query.all()
             
@@ -999,9 +1969,9 @@ class DatabaseManager:
                     'id': row.id,
                     'row_number': row.row_number,
                     'data': row.data,
-                    'exported': row.exported,
+                    'exported': row.is_exported,
                     'transferred': row.transferred if hasattr(row, 'transferred') else 0,
-                    'created_at': row.created_at
+                    'created_at': row.extracted_at
                 })
             
             db.close()
@@ -1011,6 +1981,7 @@ class DatabaseManager:
             self.logger.error(f"خطا در دریافت داده‌های استخراج شده: {str(e)}")
             return []
     
+    @_scoped_to_unit_of_work
     def mark_as_transferred(self, data_id: int) -> bool:
         """
         علامت‌گذاری یک رکورد به عنوان منتقل شده
@@ -1022,7 +1993,7 @@ class DatabaseManager:
             موفقیت
         """
         try:
-            db = self.get_session()
+            db = self.get_session(write=True)
             
             data = db.query(SalesData).filter_by(id=data_id).first()
             if data:
@@ -1042,6 +2013,609 @@ class DatabaseManager:
             self.logger.error(f"خطا در علامت‌گذاری: {str(e)}")
             return False
 
+    
+    # ==================== Sheet Sync State ====================
+    
+    @_scoped_to_unit_of_work
+    def get_sheet_sync_state(self, sheet_config_id: int) -> Optional[SheetSyncState]:
+        """دریافت وضعیت آخرین همگام‌سازی یک شیت"""
+        try:
+            db = self.get_session()
+            state = db.query(SheetSyncState).filter_by(sheet_config_id=sheet_config_id).first()
+            db.close()
+            return state
+        except Exception as e:
+            self.logger.error(f"خطا در دریافت وضعیت همگام‌سازی: {str(e)}")
+            return None
+    
+    @_scoped_to_unit_of_work
+    def save_sheet_sync_state(
+        self,
+        sheet_config_id: int,
+        fingerprint: Optional[str],
+        completed: bool
+    ) -> bool:
+        """
+        ذخیره اثر انگشت و وضعیت اجرای یک شیت
+        
+        Args:
+            sheet_config_id: شناسه تنظیمات
+            fingerprint: اثر انگشت تغییرات شیت
+            completed: آیا اجرا کامل شد (تمام ردیف‌ها ذخیره و علامت‌گذاری شدند)
+            
+        Returns:
+            موفقیت
+        """
+        try:
+            db = self.get_session(write=True)
+            
+            state = db.query(SheetSyncState).filter_by(sheet_config_id=sheet_config_id).first()
+            if not state:
+                state = SheetSyncState(sheet_config_id=sheet_config_id)
+                db.add(state)
+            
+            state.fingerprint = fingerprint
+            state.last_run_completed = completed
+            state.checked_at = datetime.now()
+            
+            if completed:
+                config = db.query(SheetConfig).filter_by(id=sheet_config_id).first()
+                if config:
+                    config.last_synced_at = datetime.now()
+            
+            db.commit()
+            db.close()
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"خطا در ذخیره وضعیت همگام‌سازی: {str(e)}")
+            return False
+    
+    @_scoped_to_unit_of_work
+    def clear_sheet_sync_state(self, sheet_config_id: int) -> bool:
+        """حذف اثر انگشت ذخیره شده (اجرای بعدی کامل انجام می‌شود)"""
+        try:
+            db = self.get_session(write=True)
+            db.query(SheetSyncState).filter_by(sheet_config_id=sheet_config_id).delete()
+            db.commit()
+            db.close()
+            return True
+        except Exception as e:
+            self.logger.error(f"خطا در حذف وضعیت همگام‌سازی: {str(e)}")
+            return False
+    
+    # ==================== Duplicate Candidates ====================
+    
+    @staticmethod
+    def _diff_summary(existing_data: Optional[Dict], new_data: Dict) -> Tuple[Dict, List[str]]:
+        """خلاصه تفاوت: (مقدار جدید فیلدهای تغییر یافته یا اضافه شده, فیلدهای حذف شده)"""
+        existing_data = existing_data or {}
+        changes = {key: value for key, value in new_data.items() if key not in existing_data or existing_data[key] != value}
+        removed = [key for key in existing_data if key not in new_data]
+        return changes, removed
+    
+    @staticmethod
+    def _data_hash(data: Optional[Dict]) -> str:
+        """hash کامل داده یک رکورد (پایه خلاصه تفاوت تکراری)"""
+        payload = json.dumps(data or {}, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.md5(payload.encode('utf-8')).hexdigest()
+    
+    @_scoped_to_unit_of_work
+    def stage_duplicate_candidates(
+        self,
+        sheet_config_id: int,
+        duplicates: List[Dict],
+        run_id: Optional[int] = None
+    ) -> int:
+        """
+        ثبت تکراری‌ها در جدول duplicate_candidates (به جای نگه‌داری در حافظه)
+        
+        تکراری قبلی با همان کلید یکتا با آخرین تفاوت‌ها جایگزین و دوباره در انتظار بررسی می‌شود.
+        
+        Args:
+            sheet_config_id: شناسه تنظیمات
+            duplicates: خروجی duplicates از bulk_upsert_sales_data
+            run_id: شناسه اجرای استخراج
+            
+        Returns:
+            تعداد تکراری‌های ثبت شده
+        """
+        if not duplicates:
+            return 0
+        
+        now = datetime.now()
+        staged = {}
+        for row in duplicates:
+            changes, removed = self._diff_summary(row.get('existing_data'), row['data'])
+            staged[row['unique_key']] = {
+                'sheet_config_id': sheet_config_id,
+                'existing_id': row.get('existing_id'),
+                'run_id': run_id,
+                'row_number': row['row_number'],
+                'unique_key': row['unique_key'],
+                'changes': changes,
+                'removed_fields': removed,
+                'changed_fields': len(changes) + len(removed),
+                'base_hash': self._data_hash(row.get('existing_data')),
+                'status': 'pending',
+                'created_at': now,
+                'resolved_at': None,
+            }
+        values = list(staged.values())
+        
+        db = self.get_session(write=True)
+        try:
+            dialect = db.bind.dialect.name
+            if dialect in ('sqlite', 'postgresql'):
+                insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+                stmt = insert(DuplicateCandidate)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['unique_key'],
+                    set_={
+                        column: stmt.excluded[column]
+                        for column in values[0] if column != 'unique_key'
+                    }
+                )
+                db.execute(stmt, values)
+            else:
+                db.query(DuplicateCandidate).filter(
+                    DuplicateCandidate.unique_key.in_(list(staged))
+                ).delete(synchronize_session=False)
+                db.add_all([DuplicateCandidate(**value) for value in values])
+            db.commit()
+            return len(values)
+        except Exception as e:
+            db.rollback()
+            self.logger.error(f"خطا در ثبت تکراری‌ها: {str(e)}")
+            return 0
+        finally:
+            db.close()
+    
+    @_scoped_to_unit_of_work
+    def get_duplicate_candidates_paginated(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        sheet_config_id: Optional[int] = None,
+        status: str = 'pending'
+    ) -> Tuple[List[DuplicateCandidate], int]:
+        """دریافت تکراری‌ها با pagination (بدون داده کامل رکوردها)"""
+        try:
+            db = self.get_session()
+            
+            query = db.query(DuplicateCandidate).filter_by(status=status)
+            if sheet_config_id is not None:
+                query = query.filter_by(sheet_config_id=sheet_config_id)
+            
+            total = query.count()
+            candidates = query.order_by(
+                DuplicateCandidate.sheet_config_id, DuplicateCandidate.row_number
+            ).limit(limit).offset(offset).all()
+            
+            db.close()
+            return candidates, total
+        except Exception as e:
+            self.logger.error(f"خطا در دریافت تکراری‌ها: {str(e)}")
+            return [], 0
+    
+    @_scoped_to_unit_of_work
+    def get_duplicate_candidates_count(self, status: str = 'pending', run_id: Optional[int] = None) -> int:
+        """تعداد تکراری‌ها (در صورت تعیین run_id فقط همان اجرا)"""
+        try:
+            db = self.get_session()
+            query = db.query(func.count(DuplicateCandidate.id)).filter(DuplicateCandidate.status == status)
+            if run_id is not None:
+                query = query.filter(DuplicateCandidate.run_id == run_id)
+            count = query.scalar() or 0
+            db.close()
+            return count
+        except Exception as e:
+            self.logger.error(f"خطا در شمارش تکراری‌ها: {str(e)}")
+            return 0
+    
+    @_scoped_to_unit_of_work
+    def get_duplicate_candidate_detail(self, candidate_id: int) -> Optional[Dict]:
+        """
+        بازسازی داده کامل یک تکراری برای نمایش و تصمیم کاربر
+        
+        اگر داده رکورد موجود با base_hash (داده هنگام ثبت تکراری) یکی نباشد، خلاصه تفاوت‌ها
+        روی داده دیگری ساخته شده و new_data بازسازی شده معتبر نیست: stale=True برمی‌گردد و
+        تکراری باید با استخراج دوباره شیت از نو ثبت شود.
+        
+        Returns:
+            {'id', 'row_number', 'unique_key', 'existing_id', 'existing_data', 'new_data', 'stale',
+             'sheet_config_id', 'sheet_url', 'worksheet_name', 'extracted_column'} یا None
+        """
+        try:
+            db = self.get_session()
+            candidate = db.query(DuplicateCandidate).filter_by(id=candidate_id).first()
+            if not candidate:
+                db.close()
+                return None
+            
+            existing = None
+            if candidate.existing_id:
+                existing = db.query(SalesData.id, SalesData.data).filter_by(id=candidate.existing_id).first()
+            if existing is None:
+                existing = db.query(SalesData.id, SalesData.data).filter_by(unique_key=candidate.unique_key).first()
+            config = db.query(
+                SheetConfig.sheet_url, SheetConfig.worksheet_name, SheetConfig.extracted_column
+            ).filter_by(id=candidate.sheet_config_id).first()
+            db.close()
+            
+            existing_data = dict(existing.data or {}) if existing else {}
+            new_data = {
+                key: value for key, value in existing_data.items()
+                if key not in (candidate.removed_fields or [])
+            }
+            new_data.update(candidate.changes or {})
+            # تکراری‌های ثبت شده پیش از base_hash قابل بررسی نیستند
+            stale = candidate.base_hash != self._data_hash(existing_data)
+            
+            return {
+                'id': candidate.id,
+                'row_number': candidate.row_number,
+                'unique_key': candidate.unique_key,
+                'existing_id': existing.id if existing else None,
+                'existing_data': existing_data,
+                'new_data': new_data,
+                'stale': stale,
+                'sheet_config_id': candidate.sheet_config_id,
+                'sheet_url': config.sheet_url if config else None,
+                'worksheet_name': config.worksheet_name if config else None,
+                'extracted_column': config.extracted_column if config else None,
+            }
+        except Exception as e:
+            self.logger.error(f"خطا در دریافت جزئیات تکراری: {str(e)}")
+            return None
+    
+    @_scoped_to_unit_of_work
+    def resolve_duplicate_candidates(self, candidate_ids: List[int], status: str) -> int:
+        """
+        ثبت تصمیم کاربر برای تکراری‌ها
+        
+        Args:
+            candidate_ids: شناسه‌ها
+            status: updated | skipped
+            
+        Returns:
+            تعداد رکوردهای بروز شده
+        """
+        if not candidate_ids:
+            return 0
+        try:
+            db = self.get_session(write=True)
+            count = db.query(DuplicateCandidate).filter(
+                DuplicateCandidate.id.in_(candidate_ids)
+            ).update({'status': status, 'resolved_at': datetime.now()}, synchronize_session=False)
+            db.commit()
+            db.close()
+            return count
+        except Exception as e:
+            self.logger.error(f"خطا در ثبت تصمیم تکراری‌ها: {str(e)}")
+            return 0
+    
+    # ==================== Extraction Runs ====================
+    
+    @_scoped_to_unit_of_work
+    def create_extraction_run(self, sheet_ids: Optional[List[int]] = None, force: bool = False) -> Optional[int]:
+        """
+        ثبت یک اجرای استخراج جدید
+        
+        Args:
+            sheet_ids: شناسه شیت‌های انتخاب شده (None = همه شیت‌های فعال)
+            force: استخراج کامل بدون توجه به اثر انگشت
+            
+        Returns:
+            شناسه اجرا یا None در صورت خطا
+        """
+        try:
+            db = self.get_session(write=True)
+            run = ExtractionRun(status='running', sheet_ids=sheet_ids, force=force)
+            db.add(run)
+            db.commit()
+            run_id = run.id
+            db.close()
+            return run_id
+        except Exception as e:
+            self.logger.error(f"خطا در ثبت اجرای استخراج: {str(e)}")
+            return None
+    
+    @_scoped_to_unit_of_work
+    def get_resumable_extraction_run(self) -> Optional[ExtractionRun]:
+        """
+        دریافت آخرین اجرای استخراج نیمه‌کاره (لغو شده، ناموفق یا قطع شده)
+        
+        Returns:
+            اجرا یا None اگر آخرین اجرا کامل شده باشد
+        """
+        try:
+            db = self.get_session()
+            run = db.query(ExtractionRun).order_by(ExtractionRun.id.desc()).first()
+            db.close()
+            if run and run.status != 'completed':
+                return run
+            return None
+        except Exception as e:
+            self.logger.error(f"خطا در دریافت اجرای نیمه‌کاره: {str(e)}")
+            return None
+    
+    @_scoped_to_unit_of_work
+    def resume_extraction_run(self, run_id: int) -> bool:
+        """علامت‌گذاری اجرا به عنوان در حال اجرا (ادامه از نقاط بازیابی)"""
+        try:
+            db = self.get_session(write=True)
+            run = db.query(ExtractionRun).filter_by(id=run_id).first()
+            if not run:
+                db.close()
+                return False
+            run.status = 'running'
+            run.resumed_count = (run.resumed_count or 0) + 1
+            run.finished_at = None
+            db.commit()
+            db.close()
+            return True
+        except Exception as e:
+            self.logger.error(f"خطا در ادامه اجرای استخراج: {str(e)}")
+            return False
+    
+    @_scoped_to_unit_of_work
+    def finish_extraction_run(self, run_id: int, status: str) -> bool:
+        """
+        ثبت پایان اجرای استخراج
+        
+        Args:
+            run_id: شناسه اجرا
+            status: completed | cancelled | failed
+        """
+        try:
+            db = self.get_session(write=True)
+            db.query(ExtractionRun).filter_by(id=run_id).update(
+                {'status': status, 'finished_at': datetime.now()},
+                synchronize_session=False
+            )
+            db.commit()
+            db.close()
+            return True
+        except Exception as e:
+            self.logger.error(f"خطا در ثبت پایان اجرای استخراج: {str(e)}")
+            return False
+    
+    @_scoped_to_unit_of_work
+    def get_extraction_checkpoints(self, run_id: int) -> Dict[int, ExtractionCheckpoint]:
+        """دریافت نقاط بازیابی یک اجرا: {sheet_config_id: checkpoint}"""
+        try:
+            db = self.get_session()
+            checkpoints = db.query(ExtractionCheckpoint).filter_by(run_id=run_id).all()
+            db.close()
+            return {checkpoint.sheet_config_id: checkpoint for checkpoint in checkpoints}
+        except Exception as e:
+            self.logger.error(f"خطا در دریافت نقاط بازیابی: {str(e)}")
+            return {}
+    
+    @_scoped_to_unit_of_work
+    def save_extraction_checkpoint(self, run_id: int, sheet_config_id: int, **fields) -> bool:
+        """
+        ایجاد یا بروزرسانی نقطه بازیابی یک شیت
+        
+        Args:
+            run_id: شناسه اجرا
+            sheet_config_id: شناسه تنظیمات شیت
+            **fields: ستون‌های قابل بروزرسانی (status, fingerprint, last_persisted_row,
+                persisted_rows, marked_rows, stats)
+            
+        Returns:
+            موفقیت
+        """
+        try:
+            db = self.get_session(write=True)
+            
+            checkpoint = db.query(ExtractionCheckpoint).filter_by(
+                run_id=run_id, sheet_config_id=sheet_config_id
+            ).first()
+            if not checkpoint:
+                checkpoint = ExtractionCheckpoint(run_id=run_id, sheet_config_id=sheet_config_id)
+                db.add(checkpoint)
+            
+            for key, value in fields.items():
+                setattr(checkpoint, key, value)
+            checkpoint.updated_at = datetime.now()
+            
+            db.commit()
+            db.close()
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"خطا در ذخیره نقطه بازیابی: {str(e)}")
+            return False
+    
+    # ==================== Sheet Write Outbox ====================
+    
+    @_scoped_to_unit_of_work
+    def enqueue_sheet_writes(
+        self,
+        sheet_config_id: int,
+        sheet_url: str,
+        worksheet_name: str,
+        extracted_column: str,
+        runs: List[Tuple[int, int]],
+        content_hashes: Optional[Dict[int, str]] = None
+    ) -> Tuple[bool, List[int], str]:
+        """
+        ثبت بازه‌های ردیف در صف علامت‌گذاری
+        
+        Args:
+            sheet_config_id: شناسه تنظیمات
+            sheet_url: آدرس شیت
+            worksheet_name: نام ورک‌شیت
+            extracted_column: ستون "استخراج شده"
+            runs: لیست بازه‌های (ردیف شروع, ردیف پایان)
+            content_hashes: {شماره ردیف: hash محتوای ذخیره شده} برای بررسی پیش از علامت‌گذاری
+            
+        Returns:
+            (موفقیت, آی‌دی ردیف‌های صف, پیام)
+        """
+        try:
+            db = self.get_session(write=True)
+            
+            entries = [
+                SheetWriteOutbox(
+                    sheet_config_id=sheet_config_id,
+                    sheet_url=sheet_url,
+                    worksheet_name=worksheet_name,
+                    extracted_column=extracted_column,
+                    start_row=start,
+                    end_row=end,
+                    content_hashes=self._run_content_hashes(start, end, content_hashes),
+                    attempts=0
+                )
+                for start, end in runs
+            ]
+            db.add_all(entries)
+            db.commit()
+            entry_ids = [entry.id for entry in entries]
+            db.close()
+            
+            return True, entry_ids, f"{len(entry_ids)} بازه در صف علامت‌گذاری ثبت شد."
+            
+        except Exception as e:
+            self.logger.error(f"خطا در ثبت صف علامت‌گذاری: {str(e)}")
+            return False, [], f"خطا: {str(e)}"
+    
+    @staticmethod
+    def _run_content_hashes(
+        start: int,
+        end: int,
+        content_hashes: Optional[Dict[int, Optional[str]]]
+    ) -> Optional[List[Optional[str]]]:
+        """hash ردیف‌های یک بازه به ترتیب (None اگر hash هیچ ردیفی معلوم نباشد)"""
+        if not content_hashes:
+            return None
+        hashes = [content_hashes.get(row_number) for row_number in range(start, end + 1)]
+        return hashes if any(hashes) else None
+    
+    @_scoped_to_unit_of_work
+    def get_pending_sheet_writes(
+        self,
+        sheet_config_id: Optional[int] = None,
+        due_only: bool = True
+    ) -> List[SheetWriteOutbox]:
+        """
+        دریافت عملیات علامت‌گذاری در انتظار
+        
+        Args:
+            sheet_config_id: فقط یک شیت (None = همه)
+            due_only: فقط مواردی که زمان تلاش بعدی آن‌ها رسیده
+            
+        Returns:
+            لیست ردیف‌های صف
+        """
+        try:
+            db = self.get_session()
+            
+            query = db.query(SheetWriteOutbox)
+            if sheet_config_id is not None:
+                query = query.filter(SheetWriteOutbox.sheet_config_id == sheet_config_id)
+            if due_only:
+                query = query.filter(or_(
+                    SheetWriteOutbox.next_attempt_at == None,
+                    SheetWriteOutbox.next_attempt_at <= datetime.now()
+                ))
+            
+            entries = query.order_by(
+                SheetWriteOutbox.sheet_config_id,
+                SheetWriteOutbox.start_row
+            ).all()
+            db.close()
+            return entries
+            
+        except Exception as e:
+            self.logger.error(f"خطا در دریافت صف علامت‌گذاری: {str(e)}")
+            return []
+    
+    @_scoped_to_unit_of_work
+    def get_pending_sheet_writes_count(self, sheet_config_id: Optional[int] = None) -> int:
+        """تعداد ردیف‌های شیت که هنوز علامت نخورده‌اند"""
+        try:
+            db = self.get_session()
+            query = db.query(func.sum(SheetWriteOutbox.end_row - SheetWriteOutbox.start_row + 1))
+            if sheet_config_id is not None:
+                query = query.filter(SheetWriteOutbox.sheet_config_id == sheet_config_id)
+            count = query.scalar() or 0
+            db.close()
+            return int(count)
+        except Exception as e:
+            self.logger.error(f"خطا در شمارش صف علامت‌گذاری: {str(e)}")
+            return 0
+    
+    @_scoped_to_unit_of_work
+    def resolve_sheet_writes(
+        self,
+        entry_ids: List[int],
+        failed_runs: Optional[List[Tuple[int, int]]] = None,
+        error: Optional[str] = None,
+        content_hashes: Optional[Dict[int, Optional[str]]] = None
+    ) -> bool:
+        """
+        جایگزینی ردیف‌های صف پس از یک تلاش (در یک تراکنش)
+        
+        ردیف‌های entry_ids حذف می‌شوند و بازه‌های ناموفق (ادغام شده) با
+        تعداد تلاش بیشتر و زمان تلاش بعدی (backoff نمایی) دوباره ثبت می‌شوند.
+        
+        Args:
+            entry_ids: آی‌دی ردیف‌های صف که تلاش شده‌اند (باید مقصد یکسان داشته باشند)
+            failed_runs: بازه‌های (ردیف شروع, ردیف پایان) که علامت نخوردند
+            error: پیام خطا
+            content_hashes: {شماره ردیف: hash محتوا} ردیف‌های بازه‌های ناموفق
+            
+        Returns:
+            موفقیت
+        """
+        if not entry_ids:
+            return True
+        
+        try:
+            db = self.get_session(write=True)
+            
+            entries = db.query(SheetWriteOutbox).filter(SheetWriteOutbox.id.in_(entry_ids)).all()
+            if not entries:
+                db.close()
+                return True
+            
+            template = entries[0]
+            attempts = max(entry.attempts for entry in entries) + 1
+            
+            if failed_runs:
+                # backoff نمایی با سقف یک ساعت
+                delay = min(3600, 30 * (2 ** (attempts - 1)))
+                next_attempt_at = datetime.now() + timedelta(seconds=delay)
+                db.add_all([
+                    SheetWriteOutbox(
+                        sheet_config_id=template.sheet_config_id,
+                        sheet_url=template.sheet_url,
+                        worksheet_name=template.worksheet_name,
+                        extracted_column=template.extracted_column,
+                        start_row=start,
+                        end_row=end,
+                        content_hashes=self._run_content_hashes(start, end, content_hashes),
+                        attempts=attempts,
+                        last_error=error,
+                        next_attempt_at=next_attempt_at
+                    )
+                    for start, end in failed_runs
+                ])
+            
+            for entry in entries:
+                db.delete(entry)
+            
+            db.commit()
+            db.close()
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"خطا در بروزرسانی صف علامت‌گذاری: {str(e)}")
+            return False
+
 
 # نمونه سراسری
 db_manager = DatabaseManager()
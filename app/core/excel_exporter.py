@@ -8,7 +8,7 @@ from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 import shutil
 
 from app.core.logger import app_logger
@@ -25,7 +25,7 @@ class ExcelExporter:
     def export_to_excel(
         self,
         template: ExportTemplate,
-        data_list: List[SalesData],
+        data_rows: Iterable,
         output_path: str
     ) -> Tuple[bool, str]:
         """
@@ -33,16 +33,87 @@ class ExcelExporter:
         
         Args:
             template: Template Export
-            data_list: لیست داده‌های استخراج شده
+            data_rows: رکوردهای استخراج شده (SalesData یا SalesDataRow) - لیست یا
+                iterator جریانی (مثلاً از DatabaseManager.iter_*)؛ فقط یک بار پیمایش می‌شود
             output_path: مسیر فایل خروجی
             
         Returns:
             (موفقیت, پیام)
         """
+        success, message, _ = self._export(template, data_rows, output_path, apply_styling=False)
+        return success, message
+    
+    def export_with_formatting(
+        self,
+        template: ExportTemplate,
+        data_rows: Iterable,
+        output_path: str,
+        apply_styling: bool = True
+    ) -> Tuple[bool, str]:
+        """
+        Export با فرمت‌بندی پیشرفته
+        
+        Args:
+            template: Template Export
+            data_rows: رکوردها (ن.ک. export_to_excel)
+            output_path: مسیر خروجی
+            apply_styling: اعمال استایل‌ها
+            
+        Returns:
+            (موفقیت, پیام)
+        """
+        success, message, record_count = self._export(template, data_rows, output_path, apply_styling)
+        if success and apply_styling:
+            return True, f"✅ Export با فرمت‌بندی انجام شد: {record_count} رکورد"
+        return success, message
+    
+    @staticmethod
+    def _column_mappings(template: ExportTemplate) -> Dict[str, str]:
+        """
+        Mapping ستون‌ها به فرمت {'db_column': 'A'}
+        
+        فرمت قدیم: {'db_column': 'A'}
+        فرمت جدید: {'A': {'source_column': 'db_column', 'source_sheet': 1, 'formula': None}}
+        """
+        column_mappings = template.column_mappings or {}
+        
+        # بررسی فرمت mapping (قدیم یا جدید)
+        is_new_format = False
+        if column_mappings:
+            first_value = next(iter(column_mappings.values()))
+            if isinstance(first_value, dict) and 'source_column' in first_value:
+                is_new_format = True
+        
+        # تبدیل فرمت جدید به قدیم برای سازگاری
+        if is_new_format:
+            old_format_mappings = {}
+            for excel_col, mapping_info in column_mappings.items():
+                source_col = mapping_info.get('source_column')
+                if source_col:
+                    old_format_mappings[source_col] = excel_col
+            column_mappings = old_format_mappings
+        
+        return column_mappings
+    
+    def _export(
+        self,
+        template: ExportTemplate,
+        data_rows: Iterable,
+        output_path: str,
+        apply_styling: bool
+    ) -> Tuple[bool, str, int]:
+        """
+        نوشتن رکوردها در کپی Template، فرمت‌بندی (اختیاری) و علامت‌گذاری Export
+        
+        فایل یک بار باز و ذخیره می‌شود؛ از رکوردها فقط id ها نگه داشته می‌شوند.
+        
+        Returns:
+            (موفقیت, پیام, تعداد رکوردها)
+        """
         try:
             # بارگذاری فایل Template
             if not Path(template.template_path).exists():
-                return False, f"فایل Template یافت نشد: {template.template_path}"
+                return False, f"فایل Template یافت نشد: {template.template_path}", 0
             
             # کپی Template به فایل خروجی
             shutil.copy2(template.template_path, output_path)
@@ -57,31 +128,14 @@ class ExcelExporter:
                 ws = wb.active
             
             # دریافت Mapping ستون‌ها
-            column_mappings = template.column_mappings or {}
-            
-            # بررسی فرمت mapping (قدیم یا جدید)
-            # فرمت قدیم: {'db_column': 'A'}
-            # فرمت جدید: {'A': {'source_column': 'db_column', 'source_sheet': 1, 'formula': None}}
-            is_new_format = False
-            if column_mappings:
-                first_value = next(iter(column_mappings.values()))
-                if isinstance(first_value, dict) and 'source_column' in first_value:
-                    is_new_format = True
-            
-            # تبدیل فرمت جدید به قدیم برای سازگاری
-            if is_new_format:
-                old_format_mappings = {}
-                for excel_col, mapping_info in column_mappings.items():
-                    source_col = mapping_info.get('source_column')
-                    if source_col:
-                        old_format_mappings[source_col] = excel_col
-                column_mappings = old_format_mappings
+            column_mappings = self._column_mappings(template)
             
             # شروع از سطر مشخص شده
             current_row = template.start_row
+            data_ids = []
             
             # نوشتن داده‌ها
-            for data in data_list:
+            for data in data_rows:
                 data_dict = data.data
                 
                 # پردازش هر ستون
@@ -108,14 +162,19 @@ class ExcelExporter:
                         except Exception as e:
                             self.logger.warning(f"خطا در نوشتن ستون {col}: {str(e)}")
                 
+                data_ids.append(data.id)
                 current_row += 1
             
+            record_count = len(data_ids)
+            
+            if apply_styling:
+                self._apply_styling(ws, template, column_mappings, record_count)
+            
             # ذخیره فایل
             wb.save(output_path)
             wb.close()
             
             # علامت‌گذاری داده‌ها به عنوان Exported
-            data_ids = [data.id for data in data_list]
             db_manager.mark_as_exported(data_ids, template.template_type)
             
             # ثبت لاگ Export
@@ -123,7 +182,7 @@ class ExcelExporter:
                 db = db_manager.get_session()
                 export_log = ExportLog(
                     export_type=template.template_type,
-                    record_count=len(data_list),
+                    record_count=record_count,
                     file_path=output_path,
                     template_name=template.name
                 )
@@ -134,119 +193,65 @@ class ExcelExporter:
             except Exception as log_error:
                 self.logger.warning(f"خطا در ثبت لاگ Export: {log_error}")
             
-            message = f"✅ {len(data_list)} رکورد با موفقیت Export شدند"
+            message = f"✅ {record_count} رکورد با موفقیت Export شدند"
             self.logger.success(message)
             
-            return True, message
+            return True, message, record_count
             
         except Exception as e:
             error_msg = f"خطا در Export: {str(e)}"
             self.logger.error(error_msg)
-            return False, error_msg
+            return False, error_msg, 0
     
-    def export_with_formatting(
-        self,
-        template: ExportTemplate,
-        data_list: List[SalesData],
-        output_path: str,
-        apply_styling: bool = True
-    ) -> Tuple[bool, str]:
-        """
-        Export با فرمت‌بندی پیشرفته
+    def _apply_styling(self, ws, template: ExportTemplate, column_mappings: Dict[str, str], record_count: int):
+        """فرمت‌بندی هدر، سلول‌های نوشته شده و عرض ستون‌ها"""
+        # استایل‌های پیش‌فرض
+        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        header_font = Font(color="FFFFFF", bold=True, size=11)
+        header_alignment = Alignment(horizontal="center", vertical="center")
         
-        Args:
-            template: Template Export
-            data_list: لیست داده‌ها
-            output_path: مسیر خروجی
-            apply_styling: اعمال استایل‌ها
-            
-        Returns:
-            (موفقیت, پیام)
-        """
-        try:
-            # Export اولیه
-            success, message = self.export_to_excel(template, data_list, output_path)
-            
-            if not success or not apply_styling:
-                return success, message
-            
-            # اعمال فرمت‌بندی
-            wb = openpyxl.load_workbook(output_path)
-            ws = wb[template.target_worksheet] if template.target_worksheet in wb.sheetnames else wb.active
-            
-            # استایل‌های پیش‌فرض
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            header_font = Font(color="FFFFFF", bold=True, size=11)
-            header_alignment = Alignment(horizontal="center", vertical="center")
-            
-            border_thin = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            
-            # تبدیل فرمت mapping (اگر جدید است)
-            column_mappings = template.column_mappings or {}
-            is_new_format = False
-            if column_mappings:
-                first_value = next(iter(column_mappings.values()))
-                if isinstance(first_value, dict) and 'source_column' in first_value:
-                    is_new_format = True
-            
-            if is_new_format:
-                old_format_mappings = {}
-                for excel_col, mapping_info in column_mappings.items():
-                    source_col = mapping_info.get('source_column')
-                    if source_col:
-                        old_format_mappings[source_col] = excel_col
-                column_mappings = old_format_mappings
-            
-            # فرمت‌بندی هدر (سطر قبل از start_row)
-            if template.start_row > 1:
-                header_row = template.start_row - 1
-                for db_col, excel_col in column_mappings.items():
-                    if isinstance(excel_col, str) and excel_col.isalpha():
-                        cell = ws[f"{excel_col}{header_row}"]
-                        cell.fill = header_fill
-                        cell.font = header_font
-                        cell.alignment = header_alignment
-                        cell.border = border_thin
-            
-            # فرمت‌بندی داده‌ها
-            end_row = template.start_row + len(data_list) - 1
-            for row_idx in range(template.start_row, end_row + 1):
-                for db_col, excel_col in column_mappings.items():
-                    if isinstance(excel_col, str) and excel_col.isalpha():
-                        cell = ws[f"{excel_col}{row_idx}"]
-                        cell.border = border_thin
-                        cell.alignment = Alignment(horizontal="right", vertical="center")
-            
-            # تنظیم عرض ستون‌ها خودکار
-            for column in ws.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(cell.value)
-                    except:
-                        pass
-                
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # ذخیره
-            wb.save(output_path)
-            wb.close()
+        border_thin = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+        data_alignment = Alignment(horizontal="right", vertical="center")
+        
+        # فرمت‌بندی هدر (سطر قبل از start_row)
+        if template.start_row > 1:
+            header_row = template.start_row - 1
+            for db_col, excel_col in column_mappings.items():
+                if isinstance(excel_col, str) and excel_col.isalpha():
+                    cell = ws[f"{excel_col}{header_row}"]
+                    cell.fill = header_fill
+                    cell.font = header_font
+                    cell.alignment = header_alignment
+                    cell.border = border_thin
+        
+        # فرمت‌بندی داده‌ها
+        end_row = template.start_row + record_count - 1
+        for row_idx in range(template.start_row, end_row + 1):
+            for db_col, excel_col in column_mappings.items():
+                if isinstance(excel_col, str) and excel_col.isalpha():
+                    cell = ws[f"{excel_col}{row_idx}"]
+                    cell.border = border_thin
+                    cell.alignment = data_alignment
+        
+        # تنظیم عرض ستون‌ها خودکار
+        for column in ws.columns:
+            max_length = 0
+            column_letter = get_column_letter(column[0].column)
             
-            return True, f"✅ Export با فرمت‌بندی انجام شد: {len(data_list)} رکورد"
+            for cell in column:
+                try:
+                    if len(str(cell.value)) > max_length:
+                        max_length = len(cell.value)
+                except:
+                    pass
             
-        except Exception as e:
-            error_msg = f"خطا در فرمت‌بندی: {str(e)}"
-            self.logger.error(error_msg)
-            return False, error_msg
+            adjusted_width = min(max_length + 2, 50)
+            ws.column_dimensions[column_letter].width = adjusted_width
     
     def generate_output_filename(self, template: ExportTemplate, sheet_name: str = "") -> str:
         """
@@ -0,0 +1,124 @@
+"""
+زمان‌بند استخراج موازی چند شیت
+
+چند job از extract_and_save را همزمان اجرا می‌کند. هر worker نسخه مستقل خود از
+GoogleSheetExtractor (gspread client و کش متادیتا) را دارد، ولی همه از محدودکننده نرخ
+مشترک استفاده می‌کنند؛ بنابراین موازی‌سازی فقط انتظارهای شبکه را هم‌پوشانی می‌دهد و از
+سهمیه Google عبور نمی‌کند.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.logger import app_logger
+
+
+class ExtractionScheduler:
+    """
+    اجرای موازی extract_and_save با تعداد worker قابل تنظیم
+    """
+
+    def __init__(self, extractor, max_workers: Optional[int] = None):
+        """
+        Args:
+            extractor: نمونه GoogleSheetExtractor الگو (هر worker یک clone از آن می‌سازد)
+            max_workers: تعداد worker (پیش‌فرض: MAX_WORKERS یا 4)
+        """
+        self.logger = app_logger
+        self.extractor = extractor
+        self.max_workers = max(1, max_workers or int(os.getenv("MAX_WORKERS", "4")))
+        self._worker_state = threading.local()
+
+    def _worker_extractor(self):
+        """extractor thread فعلی (یک بار برای هر worker ساخته و بین jobهای آن استفاده می‌شود)"""
+        extractor = getattr(self._worker_state, 'extractor', None)
+        if extractor is None:
+            extractor = self.extractor.clone()
+            self._worker_state.extractor = extractor
+        return extractor
+
+    def _run_job(
+        self,
+        config,
+        auto_update: bool,
+        progress_callback: Optional[Callable],
+        log_callback: Optional[Callable],
+        is_cancelled: Optional[Callable[[], bool]],
+        force: bool = False,
+        run_id: Optional[int] = None
+    ) -> Tuple[bool, str, Dict]:
+        """اجرای یک job در thread worker"""
+        if is_cancelled and is_cancelled():
+            return False, "عملیات لغو شد", {'cancelled': True}
+
+        def job_progress(current, total, message):
+            if progress_callback:
+                progress_callback(config, current, total, message)
+
+        def job_log(message, level):
+            if log_callback:
+                log_callback(config, message, level)
+
+        return self._worker_extractor().extract_and_save(
+            config.id,
+            auto_update=auto_update,
+            progress_callback=job_progress,
+            log_callback=job_log,
+            force=force,
+            run_id=run_id
+        )
+
+    def run(
+        self,
+        configs: List,
+        auto_update: bool = False,
+        on_result: Optional[Callable] = None,
+        progress_callback: Optional[Callable] = None,
+        log_callback: Optional[Callable] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+        force: bool = False,
+        run_id: Optional[int] = None
+    ) -> int:
+        """
+        اجرای استخراج برای لیست شیت‌ها
+
+        Args:
+            configs: لیست SheetConfig
+            auto_update: بروزرسانی خودکار تکراری‌ها
+            on_result: تابع (config, success, message, stats) - در thread فراخواننده اجرا می‌شود
+            progress_callback: تابع (config, current, total, message) - از thread worker
+            log_callback: تابع (config, message, level) - از thread worker
+            is_cancelled: تابع بدون آرگومان برای بررسی لغو عملیات
+            force: استخراج کامل بدون توجه به اثر انگشت تغییرات
+            run_id: شناسه اجرای استخراج برای ثبت و ادامه از نقاط بازیابی
+
+        Returns:
+            تعداد jobهای پایان یافته
+        """
+        if not configs:
+            return 0
+
+        workers = min(self.max_workers, len(configs))
+        self.logger.info(f"🚦 استخراج موازی {len(configs)} شیت با {workers} worker")
+
+        completed = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract") as pool:
+            futures = {
+                pool.submit(self._run_job, config, auto_update, progress_callback, log_callback, is_cancelled, force, run_id): config
+                for config in configs
+            }
+
+            for future in as_completed(futures):
+                config = futures[future]
+                try:
+                    success, message, stats = future.result()
+                except Exception as e:
+                    self.logger.error(f"خطا در استخراج از {config.name}: {str(e)}")
+                    success, message, stats = False, str(e), {}
+
+                completed += 1
+                if on_result:
+                    on_result(config, success, message, stats)
+
+        return completed
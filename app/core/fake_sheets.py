@@ -0,0 +1,360 @@
+"""
+جایگزین آفلاین Google Sheets برای تست و بنچمارک
+
+بخشی از رابط gspread که پروژه استفاده می‌کند را شبیه‌سازی می‌کند:
+open_by_url، worksheets، get_all_values، row_values، get، batch_get، batch_update و update_cells.
+داده‌ها در حافظه (grid تولید شده) یا از فایل CSV بارگذاری می‌شوند و تأخیر شبکه، سهمیه
+دقیقه‌ای و خطاهای تصادفی قابل تنظیم هستند.
+
+Example:
+    client = FakeSheetsClient(latency=0.05)
+    url = client.add_worksheet("bench", "Sheet1", generate_sales_grid(10000))
+    extractor = GoogleSheetExtractor(client=client)
+"""
+import csv
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from gspread.utils import a1_to_rowcol
+
+
+class FakeAPIError(Exception):
+    """خطای شبیه‌سازی شده API (code: کد HTTP مانند 429 یا 503)"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"APIError: [{code}]: {message}")
+        self.code = code
+
+
+@dataclass
+class FakeCell:
+    """سلول ساده برای update_cells"""
+    row: int
+    col: int
+    value: str = ""
+
+
+_A1_RANGE = re.compile(r"^([A-Z]+)?(\d+)?$")
+
+
+def _column_to_number(letters: str) -> int:
+    number = 0
+    for char in letters:
+        number = number * 26 + (ord(char) - ord('A') + 1)
+    return number
+
+
+def parse_a1_range(a1_range: str, max_rows: int, max_cols: int):
+    """
+    تبدیل محدوده A1 به (ردیف شروع, ستون شروع, ردیف پایان, ستون پایان) - 1-indexed
+
+    از محدوده‌های باز مانند "C2:C" و "A5:D" پشتیبانی می‌کند.
+    """
+    a1_range = a1_range.split('!')[-1].replace('$', '').upper()
+    start, _, end = a1_range.partition(':')
+    start_match = _A1_RANGE.match(start)
+    end_match = _A1_RANGE.match(end or start)
+    if not start_match or not end_match:
+        raise FakeAPIError(400, f"Unable to parse range: {a1_range}")
+
+    start_col = _column_to_number(start_match.group(1)) if start_match.group(1) else 1
+    start_row = int(start_match.group(2)) if start_match.group(2) else 1
+    end_col = _column_to_number(end_match.group(1)) if end_match.group(1) else max_cols
+    end_row = int(end_match.group(2)) if end_match.group(2) else max_rows
+    return start_row, start_col, end_row, end_col
+
+
+def generate_sales_grid(rows: int, ready_ratio: float = 0.8, extracted_ratio: float = 0.2, seed: int = 42) -> List[List[str]]:
+    """
+    تولید grid نمونه شبیه شیت‌های فروش (ردیف اول = هدر)
+
+    Args:
+        rows: تعداد ردیف‌های داده
+        ready_ratio: نسبت ردیف‌های آماده
+        extracted_ratio: نسبت ردیف‌های آماده‌ای که قبلاً استخراج شده‌اند
+        seed: بذر تصادفی برای تکرارپذیری
+    """
+    rng = random.Random(seed)
+    headers = ['Order ID', 'Date', 'Customer', 'Product', 'Quantity', 'Price', 'Total', 'Ready', 'Extracted']
+    products = ['Apple 10$', 'Apple 25$', 'Google Play 10$', 'Steam 20$', 'PSN 50$', 'Xbox 15$']
+    grid = [headers]
+    for index in range(rows):
+        ready = rng.random() < ready_ratio
+        extracted = ready and rng.random() < extracted_ratio
+        quantity = rng.randint(1, 20)
+        price = rng.randint(5, 500)
+        grid.append([
+            f"ORD-{index + 1:07d}",
+            f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            f"Customer {rng.randint(1, 5000)}",
+            rng.choice(products),
+            str(quantity),
+            str(price),
+            str(quantity * price),
+            "TRUE" if ready else "FALSE",
+            "TRUE" if extracted else "",
+        ])
+    return grid
+
+
+class FakeWorksheet:
+    """Worksheet در حافظه"""
+
+    def __init__(self, spreadsheet: 'FakeSpreadsheet', title: str, grid: List[List[str]]):
+        self.spreadsheet = spreadsheet
+        self.client = spreadsheet.client
+        self.title = title
+        self.id = abs(hash(title)) % 10 ** 9
+        self._grid = [list(row) for row in grid]
+
+    # ==================== Properties ====================
+
+    @property
+    def row_count(self) -> int:
+        return max(len(self._grid), 1000)
+
+    @property
+    def col_count(self) -> int:
+        return max([len(row) for row in self._grid] + [26])
+
+    @property
+    def grid(self) -> List[List[str]]:
+        """دسترسی مستقیم به داده‌ها (بدون شمارش درخواست)"""
+        return self._grid
+
+    def _width(self) -> int:
+        return max([len(row) for row in self._grid] + [0])
+
+    def _read(self, start_row, start_col, end_row, end_col) -> List[List[str]]:
+        """خواندن محدوده با حذف سلول‌ها و ردیف‌های خالی انتهایی (مانند API واقعی)"""
+        values = []
+        for row in self._grid[start_row - 1:end_row]:
+            cells = list(row[start_col - 1:end_col])
+            while cells and cells[-1] == "":
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def _write(self, row: int, col: int, value):
+        while len(self._grid) < row:
+            self._grid.append([])
+        cells = self._grid[row - 1]
+        while len(cells) < col:
+            cells.append("")
+        cells[col - 1] = "" if value is None else str(value)
+
+    # ==================== Read API ====================
+
+    def get_all_values(self, **kwargs) -> List[List[str]]:
+        self.client._request('get_all_values')
+        width = self._width()
+        return [list(row) + [""] * (width - len(row)) for row in self._grid]
+
+    def row_values(self, row: int, **kwargs) -> List[str]:
+        self.client._request('row_values')
+        return self._read(row, 1, row, self._width())[0] if row <= len(self._grid) else []
+
+    def get(self, range_name: str, **kwargs) -> List[List[str]]:
+        self.client._request('get')
+        return self._read(*parse_a1_range(range_name, len(self._grid), self._width()))
+
+    def batch_get(self, ranges: List[str], major_dimension: Optional[str] = None, **kwargs) -> List[List[List[str]]]:
+        self.client._request('batch_get')
+        results = []
+        max_rows, max_cols = len(self._grid), self._width()
+        for a1_range in ranges:
+            start_row, start_col, end_row, end_col = parse_a1_range(a1_range, max_rows, max_cols)
+            values = self._read(start_row, start_col, end_row, end_col)
+            if major_dimension == 'COLUMNS':
+                width = end_col - start_col + 1
+                columns = [[] for _ in range(width)]
+                for row in values:
+                    for offset in range(width):
+                        columns[offset].append(row[offset] if offset < len(row) else "")
+                for column in columns:
+                    while column and column[-1] == "":
+                        column.pop()
+                while columns and not columns[-1]:
+                    columns.pop()
+                values = columns
+            results.append(values)
+        return results
+
+    # ==================== Write API ====================
+
+    def batch_update(self, data: List[Dict], value_input_option: Optional[str] = None, **kwargs) -> Dict:
+        cells = sum(len(item['values']) * max((len(row) for row in item['values']), default=0) for item in data)
+        self.client._request('batch_update', cells=cells)
+        max_rows, max_cols = len(self._grid), self._width()
+        for item in data:
+            start_row, start_col, _, _ = parse_a1_range(item['range'], max_rows, max_cols)
+            for row_offset, row in enumerate(item['values']):
+                for col_offset, value in enumerate(row):
+                    self._write(start_row + row_offset, start_col + col_offset, value)
+        self.spreadsheet._touch()
+        return {'totalUpdatedCells': cells}
+
+    def update_cells(self, cell_list: List, value_input_option: Optional[str] = None, **kwargs) -> Dict:
+        self.client._request('update_cells', cells=len(cell_list))
+        for cell in cell_list:
+            self._write(cell.row, cell.col, cell.value)
+        self.spreadsheet._touch()
+        return {'updatedCells': len(cell_list)}
+
+    def update_acell(self, label: str, value) -> Dict:
+        self.client._request('update_acell', cells=1)
+        row, col = a1_to_rowcol(label)
+        self._write(row, col, value)
+        self.spreadsheet._touch()
+        return {'updatedCells': 1}
+
+
+class FakeSpreadsheet:
+    """Spreadsheet در حافظه"""
+
+    def __init__(self, client: 'FakeSheetsClient', key: str, title: str):
+        self.client = client
+        self.id = key
+        self.title = title
+        self.url = f"https://docs.google.com/spreadsheets/d/{key}/edit"
+        self._worksheets: List[FakeWorksheet] = []
+        self._modified_at = datetime.now(timezone.utc)
+
+    def _touch(self):
+        self._modified_at = datetime.now(timezone.utc)
+
+    def worksheets(self, **kwargs) -> List[FakeWorksheet]:
+        self.client._request('worksheets')
+        return list(self._worksheets)
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.client._request('worksheet')
+        for worksheet in self._worksheets:
+            if worksheet.title == title:
+                return worksheet
+        raise FakeAPIError(404, f"Worksheet '{title}' not found")
+
+    @property
+    def sheet1(self) -> FakeWorksheet:
+        return self._worksheets[0]
+
+    def get_lastUpdateTime(self) -> str:
+        self.client._request('get_lastUpdateTime')
+        return self._modified_at.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class FakeSheetsClient:
+    """
+    کلاینت جعلی با تأخیر، سهمیه و تزریق خطای قابل تنظیم
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        latency_per_1k_cells: float = 0.0,
+        quota_per_minute: Optional[int] = None,
+        error_rate: float = 0.0,
+        error_codes: Optional[List[int]] = None,
+        seed: int = 42
+    ):
+        """
+        Args:
+            latency: تأخیر ثابت هر درخواست (ثانیه)
+            latency_per_1k_cells: تأخیر اضافه به ازای هر 1000 سلول نوشته شده
+            quota_per_minute: حداکثر درخواست در دقیقه (بیشتر از آن = خطای 429)
+            error_rate: احتمال خطای تصادفی هر درخواست
+            error_codes: کدهای خطای تصادفی (پیش‌فرض: 500 و 503)
+            seed: بذر تصادفی برای تکرارپذیری
+        """
+        self.latency = latency
+        self.latency_per_1k_cells = latency_per_1k_cells
+        self.quota_per_minute = quota_per_minute
+        self.error_rate = error_rate
+        self.error_codes = error_codes or [500, 503]
+        self.calls: Counter = Counter()
+        self.cells_written = 0
+        self._rng = random.Random(seed)
+        self._spreadsheets: Dict[str, FakeSpreadsheet] = {}
+        self._request_times: deque = deque()
+        self._lock = threading.Lock()
+
+    # ==================== Setup ====================
+
+    def add_worksheet(self, key: str, title: str, grid: List[List[str]]) -> str:
+        """
+        افزودن worksheet (Spreadsheet در صورت نبود ساخته می‌شود)
+
+        Returns:
+            URL شیت
+        """
+        spreadsheet = self._spreadsheets.get(key)
+        if spreadsheet is None:
+            spreadsheet = FakeSpreadsheet(self, key, key)
+            self._spreadsheets[key] = spreadsheet
+        spreadsheet._worksheets.append(FakeWorksheet(spreadsheet, title, grid))
+        return spreadsheet.url
+
+    def load_csv(self, key: str, title: str, csv_path: str) -> str:
+        """افزودن worksheet از فایل CSV"""
+        with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+            grid = [row for row in csv.reader(f)]
+        return self.add_worksheet(key, title, grid)
+
+    def reset_stats(self):
+        """صفر کردن شمارنده‌های درخواست"""
+        with self._lock:
+            self.calls.clear()
+            self.cells_written = 0
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    # ==================== Simulation ====================
+
+    def _request(self, method: str, cells: int = 0):
+        """شبیه‌سازی یک درخواست API: شمارش، سهمیه، خطا و تأخیر"""
+        with self._lock:
+            self.calls[method] += 1
+            now = time.monotonic()
+
+            if self.quota_per_minute:
+                while self._request_times and now - self._request_times[0] > 60:
+                    self._request_times.popleft()
+                if len(self._request_times) >= self.quota_per_minute:
+                    raise FakeAPIError(429, "Quota exceeded for quota metric 'Read requests'")
+                self._request_times.append(now)
+
+            if self.error_rate and self._rng.random() < self.error_rate:
+                raise FakeAPIError(self._rng.choice(self.error_codes), "Internal error encountered.")
+
+            self.cells_written += cells
+
+        delay = self.latency + self.latency_per_1k_cells * cells / 1000.0
+        if delay > 0:
+            time.sleep(delay)
+
+    # ==================== gspread Client API ====================
+
+    def open_by_key(self, key: str) -> FakeSpreadsheet:
+        self._request('open_by_key')
+        spreadsheet = self._spreadsheets.get(key)
+        if spreadsheet is None:
+            raise FakeAPIError(404, f"Spreadsheet '{key}' not found")
+        return spreadsheet
+
+    def open_by_url(self, url: str) -> FakeSpreadsheet:
+        self._request('open_by_url')
+        match = re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", url)
+        spreadsheet = self._spreadsheets.get(match.group(1)) if match else None
+        if spreadsheet is None:
+            raise FakeAPIError(404, f"Spreadsheet not found: {url}")
+        return spreadsheet
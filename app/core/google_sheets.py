@@ -4,11 +4,23 @@ from google.oauth2.service_account import Credentials
 from typing import List, Dict, Optional, Tuple
 from tenacity import retry, stop_after_attempt, wait_exponential
 import time
+import hashlib
+import json
+from collections import deque
 
 from app.core.logger import app_logger
 from app.utils.constants import ERROR_MESSAGES, SUCCESS_MESSAGES
 from app.utils.helpers import validate_google_sheet_url
 from app.utils.cell_status_detector import is_cell_checked, is_cell_extracted
+from app.core.sheets_cache import SheetMetadataCache, clean_headers
+from app.core.rate_limiter import SheetsRateLimiter, get_shared_rate_limiter
+from app.core.sheets_outbox import SheetWriteOutboxDrainer
+from app.core.pipeline import PipelineStage, StagedPipeline
+from app.core.sheet_snapshots import WorksheetSnapshotStore
+from app.core.batch_tuning import (
+    ERROR_SERVER, ERROR_THROTTLED, ERROR_TIMEOUT,
+    classify_sheets_error, get_shared_batch_sizer
+)
 
 def column_letter_to_index(column_letter):
     column_letter = column_letter.upper().strip()
@@ -17,13 +29,85 @@ def column_letter_to_index(column_letter):
         result = result * 26 + (ord(char) - ord('A') + 1)
     return result - 1
 
+def column_index_to_letter(column_index):
+    """تبدیل ایندکس ستون (0-based) به حرف ستون (A, B, ..., AA)"""
+    result = ""
+    number = column_index + 1
+    while number > 0:
+        number, remainder = divmod(number - 1, 26)
+        result = chr(ord('A') + remainder) + result
+    return result
+
+def coalesce_row_ranges(numbers):
+    """
+    ادغام اعداد مرتب شده در بازه‌های پیوسته
+    
+    Example:
+        [2, 3, 4, 7, 9, 10] -> [(2, 4), (7, 7), (9, 10)]
+    """
+    ranges = []
+    for number in numbers:
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return [(start, end) for start, end in ranges]
+
 class GoogleSheetExtractor:
-    def __init__(self, credentials_path=None):
+    # حداکثر تعداد محدوده‌ها در هر درخواست batch_get (محدودیت طول URL)
+    BATCH_GET_MAX_RANGES = 100
+    # بررسی ردیف‌های صف علامت‌گذاری: ردیف‌هایی که حداکثر این تعداد ردیف فاصله دارند یکجا خوانده می‌شوند
+    VERIFY_READ_GAP_ROWS = 50
+    
+    def __init__(self, credentials_path=None, rate_limiter=None, batch_sizer=None, snapshot_store=None, client=None):
+        """
+        Args:
+            credentials_path: مسیر فایل credentials سرویس اکانت
+            rate_limiter: محدودکننده نرخ (پیش‌فرض: مشترک کل برنامه)
+            batch_sizer: کنترل‌کننده اندازه بچ علامت‌گذاری (پیش‌فرض: مشترک)
+            snapshot_store: مخزن snapshot محلی (پیش‌فرض: طبق SHEETS_SNAPSHOT_CACHE)
+            client: کلاینت آماده (مثلاً FakeSheetsClient برای تست و بنچمارک) - بدون احراز هویت
+        """
         import os
         self.logger = app_logger
         self.credentials_path = credentials_path or os.getenv("GOOGLE_CREDENTIALS_PATH", "config/credentials.json")
-        self.client = None
-        self._connect()
+        self.client = client
+        # کلاینت تزریق شده (جعلی) بین نسخه‌های clone مشترک است؛ کلاینت واقعی برای هر نسخه جدا ساخته می‌شود
+        self._injected_client = client
+        # کش متادیتا: Spreadsheet، Worksheet و هدرها بین فراخوانی‌های یک اجرا مشترک هستند
+        self.metadata_cache = SheetMetadataCache(
+            ttl_seconds=float(os.getenv("SHEETS_METADATA_TTL", "300"))
+        )
+        # محدودکننده نرخ مشترک بین تمام extractorها و workerهای موازی
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        # اندازه بچ علامت‌گذاری به صورت تطبیقی (AIMD) و به ازای هر Spreadsheet یاد گرفته می‌شود
+        self.batch_sizer = batch_sizer or get_shared_batch_sizer()
+        # تعداد ردیف هر پنجره در خواندن پنجره‌ای شیت‌های بزرگ
+        self.read_window_rows = int(os.getenv("SHEETS_READ_WINDOW_ROWS", "5000"))
+        # ظرفیت صف بین مراحل pipeline استخراج (تعداد بسته)
+        self.pipeline_queue_size = int(os.getenv("SHEETS_PIPELINE_QUEUE_SIZE", "4"))
+        # snapshot محلی شیت‌ها (اختیاری - SHEETS_SNAPSHOT_CACHE)
+        if snapshot_store is None and WorksheetSnapshotStore.is_enabled():
+            snapshot_store = WorksheetSnapshotStore()
+        self.snapshot_store = snapshot_store
+        if self.client is None:
+            self._connect()
+    
+    def clone(self) -> 'GoogleSheetExtractor':
+        """
+        extractor مستقل برای یک thread worker
+        
+        gspread client (session HTTP) و کش متادیتا (اشیای Worksheet متصل به همان client) برای
+        هر نسخه جدا ساخته می‌شوند؛ محدودکننده نرخ، کنترل‌کننده بچ و snapshot ها مشترک می‌مانند
+        (سهمیه و اندازه یادگرفته شده هر Spreadsheet بین workerها یکی است و هر دو قفل داخلی دارند).
+        """
+        return GoogleSheetExtractor(
+            credentials_path=self.credentials_path,
+            rate_limiter=self.rate_limiter,
+            batch_sizer=self.batch_sizer,
+            snapshot_store=self.snapshot_store,
+            client=self._injected_client
+        )
     
     def _connect(self):
         try:
@@ -42,12 +126,189 @@ class GoogleSheetExtractor:
             self.logger.error(f"خطا در احراز هویت Google Sheets: {str(e)}")
             raise Exception(ERROR_MESSAGES["GOOGLE_SHEETS_AUTH_FAILED"])
     
+    def _throttle(self, kind=SheetsRateLimiter.READ):
+        """صبر تا آزاد شدن سهمیه API (خواندن یا نوشتن)"""
+        waited = self.rate_limiter.acquire(kind)
+        if waited > 1:
+            self.logger.debug(f"⏳ انتظار {waited:.1f}s برای سهمیه {kind} Google Sheets")
+    
+    # ==================== Metadata Cache ====================
+    
+    def _open_spreadsheet(self, sheet_url):
+        """
+        باز کردن Spreadsheet با استفاده از کش متادیتا
+        
+        Returns:
+            SpreadsheetMetadata (شامل spreadsheet و لیست worksheetها)
+        """
+        cached = self.metadata_cache.get_spreadsheet(sheet_url)
+        if cached:
+            return cached
+        
+        self._throttle()
+        sheet = self.client.open_by_url(sheet_url)
+        self._throttle()
+        return self.metadata_cache.put_spreadsheet(sheet_url, sheet, sheet.worksheets())
+    
+    def _resolve_worksheet(self, sheet_url, worksheet_name=None, log_callback=None, exact=False):
+        """
+        پیدا کردن worksheet با استفاده از کش متادیتا
+        
+        Args:
+            exact: فقط نام دقیق (مانند sheet.worksheet)؛ در غیر این صورت case-insensitive
+                   با اولویت نام دقیق (رفتار استخراج و علامت‌گذاری)
+        
+        Raises:
+            Exception: اگر worksheet یافت نشود
+        """
+        cached = self.metadata_cache.get_worksheet(sheet_url, worksheet_name)
+        if cached and not (exact and worksheet_name and cached.title != worksheet_name):
+            return cached.worksheet
+        
+        meta = self._open_spreadsheet(sheet_url)
+        all_worksheets = [ws.title for ws in meta.worksheets]
+        msg = f"📋 لیست worksheetهای موجود: {all_worksheets}"
+        self.logger.info(msg)
+        if log_callback:
+            log_callback(msg, "info")
+        
+        if worksheet_name:
+            matching_ws = next((ws for ws in meta.worksheets if ws.title == worksheet_name), None)
+            if not matching_ws and not exact:
+                matching_ws = next(
+                    (ws for ws in meta.worksheets if ws.title.lower() == worksheet_name.lower()), None
+                )
+            
+            if not matching_ws:
+                raise Exception(f"Worksheet با نام '{worksheet_name}' یافت نشد. worksheetهای موجود: {all_worksheets}")
+            
+            if matching_ws.title != worksheet_name:
+                self.logger.warning(f"⚠️ نام worksheet در دیتابیس '{worksheet_name}' با نام واقعی '{matching_ws.title}' متفاوت است")
+            worksheet = matching_ws
+        else:
+            worksheet = meta.worksheets[0] if meta.worksheets else meta.spreadsheet.sheet1
+        
+        self.metadata_cache.put_worksheet(sheet_url, worksheet_name, worksheet)
+        return worksheet
+    
+    def _get_raw_headers(self, sheet_url, worksheet_name, worksheet):
+        """دریافت ردیف هدر خام (از کش در صورت وجود)"""
+        cached = self.metadata_cache.get_worksheet(sheet_url, worksheet_name)
+        if cached and cached.raw_headers is not None:
+            return list(cached.raw_headers)
+        
+        self._throttle()
+        raw_headers = worksheet.row_values(1)
+        self.metadata_cache.set_headers(sheet_url, worksheet_name, raw_headers)
+        return list(raw_headers)
+    
+    def invalidate_cache(self, sheet_url=None, worksheet_name=None):
+        """
+        ابطال کش متادیتا
+        
+        Args:
+            sheet_url: آدرس شیت (None = کل کش)
+            worksheet_name: نام worksheet (None = تمام worksheetهای شیت)
+        """
+        self.metadata_cache.invalidate(sheet_url, worksheet_name)
+    
+    def get_spreadsheet_modified_time(self, sheet_url) -> Optional[str]:
+        """
+        زمان آخرین تغییر Spreadsheet (modifiedTime از Drive)
+        
+        Returns:
+            رشته زمان یا None در صورت خطا
+        """
+        try:
+            spreadsheet = self._open_spreadsheet(sheet_url).spreadsheet
+            self._throttle()
+            return spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            self.logger.warning(f"⚠️ دریافت زمان آخرین تغییر شیت ناموفق بود: {str(e)}")
+            return None
+    
+    # ==================== Snapshot ====================
+    
+    def _get_all_values(self, sheet_url, worksheet_name, worksheet):
+        """
+        دریافت کل grid یک worksheet (شامل هدر)
+        
+        اگر snapshot فعال باشد و شیت از آخرین دانلود تغییر نکرده باشد، از فایل محلی
+        خوانده می‌شود؛ در غیر این صورت دانلود و snapshot جدید ذخیره می‌شود.
+        """
+        modified_time = None
+        if self.snapshot_store:
+            modified_time = self.get_spreadsheet_modified_time(sheet_url)
+            grid = self.snapshot_store.load_grid(sheet_url, worksheet_name, modified_time)
+            if grid is not None:
+                return grid
+        
+        self._throttle()
+        all_values = worksheet.get_all_values()
+        
+        if self.snapshot_store and modified_time:
+            self.snapshot_store.save_grid(sheet_url, worksheet_name, modified_time, all_values)
+        
+        return all_values
+    
+    def _iter_sheet_rows(self, sheet_url, worksheet_name, worksheet, width):
+        """
+        خواندن پنجره‌ای ردیف‌ها (از ردیف 2) با استفاده از snapshot در صورت فعال بودن
+        
+        Yields:
+            (شماره ردیف, لیست مقادیر پر شده تا width ستون)
+        """
+        modified_time = self.get_spreadsheet_modified_time(sheet_url) if self.snapshot_store else None
+        if not modified_time:
+            yield from self.iter_rows(worksheet, width)
+            return
+        
+        if self.snapshot_store.has(sheet_url, worksheet_name, modified_time):
+            self.logger.info(f"💾 خواندن '{worksheet_name}' از snapshot محلی")
+            for row_number, values in self.snapshot_store.iter_rows(sheet_url, worksheet_name):
+                if row_number >= 2:
+                    yield row_number, values + [""] * (width - len(values))
+            return
+        
+        # دانلود پنجره‌ای و نوشتن همزمان snapshot (فقط در صورت خواندن کامل ذخیره می‌شود)
+        with self.snapshot_store.writer(sheet_url, worksheet_name, modified_time) as writer:
+            writer.write_row(1, self._get_raw_headers(sheet_url, worksheet_name, worksheet))
+            for row_number, values in self.iter_rows(worksheet, width):
+                writer.write_row(row_number, values)
+                yield row_number, values
+    
+    def get_change_fingerprint(self, sheet_config) -> Optional[str]:
+        """
+        اثر انگشت ارزان تغییرات یک شیت
+        
+        زمان آخرین تغییر Spreadsheet (modifiedTime از Drive - یک درخواست سبک) به همراه
+        تنظیماتی که نتیجه استخراج به آن‌ها وابسته است.
+        
+        Returns:
+            اثر انگشت، یا None اگر سیگنال در دسترس نباشد (استخراج کامل انجام می‌شود)
+        """
+        modified_time = self.get_spreadsheet_modified_time(sheet_config.sheet_url)
+        if not modified_time:
+            return None
+        
+        settings = json.dumps({
+            'worksheet_name': sheet_config.worksheet_name,
+            'ready_column': sheet_config.ready_column,
+            'extracted_column': sheet_config.extracted_column,
+            'columns_to_extract': sheet_config.columns_to_extract,
+            'unique_key_columns': sheet_config.unique_key_columns,
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        settings_hash = hashlib.md5(settings.encode('utf-8')).hexdigest()[:12]
+        return f"{modified_time}|{settings_hash}"
+    
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def test_connection(self, sheet_url):
         try:
             if not validate_google_sheet_url(sheet_url):
                 return False, ERROR_MESSAGES["INVALID_SHEET_URL"]
+            self._throttle()
             sheet = self.client.open_by_url(sheet_url)
+            self._throttle()
             worksheets = sheet.worksheets()
             return True, f"اتصال موفق. تعداد ورک‌شیت‌ها: {len(worksheets)}"
         except gspread.exceptions.SpreadsheetNotFound:
@@ -62,8 +323,7 @@ class GoogleSheetExtractor:
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def get_worksheets(self, sheet_url):
         try:
-            sheet = self.client.open_by_url(sheet_url)
-            return [ws.title for ws in sheet.worksheets()]
+            return [ws.title for ws in self._open_spreadsheet(sheet_url).worksheets]
         except Exception as e:
             self.logger.error(f"خطا در دریافت ورک‌شیت‌ها: {str(e)}")
             return []
@@ -71,200 +331,210 @@ class GoogleSheetExtractor:
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def get_headers(self, sheet_url, worksheet_name=None):
         try:
-            sheet = self.client.open_by_url(sheet_url)
-            worksheet = sheet.worksheet(worksheet_name) if worksheet_name else sheet.sheet1
-            return worksheet.row_values(1)
+            worksheet = self._resolve_worksheet(sheet_url, worksheet_name, exact=True)
+            
+            # هدر از snapshot محلی (اگر در کش متادیتا نباشد و شیت تغییر نکرده باشد)
+            cached = self.metadata_cache.get_worksheet(sheet_url, worksheet_name)
+            if self.snapshot_store and not (cached and cached.raw_headers is not None):
+                modified_time = self.get_spreadsheet_modified_time(sheet_url)
+                if self.snapshot_store.has(sheet_url, worksheet_name, modified_time):
+                    for _, raw_headers in self.snapshot_store.iter_rows(sheet_url, worksheet_name):
+                        self.metadata_cache.set_headers(sheet_url, worksheet_name, raw_headers)
+                        return list(raw_headers)
+            
+            return self._get_raw_headers(sheet_url, worksheet_name, worksheet)
         except Exception as e:
+            self.invalidate_cache(sheet_url, worksheet_name)
             self.logger.error(f"خطا در دریافت هدرها: {str(e)}")
             return []
     
+    def _find_column_index(self, headers, column, label, log_callback=None):
+        """
+        پیدا کردن ایندکس ستون بر اساس نام یا حرف ستون
+
+        Returns:
+            ایندکس (0-based) یا -1
+        """
+        col_idx = -1
+        column_clean = column.strip().lower()
+
+        # روش 1: جستجو در نام‌های ستون‌ها (اولویت اول)
+        for idx, header in enumerate(headers):
+            header_clean = str(header).strip().lower()
+            if header_clean == column_clean:
+                col_idx = idx
+                msg = f"✅ ستون {label} پیدا شد با نام: '{header}' (index {idx})"
+                self.logger.info(msg)
+                if log_callback:
+                    log_callback(msg, "success")
+                break
+
+        # روش 2: اگر پیدا نشد، شاید حرف ستون باشد (A, B, C, ...)
+        if col_idx == -1 and len(column) <= 3 and column.isalpha():
+            try:
+                col_idx = column_letter_to_index(column)
+                if col_idx < len(headers):
+                    self.logger.info(f"✅ ستون {label} پیدا شد با حرف: {column} -> '{headers[col_idx]}' (index {col_idx})")
+                else:
+                    col_idx = -1
+            except:
+                pass
+
+        if col_idx == -1:
+            self.logger.error(f"❌ ستون {label} '{column}' یافت نشد!")
+            self.logger.error(f"📋 هدرهای موجود: {headers}")
+
+        return col_idx
+
+    def _resolve_filter_columns(self, headers, ready_column, extracted_column, columns_to_extract, log_callback=None):
+        """
+        پیدا کردن ستون‌های آماده، استخراج شده و ستون‌های قابل استخراج
+
+        Returns:
+            (ready_col_idx, extracted_col_idx, col_indices, col_names) یا None در صورت خطا
+        """
+        # ==================== پیدا کردن ستون آماده (Ready) ====================
+        ready_col_idx = -1
+        if ready_column:
+            ready_col_idx = self._find_column_index(headers, ready_column, "آماده", log_callback)
+            if ready_col_idx == -1:
+                return None
+
+        # ==================== پیدا کردن ستون استخراج شده (Extracted) ====================
+        extracted_col_idx = -1
+        if extracted_column:
+            extracted_col_idx = self._find_column_index(headers, extracted_column, "استخراج", log_callback)
+            if extracted_col_idx == -1:
+                return None
+
+        # ==================== فیلتر ستون‌ها ====================
+        if columns_to_extract:
+            col_indices, col_names = [], []
+            for col in columns_to_extract:
+                try:
+                    idx = column_letter_to_index(col)
+                    if idx < len(headers):
+                        col_indices.append(idx)
+                        col_names.append(headers[idx])
+                except:
+                    if col in headers:
+                        col_indices.append(headers.index(col))
+                        col_names.append(col)
+            if not col_indices:
+                self.logger.error("هیچ ستون معتبری برای استخراج یافت نشد!")
+                return None
+        else:
+            col_indices = list(range(len(headers)))
+            col_names = headers
+
+        return ready_col_idx, extracted_col_idx, col_indices, col_names
+
+    @staticmethod
+    def _build_row_data(row_values, col_indices, col_names):
+        """ساخت دیکشنری داده یک ردیف از مقادیر آن"""
+        row_data = {}
+        for idx, col_name in zip(col_indices, col_names):
+            row_data[col_name] = row_data.get(col_name, row_values[idx] if idx < len(row_values) else "")
+        return row_data
+
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-    def extract_ready_rows(self, sheet_url, worksheet_name, ready_column, extracted_column, columns_to_extract=None, skip_rows=0, max_rows=None, log_callback=None):
+    def extract_ready_rows(self, sheet_url, worksheet_name, ready_column, extracted_column, columns_to_extract=None, skip_rows=0, max_rows=None, log_callback=None, two_phase=True):
         """
         استخراج ردیف‌های آماده از Google Sheets
-        
+
         Args:
             log_callback: تابع اختیاری (message, level) برای ارسال لاگ به UI
+            two_phase: استخراج دو مرحله‌ای (ابتدا فقط ستون‌های آماده/استخراج، سپس فقط ردیف‌های واجد شرایط)
         """
         try:
             msg = f"📄 در حال باز کردن worksheet: '{worksheet_name}'"
             self.logger.info(msg)
             if log_callback:
                 log_callback(msg, "info")
-            
-            sheet = self.client.open_by_url(sheet_url)
-            
-            # لیست تمام worksheetها را لاگ کن
-            all_worksheets = [ws.title for ws in sheet.worksheets()]
-            msg = f"📋 لیست worksheetهای موجود: {all_worksheets}"
-            self.logger.info(msg)
-            if log_callback:
-                log_callback(msg, "info")
-            
-            # جستجوی case-insensitive برای worksheet
-            if worksheet_name:
-                # سعی کن نام دقیق را پیدا کنی
-                matching_ws = None
-                for ws in sheet.worksheets():
-                    if ws.title.lower() == worksheet_name.lower():
-                        matching_ws = ws
-                        break
-                
-                if matching_ws:
-                    worksheet = matching_ws
-                    if matching_ws.title != worksheet_name:
-                        self.logger.warning(f"⚠️ نام worksheet در دیتابیس '{worksheet_name}' با نام واقعی '{matching_ws.title}' متفاوت است")
-                else:
-                    raise Exception(f"Worksheet با نام '{worksheet_name}' یافت نشد. worksheetهای موجود: {all_worksheets}")
-            else:
-                worksheet = sheet.sheet1
-            
+
+            worksheet = self._resolve_worksheet(sheet_url, worksheet_name, log_callback)
+
             self.logger.info(f"✅ Worksheet '{worksheet.title}' باز شد")
             if log_callback:
                 log_callback(f"✅ Worksheet '{worksheet.title}' باز شد", "success")
-            
-            all_values = worksheet.get_all_values()
-            if not all_values or len(all_values) < 2:
+
+            # ==================== استخراج دو مرحله‌ای ====================
+            if two_phase and ready_column and extracted_column:
+                try:
+                    ready_rows = self._extract_ready_rows_two_phase(
+                        sheet_url, worksheet_name, worksheet,
+                        ready_column, extracted_column, columns_to_extract,
+                        max_rows=max_rows, log_callback=log_callback
+                    )
+                except Exception as e:
+                    ready_rows = None
+                    msg = f"⚠️ استخراج دو مرحله‌ای ناموفق بود، خواندن پنجره‌ای شیت: {str(e)}"
+                    self.logger.warning(msg)
+                    if log_callback:
+                        log_callback(msg, "warning")
+
+                if ready_rows is not None:
+                    msg = f"✅ {len(ready_rows):,} ردیف آماده یافت شد"
+                    self.logger.success(msg)
+                    if log_callback:
+                        log_callback(msg, "success")
+                    return ready_rows
+
+            # اگر ready_column و extracted_column هر دو None هستند، همه ردیف‌ها برگردانده شوند
+            if ready_column is None and extracted_column is None:
+                all_values = self._get_all_values(sheet_url, worksheet_name, worksheet)
+                if not all_values or len(all_values) < 2:
+                    msg = "⚠️ شیت خالی است یا فقط هدر دارد"
+                    self.logger.warning(msg)
+                    if log_callback:
+                        log_callback(msg, "warning")
+                    return []
+
+                # ردیف هدر در کش ذخیره می‌شود تا علامت‌گذاری دوباره آن را دریافت نکند
+                self.metadata_cache.set_headers(sheet_url, worksheet_name, all_values[0])
+
+                msg = "📊 بدون فیلتر - همه ردیف‌ها برگردانده می‌شوند"
+                self.logger.info(msg)
+                if log_callback:
+                    log_callback(msg, "info")
+                return all_values  # شامل headers
+
+            # پاک‌سازی هدرها: حذف علامت تیک و فضای خالی
+            headers = clean_headers(self._get_raw_headers(sheet_url, worksheet_name, worksheet))
+            if not headers:
                 msg = "⚠️ شیت خالی است یا فقط هدر دارد"
                 self.logger.warning(msg)
                 if log_callback:
                     log_callback(msg, "warning")
                 return []
-            
-            # پاک‌سازی هدرها: حذف علامت تیک و فضای خالی
-            headers = all_values[0]
-            headers = [str(h).strip().replace('✓', '').replace('✔', '').replace('☑', '').replace('✅', '').strip() for h in headers]
-            
+
             msg = f"📊 هدرهای یافت شده: {headers}"
             self.logger.info(msg)
             if log_callback:
                 log_callback(msg, "info")
-            
-            msg = f"📏 تعداد کل ردیف‌ها: {len(all_values) - 1:,}"
-            self.logger.info(msg)
-            if log_callback:
-                log_callback(msg, "info")
-            
-            # ==================== پیدا کردن ستون آماده (Ready) ====================
-            ready_col_idx = -1
-            
-            # اگر ready_column و extracted_column هر دو None هستند، همه ردیف‌ها برگردانده شوند
-            if ready_column is None and extracted_column is None:
-                msg = "📊 بدون فیلتر - همه ردیف‌ها برگردانده می‌شوند"
-                self.logger.info(msg)
-                if log_callback:
-                    log_callback(msg, "info")
-                return all_values  # شامل headers
-            
-            if ready_column:
-                ready_column_clean = ready_column.strip().lower()
-                
-                # روش 1: جستجو در نام‌های ستون‌ها (اولویت اول)
-                for idx, header in enumerate(headers):
-                    header_clean = str(header).strip().lower()
-                    if header_clean == ready_column_clean:
-                        ready_col_idx = idx
-                        msg = f"✅ ستون آماده پیدا شد با نام: '{header}' (index {idx})"
-                        self.logger.info(msg)
-                        if log_callback:
-                            log_callback(msg, "success")
-                        break
-                
-                # روش 2: اگر پیدا نشد، شاید حرف ستون باشد (A, B, C, ...)
-                if ready_col_idx == -1 and len(ready_column) <= 3 and ready_column.isalpha():
-                    try:
-                        ready_col_idx = column_letter_to_index(ready_column)
-                        if ready_col_idx < len(headers):
-                            self.logger.info(f"✅ ستون آماده پیدا شد با حرف: {ready_column} -> '{headers[ready_col_idx]}' (index {ready_col_idx})")
-                        else:
-                            ready_col_idx = -1
-                    except:
-                        pass
-                
-                if ready_col_idx == -1:
-                    self.logger.error(f"❌ ستون آماده '{ready_column}' یافت نشد!")
-                    self.logger.error(f"📋 هدرهای موجود: {headers}")
-                    return []
-            
-            # ==================== پیدا کردن ستون استخراج شده (Extracted) ====================
-            extracted_col_idx = -1
-            
-            if extracted_column:
-                extracted_column_clean = extracted_column.strip().lower()
-                
-                # روش 1: جستجو در نام‌های ستون‌ها (اولویت اول)
-                for idx, header in enumerate(headers):
-                    header_clean = str(header).strip().lower()
-                    if header_clean == extracted_column_clean:
-                        extracted_col_idx = idx
-                        msg = f"✅ ستون استخراج پیدا شد با نام: '{header}' (index {idx})"
-                        self.logger.info(msg)
-                        if log_callback:
-                            log_callback(msg, "success")
-                        break
-                
-                # روش 2: اگر پیدا نشد، شاید حرف ستون باشد (A, B, C, ...)
-                if extracted_col_idx == -1 and len(extracted_column) <= 3 and extracted_column.isalpha():
-                    try:
-                        extracted_col_idx = column_letter_to_index(extracted_column)
-                        if extracted_col_idx < len(headers):
-                            self.logger.info(f"✅ ستون استخراج پیدا شد با حرف: {extracted_column} -> '{headers[extracted_col_idx]}' (index {extracted_col_idx})")
-                        else:
-                            extracted_col_idx = -1
-                    except:
-                        pass
-                
-                if extracted_col_idx == -1:
-                    self.logger.error(f"❌ ستون استخراج '{extracted_column}' یافت نشد!")
-                    self.logger.error(f"📋 هدرهای موجود: {headers}")
-                    return []
-            
-            # ==================== فیلتر ستون‌ها ====================
-            if columns_to_extract:
-                col_indices, col_names = [], []
-                for col in columns_to_extract:
-                    try:
-                        idx = column_letter_to_index(col)
-                        if idx < len(headers):
-                            col_indices.append(idx)
-                            col_names.append(headers[idx])
-                    except:
-                        if col in headers:
-                            col_indices.append(headers.index(col))
-                            col_names.append(col)
-                if not col_indices:
-                    self.logger.error("هیچ ستون معتبری برای استخراج یافت نشد!")
-                    return []
-            else:
-                col_indices = list(range(len(headers)))
-                col_names = headers
-            ready_rows = []
-            for row_idx, row_values in enumerate(all_values[1:], start=2):
-                if max_rows and len(ready_rows) >= max_rows:
-                    break
-                while len(row_values) < len(headers):
-                    row_values.append("")
-                ready_value = row_values[ready_col_idx] if ready_col_idx < len(row_values) else ""
-                extracted_value = row_values[extracted_col_idx] if extracted_col_idx < len(row_values) else ""
-                
-                # استفاده از تشخیص هوشمند به جای چک ساده
-                # این قابلیت Checkbox, Dropdown, Text و Unicode را پشتیبانی می‌کند
-                is_ready = is_cell_checked(ready_value)
-                is_extracted = is_cell_extracted(extracted_value)
-                
-                if is_ready and not is_extracted:
-                    row_data = {}
-                    for idx, col_name in zip(col_indices, col_names):
-                        row_data[col_name] = row_data.get(col_name, row_values[idx] if idx < len(row_values) else "")
-                    ready_rows.append({"row_number": row_idx, "data": row_data})
-            
+
+            resolved = self._resolve_filter_columns(headers, ready_column, extracted_column, columns_to_extract, log_callback)
+            if resolved is None:
+                return []
+
+            # خواندن پنجره‌ای: فقط یک پنجره از ردیف‌ها همزمان در حافظه است
+            ready_rows = [
+                row
+                for batch in self._iter_windowed_ready_batches(
+                    sheet_url, worksheet_name, worksheet, len(headers), resolved,
+                    max_rows=max_rows, log_callback=log_callback
+                )
+                for row in batch
+            ]
+
             msg = f"✅ {len(ready_rows):,} ردیف آماده یافت شد"
             self.logger.success(msg)
             if log_callback:
                 log_callback(msg, "success")
-            
+
             return ready_rows
         except Exception as e:
+            self.invalidate_cache(sheet_url, worksheet_name)
             msg = f"❌ خطا در استخراج از worksheet '{worksheet_name}': {str(e)}"
             self.logger.error(msg)
             if log_callback:
@@ -272,8 +542,372 @@ class GoogleSheetExtractor:
             import traceback
             self.logger.error(f"جزئیات خطا: {traceback.format_exc()}")
             return []
+
+    def iter_rows(self, worksheet, width, start_row=2, window_rows=None):
+        """
+        خواندن پنجره‌ای ردیف‌های worksheet (generator)
+        
+        هر پنجره با یک درخواست محدوده‌دار دریافت می‌شود و ردیف‌ها به صورت کپی
+        نرمال‌سازی شده (پر شده تا width ستون) تحویل داده می‌شوند؛ بنابراین حافظه
+        مصرفی مستقل از اندازه شیت و حداکثر به اندازه یک پنجره است.
+        
+        Args:
+            worksheet: worksheet object
+            width: تعداد ستون‌ها (معمولاً تعداد هدرها)
+            start_row: اولین ردیف (1-indexed)
+            window_rows: تعداد ردیف هر پنجره (پیش‌فرض: SHEETS_READ_WINDOW_ROWS)
+        
+        Yields:
+            (شماره ردیف, لیست مقادیر)
+        """
+        window_rows = window_rows or self.read_window_rows
+        width = max(width, 1)
+        last_letter = column_index_to_letter(width - 1)
+        row_count = getattr(worksheet, 'row_count', 0) or 0
+        
+        start = start_row
+        while True:
+            end = start + window_rows - 1
+            # پنجره آخر بدون ردیف پایان درخواست می‌شود تا ردیف‌های اضافه شده بعد از
+            # دریافت متادیتا (row_count قدیمی) هم خوانده شوند
+            is_last = end >= row_count
+            a1_range = f"A{start}:{last_letter}" if is_last else f"A{start}:{last_letter}{end}"
+            
+            self._throttle()
+            values = worksheet.get(a1_range)
+            for offset, row in enumerate(values):
+                yield start + offset, list(row) + [""] * (width - len(row))
+            
+            if is_last:
+                break
+            start = end + 1
     
+    def _extract_ready_rows_two_phase(self, sheet_url, worksheet_name, worksheet, ready_column, extracted_column, columns_to_extract, max_rows=None, log_callback=None):
+        """
+        استخراج دو مرحله‌ای
+
+        مرحله 1: فقط هدر و ستون‌های آماده/استخراج (batch_get محدود)
+        مرحله 2: فقط ردیف‌های واجد شرایط، ادغام شده در بلوک‌های پیوسته و فقط ستون‌های columns_to_extract
+
+        Returns:
+            لیست ردیف‌های آماده، یا None اگر باید به دریافت کامل برگشت
+        """
+        phase_one = self._find_qualifying_rows(
+            sheet_url, worksheet_name, worksheet, ready_column, extracted_column,
+            columns_to_extract, max_rows=max_rows, log_callback=log_callback
+        )
+        if phase_one is None:
+            return None
+        col_indices, col_names, qualifying = phase_one
+
+        return [
+            row
+            for batch in self._iter_qualifying_row_batches(worksheet, qualifying, col_indices, col_names, log_callback)
+            for row in batch
+        ]
+
+    def _find_qualifying_rows(self, sheet_url, worksheet_name, worksheet, ready_column, extracted_column, columns_to_extract, max_rows=None, log_callback=None):
+        """
+        مرحله 1 استخراج دو مرحله‌ای: هدر + ستون‌های وضعیت
+
+        Returns:
+            (col_indices, col_names, شماره ردیف‌های واجد شرایط)، یا None اگر باید به دریافت کامل برگشت
+        """
+        headers = clean_headers(self._get_raw_headers(sheet_url, worksheet_name, worksheet))
+        if not headers:
+            return None
+
+        msg = f"📊 هدرهای یافت شده: {headers}"
+        self.logger.info(msg)
+        if log_callback:
+            log_callback(msg, "info")
+
+        resolved = self._resolve_filter_columns(headers, ready_column, extracted_column, columns_to_extract, log_callback)
+        if resolved is None:
+            return [], [], []
+        ready_col_idx, extracted_col_idx, col_indices, col_names = resolved
+
+        ready_letter = column_index_to_letter(ready_col_idx)
+        extracted_letter = column_index_to_letter(extracted_col_idx)
+        self._throttle()
+        ready_values, extracted_values = worksheet.batch_get(
+            [f"{ready_letter}2:{ready_letter}", f"{extracted_letter}2:{extracted_letter}"],
+            major_dimension='COLUMNS'
+        )
+        ready_values = ready_values[0] if ready_values else []
+        extracted_values = extracted_values[0] if extracted_values else []
+
+        msg = f"📏 تعداد کل ردیف‌ها: {len(ready_values):,}"
+        self.logger.info(msg)
+        if log_callback:
+            log_callback(msg, "info")
+
+        qualifying = []
+        for offset, ready_value in enumerate(ready_values):
+            if max_rows and len(qualifying) >= max_rows:
+                break
+            extracted_value = extracted_values[offset] if offset < len(extracted_values) else ""
+            if is_cell_checked(ready_value) and not is_cell_extracted(extracted_value):
+                qualifying.append(offset + 2)
+
+        return col_indices, col_names, qualifying
+
+    def _iter_qualifying_row_batches(self, worksheet, qualifying, col_indices, col_names, log_callback=None):
+        """
+        مرحله 2 استخراج دو مرحله‌ای: دریافت فقط ردیف‌ها و ستون‌های لازم (generator)
+
+        ردیف‌های پیوسته در بلوک‌هایی حداکثر به اندازه read_window_rows ادغام می‌شوند و هر
+        درخواست batch_get حداکثر read_window_rows ردیف را دریافت می‌کند؛ ردیف‌های هر
+        درخواست بلافاصله تحویل داده می‌شوند.
+
+        Yields:
+            لیست ردیف‌های آماده {'row_number', 'data'}
+        """
+        if not qualifying:
+            return
+
+        window = self.read_window_rows
+        col_spans = coalesce_row_ranges(sorted(set(col_indices)))
+
+        row_blocks = []
+        for start_row, end_row in coalesce_row_ranges(qualifying):
+            while start_row <= end_row:
+                row_blocks.append((start_row, min(end_row, start_row + window - 1)))
+                start_row += window
+
+        # گروه‌بندی بلوک‌ها در درخواست‌ها (حداکثر BATCH_GET_MAX_RANGES محدوده و window ردیف)
+        requests = []
+        current, current_rows = [], 0
+        for start_row, end_row in row_blocks:
+            block_rows = end_row - start_row + 1
+            if current and (
+                (len(current) + 1) * len(col_spans) > self.BATCH_GET_MAX_RANGES
+                or current_rows + block_rows > window
+            ):
+                requests.append(current)
+                current, current_rows = [], 0
+            current.append((start_row, end_row))
+            current_rows += block_rows
+        if current:
+            requests.append(current)
+
+        msg = f"📦 دریافت {len(qualifying):,} ردیف در {len(row_blocks):,} بلوک ({len(requests):,} درخواست)"
+        self.logger.info(msg)
+        if log_callback:
+            log_callback(msg, "info")
+
+        for blocks in requests:
+            ranges = [
+                (start_row, start_col, f"{column_index_to_letter(start_col)}{start_row}:{column_index_to_letter(end_col)}{end_row}")
+                for start_row, end_row in blocks
+                for start_col, end_col in col_spans
+            ]
+
+            # مقادیر هر ردیف: {row_number: {col_idx: value}}
+            row_cells = {row_num: {} for start_row, end_row in blocks for row_num in range(start_row, end_row + 1)}
+            for chunk_start in range(0, len(ranges), self.BATCH_GET_MAX_RANGES):
+                chunk = ranges[chunk_start:chunk_start + self.BATCH_GET_MAX_RANGES]
+                self._throttle()
+                results = worksheet.batch_get([a1 for _, _, a1 in chunk])
+                for (start_row, start_col, _), values in zip(chunk, results):
+                    for row_offset, row_values in enumerate(values):
+                        cells = row_cells.get(start_row + row_offset)
+                        if cells is None:
+                            continue
+                        for col_offset, value in enumerate(row_values):
+                            cells[start_col + col_offset] = value
+
+            batch = []
+            for row_num, cells in row_cells.items():
+                row_data = {}
+                for idx, col_name in zip(col_indices, col_names):
+                    row_data[col_name] = row_data.get(col_name, cells.get(idx, ""))
+                batch.append({"row_number": row_num, "data": row_data})
+            yield batch
+
+    def _iter_windowed_ready_batches(self, sheet_url, worksheet_name, worksheet, width, resolved, max_rows=None, batch_rows=None, log_callback=None, start_row=None):
+        """
+        فیلتر ردیف‌های آماده هنگام خواندن پنجره‌ای کل شیت (generator)
+
+        ردیف‌های تا start_row (در صورت تعیین) نادیده گرفته می‌شوند.
+
+        Yields:
+            لیست ردیف‌های آماده (حداکثر batch_rows ردیف در هر بسته)
+        """
+        ready_col_idx, extracted_col_idx, col_indices, col_names = resolved
+        batch_rows = batch_rows or self.read_window_rows
+
+        batch = []
+        found = 0
+        scanned_rows = 0
+        for row_idx, row_values in self._iter_sheet_rows(sheet_url, worksheet_name, worksheet, width):
+            if max_rows and found >= max_rows:
+                break
+            scanned_rows += 1
+            if start_row and row_idx <= start_row:
+                continue
+            ready_value = row_values[ready_col_idx]
+            extracted_value = row_values[extracted_col_idx]
+
+            # استفاده از تشخیص هوشمند به جای چک ساده
+            # این قابلیت Checkbox, Dropdown, Text و Unicode را پشتیبانی می‌کند
+            if is_cell_checked(ready_value) and not is_cell_extracted(extracted_value):
+                batch.append({"row_number": row_idx, "data": self._build_row_data(row_values, col_indices, col_names)})
+                found += 1
+                if len(batch) >= batch_rows:
+                    yield batch
+                    batch = []
+
+        if batch:
+            yield batch
+
+        msg = f"📏 تعداد کل ردیف‌ها: {scanned_rows:,}"
+        self.logger.info(msg)
+        if log_callback:
+            log_callback(msg, "info")
+
+    def iter_ready_row_batches(self, sheet_url, worksheet_name, ready_column, extracted_column, columns_to_extract=None, batch_rows=None, log_callback=None, total_callback=None, start_row=None):
+        """
+        دریافت تدریجی ردیف‌های آماده به صورت بسته (generator) - منبع pipeline استخراج
+
+        مانند extract_ready_rows است، با این تفاوت که هر بسته بلافاصله پس از دریافت تحویل
+        داده می‌شود. برگشت به خواندن پنجره‌ای فقط تا پیش از تحویل اولین بسته ممکن است.
+
+        Args:
+            batch_rows: حداکثر ردیف هر بسته در خواندن پنجره‌ای
+            log_callback: تابع (message, level)
+            total_callback: تابع (تعداد کل ردیف‌های آماده) - در صورت معلوم بودن
+            start_row: فقط ردیف‌های بعد از این شماره (ادامه از نقطه بازیابی)
+
+        Yields:
+            لیست ردیف‌های آماده {'row_number', 'data'}
+        """
+        if ready_column is None and extracted_column is None:
+            msg = "⚠️ ستون آماده/استخراج تنظیم نشده است"
+            self.logger.warning(msg)
+            if log_callback:
+                log_callback(msg, "warning")
+            return
+
+        yielded = False
+        try:
+            msg = f"📄 در حال باز کردن worksheet: '{worksheet_name}'"
+            self.logger.info(msg)
+            if log_callback:
+                log_callback(msg, "info")
+
+            worksheet = self._resolve_worksheet(sheet_url, worksheet_name, log_callback)
+
+            # ==================== استخراج دو مرحله‌ای ====================
+            if ready_column and extracted_column:
+                try:
+                    phase_one = self._find_qualifying_rows(
+                        sheet_url, worksheet_name, worksheet, ready_column, extracted_column,
+                        columns_to_extract, log_callback=log_callback
+                    )
+                    if phase_one is not None:
+                        col_indices, col_names, qualifying = phase_one
+                        if start_row:
+                            qualifying = [row_number for row_number in qualifying if row_number > start_row]
+                        msg = f"✅ {len(qualifying):,} ردیف آماده یافت شد"
+                        self.logger.success(msg)
+                        if log_callback:
+                            log_callback(msg, "success")
+                        if total_callback:
+                            total_callback(len(qualifying))
+                        for batch in self._iter_qualifying_row_batches(worksheet, qualifying, col_indices, col_names, log_callback):
+                            yielded = True
+                            yield batch
+                        return
+                except Exception as e:
+                    if yielded:
+                        raise
+                    msg = f"⚠️ استخراج دو مرحله‌ای ناموفق بود، خواندن پنجره‌ای شیت: {str(e)}"
+                    self.logger.warning(msg)
+                    if log_callback:
+                        log_callback(msg, "warning")
+
+            headers = clean_headers(self._get_raw_headers(sheet_url, worksheet_name, worksheet))
+            if not headers:
+                msg = "⚠️ شیت خالی است یا فقط هدر دارد"
+                self.logger.warning(msg)
+                if log_callback:
+                    log_callback(msg, "warning")
+                return
+
+            resolved = self._resolve_filter_columns(headers, ready_column, extracted_column, columns_to_extract, log_callback)
+            if resolved is None:
+                return
+
+            for batch in self._iter_windowed_ready_batches(
+                sheet_url, worksheet_name, worksheet, len(headers), resolved,
+                batch_rows=batch_rows, log_callback=log_callback, start_row=start_row
+            ):
+                yielded = True
+                yield batch
+        except Exception as e:
+            self.invalidate_cache(sheet_url, worksheet_name)
+            msg = f"❌ خطا در استخراج از worksheet '{worksheet_name}': {str(e)}"
+            self.logger.error(msg)
+            if log_callback:
+                log_callback(msg, "error")
+            raise
+
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    def read_row_content_hashes(self, sheet_config, sheet_url, worksheet_name, row_numbers: List[int]) -> Dict[int, str]:
+        """
+        hash محتوای فعلی ردیف‌های شیت (همان hash که extract_and_save ذخیره می‌کند)
+        
+        صف علامت‌گذاری پیش از نوشتن، ردیف‌ها را دوباره می‌خواند؛ اگر ردیفی درج یا حذف شده
+        باشد (جابجایی شماره ردیف‌ها) یا محتوای آن تغییر کرده باشد، hash متفاوت است.
+        
+        Args:
+            sheet_config: تنظیمات شیت (ستون‌های استخراج و کلیدی)
+            row_numbers: شماره ردیف‌ها
+            
+        Returns:
+            {شماره ردیف: content_hash}
+            
+        Raises:
+            Exception: در صورت خطای خواندن یا پیدا نشدن ستون‌ها
+        """
+        from app.utils.unique_key_generator import UniqueKeyBatch
+        
+        worksheet = self._resolve_worksheet(sheet_url, worksheet_name)
+        headers = clean_headers(self._get_raw_headers(sheet_url, worksheet_name, worksheet))
+        resolved = self._resolve_filter_columns(
+            headers, sheet_config.ready_column, sheet_config.extracted_column, sheet_config.columns_to_extract
+        )
+        if resolved is None:
+            raise Exception(f"ستون‌های شیت '{worksheet_name}' یافت نشد")
+        _, _, col_indices, col_names = resolved
+        
+        # hash فقط به ستون‌های کلیدی (در صورت تنظیم) وابسته است
+        unique_columns = sheet_config.unique_key_columns
+        if unique_columns:
+            columns = [(idx, name) for idx, name in zip(col_indices, col_names) if name in unique_columns]
+            if columns:
+                col_indices, col_names = [idx for idx, _ in columns], [name for _, name in columns]
+        
+        # ردیف‌های نزدیک به هم با فاصله‌شان در یک بازه خوانده می‌شوند (درخواست‌های کمتر)
+        requested = sorted(set(row_numbers))
+        spans = []
+        for row_number in requested:
+            if spans and row_number - spans[-1][1] <= self.VERIFY_READ_GAP_ROWS:
+                spans[-1][1] = row_number
+            else:
+                spans.append([row_number, row_number])
+        to_read = [row_number for start, end in spans for row_number in range(start, end + 1)]
+        
+        requested = set(requested)
+        key_batch = UniqueKeyBatch(sheet_config.id, headers=list(dict.fromkeys(col_names)), unique_columns=unique_columns)
+        hashes = {}
+        for batch in self._iter_qualifying_row_batches(worksheet, to_read, col_indices, col_names):
+            batch = [row for row in batch if row['row_number'] in requested]
+            for row, (_, content_hash) in zip(batch, key_batch.keys_for_records(batch)):
+                hashes[row['row_number']] = content_hash
+        return hashes
+    
     def mark_as_extracted(self, sheet_url, worksheet_name, row_number, extracted_column):
         """علامت‌گذاری یک ردیف - برای سازگاری با کدهای قدیمی"""
         return self.mark_rows_as_extracted(sheet_url, worksheet_name, [row_number], extracted_column)
@@ -283,10 +917,12 @@ class GoogleSheetExtractor:
         علامت‌گذاری چندین ردیف با مدیریت پیشرفته خطا و تقسیم‌بندی هوشمند
         
         این متد:
-        - رکوردها را به بچ‌های کوچک تقسیم می‌کند (500 رکورد)
+        - ردیف‌ها را مرتب و در بازه‌های پیوسته ادغام می‌کند (هر بازه یک محدوده A1)
+        - بازه‌ها را با کمترین تعداد درخواست batch_update ارسال می‌کند
+        - اندازه هر بچ را از کنترل‌کننده تطبیقی (AIMD) همان Spreadsheet می‌گیرد
         - از timeout و retry استفاده می‌کند
         - پیشرفت را گزارش می‌دهد
-        - در صورت خطا، بچ را به قسمت‌های کوچک‌تر تقسیم می‌کند
+        - در صورت timeout یا 429/5xx، بچ را به اندازه جدید تقسیم می‌کند
         
         Args:
             sheet_url: آدرس Google Sheet
@@ -305,34 +941,16 @@ class GoogleSheetExtractor:
             total_rows = len(row_numbers)
             self.logger.info(f"🔄 شروع علامت‌گذاری {total_rows:,} ردیف...")
             
-            # اتصال به شیت
-            sheet = self.client.open_by_url(sheet_url)
-            
-            # جستجوی case-insensitive برای worksheet (مشابه extract_ready_rows)
-            if worksheet_name:
-                matching_ws = None
-                all_worksheets = [ws.title for ws in sheet.worksheets()]
-                
-                for ws in sheet.worksheets():
-                    if ws.title.lower() == worksheet_name.lower():
-                        matching_ws = ws
-                        break
-                
-                if matching_ws:
-                    worksheet = matching_ws
-                    if matching_ws.title != worksheet_name:
-                        self.logger.info(f"📋 Worksheet واقعی: '{matching_ws.title}' (از تنظیمات: '{worksheet_name}')")
-                else:
-                    self.logger.error(f"❌ Worksheet '{worksheet_name}' یافت نشد. موجود: {all_worksheets}")
-                    return False, f"Worksheet '{worksheet_name}' یافت نشد", {}
-            else:
-                worksheet = sheet.sheet1
+            # اتصال به شیت (از کش متادیتا در صورت وجود)
+            try:
+                worksheet = self._resolve_worksheet(sheet_url, worksheet_name)
+            except Exception as e:
+                self.logger.error(f"❌ {str(e)}")
+                return False, f"Worksheet '{worksheet_name}' یافت نشد", {}
             
             # پیدا کردن ایندکس ستون با منطق جدید
-            headers = worksheet.row_values(1)
-            
             # پاک‌سازی هدرها: حذف علامت تیک و فضای خالی
-            headers = [str(h).strip().replace('✓', '').replace('✔', '').replace('☑', '').replace('✅', '').strip() for h in headers]
+            headers = clean_headers(self._get_raw_headers(sheet_url, worksheet_name, worksheet))
             
             extracted_col_idx = -1
             extracted_column_clean = extracted_column.strip().lower()
@@ -359,53 +977,68 @@ class GoogleSheetExtractor:
             
             self.logger.info(f"🎯 شروع علامت‌گذاری در ستون index {extracted_col_idx}")
             
-            # تقسیم به بچ‌های بزرگ‌تر برای سرعت بیشتر
-            BATCH_SIZE = 1000  # افزایش از 500 به 1000 برای سرعت بیشتر
-            total_batches = (total_rows + BATCH_SIZE - 1) // BATCH_SIZE
+            # مرتب‌سازی و ادغام ردیف‌ها در بازه‌های پیوسته (هر بازه = یک محدوده A1)
+            runs = coalesce_row_ranges(sorted(set(row_numbers)))
+            total_rows = sum(end - start + 1 for start, end in runs)
+            
+            # اندازه بچ قبل از هر درخواست از کنترل‌کننده تطبیقی خوانده می‌شود
+            tuning_key = self.metadata_cache.spreadsheet_key(sheet_url)
+            self.logger.info(
+                f"📐 {total_rows:,} ردیف در {len(runs):,} بازه پیوسته "
+                f"(اندازه بچ فعلی: {self.batch_sizer.current_size(tuning_key):,} سلول)"
+            )
             
             success_count = 0
             failed_batches = []
+            failed_runs = []
+            pending = deque(runs)
+            batch_num = 0
             
-            for batch_num in range(total_batches):
-                start_idx = batch_num * BATCH_SIZE
-                end_idx = min(start_idx + BATCH_SIZE, total_rows)
-                batch_rows = row_numbers[start_idx:end_idx]
-                batch_size = len(batch_rows)
+            while pending:
+                batch_runs = self._take_runs(pending, self.batch_sizer.current_size(tuning_key))
+                batch_size = sum(end - start + 1 for start, end in batch_runs)
+                batch_num += 1
                 
                 # گزارش پیشرفت
                 if progress_callback:
-                    progress_callback(success_count, total_rows, f"علامت‌گذاری بچ {batch_num + 1}/{total_batches}")
+                    progress_callback(success_count, total_rows, f"علامت‌گذاری بچ {batch_num}")
                 
-                self.logger.info(f"📦 بچ {batch_num + 1}/{total_batches}: {batch_size} ردیف (از {start_idx + 1} تا {end_idx})")
+                self.logger.info(f"📦 بچ {batch_num}: {batch_size} ردیف در {len(batch_runs)} بازه")
                 
                 try:
-                    # تلاش برای update با timeout
+                    # ارسال با retry؛ فاصله بین درخواست‌ها توسط محدودکننده نرخ کنترل می‌شود
                     success = self._update_batch_with_retry(
-                        worksheet, batch_rows, extracted_col_idx, 
-                        max_attempts=3, initial_batch_size=batch_size
+                        worksheet, batch_runs, extracted_col_idx, max_attempts=3, tuning_key=tuning_key
                     )
                     
                     if success:
                         success_count += batch_size
-                        self.logger.success(f"✅ بچ {batch_num + 1} موفق: {batch_size} ردیف")
+                        self.logger.success(f"✅ بچ {batch_num} موفق: {batch_size} ردیف")
                     else:
-                        failed_batches.append(batch_num + 1)
-                        self.logger.error(f"❌ بچ {batch_num + 1} ناموفق")
+                        failed_batches.append(batch_num)
+                        failed_runs.extend(batch_runs)
+                        self.logger.error(f"❌ بچ {batch_num} ناموفق")
                         
                 except Exception as e:
-                    failed_batches.append(batch_num + 1)
-                    self.logger.error(f"❌ خطا در بچ {batch_num + 1}: {str(e)}")
-                
-                # تاخیر کمتر بین بچ‌ها برای سرعت بیشتر
-                if batch_num < total_batches - 1:
-                    time.sleep(0.5)  # کاهش از 1 ثانیه به 0.5 ثانیه
+                    failed_batches.append(batch_num)
+                    failed_runs.extend(batch_runs)
+                    self.logger.error(f"❌ خطا در بچ {batch_num}: {str(e)}")
+            
+            # ذخیره اندازه یادگرفته شده برای اجرای بعدی
+            self.batch_sizer.save()
             
             # گزارش نهایی
             stats = {
                 'total': total_rows,
                 'success': success_count,
                 'failed': total_rows - success_count,
-                'failed_batches': failed_batches
+                'failed_batches': failed_batches,
+                'failed_runs': coalesce_row_ranges(
+                    [row for start, end in failed_runs for row in range(start, end + 1)]
+                ),
+                'ranges': len(runs),
+                'requests': batch_num,
+                'batch_size': self.batch_sizer.current_size(tuning_key)
             }
             
             if success_count == total_rows:
@@ -422,75 +1055,124 @@ class GoogleSheetExtractor:
                 return False, msg, stats
                 
         except Exception as e:
+            self.invalidate_cache(sheet_url, worksheet_name)
             self.logger.error(f"❌ خطای کلی در علامت‌گذاری: {str(e)}")
             import traceback
             self.logger.error(traceback.format_exc())
-            return False, f"خطا: {str(e)}", {'total': len(row_numbers), 'success': 0, 'failed': len(row_numbers)}
+            return False, f"خطا: {str(e)}", {
+                'total': len(row_numbers),
+                'success': 0,
+                'failed': len(row_numbers),
+                'failed_runs': coalesce_row_ranges(sorted(set(row_numbers)))
+            }
     
-    def _update_batch_with_retry(self, worksheet, row_numbers, col_idx, max_attempts=3, initial_batch_size=None):
+    @staticmethod
+    def _take_runs(pending, max_cells):
+        """
+        برداشتن بازه‌ها از ابتدای صف تا حداکثر max_cells سلول
+        (بازه‌ای که جا نشود تقسیم و باقی‌مانده آن به صف برگردانده می‌شود)
         """
-        تلاش برای update یک بچ با retry و تقسیم‌بندی در صورت خطا
+        max_cells = max(1, max_cells)
+        batch, cells = [], 0
+        while pending and cells < max_cells:
+            start, end = pending.popleft()
+            take = min(end - start + 1, max_cells - cells)
+            batch.append((start, start + take - 1))
+            cells += take
+            if start + take <= end:
+                pending.appendleft((start + take, end))
+        return batch
+    
+    @staticmethod
+    def _split_runs(runs):
+        """تقسیم لیست بازه‌ها به دو نیمه با تعداد سلول تقریباً برابر"""
+        if len(runs) == 1:
+            start, end = runs[0]
+            mid = (start + end) // 2
+            return [(start, mid)], [(mid + 1, end)]
+        half = len(runs) // 2
+        return runs[:half], runs[half:]
+    
+    def _update_batch_with_retry(self, worksheet, runs, col_idx, max_attempts=3, tuning_key=None):
+        """
+        تلاش برای update یک بچ (لیست بازه‌های پیوسته) با retry و تقسیم‌بندی در صورت خطا
         
         Args:
             worksheet: worksheet object
-            row_numbers: لیست شماره ردیف‌ها
-            col_idx: ایندکس ستون
+            runs: لیست بازه‌های (ردیف شروع, ردیف پایان)
+            col_idx: ایندکس ستون (1-indexed)
             max_attempts: حداکثر تلاش
-            initial_batch_size: اندازه اولیه بچ
+            tuning_key: کلید Spreadsheet در کنترل‌کننده اندازه بچ (None = بدون یادگیری)
         
         Returns:
             bool: موفقیت
         """
-        batch_size = initial_batch_size or len(row_numbers)
+        column_letter = column_index_to_letter(col_idx - 1)
+        cell_count = sum(end - start + 1 for start, end in runs)
         
         for attempt in range(max_attempts):
             try:
-                # ساخت لیست سلول‌ها
-                cell_list = []
-                for row_num in row_numbers:
-                    cell_list.append(gspread.Cell(row_num, col_idx, "TRUE"))
+                # هر بازه پیوسته یک محدوده A1 با یک بلوک مقدار
+                data = [
+                    {
+                        'range': f"{column_letter}{start}:{column_letter}{end}",
+                        'values': [["TRUE"]] * (end - start + 1)
+                    }
+                    for start, end in runs
+                ]
                 
                 # تلاش برای update
-                worksheet.update_cells(cell_list, value_input_option='USER_ENTERED')
+                self._throttle(SheetsRateLimiter.WRITE)
+                started_at = time.monotonic()
+                worksheet.batch_update(data, value_input_option='USER_ENTERED')
+                if tuning_key:
+                    self.batch_sizer.record_success(tuning_key, cell_count, time.monotonic() - started_at)
                 return True
                 
             except Exception as e:
-                error_msg = str(e).lower()
+                error_kind = classify_sheets_error(e)
+                new_size = cell_count // 2
+                if tuning_key:
+                    new_size = self.batch_sizer.record_failure(tuning_key, error_kind)
                 
-                # اگر خطای timeout یا connection بود
-                if 'timeout' in error_msg or 'connection' in error_msg or 'aborted' in error_msg:
-                    # تقسیم بچ به دو نیمه و تلاش مجدد
-                    if len(row_numbers) > 10:  # فقط اگر بچ بزرگ باشد
-                        mid = len(row_numbers) // 2
-                        self.logger.warning(f"⚠️ تقسیم بچ به دو نیمه ({mid} + {len(row_numbers) - mid})")
-                        
-                        # تلاش برای نیمه اول
-                        success1 = self._update_batch_with_retry(
-                            worksheet, row_numbers[:mid], col_idx, 
-                            max_attempts=2, initial_batch_size=mid
+                # اگر خطای timeout، 429 یا 5xx بود
+                if error_kind in (ERROR_TIMEOUT, ERROR_THROTTLED, ERROR_SERVER):
+                    # تقسیم بچ به اندازه جدید و تلاش مجدد
+                    if cell_count > 10 and new_size < cell_count:  # فقط اگر بچ بزرگ باشد
+                        if tuning_key:
+                            pending = deque(runs)
+                            parts = []
+                            while pending:
+                                parts.append(self._take_runs(pending, new_size))
+                        else:
+                            parts = list(self._split_runs(runs))
+                        self.logger.warning(
+                            f"⚠️ خطای {error_kind}: تقسیم بچ {cell_count} سلولی به {len(parts)} بخش "
+                            f"(اندازه جدید: {new_size})"
                         )
                         
-                        # تلاش برای نیمه دوم
-                        success2 = self._update_batch_with_retry(
-                            worksheet, row_numbers[mid:], col_idx,
-                            max_attempts=2, initial_batch_size=len(row_numbers) - mid
-                        )
+                        results = [
+                            self._update_batch_with_retry(worksheet, part, col_idx, max_attempts=2, tuning_key=tuning_key)
+                            for part in parts
+                        ]
                         
-                        return success1 and success2
+                        return all(results)
                 
                 # اگر تلاش آخر بود
                 if attempt == max_attempts - 1:
                     self.logger.error(f"❌ شکست بعد از {max_attempts} تلاش: {str(e)}")
                     return False
                 
-                # تاخیر قبل از تلاش بعدی
+                # تاخیر قبل از تلاش بعدی (برای 429 طولانی‌تر)
                 wait_time = 2 ** attempt  # exponential backoff
+                if error_kind == ERROR_THROTTLED:
+                    wait_time *= 5
                 self.logger.warning(f"⚠️ تلاش {attempt + 1} ناموفق، صبر {wait_time}s...")
                 time.sleep(wait_time)
         
         return False
     
-    def extract_and_save(self, sheet_config_id: int, auto_update: bool = False, progress_callback=None, log_callback=None) -> Tuple[bool, str, Dict]:
+    def extract_and_save(self, sheet_config_id: int, auto_update: bool = False, progress_callback=None, log_callback=None, force: bool = False, run_id: Optional[int] = None) -> Tuple[bool, str, Dict]:
         """
         استخراج و ذخیره داده از یک شیت با گزارش پیشرفت دقیق
         
@@ -499,12 +1181,18 @@ class GoogleSheetExtractor:
             auto_update: بروزرسانی خودکار بدون تایید کاربر
             progress_callback: تابع (current, total, message) برای گزارش پیشرفت
             log_callback: تابع (message, level) برای ارسال لاگ به UI
+            force: استخراج کامل حتی اگر شیت از آخرین همگام‌سازی تغییر نکرده باشد
+            run_id: شناسه اجرای استخراج برای ثبت نقطه بازیابی؛ اگر این شیت در همین اجرا
+                نیمه‌کاره مانده باشد، از بعد از آخرین ردیف ذخیره شده ادامه می‌یابد
             
         Returns:
             (موفقیت, پیام, آمار کامل)
         """
         from app.core.database import db_manager
-        import json
+        
+        def save_checkpoint(**fields):
+            if run_id:
+                db_manager.save_extraction_checkpoint(run_id, sheet_config_id, **fields)
         
         try:
             # دریافت تنظیمات شیت
@@ -519,168 +1207,366 @@ class GoogleSheetExtractor:
             if not sheet_config.is_active:
                 return False, "شیت غیرفعال است", {}
             
-            # استخراج داده‌ها
+            # ==================== بررسی اثر انگشت تغییرات ====================
             if progress_callback:
-                progress_callback(10, 100, "اتصال به Google Sheets")
-            
-            if log_callback:
-                log_callback("🔗 اتصال به Google Sheets برقرار شد", "success")
+                progress_callback(5, 100, "بررسی تغییرات شیت")
             
-            ready_rows = self.extract_ready_rows(
-                sheet_url=sheet_config.sheet_url,
-                worksheet_name=sheet_config.worksheet_name or 'Sheet1',
-                ready_column=sheet_config.ready_column,
-                extracted_column=sheet_config.extracted_column,
-                columns_to_extract=sheet_config.columns_to_extract,
-                log_callback=log_callback
-            )
+            fingerprint = self.get_change_fingerprint(sheet_config)
             
-            if not ready_rows:
-                return True, "هیچ ردیف آماده‌ای یافت نشد", {
-                    'new_records': 0, 
-                    'updated_records': 0, 
+            # ==================== نقطه بازیابی ====================
+            checkpoint = db_manager.get_extraction_checkpoints(run_id).get(sheet_config_id) if run_id else None
+            start_row = None
+            if checkpoint and checkpoint.status == 'completed':
+                msg = "⏭️ این شیت در همین اجرا قبلاً کامل شده است - رد شد"
+                self.logger.info(msg)
+                if log_callback:
+                    log_callback(msg, "info")
+                if progress_callback:
+                    progress_callback(100, 100, "قبلاً کامل شده")
+                return True, "قبلاً در همین اجرا کامل شده", {
+                    'new_records': 0,
+                    'updated_records': 0,
                     'total_extracted': 0,
-                    'duplicates': [], 
-                    'warnings': []
+                    'duplicates': 0,
+                    'warnings': [],
+                    'skipped': True
                 }
+            if checkpoint and checkpoint.last_persisted_row:
+                # علامت‌گذاری خود برنامه زمان تغییر را عوض می‌کند؛ فقط بخش تنظیمات مقایسه می‌شود
+                saved_settings = (checkpoint.fingerprint or '').rpartition('|')[2]
+                current_settings = (fingerprint or '').rpartition('|')[2]
+                if saved_settings and saved_settings == current_settings:
+                    start_row = checkpoint.last_persisted_row
+                    msg = f"↩️ ادامه از نقطه بازیابی: ردیف‌های بعد از {start_row:,}"
+                    self.logger.info(msg)
+                    if log_callback:
+                        log_callback(msg, "info")
+                else:
+                    msg = "⚠️ تنظیمات شیت پس از نقطه بازیابی تغییر کرده است - استخراج از ابتدا"
+                    self.logger.warning(msg)
+                    if log_callback:
+                        log_callback(msg, "warning")
             
-            total_rows = len(ready_rows)
-            msg = f"📥 {total_rows:,} ردیف آماده برای پردازش"
-            self.logger.info(msg)
-            if log_callback:
-                log_callback(msg, "info")
+            if start_row:
+                save_checkpoint(status='running', fingerprint=fingerprint)
+            else:
+                save_checkpoint(
+                    status='running', fingerprint=fingerprint,
+                    last_persisted_row=None, persisted_rows=0, marked_rows=0, stats=None
+                )
             
-            if progress_callback:
-                progress_callback(20, 100, f"پردازش {total_rows:,} ردیف")
+            if not force and not start_row and fingerprint:
+                sync_state = db_manager.get_sheet_sync_state(sheet_config_id)
+                if (
+                    sync_state
+                    and sync_state.last_run_completed
+                    and sync_state.fingerprint == fingerprint
+                    and not db_manager.get_pending_sheet_writes_count(sheet_config_id)
+                ):
+                    msg = "⏭️ شیت از آخرین همگام‌سازی تغییر نکرده است - رد شد"
+                    self.logger.info(msg)
+                    if log_callback:
+                        log_callback(msg, "info")
+                    if progress_callback:
+                        progress_callback(100, 100, "بدون تغییر")
+                    save_checkpoint(status='completed', stats={'skipped': True})
+                    return True, "بدون تغییر از آخرین همگام‌سازی", {
+                        'new_records': 0,
+                        'updated_records': 0,
+                        'total_extracted': 0,
+                        'duplicates': 0,
+                        'warnings': [],
+                        'skipped': True
+                    }
             
-            # 🔍 تشخیص تغییرات
+            # ==================== Pipeline استخراج ====================
+            # دریافت → کلید → ذخیره → علامت‌گذاری؛ هر مرحله در thread جداگانه و با صف محدود
+            # بین مراحل اجرا می‌شود تا I/O شبکه و دیتابیس همزمان انجام شود
             from app.utils.change_detector import ChangeDetector
-            from app.utils.unique_key_generator import generate_unique_key
+            from app.utils.unique_key_generator import UniqueKeyBatch
+            
+            if progress_callback:
+                progress_callback(10, 100, "اتصال به Google Sheets")
             
             if log_callback:
-                log_callback("🔍 بررسی تغییرات و تکراری‌ها...", "info")
+                log_callback("🔗 اتصال به Google Sheets برقرار شد", "success")
             
-            warnings = []
-            existing_data_list = db_manager.get_sales_data_by_sheet_config(sheet_config_id)
+            worksheet_name = sheet_config.worksheet_name or 'Sheet1'
+            unique_columns = sheet_config.unique_key_columns
+            pipeline = StagedPipeline(queue_size=self.pipeline_queue_size)
             
-            if existing_data_list:
-                if log_callback:
-                    log_callback(f"📊 {len(existing_data_list):,} رکورد موجود در دیتابیس", "info")
-                
-                detector = ChangeDetector()
-                old_data = [
-                    {'row_number': item.row_number, 'data': item.data}
-                    for item in existing_data_list
-                ]
-                changes, change_stats = detector.detect_changes(
-                    old_data,
-                    ready_rows,
-                    sheet_config.unique_key_columns
-                )
-                
-                # اگر ردیف حذف شده یا جابجا شده وجود دارد
-                if change_stats['deleted'] > 0 or change_stats['moved'] > 0:
-                    warning_report = detector.generate_warning_report(changes)
-                    warnings.append(warning_report)
-                    self.logger.warning(warning_report)
-                    if log_callback:
-                        log_callback(f"⚠️ تغییرات شناسایی شد: {change_stats}", "warning")
-            else:
-                if log_callback:
-                    log_callback("📊 هیچ رکورد قبلی در دیتابیس یافت نشد (اولین استخراج)", "info")
+            # ردیف‌هایی که قبلاً ذخیره شده‌اند ولی علامت‌گذاری آن‌ها در صف مانده، دوباره پردازش نمی‌شوند؛
+            # فقط اگر محتوای ردیف همان محتوای ذخیره شده باشد (None = بازه قدیمی بدون hash)
+            pending_hashes = {}
+            for entry in db_manager.get_pending_sheet_writes(sheet_config_id, due_only=False):
+                for row_number, content_hash in entry.row_content_hashes():
+                    pending_hashes.setdefault(row_number, set()).add(content_hash)
             
-            # ذخیره در دیتابیس
-            if log_callback:
-                log_callback("💾 شروع ذخیره رکوردها در دیتابیس...", "info")
-            
-            new_count = 0
-            updated_count = 0
-            duplicate_list = []  # لیست تکراری‌ها برای بررسی بعدی
-            rows_to_mark = []  # ردیف‌هایی که باید علامت بخورند
-            
-            for idx, row in enumerate(ready_rows):
-                if progress_callback and idx % 100 == 0:
-                    progress_callback(
-                        30 + int((idx / total_rows) * 50),
-                        100,
-                        f"پردازش {idx+1:,} از {total_rows:,}"
-                    )
-                
-                # ✨ ساخت کلید یکتا با سیستم جدید
-                unique_key = generate_unique_key(
-                    sheet_config_id=sheet_config_id,
-                    row_data=row['data'],
-                    unique_columns=sheet_config.unique_key_columns,
-                    row_number=row['row_number']
+            state = {
+                'total': None,  # تعداد کل ردیف‌های آماده (در صورت معلوم بودن)
+                'skipped_pending': 0,
+                'duplicates': 0,  # تکراری‌های ثبت شده در duplicate_candidates
+                'key_batch': None,
+                'key_index': None,
+                'old_hashes': {},
+                'row_hashes': [],  # (row_number, content_hash) برای تشخیص تغییرات
+                'new': 0,
+                'updated': 0,
+                'failed': 0,
+                'to_mark': 0,
+                'unmarked': 0,
+                'mark_failed': False,
+                'persisted': (checkpoint.persisted_rows or 0) if start_row else 0,
+                'marked': (checkpoint.marked_rows or 0) if start_row else 0,
+                # زمان تغییر شناخته شده شیت: پیش از استخراج و پس از هر علامت‌گذاری خود برنامه
+                'revision': fingerprint.rpartition('|')[0] if fingerprint else None,
+                'foreign_edit': False,  # تغییر دیگری در فاصله علامت‌گذاری‌ها دیده شد
+            }
+            mark_stats = {'total': 0, 'success': 0, 'failed': 0, 'dropped': 0, 'targets': 0}
+            drainer = SheetWriteOutboxDrainer(extractor=self)
+            mark_threshold = self.batch_sizer.current_size(self.metadata_cache.spreadsheet_key(sheet_config.sheet_url))
+            
+            def set_total(total):
+                state['total'] = total
+            
+            def fetch_batches():
+                return self.iter_ready_row_batches(
+                    sheet_config.sheet_url,
+                    worksheet_name,
+                    sheet_config.ready_column,
+                    sheet_config.extracted_column,
+                    sheet_config.columns_to_extract,
+                    log_callback=pipeline.log,
+                    total_callback=set_total,
+                    start_row=start_row
                 )
+            
+            def key_rows(batch):
+                """مرحله کلید: ساخت کلید یکتا و hash محتوا، حذف ردیف‌های بدون تغییر در صف علامت‌گذاری"""
+                if not batch:
+                    return None
                 
-                # ابتدا چک می‌کنیم آیا قبلاً وجود دارد
-                existing = db_manager.get_sales_data_by_unique_key(unique_key)
+                if state['key_batch'] is None:
+                    state['key_batch'] = UniqueKeyBatch(
+                        sheet_config_id,
+                        headers=list(batch[0]['data']),
+                        unique_columns=unique_columns
+                    )
+                    # رکوردهای بدون hash (قدیمی یا پس از تغییر ستون‌های کلیدی) یک بار محاسبه می‌شوند
+                    db_manager.backfill_content_hashes(sheet_config_id, unique_columns)
+                    # رکوردهای موجود یک بار بارگذاری می‌شوند و برای تشخیص تغییرات و ذخیره استفاده می‌شوند
+                    key_index = db_manager.get_sheet_key_index(sheet_config_id)
+                    state['key_index'] = key_index
+                    state['old_hashes'] = key_index.content_hashes()
+                    if key_index:
+                        pipeline.log(f"📊 {len(key_index):,} رکورد موجود در دیتابیس", "info")
+                    else:
+                        pipeline.log("📊 هیچ رکورد قبلی در دیتابیس یافت نشد (اولین استخراج)", "info")
                 
-                if existing and not auto_update:
-                    # تکراری است - به لیست اضافه می‌کنیم
-                    duplicate_list.append({
+                keyed_rows = []
+                for row, (unique_key, content_hash) in zip(batch, state['key_batch'].keys_for_records(batch)):
+                    queued = pending_hashes.get(row['row_number'])
+                    if queued and (None in queued or content_hash in queued):
+                        state['skipped_pending'] += 1
+                        continue
+                    keyed_rows.append({
                         'row_number': row['row_number'],
                         'unique_key': unique_key,
-                        'existing_data': existing.data,
-                        'new_data': row['data'],
-                        'existing_id': existing.id,
-                        'sheet_config_id': sheet_config_id,  # اضافه شد
-                        'sheet_url': sheet_config.sheet_url,  # برای علامت‌گذاری
-                        'worksheet_name': sheet_config.worksheet_name,  # برای علامت‌گذاری
-                        'extracted_column': sheet_config.extracted_column  # برای علامت‌گذاری
+                        'content_hash': content_hash,
+                        'data': row['data'],
                     })
-                    continue
+                    state['row_hashes'].append((row['row_number'], content_hash))
+                return keyed_rows or None
+            
+            def persist_rows(keyed_rows):
+                """مرحله ذخیره: ذخیره دسته‌ای و ثبت ردیف‌های ذخیره شده در صف علامت‌گذاری"""
+                saved, save_result, save_msg = db_manager.bulk_upsert_sales_data(
+                    sheet_config_id,
+                    keyed_rows,
+                    update_existing=auto_update,
+                    key_index=state['key_index']
+                )
+                if not saved:
+                    raise RuntimeError(save_msg)
+                
+                state['new'] += len(save_result['new'])
+                state['updated'] += len(save_result['updated'])
+                state['failed'] += len(save_result['failed'])
                 
-                # ذخیره داده
-                success, saved_data, is_new, message = db_manager.save_sales_data(
-                    sheet_config_id=sheet_config_id,
-                    row_number=row['row_number'],
-                    unique_key=unique_key,
-                    data=row['data'],
-                    update_if_exists=auto_update or existing is None
+                # تکراری‌ها - در جدول duplicate_candidates برای بررسی بعدی توسط کاربر
+                state['duplicates'] += db_manager.stage_duplicate_candidates(
+                    sheet_config_id, save_result['duplicates'], run_id=run_id
                 )
                 
-                if success:
-                    if is_new:
-                        new_count += 1
-                    else:
-                        updated_count += 1
-                    
-                    # اضافه کردن به لیست ردیف‌های آماده علامت‌گذاری
-                    rows_to_mark.append(row['row_number'])
+                if save_result['failed']:
+                    pipeline.log(f"⚠️ {len(save_result['failed']):,} ردیف به دلیل تداخل ذخیره نشد", "warning")
+                
+                # ردیف‌هایی که باید علامت بخورند - ابتدا در صف پایدار ثبت می‌شوند
+                # تا در صورت شکست، در اجرای بعدی دوباره ارسال شوند
+                saved_hashes = {
+                    row['row_number']: row['content_hash'] for row in save_result['new'] + save_result['updated']
+                }
+                rows_to_mark = sorted(saved_hashes)
+                if rows_to_mark:
+                    db_manager.enqueue_sheet_writes(
+                        sheet_config_id,
+                        sheet_config.sheet_url,
+                        worksheet_name,
+                        sheet_config.extracted_column,
+                        coalesce_row_ranges(rows_to_mark),
+                        content_hashes=saved_hashes
+                    )
+                    state['to_mark'] += len(rows_to_mark)
+                
+                # نقطه بازیابی: بسته‌ها به ترتیب صعودی ردیف می‌رسند
+                state['persisted'] += len(keyed_rows)
+                save_checkpoint(
+                    last_persisted_row=max(row['row_number'] for row in keyed_rows),
+                    persisted_rows=state['persisted']
+                )
+                return rows_to_mark or None
+            
+            def drain_marks():
+                # علامت‌گذاری خود برنامه زمان تغییر شیت را عوض می‌کند؛ زمان پس از ارسال فقط وقتی
+                # نسخه خود برنامه حساب می‌شود که پیش از ارسال، زمان همان نسخه شناخته شده قبلی باشد
+                track_revision = state['revision'] and not state['foreign_edit']
+                if track_revision and self.get_spreadsheet_modified_time(sheet_config.sheet_url) != state['revision']:
+                    state['foreign_edit'] = True
+                    track_revision = False
+                
+                result = drainer.drain(sheet_config_id, due_only=False)
+                for key in mark_stats:
+                    mark_stats[key] += result.get(key, 0)
+                if result.get('success'):
+                    state['marked'] += result['success']
+                    save_checkpoint(marked_rows=state['marked'])
+                    if track_revision:
+                        state['revision'] = self.get_spreadsheet_modified_time(sheet_config.sheet_url)
+                if result.get('failed'):
+                    # تا پایان این اجرا فقط یک تلاش دیگر (در انتها) انجام می‌شود
+                    state['mark_failed'] = True
             
-            # علامت‌گذاری همه ردیف‌ها به صورت یکجا (Batch Update)
-            mark_stats = {}
-            if rows_to_mark:
-                msg = f"🔄 در حال علامت‌گذاری {len(rows_to_mark):,} ردیف در ستون Extracted..."
+            def mark_rows(rows_to_mark):
+                """مرحله علامت‌گذاری: ارسال صف پس از رسیدن به اندازه بچ فعلی"""
+                state['unmarked'] += len(rows_to_mark)
+                if state['unmarked'] >= mark_threshold and not state['mark_failed']:
+                    state['unmarked'] = 0
+                    drain_marks()
+            
+            def report_progress(stages):
+                if not progress_callback:
+                    return
+                fetch_stage, _, persist_stage, mark_stage = stages
+                total = state['total']
+                if total:
+                    percent = 10 + int(85 * min(persist_stage.rows + state['skipped_pending'], total) / total)
+                else:
+                    percent = 20
+                progress_callback(percent, 100, (
+                    f"دریافت {fetch_stage.rows:,} | ذخیره {persist_stage.rows:,} | "
+                    f"علامت‌گذاری {mark_stage.rows:,}"
+                ))
+            
+            fetch_stage = PipelineStage('fetch', None, label='دریافت')
+            stages = [
+                PipelineStage('key', key_rows, label='کلید'),
+                PipelineStage('persist', persist_rows, label='ذخیره'),
+                PipelineStage('mark', mark_rows, finish=drain_marks, label='علامت‌گذاری'),
+            ]
+            stage_stats = pipeline.run(
+                fetch_stage, fetch_batches, stages,
+                log_callback=log_callback,
+                on_tick=report_progress
+            )
+            
+            if state['skipped_pending'] and log_callback:
+                log_callback(f"📤 {state['skipped_pending']:,} ردیف در صف علامت‌گذاری است و رد شد", "info")
+            
+            # توان عملیاتی هر مرحله
+            for stage in [fetch_stage] + stages:
+                msg = (
+                    f"⏱️ {stage.label}: {stage.rows:,} ردیف در {stage.busy_seconds:.1f} ثانیه "
+                    f"({stage.rows_per_second:,.0f} ردیف/ثانیه)"
+                )
                 self.logger.info(msg)
                 if log_callback:
                     log_callback(msg, "info")
-                
-                # callback برای پیشرفت علامت‌گذاری
-                def mark_progress_callback(current, total, message):
-                    if progress_callback:
-                        progress_callback(80 + int((current / total) * 15), 100, message)
-                
-                success, mark_msg, mark_stats = self.mark_rows_as_extracted(
-                    sheet_config.sheet_url,
-                    sheet_config.worksheet_name or 'Sheet1',
-                    rows_to_mark,
-                    sheet_config.extracted_column,
-                    progress_callback=mark_progress_callback
+            
+            total_rows = len(state['row_hashes'])
+            new_count = state['new']
+            updated_count = state['updated']
+            
+            if not total_rows and not mark_stats['total']:
+                # پس از ادامه از نقطه بازیابی، اجرای عادی بعدی کل شیت را بررسی می‌کند
+                db_manager.save_sheet_sync_state(sheet_config_id, fingerprint, completed=not start_row)
+                save_checkpoint(status='completed', stats={'new_records': 0, 'updated_records': 0, 'duplicates': 0})
+                return True, "هیچ ردیف آماده‌ای یافت نشد", {
+                    'new_records': 0, 
+                    'updated_records': 0, 
+                    'total_extracted': 0,
+                    'duplicates': 0, 
+                    'warnings': [],
+                    'stage_stats': stage_stats
+                }
+            
+            # 🔍 تشخیص تغییرات (بر اساس hash رکوردهای موجود پیش از این اجرا)
+            # پس از ادامه از نقطه بازیابی فقط بخشی از شیت خوانده شده و مقایسه معتبر نیست
+            warnings = []
+            if state['old_hashes'] and not start_row:
+                detector = ChangeDetector()
+                changes, change_stats = detector.detect_changes_by_hash(
+                    state['old_hashes'],
+                    [
+                        {'row_number': row_number, 'content_hash': content_hash, 'data': None}
+                        for row_number, content_hash in state['row_hashes']
+                    ],
+                    unique_columns
                 )
                 
-                if success:
-                    msg = f"✅ علامت‌گذاری تکمیل شد: {mark_stats.get('success', 0):,} ردیف"
+                # اگر ردیف حذف شده یا جابجا شده وجود دارد
+                if change_stats['deleted'] > 0 or change_stats['moved'] > 0:
+                    warning_report = detector.generate_warning_report(changes)
+                    warnings.append(warning_report)
+                    self.logger.warning(warning_report)
+                    if log_callback:
+                        log_callback(f"⚠️ تغییرات شناسایی شد: {change_stats}", "warning")
+            
+            if mark_stats['total']:
+                if mark_stats['failed'] == 0:
+                    msg = f"✅ علامت‌گذاری تکمیل شد: {mark_stats['success']:,} ردیف"
                     self.logger.success(msg)
                     if log_callback:
                         log_callback(msg, "success")
                 else:
-                    msg = f"⚠️ علامت‌گذاری با خطا: {mark_msg}"
+                    msg = f"⚠️ {mark_stats['failed']:,} ردیف علامت نخورد و در صف برای تلاش بعدی باقی ماند"
                     self.logger.warning(msg)
                     if log_callback:
                         log_callback(msg, "warning")
+            if mark_stats['dropped']:
+                msg = f"⚠️ {mark_stats['dropped']:,} ردیف پس از ذخیره در شیت جابجا یا ویرایش شد و علامت نخورد"
+                self.logger.warning(msg)
+                if log_callback:
+                    log_callback(msg, "warning")
+            
+            # ==================== ذخیره اثر انگشت ====================
+            # اجرا کامل است اگر تکراری در انتظار تصمیم کاربر، ردیف ذخیره نشده و علامت‌گذاری ناموفق نباشد؛
+            # ردیف‌های پیش از نقطه بازیابی دوباره بررسی نشده‌اند، پس اجرای ادامه‌یافته کامل حساب نمی‌شود
+            remaining_marks = db_manager.get_pending_sheet_writes_count(sheet_config_id)
+            completed = (
+                not state['duplicates'] and not state['failed'] and not mark_stats['dropped']
+                and not remaining_marks and not start_row
+            )
+            # اثر انگشت پیش از استخراج ذخیره می‌شود، مگر اینکه زمان تغییر فعلی فقط حاصل علامت‌گذاری
+            # خود برنامه باشد؛ تغییر دیگران در این فاصله باعث خواندن دوباره شیت در اجرای بعدی می‌شود
+            if mark_stats['success'] and state['revision'] and not state['foreign_edit']:
+                fingerprint = f"{state['revision']}|{fingerprint.rpartition('|')[2]}"
+            db_manager.save_sheet_sync_state(sheet_config_id, fingerprint, completed=completed)
+            save_checkpoint(status='completed', stats={
+                'new_records': new_count,
+                'updated_records': updated_count,
+                'duplicates': state['duplicates'],
+                'resumed_from_row': start_row,
+            })
             
             if progress_callback:
                 progress_callback(100, 100, "✅ تمام شد!")
@@ -688,17 +1574,20 @@ class GoogleSheetExtractor:
             stats = {
                 'new_records': new_count,
                 'updated_records': updated_count,
-                'total_rows': len(ready_rows),
-                'total_extracted': len(rows_to_mark),
+                'total_rows': total_rows,
+                'total_extracted': state['to_mark'],
                 'mark_stats': mark_stats,
-                'duplicates': duplicate_list,  # لیست تکراری‌ها
+                'stage_stats': stage_stats,
+                'resumed_from_row': start_row,
+                'duplicates': state['duplicates'],  # تعداد تکراری‌های ثبت شده در duplicate_candidates
                 'warnings': warnings  # هشدارهای تغییرات
             }
             
-            return True, f"{new_count} جدید، {updated_count} بروز شد، {len(duplicate_list)} تکراری", stats
+            return True, f"{new_count} جدید، {updated_count} بروز شد، {state['duplicates']} تکراری", stats
             
         except Exception as e:
             self.logger.error(f"خطا در extract_and_save: {str(e)}")
+            save_checkpoint(status='failed')
             return False, str(e), {}
     
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
@@ -710,15 +1599,17 @@ class GoogleSheetExtractor:
             List[List]: لیستی از سطرها (هر سطر یک لیست است)
         """
         try:
-            sheet = self.client.open_by_url(sheet_url)
-            worksheet = sheet.worksheet(worksheet_name)
+            worksheet = self._resolve_worksheet(sheet_url, worksheet_name, exact=True)
             
-            # دریافت تمام داده‌ها
-            all_values = worksheet.get_all_values()
+            # دریافت تمام داده‌ها (یا از snapshot محلی)
+            all_values = self._get_all_values(sheet_url, worksheet_name, worksheet)
+            if all_values:
+                self.metadata_cache.set_headers(sheet_url, worksheet_name, all_values[0])
             
             self.logger.info(f"✅ {len(all_values)} سطر از '{worksheet_name}' دریافت شد")
             return all_values
             
         except Exception as e:
+            self.invalidate_cache(sheet_url, worksheet_name)
             self.logger.error(f"❌ خطا در دریافت داده: {str(e)}")
             return []
@@ -0,0 +1,223 @@
+"""
+ایندکس عبارتی روی کلیدهای پرکاربرد داده JSON فروش (sales_data.data)
+
+برای هر کلید انتخاب شده در indexed_fields تنظیمات شیت، روی SQLite یک ایندکس
+json_extract(data, '$."KEY"') و یک ایندکس عددی CAST(json_extract(...) AS REAL) ساخته
+می‌شود. فیلترهای برابری/بازه روی همین کلیدها با json_field() / json_number_field() ساخته
+می‌شوند تا عبارت کوئری دقیقاً با عبارت ایندکس یکی باشد (مسیر JSON به صورت literal در SQL
+می‌آید؛ با پارامتر bind شده SQLite از ایندکس استفاده نمی‌کند).
+
+مقادیر Google Sheet متنی ذخیره می‌شوند؛ مقایسه بازه‌ای با مقدار عددی ("45") به صورت عددی
+انجام می‌شود (در غیر این صورت "5" >= "45" درست است) و با مقدار غیر عددی (مثلاً تاریخ
+1403/01/01) به صورت متنی.
+
+کلیدها با همان شکلی که json.dumps (serializer پیش‌فرض ستون JSON) ذخیره می‌کند در مسیر
+نوشته می‌شوند (حروف غیر ASCII به صورت \\uXXXX)؛ در غیر این صورت SQLite کلیدهای فارسی را
+پیدا نمی‌کند.
+"""
+import hashlib
+import json
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import REAL, and_, cast, func, literal_column, text
+
+from app.models import SalesData
+
+
+INDEX_PREFIX = 'idx_sales_data_json_'
+NUMBER_INDEX_PREFIX = INDEX_PREFIX + 'num_'
+
+# عملگرهای مجاز فیلتر
+FILTER_OPERATORS = ('=', '!=', '<', '<=', '>', '>=', 'between', 'in')
+
+
+def json_field_index_name(key: str) -> str:
+    """نام ایندکس یک کلید (کلید ممکن است فارسی یا دارای فاصله باشد)"""
+    return INDEX_PREFIX + hashlib.md5(key.encode('utf-8')).hexdigest()[:12]
+
+
+def json_number_index_name(key: str) -> str:
+    """نام ایندکس عددی یک کلید"""
+    return NUMBER_INDEX_PREFIX + hashlib.md5(key.encode('utf-8')).hexdigest()[:12]
+
+
+def _json_path_sql(key: str) -> str:
+    """مسیر JSON کلید به صورت literal رشته‌ای SQL: '$."KEY"'"""
+    path = f"$.{json.dumps(key)}"
+    return "'" + path.replace("'", "''") + "'"
+
+
+def json_field(key: str, dialect_name: str = 'sqlite'):
+    """
+    عبارت SQLAlchemy مقدار یک کلید داده JSON
+
+    روی SQLite همان عبارت ایندکس است؛ روی دیتابیس‌های دیگر مقدار متنی کلید.
+    """
+    if dialect_name == 'sqlite':
+        return func.json_extract(SalesData.data, literal_column(_json_path_sql(key)))
+    return SalesData.data[key].as_string()
+
+
+def json_number_field(key: str, dialect_name: str = 'sqlite'):
+    """
+    عبارت SQLAlchemy مقدار عددی یک کلید داده JSON (برای مقایسه‌های بازه‌ای عددی)
+
+    روی SQLite همان عبارت ایندکس عددی است: CAST(json_extract(...) AS REAL)
+    """
+    if dialect_name == 'sqlite':
+        return cast(json_field(key, dialect_name), REAL)
+    return SalesData.data[key].as_float()
+
+
+def _number(value: Any) -> Optional[float]:
+    """مقدار عددی عملوند فیلتر (None اگر عدد نباشد)"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+
+def _candidates(value: Any) -> List[Any]:
+    """
+    مقادیر معادل برای مقایسه برابری
+
+    مقدار سلول‌ها ممکن است متن یا عدد ذخیره شده باشد ("123" یا 123)؛ json_extract نوع
+    اصلی را برمی‌گرداند و SQLite متن و عدد را برابر نمی‌داند.
+    """
+    if not isinstance(value, str):
+        return [value, str(value)]
+
+    candidates = [value]
+    stripped = value.strip()
+    try:
+        number = int(stripped)
+    except ValueError:
+        try:
+            number = float(stripped)
+        except ValueError:
+            return candidates
+    candidates.append(number)
+    return candidates
+
+
+def build_json_filters(
+    field_filters: Iterable[Tuple[str, str, Any]],
+    dialect_name: str = 'sqlite'
+):
+    """
+    ساخت شرط SQL از فیلترهای کلیدهای JSON
+
+    Args:
+        field_filters: [(کلید, عملگر, مقدار)] - برای between مقدار (از, تا) و برای in لیست است
+            (عملگرهای بازه‌ای با مقدار عددی مقایسه عددی و در غیر این صورت مقایسه متنی انجام می‌دهند)
+        dialect_name: نام dialect دیتابیس
+
+    Returns:
+        شرط and_ یا None اگر فیلتری نباشد
+
+    Raises:
+        ValueError: عملگر نامعتبر
+    """
+    conditions = []
+    for key, operator, value in field_filters:
+        if operator not in FILTER_OPERATORS:
+            raise ValueError(f"عملگر نامعتبر: {operator}")
+
+        column = json_field(key, dialect_name)
+
+        if operator == '=':
+            candidates = _candidates(value) if dialect_name == 'sqlite' else [str(value)]
+            conditions.append(column.in_(candidates) if len(candidates) > 1 else column == candidates[0])
+        elif operator == 'in':
+            values = []
+            for item in value:
+                values.extend(_candidates(item) if dialect_name == 'sqlite' else [str(item)])
+            conditions.append(column.in_(values))
+        elif operator == '!=':
+            conditions.append(column.notin_(_candidates(value) if dialect_name == 'sqlite' else [str(value)]))
+        else:
+            bounds = tuple(value) if operator == 'between' else (value,)
+            numbers = [_number(bound) for bound in bounds]
+            if all(number is not None for number in numbers):
+                # مقایسه عددی؛ سلول‌های خالی/غیر عددی (CAST = 0) کنار گذاشته می‌شوند
+                bounds = numbers
+                conditions.append(column.op('GLOB')('*[0-9]*') if dialect_name == 'sqlite' else column.isnot(None))
+                column = json_number_field(key, dialect_name)
+            if operator == 'between':
+                conditions.append(column.between(*bounds))
+            else:
+                bound = bounds[0]
+                conditions.append({
+                    '<': column < bound,
+                    '<=': column <= bound,
+                    '>': column > bound,
+                    '>=': column >= bound,
+                }[operator])
+
+    return and_(*conditions) if conditions else None
+
+
+def sync_json_field_indexes(engine, keys: Sequence[str]) -> Tuple[List[str], List[str]]:
+    """
+    ایجاد ایندکس کلیدهای انتخاب شده و حذف ایندکس کلیدهایی که دیگر انتخاب نشده‌اند
+
+    فقط روی SQLite؛ روی دیتابیس‌های دیگر کاری انجام نمی‌شود.
+
+    Args:
+        engine: Engine دیتابیس
+        keys: اجتماع indexed_fields همه شیت‌ها
+
+    Returns:
+        (نام ایندکس‌های ایجاد شده, نام ایندکس‌های حذف شده)
+    """
+    if engine.dialect.name != 'sqlite':
+        return [], []
+
+    wanted = {}
+    for key in keys:
+        if key:
+            path = _json_path_sql(key)
+            wanted[json_field_index_name(key)] = f"json_extract(data, {path})"
+            wanted[json_number_index_name(key)] = f"CAST(json_extract(data, {path}) AS REAL)"
+
+    with engine.begin() as connection:
+        existing = {
+            row[0] for row in connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE :prefix"),
+                {'prefix': INDEX_PREFIX + '%'}
+            )
+        }
+
+        created = []
+        for name, expression in wanted.items():
+            if name in existing:
+                continue
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON sales_data ({expression})"))
+            created.append(name)
+
+        dropped = []
+        for name in existing - set(wanted):
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            dropped.append(name)
+
+        if created:
+            # بدون آمار، برنامه‌ریز SQLite با وجود فیلتر شیت ایندکس sheet_config_id را ترجیح می‌دهد
+            connection.execute(text("ANALYZE sales_data"))
+
+    return created, dropped
+
+
+def normalize_indexed_fields(fields: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """حذف فاصله‌ها، مقادیر خالی و تکراری (None اگر کلیدی نماند)"""
+    if not fields:
+        return None
+    result = []
+    for field in fields:
+        field = (field or '').strip()
+        if field and field not in result:
+            result.append(field)
+    return result or None
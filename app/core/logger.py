@@ -3,13 +3,19 @@
 """
 from loguru import logger
 import sys
+import threading
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from app.utils.constants import ProcessStatus, ProcessType
 from app.models import ProcessLog, SessionLocal
 
 
+def _in_unit_of_work() -> bool:
+    from app.core.database import in_unit_of_work
+    return in_unit_of_work()
+
+
 class AppLogger:
     """
     کلاس مدیریت لاگ‌ها
@@ -59,6 +65,9 @@ class AppLogger:
         )
         
         self.logger = logger
+        
+        # لاگ‌های دیتابیس unit of work فعال هر thread (ن.ک. _deferred_logs)
+        self._deferred = threading.local()
     
     def info(self, message: str, **kwargs):
         """ثبت لاگ اطلاعاتی"""
@@ -84,6 +93,46 @@ class AppLogger:
         """ثبت لاگ بحرانی"""
         self.logger.critical(message, **kwargs)
     
+    # ==================== Database Logs ====================
+    
+    def _deferred_logs(self) -> Optional[List[ProcessLog]]:
+        """
+        صف لاگ‌های دیتابیس unit of work فعال همین thread (None خارج از unit of work)
+        
+        لاگ‌ها در session جدا نوشته می‌شوند تا با rollback تراکنش فراخواننده از بین نروند؛
+        داخل unit of work همین thread قفل نوشتن را نگه داشته است، پس لاگ‌ها تا پایان آن در
+        صف می‌مانند و سپس نوشته می‌شوند (flush_deferred_logs).
+        """
+        if not _in_unit_of_work():
+            return None
+        pending = getattr(self._deferred, 'logs', None)
+        if pending is None:
+            pending = self._deferred.logs = []
+        return pending
+    
+    def _save_logs(self, entries: List[ProcessLog]):
+        """نوشتن لاگ‌ها در session و تراکنش جدا"""
+        db = SessionLocal()
+        try:
+            db.add_all(entries)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    def flush_deferred_logs(self):
+        """نوشتن لاگ‌های صف شده unit of work پایان یافته همین thread"""
+        pending = getattr(self._deferred, 'logs', None)
+        if not pending:
+            return
+        self._deferred.logs = []
+        try:
+            self._save_logs(pending)
+        except Exception as e:
+            self.error(f"خطا در ثبت لاگ در دیتابیس: {str(e)}")
+    
     def log_to_db(
         self,
         process_type: ProcessType,
@@ -107,8 +156,6 @@ class AppLogger:
             **kwargs: آرگومان‌های اضافی
         """
         try:
-            db = SessionLocal()
-            
             log_entry = ProcessLog(
                 process_type=process_type.value,
                 status=status.value,
@@ -119,9 +166,11 @@ class AppLogger:
                 **kwargs
             )
             
-            db.add(log_entry)
-            db.commit()
-            db.close()
+            pending = self._deferred_logs()
+            if pending is not None:
+                pending.append(log_entry)
+            else:
+                self._save_logs([log_entry])
             
         except Exception as e:
             self.error(f"خطا در ثبت لاگ در دیتابیس: {str(e)}")
@@ -141,11 +190,10 @@ class AppLogger:
             **kwargs: آرگومان‌های اضافی
             
         Returns:
-            شناسه لاگ در دیتابیس
+            شناسه لاگ در دیتابیس (داخل unit of work شناسه موقت منفی که تا پایان همان
+            unit of work برای complete_process معتبر است)
         """
         try:
-            db = SessionLocal()
-            
             log_entry = ProcessLog(
                 process_type=process_type.value,
                 status=ProcessStatus.IN_PROGRESS.value,
@@ -154,10 +202,13 @@ class AppLogger:
                 **kwargs
             )
             
-            db.add(log_entry)
-            db.commit()
-            log_id = log_entry.id
-            db.close()
+            pending = self._deferred_logs()
+            if pending is not None:
+                pending.append(log_entry)
+                log_id = -len(pending)
+            else:
+                self._save_logs([log_entry])
+                log_id = log_entry.id
             
             self.info(f"شروع فرآیند: {message}")
             return log_id
@@ -183,9 +234,15 @@ class AppLogger:
             **kwargs: آرگومان‌های اضافی
         """
         try:
-            db = SessionLocal()
+            pending = self._deferred_logs()
+            if log_id < 0 and pending and -log_id <= len(pending):
+                # لاگ صف شده همین unit of work (با صف نوشته می‌شود)
+                db = None
+                log_entry = pending[-log_id - 1]
+            else:
+                db = SessionLocal()
+                log_entry = db.query(ProcessLog).filter_by(id=log_id).first()
             
-            log_entry = db.query(ProcessLog).filter_by(id=log_id).first()
             if log_entry:
                 log_entry.status = status.value
                 if message:
@@ -203,7 +260,8 @@ class AppLogger:
                     if hasattr(log_entry, key):
                         setattr(log_entry, key, value)
                 
-                db.commit()
+                if db is not None:
+                    db.commit()
                 
                 if status == ProcessStatus.SUCCESS:
                     self.success(f"پایان موفق فرآیند: {message or log_entry.message}")
@@ -212,7 +270,8 @@ class AppLogger:
                 else:
                     self.warning(f"پایان فرآیند با هشدار: {message or log_entry.message}")
             
-            db.close()
+            if db is not None:
+                db.close()
             
         except Exception as e:
             self.error(f"خطا در پایان فرآیند: {str(e)}")
@@ -0,0 +1,232 @@
+"""
+اجرای مرحله‌ای (Pipeline) با صف‌های محدود
+
+هر مرحله در thread جداگانه اجرا می‌شود و بسته‌ها از طریق صف‌های با ظرفیت محدود به
+مرحله بعد می‌روند؛ بنابراین I/O مراحل (شبکه، دیتابیس، علامت‌گذاری) همزمان انجام
+می‌شود و اگر مرحله‌ای کند باشد، مراحل قبلی منتظر می‌مانند (حافظه محدود می‌ماند).
+
+لاگ‌ها و گزارش پیشرفت مراحل از طریق thread فراخواننده ارسال می‌شوند تا callbackهای
+رابط کاربری فقط از یک thread فراخوانی شوند.
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.core.logger import app_logger
+
+
+# پایان داده‌ها در صف
+_DONE = object()
+
+
+class PipelineStage:
+    """
+    یک مرحله pipeline و آمار توان عملیاتی آن
+    """
+
+    def __init__(self, name: str, process: Callable[[Any], Any], finish: Optional[Callable[[], None]] = None, label: Optional[str] = None):
+        """
+        Args:
+            name: نام مرحله
+            process: تابع پردازش یک بسته؛ خروجی (اگر None نباشد) به مرحله بعد می‌رود
+            finish: تابع اختیاری پس از آخرین بسته (مثلاً ارسال باقی‌مانده)
+            label: نام نمایشی مرحله در گزارش‌ها
+        """
+        self.name = name
+        self.label = label or name
+        self.process = process
+        self.finish = finish
+        self.items = 0
+        self.rows = 0
+        self.busy_seconds = 0.0
+
+    def record(self, item: Any, seconds: float):
+        self.items += 1
+        self.rows += len(item) if hasattr(item, '__len__') else 1
+        self.busy_seconds += seconds
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.busy_seconds if self.busy_seconds else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'items': self.items,
+            'rows': self.rows,
+            'seconds': round(self.busy_seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+class StagedPipeline:
+    """
+    اجرای یک منبع و چند مرحله متوالی با صف‌های محدود بین آن‌ها
+
+    Example:
+        pipeline = StagedPipeline(queue_size=4)
+        stats = pipeline.run(
+            PipelineStage('fetch', None), lambda: iter_batches(),
+            [PipelineStage('key', key_batch), PipelineStage('persist', save_batch)],
+            log_callback=log_callback
+        )
+    """
+
+    def __init__(self, queue_size: int = 4, poll_interval: float = 1.0):
+        """
+        Args:
+            queue_size: ظرفیت هر صف بین مراحل (تعداد بسته)
+            poll_interval: فاصله گزارش پیشرفت (ثانیه)
+        """
+        self.logger = app_logger
+        self.queue_size = max(1, queue_size)
+        self.poll_interval = poll_interval
+        self._events: "queue.Queue" = queue.Queue()
+        self._cancel = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._error_lock = threading.Lock()
+
+    # ==================== Thread-safe Reporting ====================
+
+    def log(self, message: str, level: str = "info"):
+        """ارسال لاگ از هر thread (در thread فراخواننده به log_callback داده می‌شود)"""
+        self._events.put((message, level))
+
+    def _flush_events(self, log_callback):
+        while True:
+            try:
+                message, level = self._events.get_nowait()
+            except queue.Empty:
+                return
+            if log_callback:
+                log_callback(message, level)
+
+    # ==================== Workers ====================
+
+    def _fail(self, error: BaseException):
+        with self._error_lock:
+            if self._error is None:
+                self._error = error
+        self._cancel.set()
+
+    def _put(self, target: "queue.Queue", item: Any) -> bool:
+        """قرار دادن در صف با انتظار (backpressure)؛ در صورت لغو False"""
+        while not self._cancel.is_set():
+            try:
+                target.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: "queue.Queue") -> Any:
+        while not self._cancel.is_set():
+            try:
+                return source.get(timeout=0.2)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _run_source(self, stage: PipelineStage, source: Callable[[], Iterable], output: "queue.Queue"):
+        try:
+            iterator = iter(source())
+            while not self._cancel.is_set():
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stage.record(item, time.perf_counter() - started)
+                if not self._put(output, item):
+                    break
+            if stage.finish and not self._cancel.is_set():
+                stage.finish()
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(output, _DONE)
+
+    def _run_stage(self, stage: PipelineStage, source: "queue.Queue", output: Optional["queue.Queue"]):
+        try:
+            while True:
+                item = self._get(source)
+                if item is _DONE:
+                    break
+                started = time.perf_counter()
+                result = stage.process(item)
+                stage.record(item, time.perf_counter() - started)
+                if result is not None and output is not None:
+                    if not self._put(output, result):
+                        break
+            if stage.finish and not self._cancel.is_set():
+                stage.finish()
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            if output is not None:
+                self._put(output, _DONE)
+
+    # ==================== Run ====================
+
+    def run(
+        self,
+        source_stage: PipelineStage,
+        source: Callable[[], Iterable],
+        stages: List[PipelineStage],
+        log_callback=None,
+        on_tick: Optional[Callable[[List[PipelineStage]], None]] = None
+    ) -> Dict[str, Dict]:
+        """
+        اجرای pipeline تا پایان منبع و همه مراحل
+
+        Args:
+            source_stage: مرحله منبع (فقط برای نام و آمار؛ process استفاده نمی‌شود)
+            source: تابعی که iterable بسته‌ها را برمی‌گرداند (در thread منبع اجرا می‌شود)
+            stages: مراحل پردازش به ترتیب
+            log_callback: تابع (message, level) - در thread فراخواننده
+            on_tick: تابع (مراحل) برای گزارش دوره‌ای پیشرفت - در thread فراخواننده
+
+        Returns:
+            آمار هر مرحله: {name: {'items', 'rows', 'seconds', 'rows_per_second'}}
+
+        Raises:
+            اولین خطای رخ داده در هر مرحله
+        """
+        all_stages = [source_stage] + list(stages)
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in stages]
+
+        threads = [threading.Thread(
+            target=self._run_source, args=(source_stage, source, queues[0] if queues else queue.Queue()),
+            name=f"pipeline-{source_stage.name}", daemon=True
+        )]
+        for index, stage in enumerate(stages):
+            output = queues[index + 1] if index + 1 < len(queues) else None
+            threads.append(threading.Thread(
+                target=self._run_stage, args=(stage, queues[index], output),
+                name=f"pipeline-{stage.name}", daemon=True
+            ))
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            while any(thread.is_alive() for thread in threads):
+                threads[-1].join(self.poll_interval)
+                self._flush_events(log_callback)
+                if on_tick:
+                    on_tick(all_stages)
+        except BaseException as e:
+            # توقف مراحل در صورت خطای thread فراخواننده (مثلاً در callback)
+            self._fail(e)
+            for thread in threads:
+                thread.join()
+            raise
+        finally:
+            self._flush_events(log_callback)
+
+        if self._error is not None:
+            raise self._error
+
+        if on_tick:
+            on_tick(all_stages)
+        return {stage.name: stage.to_dict() for stage in all_stages}
@@ -0,0 +1,101 @@
+"""
+محدودکننده نرخ درخواست‌های Google Sheets API (Token Bucket)
+
+تمام GoogleSheetExtractorها و workerهای استخراج موازی از یک محدودکننده مشترک
+استفاده می‌کنند تا مجموع درخواست‌ها از سهمیه دقیقه‌ای Google عبور نکند.
+"""
+import os
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token Bucket ساده و thread-safe
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate_per_minute: تعداد توکن‌های اضافه شده در هر دقیقه
+            capacity: حداکثر توکن‌های ذخیره شده (حداکثر burst)
+        """
+        self.rate_per_second = max(rate_per_minute, 1) / 60.0
+        self.capacity = capacity if capacity is not None else max(rate_per_minute / 6.0, 1)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """
+        تلاش برای برداشتن توکن بدون انتظار
+
+        Returns:
+            0 در صورت موفقیت، در غیر این صورت زمان انتظار لازم (ثانیه)
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate_per_second
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        برداشتن توکن (در صورت نیاز صبر می‌کند)
+
+        Returns:
+            مدت زمان انتظار (ثانیه)
+        """
+        waited = 0.0
+        while True:
+            wait_time = self.try_acquire(tokens)
+            if wait_time <= 0:
+                return waited
+            time.sleep(wait_time)
+            waited += wait_time
+
+
+class SheetsRateLimiter:
+    """
+    محدودکننده جداگانه برای درخواست‌های خواندن و نوشتن Google Sheets
+    """
+
+    READ = 'read'
+    WRITE = 'write'
+
+    def __init__(self, read_per_minute: Optional[float] = None, write_per_minute: Optional[float] = None):
+        """
+        Args:
+            read_per_minute: سهمیه خواندن در دقیقه (پیش‌فرض: SHEETS_READ_REQUESTS_PER_MINUTE یا 60)
+            write_per_minute: سهمیه نوشتن در دقیقه (پیش‌فرض: SHEETS_WRITE_REQUESTS_PER_MINUTE یا 60)
+        """
+        read_per_minute = read_per_minute or float(os.getenv("SHEETS_READ_REQUESTS_PER_MINUTE", "60"))
+        write_per_minute = write_per_minute or float(os.getenv("SHEETS_WRITE_REQUESTS_PER_MINUTE", "60"))
+        self.buckets = {
+            self.READ: TokenBucket(read_per_minute),
+            self.WRITE: TokenBucket(write_per_minute),
+        }
+
+    def acquire(self, kind: str = READ) -> float:
+        """برداشتن یک توکن از سهمیه خواندن یا نوشتن"""
+        return self.buckets[kind].acquire()
+
+
+_shared_limiter: Optional[SheetsRateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_rate_limiter() -> SheetsRateLimiter:
+    """محدودکننده مشترک کل برنامه"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = SheetsRateLimiter()
+        return _shared_limiter
@@ -0,0 +1,53 @@
+"""
+ردیف سبک و فقط‌خواندنی داده‌های فروش برای خواننده‌های حجیم (Export و انتقال)
+
+به جای شیء ORM (وضعیت session، identity map، رابطه‌ها) فقط ستون‌های لازم یک رکورد در یک
+شیء __slots__ نگه داشته می‌شود. DatabaseManager.iter_* این ردیف‌ها را دسته به دسته از یک
+cursor تحویل می‌دهند؛ دسته قبلی پس از مصرف آزاد می‌شود و حافظه با تعداد رکوردها رشد نمی‌کند.
+"""
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.models import SalesData
+
+
+class SalesDataRow:
+    """
+    نمای فقط‌خواندنی یک رکورد sales_data (جدا از session)
+    """
+
+    __slots__ = (
+        'id', 'sheet_config_id', 'row_number', 'unique_key', 'data',
+        'is_exported', 'export_type', 'is_updated', 'transferred', 'extracted_at'
+    )
+
+    def __init__(
+        self,
+        id: int,
+        sheet_config_id: int,
+        row_number: int,
+        unique_key: str,
+        data: Optional[Dict],
+        is_exported: bool,
+        export_type: Optional[str],
+        is_updated: bool,
+        transferred: int,
+        extracted_at: Optional[datetime]
+    ):
+        self.id = id
+        self.sheet_config_id = sheet_config_id
+        self.row_number = row_number
+        self.unique_key = unique_key
+        self.data = data if data is not None else {}
+        self.is_exported = is_exported
+        self.export_type = export_type
+        self.is_updated = is_updated
+        self.transferred = transferred
+        self.extracted_at = extracted_at
+
+    def __repr__(self):
+        return f"<SalesDataRow(id={self.id}, sheet={self.sheet_config_id}, row={self.row_number})>"
+
+
+# ستون‌های select به همان ترتیب آرگومان‌های SalesDataRow
+SALES_DATA_ROW_COLUMNS = tuple(getattr(SalesData, name) for name in SalesDataRow.__slots__)
@@ -0,0 +1,60 @@
+"""
+ایندکس حافظه‌ای کلیدهای یکتای یک شیت
+
+رکوردهای موجود یک شیت یک بار (فقط ستون‌های id، unique_key، row_number و content_hash و
+بدون خواندن JSON داده‌ها) بارگذاری می‌شوند؛ سپس تشخیص ردیف جدید/تکراری/بروزرسانی در
+ذخیره دسته‌ای و مقایسه ChangeDetector هر دو از همین ایندکس استفاده می‌کنند.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class SheetKeyIndex:
+    """
+    نگاشت unique_key -> (id, row_number, content_hash) برای رکوردهای یک شیت
+    """
+
+    __slots__ = ('sheet_config_id', '_entries')
+
+    def __init__(self, sheet_config_id: int, records: Iterable[Tuple[int, str, int, Optional[str]]] = ()):
+        """
+        Args:
+            sheet_config_id: شناسه تنظیمات شیت
+            records: (id, unique_key, row_number, content_hash)
+        """
+        self.sheet_config_id = sheet_config_id
+        self._entries: Dict[str, Tuple[Optional[int], int, Optional[str]]] = {
+            unique_key: (record_id, row_number, content_hash)
+            for record_id, unique_key, row_number, content_hash in records
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, unique_key: str) -> bool:
+        return unique_key in self._entries
+
+    def get(self, unique_key: str) -> Optional[Tuple[Optional[int], int, Optional[str]]]:
+        """
+        Returns:
+            (id, row_number, content_hash) یا None
+        """
+        return self._entries.get(unique_key)
+
+    def add(self, unique_key: str, record_id: Optional[int], row_number: int, content_hash: Optional[str]):
+        """ثبت یا بروزرسانی یک کلید (id رکوردهای تازه درج شده ممکن است None باشد)"""
+        previous = self._entries.get(unique_key)
+        if record_id is None and previous is not None:
+            record_id = previous[0]
+        self._entries[unique_key] = (record_id, row_number, content_hash)
+
+    def content_hashes(self) -> Dict[str, int]:
+        """
+        نگاشت hash محتوا -> شماره ردیف برای ChangeDetector.detect_changes_by_hash
+
+        رکوردهای بدون hash (پیش از backfill) در نظر گرفته نمی‌شوند.
+        """
+        return {
+            content_hash: row_number
+            for _, row_number, content_hash in self._entries.values()
+            if content_hash
+        }
@@ -0,0 +1,178 @@
+"""
+ذخیره محلی Snapshot شیت‌ها (اختیاری)
+
+هر worksheet دانلود شده به صورت یک فایل فشرده (gzip، هر خط یک ردیف JSON) همراه با
+هش هر ردیف ذخیره می‌شود. کلید فایل Spreadsheet و worksheet است و اثر انگشت (زمان آخرین
+تغییر Spreadsheet) در خط اول فایل نگهداری می‌شود؛ تا وقتی اثر انگشت تغییر نکرده، خواندن
+دوباره همان شیت (پیش‌نمایش‌ها، تلاش مجدد پس از خطا) از فایل محلی انجام می‌شود.
+
+فعال‌سازی: SHEETS_SNAPSHOT_CACHE=true در فایل .env
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.logger import app_logger
+from app.core.sheets_cache import SheetMetadataCache
+
+
+def hash_row(values: List) -> str:
+    """هش محتوای یک ردیف"""
+    payload = json.dumps(values, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+class SnapshotWriter:
+    """
+    نوشتن تدریجی یک snapshot
+
+    فایل ابتدا در مسیر موقت نوشته می‌شود و فقط در صورت پایان کامل (بدون خطا یا
+    توقف generator) جایگزین snapshot قبلی می‌شود.
+    """
+
+    def __init__(self, path: Path, header: Dict):
+        self.path = path
+        self.tmp_path = path.with_name(path.name + '.tmp')
+        self.header = header
+        self.rows_written = 0
+        self._file = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self.tmp_path, 'wt', encoding='utf-8')
+        self._file.write(json.dumps(self.header, ensure_ascii=False) + '\n')
+        return self
+
+    def write_row(self, row_number: int, values: List):
+        self._file.write(json.dumps([row_number, hash_row(values), values], ensure_ascii=False) + '\n')
+        self.rows_written += 1
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            # خواندن ناقص (خطا یا توقف زودهنگام) ذخیره نمی‌شود
+            self.tmp_path.unlink(missing_ok=True)
+        return False
+
+
+class WorksheetSnapshotStore:
+    """
+    مخزن snapshotهای فشرده worksheetها
+    """
+
+    def __init__(self, base_dir: Optional[str] = None):
+        """
+        Args:
+            base_dir: پوشه ذخیره (پیش‌فرض: SHEETS_SNAPSHOT_DIR یا data/snapshots)
+        """
+        self.logger = app_logger
+        self.base_dir = Path(base_dir or os.getenv("SHEETS_SNAPSHOT_DIR", "data/snapshots"))
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """آیا کش snapshot در تنظیمات فعال است؟"""
+        return os.getenv("SHEETS_SNAPSHOT_CACHE", "false").strip().lower() in ('1', 'true', 'yes')
+
+    def _path(self, sheet_url: str, worksheet_name: Optional[str]) -> Path:
+        spreadsheet_key = SheetMetadataCache.spreadsheet_key(sheet_url)
+        # نام دقیق (worksheetهای «Sales» و «sales» یک Spreadsheet جدا هستند)
+        name_hash = hashlib.md5((worksheet_name or '').encode('utf-8')).hexdigest()[:12]
+        safe_key = "".join(c for c in spreadsheet_key if c.isalnum() or c in '-_')[:80]
+        return self.base_dir / f"{safe_key}_{name_hash}.jsonl.gz"
+
+    def _read_header(self, path: Path) -> Optional[Dict]:
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return json.loads(f.readline())
+        except Exception:
+            return None
+
+    # ==================== Read ====================
+
+    def has(self, sheet_url: str, worksheet_name: Optional[str], fingerprint: Optional[str]) -> bool:
+        """
+        آیا snapshot معتبر برای این اثر انگشت وجود دارد؟
+
+        اثر انگشت (زمان تغییر Spreadsheet) بین همه worksheetها مشترک است؛ نام worksheet
+        ذخیره شده هم باید دقیقاً همین نام باشد.
+        """
+        if not fingerprint:
+            return False
+        path = self._path(sheet_url, worksheet_name)
+        if not path.exists():
+            return False
+        header = self._read_header(path)
+        return (
+            bool(header)
+            and header.get('fingerprint') == fingerprint
+            and header.get('worksheet') == worksheet_name
+        )
+
+    def _iter_records(self, path: Path) -> Iterator[Tuple[int, str, List]]:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            f.readline()  # هدر فایل
+            for line in f:
+                row_number, row_hash, values = json.loads(line)
+                yield row_number, row_hash, values
+
+    def iter_rows(self, sheet_url: str, worksheet_name: Optional[str]) -> Iterator[Tuple[int, List]]:
+        """
+        خواندن تدریجی ردیف‌های snapshot (بدون بررسی اثر انگشت - ابتدا has() را فراخوانی کنید)
+
+        Yields:
+            (شماره ردیف, لیست مقادیر)
+        """
+        for row_number, _, values in self._iter_records(self._path(sheet_url, worksheet_name)):
+            yield row_number, values
+
+    def load_grid(self, sheet_url: str, worksheet_name: Optional[str], fingerprint: Optional[str]) -> Optional[List[List]]:
+        """
+        دریافت کل grid (شامل هدر) در صورت معتبر بودن snapshot
+
+        Returns:
+            لیست سطرها یا None
+        """
+        if not self.has(sheet_url, worksheet_name, fingerprint):
+            return None
+        try:
+            grid = [values for _, values in self.iter_rows(sheet_url, worksheet_name)]
+            self.logger.info(f"💾 {len(grid):,} سطر '{worksheet_name}' از snapshot محلی خوانده شد")
+            return grid
+        except Exception as e:
+            self.logger.warning(f"⚠️ خطا در خواندن snapshot: {str(e)}")
+            return None
+
+    # ==================== Write ====================
+
+    def writer(self, sheet_url: str, worksheet_name: Optional[str], fingerprint: str) -> SnapshotWriter:
+        """نویسنده تدریجی snapshot (context manager)"""
+        header = {
+            'spreadsheet': SheetMetadataCache.spreadsheet_key(sheet_url),
+            'worksheet': worksheet_name,
+            'fingerprint': fingerprint,
+            'saved_at': time.time(),
+        }
+        return SnapshotWriter(self._path(sheet_url, worksheet_name), header)
+
+    def save_grid(self, sheet_url: str, worksheet_name: Optional[str], fingerprint: Optional[str], grid: List[List]) -> bool:
+        """ذخیره کل grid (ردیف اول = هدر)"""
+        if not fingerprint:
+            return False
+        try:
+            with self.writer(sheet_url, worksheet_name, fingerprint) as writer:
+                for row_number, values in enumerate(grid, start=1):
+                    writer.write_row(row_number, values)
+            return True
+        except Exception as e:
+            self.logger.warning(f"⚠️ خطا در ذخیره snapshot: {str(e)}")
+            return False
+
+    def invalidate(self, sheet_url: str, worksheet_name: Optional[str]):
+        """حذف snapshot یک worksheet"""
+        self._path(sheet_url, worksheet_name).unlink(missing_ok=True)
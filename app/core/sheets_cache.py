@@ -0,0 +1,149 @@
+"""
+کش متادیتای Google Sheets
+
+نگهداری Spreadsheet و Worksheetهای باز شده، نام واقعی worksheet و ردیف هدر
+تا فراخوانی‌های استخراج و علامت‌گذاری یک شیت در یک اجرا فقط یک بار متادیتا را دریافت کنند.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.utils.helpers import extract_sheet_id
+
+
+def clean_header(header) -> str:
+    """پاک‌سازی یک هدر: حذف علامت تیک و فضای خالی"""
+    return str(header).strip().replace('✓', '').replace('✔', '').replace('☑', '').replace('✅', '').strip()
+
+
+def clean_headers(headers: List) -> List[str]:
+    """پاک‌سازی لیست هدرها"""
+    return [clean_header(h) for h in headers]
+
+
+@dataclass
+class WorksheetMetadata:
+    """متادیتای کش شده یک worksheet"""
+    worksheet: Any
+    title: str
+    raw_headers: Optional[List[str]] = None
+    cached_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def headers(self) -> Optional[List[str]]:
+        """هدرهای پاک‌سازی شده"""
+        if self.raw_headers is None:
+            return None
+        return clean_headers(self.raw_headers)
+
+
+@dataclass
+class SpreadsheetMetadata:
+    """متادیتای کش شده یک Spreadsheet"""
+    spreadsheet: Any
+    worksheets: List[Any]
+    cached_at: float = field(default_factory=time.monotonic)
+
+
+class SheetMetadataCache:
+    """
+    کش متادیتا بر اساس شناسه Spreadsheet و نام worksheet با TTL و ابطال صریح
+    """
+
+    def __init__(self, ttl_seconds: float = 300):
+        """
+        Args:
+            ttl_seconds: مدت اعتبار هر مدخل (ثانیه)
+        """
+        self.ttl_seconds = ttl_seconds
+        self._spreadsheets: Dict[str, SpreadsheetMetadata] = {}
+        self._worksheets: Dict[tuple, WorksheetMetadata] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def spreadsheet_key(sheet_url: str) -> str:
+        """کلید کش برای یک Spreadsheet (شناسه شیت یا خود URL)"""
+        return extract_sheet_id(sheet_url) or sheet_url
+
+    def _is_fresh(self, cached_at: float) -> bool:
+        return (time.monotonic() - cached_at) < self.ttl_seconds
+
+    # ==================== Spreadsheet ====================
+
+    def get_spreadsheet(self, sheet_url: str) -> Optional[SpreadsheetMetadata]:
+        """دریافت Spreadsheet کش شده (یا None اگر منقضی/موجود نباشد)"""
+        key = self.spreadsheet_key(sheet_url)
+        with self._lock:
+            entry = self._spreadsheets.get(key)
+            if entry and self._is_fresh(entry.cached_at):
+                return entry
+            if entry:
+                self._drop_spreadsheet(key)
+            return None
+
+    def put_spreadsheet(self, sheet_url: str, spreadsheet, worksheets: List) -> SpreadsheetMetadata:
+        """ذخیره Spreadsheet و لیست worksheetهای آن"""
+        entry = SpreadsheetMetadata(spreadsheet=spreadsheet, worksheets=list(worksheets))
+        with self._lock:
+            self._spreadsheets[self.spreadsheet_key(sheet_url)] = entry
+        return entry
+
+    # ==================== Worksheet ====================
+
+    def get_worksheet(self, sheet_url: str, worksheet_name: Optional[str]) -> Optional[WorksheetMetadata]:
+        """دریافت worksheet کش شده برای همان نام درخواستی (کش نتیجه جستجو، نه تطبیق نام)"""
+        key = (self.spreadsheet_key(sheet_url), worksheet_name or '')
+        with self._lock:
+            entry = self._worksheets.get(key)
+            if entry and self._is_fresh(entry.cached_at):
+                return entry
+            if entry:
+                del self._worksheets[key]
+            return None
+
+    def put_worksheet(self, sheet_url: str, worksheet_name: Optional[str], worksheet) -> WorksheetMetadata:
+        """ذخیره worksheet حل شده برای نام درخواستی"""
+        entry = WorksheetMetadata(worksheet=worksheet, title=worksheet.title)
+        key = (self.spreadsheet_key(sheet_url), worksheet_name or '')
+        with self._lock:
+            self._worksheets[key] = entry
+        return entry
+
+    def set_headers(self, sheet_url: str, worksheet_name: Optional[str], raw_headers: List[str]):
+        """ذخیره ردیف هدر خام یک worksheet"""
+        key = (self.spreadsheet_key(sheet_url), worksheet_name or '')
+        with self._lock:
+            entry = self._worksheets.get(key)
+            if entry:
+                entry.raw_headers = list(raw_headers)
+
+    # ==================== Invalidation ====================
+
+    def _drop_spreadsheet(self, key: str):
+        self._spreadsheets.pop(key, None)
+        for ws_key in [k for k in self._worksheets if k[0] == key]:
+            del self._worksheets[ws_key]
+
+    def invalidate(self, sheet_url: Optional[str] = None, worksheet_name: Optional[str] = None):
+        """
+        ابطال کش
+
+        Args:
+            sheet_url: اگر None باشد کل کش پاک می‌شود
+            worksheet_name: اگر مشخص باشد فقط همان worksheet باطل می‌شود
+        """
+        with self._lock:
+            if sheet_url is None:
+                self._spreadsheets.clear()
+                self._worksheets.clear()
+                return
+
+            key = self.spreadsheet_key(sheet_url)
+            if worksheet_name is None:
+                self._drop_spreadsheet(key)
+            else:
+                # همه نام‌های درخواستی همین worksheet (با هر حالت حروف)
+                name = worksheet_name.lower()
+                for ws_key in [k for k in self._worksheets if k[0] == key and k[1].lower() == name]:
+                    del self._worksheets[ws_key]
@@ -0,0 +1,241 @@
+"""
+تخلیه صف پایدار علامت‌گذاری Google Sheets (Outbox)
+
+ردیف‌هایی که در دیتابیس ذخیره شده‌اند ابتدا در جدول sheet_write_outbox ثبت می‌شوند و
+سپس علامت‌گذاری می‌شوند. اگر نوشتن در شیت (کامل یا بخشی از آن) شکست بخورد، بازه‌های
+ناموفق در صف باقی می‌مانند و در اجراهای بعدی یا پس از راه‌اندازی مجدد برنامه، ادغام
+شده و دوباره ارسال می‌شوند؛ بنابراین استخراج بعدی آن‌ها را به عنوان تکراری دریافت نمی‌کند.
+
+پیش از هر ارسال، hash محتوای ردیف‌ها دوباره از شیت خوانده و با hash ذخیره شده مقایسه
+می‌شود؛ ردیفی که در این فاصله جابجا یا ویرایش شده علامت نمی‌خورد و از صف حذف می‌شود
+(استخراج بعدی آن را دوباره بررسی می‌کند).
+"""
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.logger import app_logger
+
+
+# فقط یک تخلیه همزمان در کل برنامه (thread پس‌زمینه و استخراج دستی)
+_drain_lock = threading.Lock()
+
+
+def merge_runs(runs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    ادغام بازه‌های هم‌پوشان یا پیوسته
+
+    Example:
+        [(2, 4), (5, 6), (3, 3), (9, 9)] -> [(2, 6), (9, 9)]
+    """
+    merged = []
+    for start, end in sorted(runs):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+class SheetWriteOutboxDrainer:
+    """
+    ارسال عملیات علامت‌گذاری در انتظار به Google Sheets
+    """
+
+    def __init__(self, extractor=None, extractor_factory: Optional[Callable] = None, interval_seconds: float = 60.0):
+        """
+        Args:
+            extractor: نمونه GoogleSheetExtractor
+            extractor_factory: تابع ساخت extractor در صورت نبود (برای thread پس‌زمینه)
+            interval_seconds: فاصله تخلیه‌های دوره‌ای در thread پس‌زمینه
+        """
+        self.logger = app_logger
+        self.extractor = extractor
+        self.extractor_factory = extractor_factory
+        self.interval_seconds = interval_seconds
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _get_extractor(self):
+        if self.extractor is None and self.extractor_factory:
+            self.extractor = self.extractor_factory()
+        return self.extractor
+
+    def drain(self, sheet_config_id: Optional[int] = None, due_only: bool = True, progress_callback=None) -> Dict:
+        """
+        تخلیه صف: ادغام بازه‌های هر مقصد و ارسال آن‌ها با یک علامت‌گذاری
+
+        Args:
+            sheet_config_id: فقط یک شیت (None = همه)
+            due_only: فقط مواردی که زمان تلاش بعدی آن‌ها رسیده (False = همه، برای استخراج دستی)
+            progress_callback: تابع (current, total, message)
+
+        Returns:
+            آمار: {'total', 'success', 'failed', 'dropped', 'targets'}
+        """
+        from app.core.database import db_manager
+
+        stats = {'total': 0, 'success': 0, 'failed': 0, 'dropped': 0, 'targets': 0}
+
+        with _drain_lock:
+            entries = db_manager.get_pending_sheet_writes(sheet_config_id, due_only=due_only)
+            if not entries:
+                return stats
+
+            extractor = self._get_extractor()
+            if extractor is None:
+                return stats
+
+            # گروه‌بندی بر اساس مقصد (شیت، ورک‌شیت، ستون)
+            groups = defaultdict(list)
+            for entry in entries:
+                groups[(entry.sheet_config_id, entry.sheet_url, entry.worksheet_name, entry.extracted_column)].append(entry)
+
+            for (config_id, sheet_url, worksheet_name, extracted_column), group in groups.items():
+                # hash های مورد انتظار هر ردیف (None = بازه قدیمی بدون hash، بدون بررسی)
+                expected: Dict[int, Set[Optional[str]]] = defaultdict(set)
+                for entry in group:
+                    for row_number, content_hash in entry.row_content_hashes():
+                        expected[row_number].add(content_hash)
+                stats['targets'] += 1
+
+                row_numbers, row_hashes, message = self._verify_rows(
+                    extractor, config_id, sheet_url, worksheet_name, expected
+                )
+                dropped = len(expected) - len(row_numbers)
+                if dropped:
+                    stats['dropped'] += dropped
+                    self.logger.warning(
+                        f"⚠️ {dropped:,} ردیف '{worksheet_name}' پس از ذخیره جابجا یا ویرایش شده‌اند - "
+                        f"علامت نخوردند و از صف حذف شدند"
+                    )
+
+                runs = merge_runs([(row_number, row_number) for row_number in row_numbers])
+                stats['total'] += len(row_numbers)
+
+                if row_hashes is None:
+                    # خواندن دوباره شیت ناموفق بود - همه ردیف‌ها (با hash) برای تلاش بعدی می‌مانند
+                    success, mark_stats = False, {}
+                    row_hashes = {
+                        row_number: next((content_hash for content_hash in hashes if content_hash), None)
+                        for row_number, hashes in expected.items()
+                    }
+                elif row_numbers:
+                    self.logger.info(
+                        f"📤 تخلیه صف علامت‌گذاری '{worksheet_name}': {len(row_numbers):,} ردیف در {len(runs)} بازه"
+                    )
+                    try:
+                        success, message, mark_stats = extractor.mark_rows_as_extracted(
+                            sheet_url, worksheet_name, row_numbers, extracted_column,
+                            progress_callback=progress_callback
+                        )
+                    except Exception as e:
+                        success, message, mark_stats = False, str(e), {}
+                else:
+                    success, mark_stats = True, {}
+
+                if success or 'failed_runs' in mark_stats:
+                    failed_runs = mark_stats.get('failed_runs', [])
+                else:
+                    # خطا پیش از ارسال (مثلاً worksheet یا ستون یافت نشد)
+                    failed_runs = runs
+
+                failed_count = sum(end - start + 1 for start, end in failed_runs)
+                stats['failed'] += failed_count
+                stats['success'] += len(row_numbers) - failed_count
+
+                db_manager.resolve_sheet_writes(
+                    [entry.id for entry in group],
+                    failed_runs=failed_runs,
+                    error=None if not failed_runs else message,
+                    content_hashes=row_hashes
+                )
+
+                if failed_runs:
+                    self.logger.warning(
+                        f"⚠️ {failed_count:,} ردیف '{worksheet_name}' در صف علامت‌گذاری باقی ماند"
+                    )
+
+        return stats
+
+    def _verify_rows(self, extractor, sheet_config_id, sheet_url, worksheet_name, expected):
+        """
+        مقایسه hash فعلی ردیف‌های شیت با hash ذخیره شده در صف
+
+        Returns:
+            (ردیف‌های قابل علامت‌گذاری, {ردیف: hash} یا None اگر خواندن شیت ناموفق بود, پیام خطا)
+        """
+        from app.core.database import db_manager
+
+        to_check = sorted(row for row, hashes in expected.items() if hashes != {None})
+        if not to_check:
+            return sorted(expected), {}, None
+
+        try:
+            sheet_config = db_manager.get_sheet_config(sheet_config_id)
+            if sheet_config is None:
+                raise Exception("تنظیمات شیت یافت نشد")
+            current = extractor.read_row_content_hashes(sheet_config, sheet_url, worksheet_name, to_check)
+        except Exception as e:
+            self.logger.error(f"❌ خواندن دوباره ردیف‌های '{worksheet_name}' پیش از علامت‌گذاری ناموفق بود: {str(e)}")
+            return sorted(expected), None, str(e)
+
+        row_numbers, row_hashes = [], {}
+        for row_number in sorted(expected):
+            hashes = expected[row_number]
+            if None in hashes:
+                row_numbers.append(row_number)
+            elif current.get(row_number) in hashes:
+                row_numbers.append(row_number)
+                row_hashes[row_number] = current[row_number]
+        return row_numbers, row_hashes, None
+
+    # ==================== Background Thread ====================
+
+    def start(self):
+        """شروع thread پس‌زمینه تخلیه دوره‌ای"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="sheets-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """توقف thread پس‌زمینه"""
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                stats = self.drain()
+                if stats['total']:
+                    self.logger.info(
+                        f"📤 صف علامت‌گذاری: {stats['success']:,} موفق، {stats['failed']:,} باقی‌مانده"
+                    )
+            except Exception as e:
+                self.logger.error(f"❌ خطا در تخلیه صف علامت‌گذاری: {str(e)}")
+            self._stop_event.wait(self.interval_seconds)
+
+
+_background_drainer: Optional[SheetWriteOutboxDrainer] = None
+
+
+def start_background_drainer(interval_seconds: float = 60.0) -> SheetWriteOutboxDrainer:
+    """
+    راه‌اندازی thread پس‌زمینه تخلیه صف (یک نمونه برای کل برنامه)
+    """
+    global _background_drainer
+    if _background_drainer is None:
+        from app.core.google_sheets import GoogleSheetExtractor
+        _background_drainer = SheetWriteOutboxDrainer(
+            extractor_factory=GoogleSheetExtractor,
+            interval_seconds=interval_seconds
+        )
+    _background_drainer.start()
+    return _background_drainer
+
+
+def stop_background_drainer():
+    """توقف thread پس‌زمینه تخلیه صف"""
+    if _background_drainer is not None:
+        _background_drainer.stop()
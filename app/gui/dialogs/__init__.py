@@ -5,5 +5,7 @@ from app.gui.dialogs.sheet_config_dialog import SheetConfigDialog
 from app.gui.dialogs.export_dialog import ExportDialog
 from app.gui.dialogs.settings_dialog import SettingsDialog
 from app.gui.dialogs.duplicate_conflict_dialog import DuplicateConflictDialog
+from app.gui.dialogs.duplicate_candidates_dialog import DuplicateCandidatesDialog
+from app.gui.dialogs.data_search_dialog import DataSearchDialog
 
-__all__ = ['SheetConfigDialog', 'ExportDialog', 'SettingsDialog', 'DuplicateConflictDialog']
+__all__ = ['SheetConfigDialog', 'ExportDialog', 'SettingsDialog', 'DuplicateConflictDialog', 'DuplicateCandidatesDialog', 'DataSearchDialog']
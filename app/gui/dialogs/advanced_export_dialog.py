@@ -12,7 +12,8 @@ from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QFont
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from itertools import chain
+from typing import Iterator, List, Optional
 
 from app.core.database import db_manager
 from app.core.excel_exporter import excel_exporter
@@ -26,10 +27,19 @@ class ExportWorker(QThread):
     progress = pyqtSignal(int, str)
     finished = pyqtSignal(bool, str)
     
-    def __init__(self, template, data_list, output_path, apply_styling=True):
+    def __init__(self, template, data_rows, record_count, output_path, apply_styling=True):
+        """
+        Args:
+            template: Template Export
+            data_rows: رکوردها (iterator جریانی؛ در همین thread خوانده می‌شود)
+            record_count: تعداد رکوردها (برای پیام‌ها)
+            output_path: مسیر خروجی
+            apply_styling: اعمال استایل‌ها
+        """
         super().__init__()
         self.template = template
-        self.data_list = data_list
+        self.data_rows = data_rows
+        self.record_count = record_count
         self.output_path = output_path
         self.apply_styling = apply_styling
     
@@ -38,23 +48,23 @@ class ExportWorker(QThread):
         try:
             self.progress.emit(10, "شروع Export...")
             
-            if not self.data_list:
+            if not self.record_count:
                 self.finished.emit(False, "هیچ داده‌ای برای Export یافت نشد!")
                 return
             
-            self.progress.emit(30, f"Export {len(self.data_list)} رکورد...")
+            self.progress.emit(30, f"Export {self.record_count} رکورد...")
             
             # Export اصلی
             if self.apply_styling:
                 success, message = excel_exporter.export_with_formatting(
                     self.template,
-                    self.data_list,
+                    self.data_rows,
                     self.output_path
                 )
             else:
                 success, message = excel_exporter.export_to_excel(
                     self.template,
-                    self.data_list,
+                    self.data_rows,
                     self.output_path
                 )
             
@@ -363,26 +373,14 @@ class AdvancedExportDialog(QDialog):
             # فعال/غیرفعال کردن محدوده
             self.limit_spin.setEnabled(filter_index == 3)
             
-            # دریافت داده‌ها
-            if filter_index == 0:  # فقط جدید
-                data_list = db_manager.get_sales_data_by_export_status(is_exported=False)
-            elif filter_index == 1:  # ویرایش شده
-                data_list = db_manager.get_updated_sales_data()
-            elif filter_index == 2:  # همه
-                data_list = db_manager.get_all_sales_data()
-            else:  # محدوده سفارشی
-                data_list = db_manager.get_all_sales_data()[:self.limit_spin.value()]
-            
             # فیلتر بر اساس شیت‌های Template
+            source_sheet_ids = []
             selected_template = self.template_combo.currentData()
             if selected_template:
                 # دریافت ID های شیت‌های منبع از Template
                 source_sheet_ids = self.extract_source_sheets_from_template(selected_template)
                 
                 if source_sheet_ids:
-                    # فیلتر داده‌ها فقط از شیت‌های Template
-                    data_list = [d for d in data_list if d.sheet_config_id in source_sheet_ids]
-                    
                     # دریافت نام شیت‌ها برای نمایش
                     sheet_names = []
                     for sheet_id in source_sheet_ids:
@@ -390,7 +388,8 @@ class AdvancedExportDialog(QDialog):
                         if config:
                             sheet_names.append(config.name)
             
-            count = len(data_list)
+            # تعداد از شمارنده‌های شیت‌ها (بدون خواندن داده‌ها)
+            count = self.count_filtered_data(filter_index, source_sheet_ids)
             
             # نمایش با جزئیات
             if selected_template and source_sheet_ids:
@@ -406,6 +405,33 @@ class AdvancedExportDialog(QDialog):
             self.data_count_label.setText("0 رکورد")
 
     
+    # ایندکس فیلتر داده‌ها -> وضعیت DatabaseManager.SALES_DATA_FILTERS
+    DATA_FILTER_STATUS = ('not_exported', 'updated', 'all', 'all')
+    
+    def count_filtered_data(self, filter_index: int, source_sheet_ids: List[int]) -> int:
+        """تعداد داده‌های فیلتر انتخاب شده (از شمارنده‌های شیت‌ها)"""
+        status = self.DATA_FILTER_STATUS[filter_index]
+        if source_sheet_ids:
+            count = sum(db_manager.get_sales_data_filter_count(status, sheet_id) for sheet_id in source_sheet_ids)
+        else:
+            count = db_manager.get_sales_data_filter_count(status)
+        
+        if filter_index == 3:  # محدوده سفارشی
+            count = min(count, self.limit_spin.value())
+        return count
+    
+    def iter_filtered_data(self, filter_index: int, source_sheet_ids: List[int]) -> Iterator:
+        """رکوردهای فیلتر انتخاب شده به صورت جریانی (SalesDataRow)"""
+        if filter_index == 0:  # فقط جدید
+            batches = db_manager.iter_sales_data_by_export_status(False, source_sheet_ids)
+        elif filter_index == 1:  # ویرایش شده
+            batches = db_manager.iter_updated_sales_data(source_sheet_ids)
+        elif filter_index == 2:  # همه
+            batches = db_manager.iter_all_sales_data(source_sheet_ids)
+        else:  # محدوده سفارشی
+            batches = db_manager.iter_all_sales_data(source_sheet_ids, limit=self.limit_spin.value())
+        return chain.from_iterable(batches)
+    
     def manage_templates(self):
         """مدیریت Template ها"""
         dialog = TemplateManagerDialog(self)
@@ -449,9 +475,7 @@ class AdvancedExportDialog(QDialog):
             # دریافت داده‌ها بر اساس فیلتر
             filter_index = self.filter_combo.currentIndex()
             
-            if filter_index == 0:  # فقط جدید
-                data_list = db_manager.get_sales_data_by_export_status(is_exported=False)
-            elif filter_index == 1:  # ویرایش شده
+            if filter_index == 1:  # ویرایش شده
                 # تأیید Re-export
                 reply = QMessageBox.question(
                     self,
@@ -462,20 +486,12 @@ class AdvancedExportDialog(QDialog):
                 
                 if reply == QMessageBox.StandardButton.No:
                     return
-                
-                data_list = db_manager.get_updated_sales_data()
-            elif filter_index == 2:  # همه
-                data_list = db_manager.get_all_sales_data()
-            else:  # محدوده سفارشی
-                data_list = db_manager.get_all_sales_data()[:self.limit_spin.value()]
             
             # فیلتر بر اساس شیت‌های Template
             source_sheet_ids = self.extract_source_sheets_from_template(self.selected_template)
+            record_count = self.count_filtered_data(filter_index, source_sheet_ids)
             
             if source_sheet_ids:
-                # فیلتر داده‌ها فقط از شیت‌های Template
-                data_list = [d for d in data_list if d.sheet_config_id in source_sheet_ids]
-                
                 # دریافت نام شیت‌ها برای لاگ
                 sheet_names = []
                 for sheet_id in source_sheet_ids:
@@ -485,11 +501,11 @@ class AdvancedExportDialog(QDialog):
                 
                 # اطلاع به کاربر
                 if len(sheet_names) == 1:
-                    app_logger.info(f"Export فقط از شیت '{sheet_names[0]}' ({len(data_list)} رکورد)")
+                    app_logger.info(f"Export فقط از شیت '{sheet_names[0]}' ({record_count} رکورد)")
                 else:
-                    app_logger.info(f"Export از {len(sheet_names)} شیت: {', '.join(sheet_names)} ({len(data_list)} رکورد)")
+                    app_logger.info(f"Export از {len(sheet_names)} شیت: {', '.join(sheet_names)} ({record_count} رکورد)")
             
-            if not data_list:
+            if not record_count:
                 QMessageBox.information(self, "اطلاع", "هیچ داده‌ای برای Export یافت نشد!")
                 return
             
@@ -500,9 +516,11 @@ class AdvancedExportDialog(QDialog):
             progress.setAutoClose(True)
             
             # ایجاد Worker
+            # داده‌ها در thread Export به صورت جریانی خوانده می‌شوند
             self.worker = ExportWorker(
                 self.selected_template,
-                data_list,
+                self.iter_filtered_data(filter_index, source_sheet_ids),
+                record_count,
                 self.output_path,
                 self.styling_checkbox.isChecked()
             )
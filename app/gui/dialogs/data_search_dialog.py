@@ -0,0 +1,244 @@
+"""
+دیالوگ جستجوی متن کامل در داده‌های همه شیت‌ها
+Dialog for full-text search across extracted rows of all sheets
+"""
+
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget,
+    QTableWidgetItem, QPushButton, QLabel, QComboBox,
+    QLineEdit, QMessageBox, QHeaderView, QAbstractItemView
+)
+from PyQt6.QtCore import Qt
+from typing import Dict
+
+from app.core.database import DatabaseManager
+from app.utils.ui_constants import COLORS, FONTS
+
+
+class DataSearchDialog(QDialog):
+    """
+    نتایج جستجو در همه شیت‌ها به ترتیب رتبه
+
+    فقط id های یک صفحه از ایندکس جستجو خوانده و رکوردهای همان صفحه بارگذاری می‌شوند؛
+    دابل کلیک جزئیات شیت ردیف را با همین جستجو باز می‌کند.
+    """
+
+    def __init__(self, search_text: str = "", parent=None):
+        super().__init__(parent)
+        self.db_manager = DatabaseManager()
+
+        # متغیرهای Pagination
+        self.page_size = 100
+        self.current_page = 1
+        self.total_pages = 1
+        self.total_records = 0
+        self.has_next = False
+        self.page_rows = []
+        self.sheet_names = {}
+
+        self.search_text = search_text.strip()
+
+        self.setup_ui()
+        self.load_data()
+
+    def setup_ui(self):
+        """تنظیمات رابط کاربری"""
+        self.setWindowTitle("🔍 جستجو در داده‌ها")
+        self.setLayoutDirection(Qt.LayoutDirection.RightToLeft)
+        self.resize(1000, 650)
+
+        main_layout = QVBoxLayout()
+        main_layout.setSpacing(10)
+        main_layout.setContentsMargins(15, 15, 15, 15)
+
+        # جستجو
+        search_layout = QHBoxLayout()
+
+        self.search_input = QLineEdit(self.search_text)
+        self.search_input.setPlaceholderText("نام، ایمیل، تلفن، کد...")
+        self.search_input.setFont(FONTS['medium'])
+        self.search_input.returnPressed.connect(self.apply_search)
+        search_layout.addWidget(self.search_input)
+
+        search_btn = QPushButton("🔍 جستجو")
+        search_btn.setFont(FONTS['medium'])
+        search_btn.clicked.connect(self.apply_search)
+        search_layout.addWidget(search_btn)
+
+        main_layout.addLayout(search_layout)
+
+        # جدول
+        self.table = QTableWidget()
+        self.table.setColumnCount(4)
+        self.table.setHorizontalHeaderLabels(["شیت", "ردیف", "ID", "داده"])
+        self.table.setAlternatingRowColors(True)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(0, 180)
+        self.table.setColumnWidth(1, 70)
+        self.table.setColumnWidth(2, 80)
+        self.table.doubleClicked.connect(self.open_selected)
+        main_layout.addWidget(self.table)
+
+        # ============ Pagination ============
+        pagination_layout = QHBoxLayout()
+
+        self.page_info = QLabel()
+        self.page_info.setFont(FONTS['medium'])
+        pagination_layout.addWidget(self.page_info)
+
+        pagination_layout.addStretch()
+
+        self.prev_btn = QPushButton("▶ قبلی")
+        self.prev_btn.setFont(FONTS['medium'])
+        self.prev_btn.clicked.connect(self.prev_page)
+        pagination_layout.addWidget(self.prev_btn)
+
+        self.current_page_label = QLabel()
+        self.current_page_label.setFont(FONTS['medium_bold'])
+        self.current_page_label.setStyleSheet(f"color: {COLORS['primary']}; padding: 0 15px;")
+        pagination_layout.addWidget(self.current_page_label)
+
+        self.next_btn = QPushButton("بعدی ◀")
+        self.next_btn.setFont(FONTS['medium'])
+        self.next_btn.clicked.connect(self.next_page)
+        pagination_layout.addWidget(self.next_btn)
+
+        pagination_layout.addStretch()
+
+        page_size_label = QLabel("تعداد در صفحه:")
+        page_size_label.setFont(FONTS['medium'])
+        pagination_layout.addWidget(page_size_label)
+
+        self.page_size_combo = QComboBox()
+        self.page_size_combo.addItems(["50", "100", "200", "500"])
+        self.page_size_combo.setCurrentText("100")
+        self.page_size_combo.setFont(FONTS['medium'])
+        self.page_size_combo.currentTextChanged.connect(self.on_page_size_changed)
+        pagination_layout.addWidget(self.page_size_combo)
+
+        main_layout.addLayout(pagination_layout)
+
+        # بستن
+        close_layout = QHBoxLayout()
+        close_layout.addStretch()
+        close_btn = QPushButton("بستن")
+        close_btn.setFont(FONTS['medium'])
+        close_btn.clicked.connect(self.accept)
+        close_layout.addWidget(close_btn)
+        main_layout.addLayout(close_layout)
+
+        self.setLayout(main_layout)
+
+    def load_data(self):
+        """بارگذاری صفحه فعلی نتایج"""
+        try:
+            if not self.sheet_names:
+                self.sheet_names = {
+                    config.id: config.name for config in self.db_manager.get_all_sheet_configs()
+                }
+
+            if self.search_text:
+                data_ids, self.has_next = self.db_manager.search_sales_data(
+                    self.search_text,
+                    limit=self.page_size,
+                    offset=(self.current_page - 1) * self.page_size
+                )
+                self.page_rows = self.db_manager.get_sales_data_by_ids(data_ids)
+                self.total_records = self.db_manager.get_sales_data_search_count(self.search_text)
+            else:
+                self.page_rows, self.has_next, self.total_records = [], False, 0
+
+            self.total_pages = max(1, (self.total_records + self.page_size - 1) // self.page_size)
+
+            self.table.setRowCount(len(self.page_rows))
+            for row, data in enumerate(self.page_rows):
+                values = [
+                    self.sheet_names.get(data.sheet_config_id, str(data.sheet_config_id)),
+                    str(data.row_number),
+                    str(data.id),
+                    self.format_preview(data.data if isinstance(data.data, dict) else {}),
+                ]
+                for column, value in enumerate(values):
+                    item = QTableWidgetItem(value)
+                    if column in (1, 2):
+                        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                    self.table.setItem(row, column, item)
+
+            self.update_pagination_controls()
+
+        except Exception as e:
+            QMessageBox.critical(self, "خطا", f"خطا در جستجو:\n{str(e)}")
+
+    def format_preview(self, data: Dict) -> str:
+        """خلاصه ردیف: فیلدهای شامل کلمات جستجو (یا 3 فیلد اول)"""
+        words = [word.lower() for word in self.search_text.split()]
+        matched = [
+            (key, value) for key, value in data.items()
+            if any(word in str(value).lower() for word in words)
+        ]
+        items = matched or list(data.items())
+        preview = ", ".join(f"{key}: {value}" for key, value in items[:3])
+        if len(items) > 3:
+            preview += "..."
+        return preview or "بدون داده"
+
+    def update_pagination_controls(self):
+        """بروزرسانی کنترل‌های Pagination"""
+        if self.total_records:
+            start = (self.current_page - 1) * self.page_size + 1
+            end = start + len(self.page_rows) - 1
+            self.page_info.setText(f"نمایش {start:,} تا {end:,} از {self.total_records:,}")
+        elif self.search_text:
+            self.page_info.setText("نتیجه‌ای یافت نشد")
+        else:
+            self.page_info.setText("متن جستجو را وارد کنید")
+
+        self.current_page_label.setText(f"صفحه {self.current_page} از {self.total_pages}")
+        self.prev_btn.setEnabled(self.current_page > 1)
+        self.next_btn.setEnabled(self.has_next)
+
+    def apply_search(self):
+        """جستجوی متن وارد شده"""
+        self.search_text = self.search_input.text().strip()
+        self.current_page = 1
+        self.load_data()
+
+    def prev_page(self):
+        """صفحه قبل"""
+        if self.current_page > 1:
+            self.current_page -= 1
+            self.load_data()
+
+    def next_page(self):
+        """صفحه بعد"""
+        if self.has_next:
+            self.current_page += 1
+            self.load_data()
+
+    def on_page_size_changed(self, text: str):
+        """تغییر تعداد ردیف در صفحه"""
+        self.page_size = int(text)
+        self.current_page = 1
+        self.load_data()
+
+    def open_selected(self):
+        """باز کردن جزئیات شیت ردیف انتخاب شده با همین جستجو"""
+        from app.gui.dialogs.sheet_details_dialog import SheetDetailsDialog
+
+        row = self.table.currentRow()
+        if row < 0 or row >= len(self.page_rows):
+            return
+
+        sheet_config_id = self.page_rows[row].sheet_config_id
+        dialog = SheetDetailsDialog(
+            sheet_config_id,
+            self.sheet_names.get(sheet_config_id, str(sheet_config_id)),
+            self,
+            search_text=self.search_text
+        )
+        dialog.exec()
+        self.load_data()
@@ -0,0 +1,339 @@
+"""
+دیالوگ بررسی تکراری‌های ثبت شده (صفحه به صفحه)
+Dialog for reviewing staged duplicate candidates page by page
+"""
+
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget,
+    QTableWidgetItem, QPushButton, QLabel, QComboBox,
+    QMessageBox, QHeaderView, QAbstractItemView
+)
+from PyQt6.QtCore import Qt, pyqtSignal
+from typing import Dict, List
+
+from app.core.database import DatabaseManager
+from app.utils.ui_constants import COLORS, FONTS
+
+
+class DuplicateCandidatesDialog(QDialog):
+    """
+    فهرست تکراری‌های در انتظار بررسی
+
+    فقط یک صفحه از جدول duplicate_candidates در حافظه است و داده کامل هر تکراری
+    هنگام باز کردن پنجره مقایسه بارگذاری می‌شود.
+    """
+
+    log_message = pyqtSignal(str)  # پیام برای لاگ ویجت استخراج
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.db_manager = DatabaseManager()
+
+        # متغیرهای Pagination
+        self.page_size = 100
+        self.current_page = 1
+        self.total_pages = 1
+        self.total_records = 0
+        self.page_candidates = []
+        self.sheet_names = {}
+
+        self.updated_count = 0
+        self.skipped_count = 0
+
+        self.setup_ui()
+        self.load_data()
+
+    def setup_ui(self):
+        """تنظیمات رابط کاربری"""
+        self.setWindowTitle("⚠️ بررسی داده‌های تکراری")
+        self.setLayoutDirection(Qt.LayoutDirection.RightToLeft)
+        self.resize(1000, 650)
+
+        main_layout = QVBoxLayout()
+        main_layout.setSpacing(10)
+        main_layout.setContentsMargins(15, 15, 15, 15)
+
+        # عنوان
+        title = QLabel("🔍 ردیف‌هایی که قبلاً استخراج شده‌اند و در Google Sheet تغییر کرده‌اند")
+        title.setFont(FONTS['medium_bold'])
+        title.setStyleSheet(f"color: {COLORS['warning']}; padding: 5px;")
+        main_layout.addWidget(title)
+
+        # جدول
+        self.table = QTableWidget()
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels([
+            "شیت", "ردیف", "تعداد تفاوت", "فیلدهای تغییر یافته", "کلید یکتا"
+        ])
+        self.table.setAlternatingRowColors(True)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(0, 180)
+        self.table.setColumnWidth(1, 70)
+        self.table.setColumnWidth(2, 90)
+        self.table.setColumnWidth(3, 380)
+        self.table.doubleClicked.connect(self.review_selected)
+        main_layout.addWidget(self.table)
+
+        # دکمه‌های عملیات
+        actions_layout = QHBoxLayout()
+
+        review_btn = QPushButton("🔍 بررسی انتخاب شده‌ها")
+        review_btn.setFont(FONTS['medium'])
+        review_btn.clicked.connect(self.review_selected)
+        actions_layout.addWidget(review_btn)
+
+        skip_btn = QPushButton("⏭️ نگه‌داشتن داده قدیم (انتخاب شده‌ها)")
+        skip_btn.setFont(FONTS['medium'])
+        skip_btn.clicked.connect(self.skip_selected)
+        actions_layout.addWidget(skip_btn)
+
+        actions_layout.addStretch()
+        main_layout.addLayout(actions_layout)
+
+        # ============ Pagination ============
+        pagination_layout = QHBoxLayout()
+
+        self.page_info = QLabel()
+        self.page_info.setFont(FONTS['medium'])
+        pagination_layout.addWidget(self.page_info)
+
+        pagination_layout.addStretch()
+
+        self.prev_btn = QPushButton("▶ قبلی")
+        self.prev_btn.setFont(FONTS['medium'])
+        self.prev_btn.clicked.connect(self.prev_page)
+        pagination_layout.addWidget(self.prev_btn)
+
+        self.current_page_label = QLabel()
+        self.current_page_label.setFont(FONTS['medium_bold'])
+        self.current_page_label.setStyleSheet(f"color: {COLORS['primary']}; padding: 0 15px;")
+        pagination_layout.addWidget(self.current_page_label)
+
+        self.next_btn = QPushButton("بعدی ◀")
+        self.next_btn.setFont(FONTS['medium'])
+        self.next_btn.clicked.connect(self.next_page)
+        pagination_layout.addWidget(self.next_btn)
+
+        pagination_layout.addStretch()
+
+        page_size_label = QLabel("تعداد در صفحه:")
+        page_size_label.setFont(FONTS['medium'])
+        pagination_layout.addWidget(page_size_label)
+
+        self.page_size_combo = QComboBox()
+        self.page_size_combo.addItems(["50", "100", "200", "500"])
+        self.page_size_combo.setCurrentText("100")
+        self.page_size_combo.setFont(FONTS['medium'])
+        self.page_size_combo.currentTextChanged.connect(self.on_page_size_changed)
+        pagination_layout.addWidget(self.page_size_combo)
+
+        main_layout.addLayout(pagination_layout)
+
+        # بستن
+        close_layout = QHBoxLayout()
+        close_layout.addStretch()
+        close_btn = QPushButton("بستن")
+        close_btn.setFont(FONTS['medium'])
+        close_btn.clicked.connect(self.accept)
+        close_layout.addWidget(close_btn)
+        main_layout.addLayout(close_layout)
+
+        self.setLayout(main_layout)
+
+    def load_data(self):
+        """بارگذاری صفحه فعلی تکراری‌ها"""
+        try:
+            if not self.sheet_names:
+                self.sheet_names = {
+                    config.id: config.name for config in self.db_manager.get_all_sheet_configs()
+                }
+
+            offset = (self.current_page - 1) * self.page_size
+            self.page_candidates, self.total_records = self.db_manager.get_duplicate_candidates_paginated(
+                limit=self.page_size,
+                offset=offset
+            )
+            self.total_pages = max(1, (self.total_records + self.page_size - 1) // self.page_size)
+
+            # اگر صفحه آخر با حل تکراری‌ها خالی شد، به صفحه قبل برگرد
+            if not self.page_candidates and self.current_page > 1:
+                self.current_page = self.total_pages
+                return self.load_data()
+
+            self.table.setRowCount(len(self.page_candidates))
+            for row, candidate in enumerate(self.page_candidates):
+                changed_names = list(candidate.changes or {}) + [
+                    f"−{name}" for name in (candidate.removed_fields or [])
+                ]
+                preview = "، ".join(changed_names[:5])
+                if len(changed_names) > 5:
+                    preview += "..."
+
+                values = [
+                    self.sheet_names.get(candidate.sheet_config_id, str(candidate.sheet_config_id)),
+                    str(candidate.row_number),
+                    str(candidate.changed_fields or 0),
+                    preview or "بدون تفاوت",
+                    candidate.unique_key,
+                ]
+                for column, value in enumerate(values):
+                    item = QTableWidgetItem(value)
+                    if column in (1, 2):
+                        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                    self.table.setItem(row, column, item)
+
+            self.update_pagination_controls()
+
+        except Exception as e:
+            QMessageBox.critical(self, "خطا", f"خطا در بارگذاری تکراری‌ها:\n{str(e)}")
+
+    def update_pagination_controls(self):
+        """بروزرسانی کنترل‌های Pagination"""
+        if self.total_records:
+            start = (self.current_page - 1) * self.page_size + 1
+            end = min(self.current_page * self.page_size, self.total_records)
+            self.page_info.setText(f"نمایش {start:,} تا {end:,} از {self.total_records:,}")
+        else:
+            self.page_info.setText("✅ تکراری در انتظار بررسی وجود ندارد")
+
+        self.current_page_label.setText(f"صفحه {self.current_page} از {self.total_pages}")
+        self.prev_btn.setEnabled(self.current_page > 1)
+        self.next_btn.setEnabled(self.current_page < self.total_pages)
+
+    def prev_page(self):
+        """صفحه قبل"""
+        if self.current_page > 1:
+            self.current_page -= 1
+            self.load_data()
+
+    def next_page(self):
+        """صفحه بعد"""
+        if self.current_page < self.total_pages:
+            self.current_page += 1
+            self.load_data()
+
+    def on_page_size_changed(self, text: str):
+        """تغییر تعداد ردیف در صفحه"""
+        self.page_size = int(text)
+        self.current_page = 1
+        self.load_data()
+
+    def selected_candidates(self) -> List:
+        """تکراری‌های انتخاب شده در صفحه فعلی"""
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        return [self.page_candidates[row] for row in rows if row < len(self.page_candidates)]
+
+    def review_selected(self):
+        """نمایش پنجره مقایسه برای هر تکراری انتخاب شده"""
+        from app.gui.dialogs.duplicate_conflict_dialog import DuplicateConflictDialog
+
+        candidates = self.selected_candidates()
+        if not candidates:
+            QMessageBox.information(self, "بررسی", "لطفاً حداقل یک ردیف را انتخاب کنید.")
+            return
+
+        stale_rows = []
+        for candidate in candidates:
+            detail = self.db_manager.get_duplicate_candidate_detail(candidate.id)
+            if not detail:
+                continue
+            if detail['stale']:
+                # رکورد موجود پس از ثبت تکراری تغییر کرده؛ داده جدید قابل بازسازی نیست
+                stale_rows.append(detail['row_number'])
+                continue
+
+            dialog = DuplicateConflictDialog(
+                existing_data=detail['existing_data'],
+                new_data=detail['new_data'],
+                row_number=detail['row_number'],
+                parent=self
+            )
+            if dialog.exec() != dialog.DialogCode.Accepted:
+                # لغو - بقیه انتخاب‌ها هم بررسی نمی‌شوند
+                break
+
+            choice = dialog.get_user_choice()
+            if choice == 'update':
+                self.apply_update(detail)
+            elif choice == 'skip':
+                self.db_manager.resolve_duplicate_candidates([candidate.id], 'skipped')
+                self.skipped_count += 1
+                self.log_message.emit(f"  ⏭️ ردیف {detail['row_number']} نادیده گرفته شد")
+
+        if stale_rows:
+            rows_text = "، ".join(str(row) for row in stale_rows[:10])
+            if len(stale_rows) > 10:
+                rows_text += "..."
+            self.log_message.emit(f"  ⚠️ {len(stale_rows)} تکراری پس از ثبت تغییر کرده و بررسی نشد")
+            QMessageBox.warning(
+                self,
+                "تکراری قدیمی",
+                f"داده موجود ردیف‌های {rows_text} پس از شناسایی تکراری تغییر کرده است.\n\n"
+                "برای مقایسه دوباره، شیت را دوباره استخراج کنید."
+            )
+
+        self.load_data()
+
+    def apply_update(self, detail: Dict):
+        """جایگزینی داده موجود با داده جدید و علامت‌گذاری ردیف در شیت"""
+        # رکورد ممکن است هنگام باز بودن پنجره مقایسه تغییر کرده باشد
+        current = self.db_manager.get_duplicate_candidate_detail(detail['id'])
+        if not current or current['stale']:
+            self.log_message.emit(
+                f"  ⚠️ ردیف {detail['row_number']} هنگام بررسی تغییر کرد و بروزرسانی نشد"
+            )
+            return
+
+        success, saved_data, is_new, message = self.db_manager.save_sales_data(
+            sheet_config_id=detail['sheet_config_id'],
+            row_number=detail['row_number'],
+            unique_key=detail['unique_key'],
+            data=detail['new_data'],
+            update_if_exists=True
+        )
+
+        if not success:
+            self.log_message.emit(f"  ❌ خطا در بروزرسانی ردیف {detail['row_number']}: {message}")
+            return
+
+        self.db_manager.resolve_duplicate_candidates([detail['id']], 'updated')
+        self.updated_count += 1
+        self.log_message.emit(f"  ✅ ردیف {detail['row_number']} بروزرسانی شد")
+
+        # علامت‌گذاری در Google Sheet
+        try:
+            from app.core.google_sheets import GoogleSheetExtractor
+            extractor = GoogleSheetExtractor()
+            extractor.mark_as_extracted(
+                sheet_url=detail['sheet_url'],
+                worksheet_name=detail['worksheet_name'] or 'Sheet1',
+                row_number=detail['row_number'],
+                extracted_column=detail['extracted_column']
+            )
+        except Exception as e:
+            self.log_message.emit(f"    ⚠️ خطا در علامت‌گذاری: {str(e)}")
+
+    def skip_selected(self):
+        """نگه‌داشتن داده قدیم برای همه تکراری‌های انتخاب شده"""
+        candidates = self.selected_candidates()
+        if not candidates:
+            QMessageBox.information(self, "نگه‌داشتن", "لطفاً حداقل یک ردیف را انتخاب کنید.")
+            return
+
+        reply = QMessageBox.question(
+            self,
+            "تایید نگه‌داشتن",
+            f"داده قدیم {len(candidates)} ردیف نگه داشته شود؟\n\n"
+            "داده جدید این ردیف‌ها از Google Sheet نادیده گرفته می‌شود.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        count = self.db_manager.resolve_duplicate_candidates([candidate.id for candidate in candidates], 'skipped')
+        self.skipped_count += count
+        self.log_message.emit(f"  ⏭️ {count} ردیف تکراری نادیده گرفته شد")
+        self.load_data()
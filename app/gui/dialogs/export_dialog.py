@@ -27,40 +27,52 @@ class ExportThread(QThread):
         self.output_path = output_path
         self.logger = app_logger
     
+    @staticmethod
+    def _to_record(item) -> dict:
+        """ردیف خروجی یک رکورد (داده + شناسه و تاریخ استخراج)"""
+        record = dict(item.data)
+        record['_id'] = item.id
+        record['_created_at'] = item.extracted_at.strftime("%Y-%m-%d %H:%M:%S") if item.extracted_at else ""
+        return record
+    
     def run(self):
-        """اجرای تولید خروجی"""
+        """
+        اجرای تولید خروجی
+        
+        داده‌ها دو بار به صورت جریانی خوانده می‌شوند: بار اول ستون‌ها، عرض آن‌ها و تعداد
+        (بدون نگه‌داشتن داده‌ها) و بار دوم نوشتن ردیف‌ها در Workbook حالت write-only؛
+        حافظه مستقل از تعداد رکوردهاست.
+        """
         try:
-            import pandas as pd
             from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
             from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+            from openpyxl.utils import get_column_letter
             
             self.progress.emit(10, "در حال دریافت داده‌ها...")
             
-            # دریافت داده‌های استخراج نشده
-            data_list = db_manager.get_unexported_data(self.export_type)
+            # گذر اول: ستون‌ها (به ترتیب اولین ظهور) -> حداکثر طول مقدار
+            columns = {}
+            total = 0
+            max_id = None
+            for batch in db_manager.iter_unexported_data(self.export_type):
+                for item in batch:
+                    for column, value in self._to_record(item).items():
+                        length = len(str(value))
+                        if columns.get(column, -1) < length:
+                            columns[column] = length
+                total += len(batch)
+                max_id = batch[-1].id
             
-            if not data_list:
+            if not total:
                 self.finished.emit(False, "هیچ داده‌ای برای خروجی یافت نشد!", "")
                 return
             
-            self.progress.emit(30, f"تعداد {len(data_list)} رکورد یافت شد...")
-            
-            # تبدیل به DataFrame
-            records = []
-            for item in data_list:
-                record = item.data.copy()
-                record['_id'] = item.id
-                record['_created_at'] = item.created_at.strftime("%Y-%m-%d %H:%M:%S")
-                records.append(record)
-            
-            df = pd.DataFrame(records)
-            
-            self.progress.emit(50, "در حال ایجاد فایل Excel...")
+            self.progress.emit(30, f"تعداد {total} رکورد یافت شد...")
             
-            # ایجاد Workbook
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Data"
+            # ایجاد Workbook (write-only: ردیف‌ها مستقیم در فایل نوشته می‌شوند)
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("Data")
             
             # استایل هدر
             header_fill = PatternFill(start_color="2196F3", end_color="2196F3", fill_type="solid")
@@ -72,42 +84,47 @@ class ExportThread(QThread):
                 top=Side(style='thin'),
                 bottom=Side(style='thin')
             )
+            cell_alignment = Alignment(horizontal="right")
+            
+            # تنظیم عرض ستون‌ها، فریز سرتیتر و فیلتر (پیش از نوشتن اولین ردیف)
+            column_names = list(columns)
+            for col_idx, column in enumerate(column_names, 1):
+                width = max(columns[column], len(str(column)))
+                ws.column_dimensions[get_column_letter(col_idx)].width = min(width + 2, 50)
+            ws.freeze_panes = "A2"
+            ws.auto_filter.ref = f"A1:{get_column_letter(len(column_names))}{total + 1}"
             
             # نوشتن هدر
-            for col_idx, column in enumerate(df.columns, 1):
-                cell = ws.cell(row=1, column=col_idx, value=column)
+            header = []
+            for column in column_names:
+                cell = WriteOnlyCell(ws, value=column)
                 cell.fill = header_fill
                 cell.font = header_font
                 cell.alignment = header_alignment
                 cell.border = border
+                header.append(cell)
+            ws.append(header)
             
-            self.progress.emit(70, "در حال نوشتن داده‌ها...")
-            
-            # نوشتن داده‌ها
-            for row_idx, row in enumerate(df.values, 2):
-                for col_idx, value in enumerate(row, 1):
-                    cell = ws.cell(row=row_idx, column=col_idx, value=value)
-                    cell.border = border
-                    cell.alignment = Alignment(horizontal="right")
-            
-            # تنظیم عرض ستون‌ها
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # فریز کردن سرتیتر
-            ws.freeze_panes = "A2"
+            self.progress.emit(50, "در حال نوشتن داده‌ها...")
             
-            # افزودن فیلتر
-            ws.auto_filter.ref = ws.dimensions
+            # گذر دوم: نوشتن داده‌ها (رکوردهای استخراج شده پس از گذر اول خارج از این خروجی‌اند)
+            data_ids = []
+            for batch in db_manager.iter_unexported_data(self.export_type, max_id=max_id):
+                for item in batch:
+                    record = self._to_record(item)
+                    row = []
+                    for column in column_names:
+                        cell = WriteOnlyCell(ws, value=record.get(column))
+                        cell.border = border
+                        cell.alignment = cell_alignment
+                        row.append(cell)
+                    ws.append(row)
+                    data_ids.append(item.id)
+                
+                self.progress.emit(
+                    50 + int(40 * len(data_ids) / max(total, len(data_ids))),
+                    f"در حال نوشتن داده‌ها... ({len(data_ids):,} از {total:,})"
+                )
             
             self.progress.emit(90, "در حال ذخیره فایل...")
             
@@ -115,11 +132,10 @@ class ExportThread(QThread):
             wb.save(self.output_path)
             
             # علامت‌گذاری رکوردها
-            data_ids = [item.id for item in data_list]
             db_manager.mark_as_exported(data_ids, self.export_type)
             
             self.progress.emit(100, "تمام!")
-            self.finished.emit(True, f"✅ {len(data_list)} رکورد با موفقیت خروجی گرفته شد!", self.output_path)
+            self.finished.emit(True, f"✅ {len(data_ids)} رکورد با موفقیت خروجی گرفته شد!", self.output_path)
             
         except Exception as e:
             self.logger.error(f"خطا در تولید خروجی: {str(e)}")
@@ -5,7 +5,7 @@ from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
     QLineEdit, QPushButton, QCheckBox, QLabel, 
     QMessageBox, QGroupBox, QFileDialog, QTabWidget,
-    QTextEdit, QSpinBox
+    QTextEdit, QSpinBox, QComboBox
 )
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont
@@ -208,6 +208,21 @@ class SettingsDialog(QDialog):
         db_group.setLayout(db_layout)
         layout.addWidget(db_group)
         
+        # پروفایل اتصال SQLite
+        from app.models.sqlite_profile import SQLITE_PROFILE_LABELS
+        
+        profile_group = QGroupBox("⚡ پروفایل اتصال SQLite")
+        profile_layout = QFormLayout()
+        
+        self.sqlite_profile_combo = QComboBox()
+        for name, label in SQLITE_PROFILE_LABELS.items():
+            self.sqlite_profile_combo.addItem(label, name)
+        self.sqlite_profile_combo.setToolTip("پس از ذخیره، با راه‌اندازی مجدد برنامه اعمال می‌شود")
+        profile_layout.addRow("پروفایل:", self.sqlite_profile_combo)
+        
+        profile_group.setLayout(profile_layout)
+        layout.addWidget(profile_group)
+        
         # عملیات دیتابیس
         ops_group = QGroupBox("🔧 عملیات دیتابیس")
         ops_layout = QVBoxLayout()
@@ -346,6 +361,11 @@ class SettingsDialog(QDialog):
         # خروجی
         self.export_path_input.setText(os.getenv("EXPORT_PATH", "data/exports"))
         self.template_path_input.setText(os.getenv("TEMPLATE_PATH", "templates"))
+        
+        # دیتابیس
+        from app.models.sqlite_profile import get_sqlite_profile_name
+        index = self.sqlite_profile_combo.findData(get_sqlite_profile_name())
+        self.sqlite_profile_combo.setCurrentIndex(max(index, 0))
     
     def save_settings(self):
         """ذخیره تنظیمات"""
@@ -364,6 +384,7 @@ class SettingsDialog(QDialog):
                 "BATCH_SIZE": str(self.batch_size_input.value()),
                 "EXPORT_PATH": self.export_path_input.text(),
                 "TEMPLATE_PATH": self.template_path_input.text(),
+                "SQLITE_PROFILE": self.sqlite_profile_combo.currentData(),
             }
             
             for key, value in settings.items():
@@ -394,6 +415,7 @@ class SettingsDialog(QDialog):
             self.batch_size_input.setValue(100)
             self.export_path_input.setText("data/exports")
             self.template_path_input.setText("templates")
+            self.sqlite_profile_combo.setCurrentIndex(0)
             
             QMessageBox.information(self, "موفق", "✅ تنظیمات به حالت پیش‌فرض بازگردانده شد!")
     
@@ -453,6 +475,8 @@ class SettingsDialog(QDialog):
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_file = backup_dir / f"gt_land_{timestamp}.db"
             
+            self.flush_wal()
+            
             shutil.copy2("data/gt_land.db", backup_file)
             
             QMessageBox.information(
@@ -481,15 +505,23 @@ class SettingsDialog(QDialog):
             from app.models import engine
             from sqlalchemy import text
             
+            from app.core.database import db_manager
+            
             # ANALYZE برای بهینه‌سازی query ها
             with engine.begin() as conn:
                 conn.execute(text("ANALYZE"))
             
+            # بازسازی شمارنده‌های آماری شیت‌ها
+            db_manager.rebuild_sheet_stats()
+            
+            # ادغام ایندکس جستجوی متن کامل
+            db_manager.optimize_search_index()
+            
             QMessageBox.information(
                 self, 
                 "موفق", 
                 "✅ دیتابیس بهینه‌سازی شد!\n\n"
-                "آمارهای جداول بروزرسانی شدند."
+                "آمارهای جداول، شمارنده‌های شیت‌ها و ایندکس جستجو بروزرسانی شدند."
             )
             
         except Exception as e:
@@ -583,6 +615,8 @@ class SettingsDialog(QDialog):
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_file = backup_dir / f"before_archive_{timestamp}.db"
             
+            self.flush_wal()
+            
             shutil.copy2("data/gt_land.db", backup_file)
             self.logger.success(f"✅ پشتیبان ایجاد شد: {backup_file}")
             
@@ -607,6 +641,7 @@ class SettingsDialog(QDialog):
             archive_db_path = archive_dir / f"archive_{timestamp}.db"
             
             # کپی کامل دیتابیس به آرشیو
+            self.flush_wal()
             shutil.copy2("data/gt_land.db", archive_db_path)
             self.logger.success(f"✅ دیتابیس آرشیو ایجاد شد: {archive_db_path}")
             
@@ -692,6 +727,8 @@ class SettingsDialog(QDialog):
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_file = backup_dir / f"before_clear_{timestamp}.db"
             
+            self.flush_wal()
+            
             shutil.copy2("data/gt_land.db", backup_file)
             self.logger.info(f"پشتیبان اضطراری: {backup_file}")
             
@@ -806,10 +843,14 @@ class SettingsDialog(QDialog):
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             current_backup = backup_dir / f"before_restore_{timestamp}.db"
             
+            self.flush_wal()
+            
             shutil.copy2("data/gt_land.db", current_backup)
             self.logger.info(f"پشتیبان فعلی: {current_backup}")
             
-            # 2. جایگزینی دیتابیس
+            # 2. جایگزینی دیتابیس (اتصال‌های باز بسته می‌شوند تا فایل WAL قدیمی روی فایل جدید اعمال نشود)
+            from app.models import engine
+            engine.dispose()
             shutil.copy2(file_path, "data/gt_land.db")
             self.logger.success("✅ دیتابیس بازیابی شد")
             
@@ -891,7 +932,8 @@ class SettingsDialog(QDialog):
     def show_database_stats(self):
         """نمایش آمار کامل دیتابیس"""
         from app.core.database import db_manager
-        from app.models import SalesData, SheetConfig, ExportTemplate, ProcessLog, ExportLog
+        from app.models import SalesData, SheetConfig, ExportTemplate, ProcessLog, ExportLog, engine
+        from app.models.sqlite_profile import describe_sqlite_connection
         from pathlib import Path
         import os
         
@@ -908,9 +950,14 @@ class SettingsDialog(QDialog):
             # حجم دیتابیس
             db_path = Path("data/gt_land.db")
             db_size = os.path.getsize(db_path) / 1024 / 1024  # MB
+            wal_path = Path(f"{db_path}-wal")
+            wal_size = os.path.getsize(wal_path) / 1024 / 1024 if wal_path.exists() else 0.0
             
             db.close()
             
+            # پروفایل اتصال
+            pragmas = describe_sqlite_connection(engine)
+            
             # ساخت پیام
             msg = f"""
 📊 آمار کامل دیتابیس
@@ -918,9 +965,17 @@ class SettingsDialog(QDialog):
 
 📁 اطلاعات فایل:
   • مسیر: {db_path}
-  • حجم: {db_size:.2f} MB
+  • حجم: {db_size:.2f} MB (WAL: {wal_size:.2f} MB)
   • نوع: SQLite
 
+⚡ پروفایل اتصال: {pragmas['profile']}
+  • journal_mode: {pragmas['journal_mode']}
+  • synchronous: {pragmas['synchronous']}
+  • cache_size: {pragmas['cache_size']}
+  • mmap_size: {pragmas['mmap_size']:,}
+  • temp_store: {pragmas['temp_store']}
+  • busy_timeout: {pragmas['busy_timeout']} ms
+
 {'=' * 50}
 
 📊 آمار جداول:
@@ -950,6 +1005,14 @@ class SettingsDialog(QDialog):
         except Exception as e:
             QMessageBox.critical(self, "خطا", f"خطا در دریافت آمار:\n{str(e)}")
     
+    def flush_wal(self):
+        """انتقال تراکنش‌های فایل WAL به فایل اصلی پیش از کپی دیتابیس"""
+        from app.models import engine
+        from app.models.sqlite_profile import checkpoint_wal
+        
+        if not checkpoint_wal(engine):
+            self.logger.warning("⚠️ checkpoint کامل نشد - ممکن است آخرین تغییرات در کپی نباشد")
+    
     def get_button_style(self, color):
         """استایل دکمه"""
         return f"""
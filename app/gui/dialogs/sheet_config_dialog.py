@@ -173,6 +173,14 @@ class SheetConfigDialog(QDialog):
         self.unique_cols_input.setText("A,B,C")
         unique_layout.addWidget(self.unique_cols_input)
         
+        indexed_label = QLabel("فیلدهای ایندکس شده برای جستجوی سریع (نام ستون داده، با کاما - اختیاری)")
+        indexed_label.setStyleSheet("color: #666; font-size: 8pt;")
+        unique_layout.addWidget(indexed_label)
+        
+        self.indexed_fields_input = QLineEdit()
+        self.indexed_fields_input.setPlaceholderText("مثال: CODE,TR_ID,Customer")
+        unique_layout.addWidget(self.indexed_fields_input)
+        
         unique_group.setLayout(unique_layout)
         layout.addWidget(unique_group)
         
@@ -252,6 +260,10 @@ class SheetConfigDialog(QDialog):
             unique_cols = ",".join(self.sheet_config.unique_key_columns)
             self.unique_cols_input.setText(unique_cols)
         
+        # فیلدهای ایندکس شده
+        if self.sheet_config.indexed_fields:
+            self.indexed_fields_input.setText(",".join(self.sheet_config.indexed_fields))
+        
         # ستون‌های استخراج
         if hasattr(self.sheet_config, 'columns_to_extract') and self.sheet_config.columns_to_extract:
             extract_cols = ",".join(self.sheet_config.columns_to_extract)
@@ -393,6 +405,10 @@ class SheetConfigDialog(QDialog):
             columns_text = self.columns_to_extract_input.text().strip()
             columns_to_extract = [col.strip() for col in columns_text.split(",")] if columns_text else None
             
+            # فیلدهای ایندکس شده (ایندکس‌ها هنگام ذخیره ساخته می‌شوند)
+            indexed_text = self.indexed_fields_input.text().strip()
+            indexed_fields = [field.strip() for field in indexed_text.split(",")] if indexed_text else None
+            
             # نقشه ستون‌ها حذف شد (ساده‌سازی)
             column_mappings = None
             
@@ -408,6 +424,7 @@ class SheetConfigDialog(QDialog):
                 'extracted_column': self.extracted_col_input.text().strip(),
                 'unique_key_columns': unique_cols,
                 'columns_to_extract': columns_to_extract,
+                'indexed_fields': indexed_fields,
                 'column_mappings': column_mappings,
                 'is_active': self.active_checkbox.isChecked()
             }
@@ -6,7 +6,7 @@ Dialog for displaying detailed records of a specific sheet
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, 
     QTableWidgetItem, QPushButton, QLabel, QCheckBox,
-    QComboBox, QMessageBox, QHeaderView, QWidget
+    QComboBox, QMessageBox, QHeaderView, QWidget, QLineEdit
 )
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QColor
@@ -22,7 +22,7 @@ class SheetDetailsDialog(QDialog):
     
     data_updated = pyqtSignal()  # سیگنال برای refresh کردن
     
-    def __init__(self, sheet_config_id: int, sheet_name: str, parent=None):
+    def __init__(self, sheet_config_id: int, sheet_name: str, parent=None, search_text: str = ""):
         super().__init__(parent)
         self.sheet_config_id = sheet_config_id
         self.sheet_name = sheet_name
@@ -35,6 +35,22 @@ class SheetDetailsDialog(QDialog):
         self.total_records = 0
         self.current_filter = "all"  # all, exported, not_exported, updated
         
+        # صفحه‌بندی keyset: مکان‌نمای صفحه فعلی و id های اول/آخر آن
+        self.page_cursor = {}  # {} | {'after_id': id} | {'before_id': id}
+        self.page_first_id = None
+        self.page_last_id = None
+        self.page_row_count = 0
+        self.has_prev = False
+        self.has_next = False
+        
+        # فیلتر کلیدهای ایندکس شده داده JSON: [(کلید, عملگر, مقدار)]
+        self.field_filters = []
+        sheet_config = self.db_manager.get_sheet_config(sheet_config_id)
+        self.indexed_fields = (sheet_config.indexed_fields or []) if sheet_config else []
+        
+        # جستجوی متن کامل (نتایج به ترتیب رتبه، صفحه‌بندی با offset)
+        self.search_text = search_text.strip()
+        
         self.setup_ui()
         self.load_data()
         
@@ -121,6 +137,66 @@ class SheetDetailsDialog(QDialog):
         
         filter_layout.addSpacing(20)
         
+        # جستجوی متن کامل در مقادیر ردیف‌ها
+        search_label = QLabel("🔍 جستجو:")
+        search_label.setFont(FONTS['medium'])
+        filter_layout.addWidget(search_label)
+        
+        self.search_input = QLineEdit(self.search_text)
+        self.search_input.setPlaceholderText("نام، ایمیل، تلفن، کد...")
+        self.search_input.setFont(FONTS['medium'])
+        self.search_input.setMinimumWidth(220)
+        self.search_input.returnPressed.connect(self.apply_search)
+        filter_layout.addWidget(self.search_input)
+        
+        search_btn = QPushButton("جستجو")
+        search_btn.setFont(FONTS['medium'])
+        search_btn.clicked.connect(self.apply_search)
+        filter_layout.addWidget(search_btn)
+        
+        search_clear_btn = QPushButton("✖")
+        search_clear_btn.setToolTip("حذف جستجو")
+        search_clear_btn.setFont(FONTS['medium'])
+        search_clear_btn.clicked.connect(self.clear_search)
+        filter_layout.addWidget(search_clear_btn)
+        
+        filter_layout.addSpacing(20)
+        
+        # جستجو روی فیلدهای ایندکس شده (تنظیمات شیت)
+        if self.indexed_fields:
+            field_label = QLabel("🔎 فیلد:")
+            field_label.setFont(FONTS['medium'])
+            filter_layout.addWidget(field_label)
+            
+            self.field_combo = QComboBox()
+            self.field_combo.addItems(self.indexed_fields)
+            self.field_combo.setFont(FONTS['medium'])
+            filter_layout.addWidget(self.field_combo)
+            
+            self.field_operator_combo = QComboBox()
+            self.field_operator_combo.addItems(["=", ">=", "<="])
+            self.field_operator_combo.setFont(FONTS['medium'])
+            filter_layout.addWidget(self.field_operator_combo)
+            
+            self.field_value_input = QLineEdit()
+            self.field_value_input.setPlaceholderText("مقدار")
+            self.field_value_input.setFont(FONTS['medium'])
+            self.field_value_input.returnPressed.connect(self.apply_field_filter)
+            filter_layout.addWidget(self.field_value_input)
+            
+            field_search_btn = QPushButton("جستجو")
+            field_search_btn.setFont(FONTS['medium'])
+            field_search_btn.clicked.connect(self.apply_field_filter)
+            filter_layout.addWidget(field_search_btn)
+            
+            field_clear_btn = QPushButton("✖")
+            field_clear_btn.setToolTip("حذف فیلتر فیلد")
+            field_clear_btn.setFont(FONTS['medium'])
+            field_clear_btn.clicked.connect(self.clear_field_filter)
+            filter_layout.addWidget(field_clear_btn)
+            
+            filter_layout.addSpacing(20)
+        
         # آمار
         self.stats_label = QLabel()
         self.stats_label.setFont(FONTS['medium'])
@@ -271,45 +347,72 @@ class SheetDetailsDialog(QDialog):
     def load_data(self):
         """بارگذاری داده‌ها با Pagination"""
         try:
-            # محاسبه Offset
-            offset = (self.current_page - 1) * self.page_size
-            
-            # بارگذاری بر اساس فیلتر
-            if self.current_filter == "all":
-                data_list, total = self.db_manager.get_all_sales_data_paginated(
+            if self.search_text:
+                # صفحه‌ای از id های نتایج جستجو به ترتیب رتبه
+                data_ids, has_more = self.db_manager.search_sales_data(
+                    self.search_text,
+                    sheet_config_id=self.sheet_config_id,
+                    status=self.current_filter,
+                    field_filters=self.field_filters,
                     limit=self.page_size,
-                    offset=offset,
-                    sheet_config_id=self.sheet_config_id
+                    offset=(self.current_page - 1) * self.page_size
                 )
-            elif self.current_filter == "exported":
-                data_list, total = self.db_manager.get_sales_data_by_export_status_paginated(
-                    is_exported=True,
-                    limit=self.page_size,
-                    offset=offset,
-                    sheet_config_id=self.sheet_config_id
+                data_list = self.db_manager.get_sales_data_by_ids(data_ids)
+                
+                if not data_list and self.current_page > 1:
+                    # ردیف‌های صفحه آخر حذف شدند - بازگشت به صفحه قبل
+                    self.current_page -= 1
+                    return self.load_data()
+                
+                self.has_prev, self.has_next = self.current_page > 1, has_more
+                
+                total = self.db_manager.get_sales_data_search_count(
+                    self.search_text, self.sheet_config_id, self.current_filter, self.field_filters
                 )
-            elif self.current_filter == "not_exported":
-                data_list, total = self.db_manager.get_sales_data_by_export_status_paginated(
-                    is_exported=False,
+            else:
+                # بارگذاری صفحه از مکان‌نمای فعلی (بدون OFFSET)
+                data_list, has_more = self.db_manager.get_sales_data_page(
+                    status=self.current_filter,
+                    sheet_config_id=self.sheet_config_id,
                     limit=self.page_size,
-                    offset=offset,
-                    sheet_config_id=self.sheet_config_id
+                    field_filters=self.field_filters,
+                    **self.page_cursor
                 )
-            else:  # updated
-                data_list, total = self.db_manager.get_updated_sales_data_paginated(
-                    limit=self.page_size,
-                    offset=offset,
-                    sheet_config_id=self.sheet_config_id
+                
+                if 'before_id' in self.page_cursor and not has_more:
+                    # به ابتدای داده‌ها رسیدیم - صفحه اول کامل بارگذاری شود
+                    self.current_page = 1
+                    self.page_cursor = {}
+                    return self.load_data()
+                
+                if not data_list and self.current_page > 1:
+                    # ردیف‌های صفحه آخر حذف شدند - بازگشت به صفحه قبل
+                    self.current_page -= 1
+                    self.page_cursor = {'before_id': self.page_first_id} if self.page_first_id else {}
+                    return self.load_data()
+                
+                if 'before_id' in self.page_cursor:
+                    self.has_prev, self.has_next = True, True
+                else:
+                    self.has_prev, self.has_next = 'after_id' in self.page_cursor, has_more
+                
+                # تعداد کل از شمارنده‌های شیت
+                total = self.db_manager.get_sales_data_filter_count(
+                    self.current_filter, self.sheet_config_id, self.field_filters
                 )
             
+            self.page_first_id = data_list[0].id if data_list else None
+            self.page_last_id = data_list[-1].id if data_list else None
+            self.page_row_count = len(data_list)
+            
             self.total_records = total
-            self.total_pages = (total + self.page_size - 1) // self.page_size
+            self.total_pages = max(1, (total + self.page_size - 1) // self.page_size)
             
             # پاک کردن Table
             self.table.setRowCount(0)
             
             # محاسبه شماره ردیف شروع
-            start_row_number = offset + 1
+            start_row_number = (self.current_page - 1) * self.page_size + 1
             
             # پر کردن Table
             for idx, data in enumerate(data_list):
@@ -378,7 +481,7 @@ class SheetDetailsDialog(QDialog):
                 self.table.setItem(row, 6, update_item)
                 
                 # دکمه‌های عملیات
-                ops_widget = self.create_operation_buttons(data.id)
+                ops_widget = self.create_operation_buttons(data.id, data.is_updated)
                 self.table.setCellWidget(row, 7, ops_widget)
             
             # آپدیت آمار و Pagination
@@ -388,7 +491,7 @@ class SheetDetailsDialog(QDialog):
         except Exception as e:
             QMessageBox.critical(self, "خطا", f"خطا در بارگذاری داده‌ها:\n{str(e)}")
     
-    def create_operation_buttons(self, data_id: int) -> QWidget:
+    def create_operation_buttons(self, data_id: int, is_updated: bool) -> QWidget:
         """ایجاد دکمه‌های عملیات برای هر ردیف"""
         widget = QWidget()
         layout = QHBoxLayout(widget)
@@ -396,8 +499,7 @@ class SheetDetailsDialog(QDialog):
         layout.setSpacing(5)
         
         # دکمه نمایش تغییرات (فقط برای ردیف‌های updated)
-        data = self.db_manager.get_sales_data_by_id(data_id)
-        if data and data.is_updated:
+        if is_updated:
             changes_btn = QPushButton("🔍")
             changes_btn.setToolTip("نمایش تغییرات")
             changes_btn.setFixedSize(35, 25)
@@ -486,6 +588,8 @@ class SheetDetailsDialog(QDialog):
         }
         
         filter_text = filter_names.get(self.current_filter, "همه")
+        if self.search_text:
+            filter_text += f" (جستجو: «{self.search_text}»)"
         self.stats_label.setText(
             f"📊 {filter_text}: {self.total_records:,} ردیف"
         )
@@ -494,32 +598,35 @@ class SheetDetailsDialog(QDialog):
         """آپدیت کنترل‌های Pagination"""
         # اطلاعات صفحه
         start = (self.current_page - 1) * self.page_size + 1
-        end = min(self.current_page * self.page_size, self.total_records)
+        end = start + self.page_row_count - 1
         self.page_info.setText(f"نمایش {start:,} تا {end:,} از {self.total_records:,}")
         
         # شماره صفحه
         self.current_page_label.setText(f"صفحه {self.current_page} از {self.total_pages}")
         
         # فعال/غیرفعال کردن دکمه‌ها
-        self.prev_btn.setEnabled(self.current_page > 1)
-        self.next_btn.setEnabled(self.current_page < self.total_pages)
+        self.prev_btn.setEnabled(self.has_prev)
+        self.next_btn.setEnabled(self.has_next)
     
     def prev_page(self):
         """صفحه قبل"""
-        if self.current_page > 1:
+        if self.has_prev:
             self.current_page -= 1
+            self.page_cursor = {'before_id': self.page_first_id}
             self.load_data()
     
     def next_page(self):
         """صفحه بعد"""
-        if self.current_page < self.total_pages:
+        if self.has_next:
             self.current_page += 1
+            self.page_cursor = {'after_id': self.page_last_id}
             self.load_data()
     
     def on_page_size_changed(self, text: str):
         """تغییر تعداد ردیف در صفحه"""
         self.page_size = int(text)
         self.current_page = 1
+        self.page_cursor = {}
         self.load_data()
     
     def on_filter_changed(self, index: int):
@@ -527,8 +634,55 @@ class SheetDetailsDialog(QDialog):
         filters = ["all", "exported", "not_exported", "updated"]
         self.current_filter = filters[index]
         self.current_page = 1
+        self.page_cursor = {}
+        self.load_data()
+    
+    def apply_field_filter(self):
+        """اعمال فیلتر فیلد ایندکس شده"""
+        value = self.field_value_input.text().strip()
+        if not value:
+            self.clear_field_filter()
+            return
+        
+        self.field_filters = [(
+            self.field_combo.currentText(),
+            self.field_operator_combo.currentText(),
+            value
+        )]
+        self.current_page = 1
+        self.page_cursor = {}
+        self.load_data()
+    
+    def clear_field_filter(self):
+        """حذف فیلتر فیلد"""
+        self.field_value_input.clear()
+        if self.field_filters:
+            self.field_filters = []
+            self.current_page = 1
+            self.page_cursor = {}
+            self.load_data()
+    
+    def apply_search(self):
+        """اعمال جستجوی متن کامل"""
+        search_text = self.search_input.text().strip()
+        if not search_text:
+            self.clear_search()
+            return
+        
+        self.search_text = search_text
+        self.current_page = 1
+        self.page_cursor = {}
         self.load_data()
     
+    def clear_search(self):
+        """حذف جستجوی متن کامل"""
+        self.search_input.clear()
+        if self.search_text:
+            self.search_text = ""
+            self.current_page = 1
+            self.page_cursor = {}
+            self.load_data()
+    
     def select_all(self):
         """انتخاب همه ردیف‌های صفحه جاری"""
         for row in range(self.table.rowCount()):
@@ -49,82 +49,76 @@ class TransferThread(QThread):
                     if not sheet_config:
                         continue
                     
-                    sheet_name = sheet_config['name']
+                    sheet_name = sheet_config.name
                     self.progress.emit(
                         int((i / len(self.sheet_ids)) * 50),
                         f"📊 در حال پردازش: {sheet_name}"
                     )
                     
-                    # گرفتن داده‌های استخراج شده که هنوز منتقل نشده‌اند
-                    if self.options.get('only_non_transferred', True):
-                        # فقط داده‌های منتقل نشده
-                        data_rows = db_manager.get_extracted_data(
-                            sheet_id, 
-                            include_exported=True
-                        )
-                        # فیلتر: فقط ردیف‌هایی که transferred != 1
-                        data_rows = [row for row in data_rows if row.get('transferred') != 1]
-                    else:
-                        # همه داده‌ها
-                        data_rows = db_manager.get_extracted_data(
-                            sheet_id,
-                            include_exported=True
+                    # تشخیص نوع شیت
+                    sheet_type = self._detect_sheet_type(sheet_name)
+                    
+                    # خواندن جریانی داده‌های استخراج شده (فقط منتقل نشده‌ها در صورت انتخاب)؛
+                    # فقط id ها برای علامت‌گذاری نگه داشته می‌شوند
+                    transferred_ids = []
+                    for batch in db_manager.iter_extracted_data(
+                        sheet_id,
+                        include_exported=True,
+                        only_non_transferred=self.options.get('only_non_transferred', True)
+                    ):
+                        total_stats["total_rows"] += len(batch)
+                        
+                        # تبدیل به raw_data
+                        self.progress.emit(
+                            int((i / len(self.sheet_ids)) * 50) + 10,
+                            f"🔄 تبدیل {len(transferred_ids) + len(batch)} ردیف به raw_data..."
                         )
+                        
+                        for j, row in enumerate(batch, len(transferred_ids)):
+                            try:
+                                # بررسی وجود در raw_data
+                                data_dict = row.data
+                                unique_key = generate_unique_key(
+                                    data_dict,
+                                    ['CODE', 'TR_ID', 'Sold_Date', 'Customer', 'Rate']
+                                )
+                                
+                                existing = financial_db.query(RawData).filter(
+                                    RawData.unique_key == unique_key
+                                ).first()
+                                
+                                if not existing:
+                                    # ایجاد RawData جدید
+                                    raw = RawData(
+                                        sheet_name=sheet_name,
+                                        sheet_id=sheet_id,
+                                        unique_key=unique_key,
+                                        unique_key_fields=['CODE', 'TR_ID', 'Sold_Date', 'Customer', 'Rate'],
+                                        data=data_dict,
+                                        row_number=row.row_number,
+                                        is_extracted=True,  # برای پردازش
+                                        is_processed=False,
+                                        import_source='gt_land_transfer'
+                                    )
+                                    financial_db.add(raw)
+                                    total_stats["new_rows"] += 1
+                                
+                                financial_db.commit()
+                                
+                            except Exception as e:
+                                financial_db.rollback()
+                                total_stats["errors"] += 1
+                                print(f"❌ خطا در ردیف {j}: {e}")
+                        
+                        transferred_ids.extend(row.id for row in batch)
                     
-                    if not data_rows:
+                    if not transferred_ids:
                         self.progress.emit(
                             int((i / len(self.sheet_ids)) * 50),
                             f"⚠️ {sheet_name}: داده‌ای برای انتقال یافت نشد"
                         )
                         continue
                     
-                    total_stats["total_rows"] += len(data_rows)
-                    
-                    # تبدیل به raw_data
-                    self.progress.emit(
-                        int((i / len(self.sheet_ids)) * 50) + 10,
-                        f"🔄 تبدیل {len(data_rows)} ردیف به raw_data..."
-                    )
-                    
-                    # تشخیص نوع شیت
-                    sheet_type = self._detect_sheet_type(sheet_name)
-                    
-                    for j, row in enumerate(data_rows):
-                        try:
-                            # بررسی وجود در raw_data
-                            data_dict = row['data']
-                            unique_key = generate_unique_key(
-                                data_dict,
-                                ['CODE', 'TR_ID', 'Sold_Date', 'Customer', 'Rate']
-                            )
-                            
-                            existing = financial_db.query(RawData).filter(
-                                RawData.unique_key == unique_key
-                            ).first()
-                            
-                            if not existing:
-                                # ایجاد RawData جدید
-                                raw = RawData(
-                                    sheet_name=sheet_name,
-                                    sheet_id=sheet_id,
-                                    unique_key=unique_key,
-                                    unique_key_fields=['CODE', 'TR_ID', 'Sold_Date', 'Customer', 'Rate'],
-                                    data=data_dict,
-                                    row_number=row['row_number'],
-                                    is_extracted=True,  # برای پردازش
-                                    is_processed=False,
-                                    import_source='gt_land_transfer'
-                                )
-                                financial_db.add(raw)
-                                total_stats["new_rows"] += 1
-                            
-                            financial_db.commit()
-                            
-                        except Exception as e:
-                            financial_db.rollback()
-                            total_stats["errors"] += 1
-                            print(f"❌ خطا در ردیف {j}: {e}")
-                    
                     # پردازش (Stage 1 → Stage 2)
                     if self.options.get('auto_process', True):
                         self.progress.emit(
@@ -148,10 +142,13 @@ class TransferThread(QThread):
                             f"✅ علامت‌گذاری {sheet_name} به عنوان منتقل شده..."
                         )
                         
-                        # بروزرسانی فیلد transferred در sales_data
-                        for row in data_rows:
-                            db_manager.mark_as_transferred(row['id'])
-                            total_stats["marked_transferred"] += 1
+                        # بروزرسانی فیلد transferred در sales_data (همه ردیف‌ها در یک تراکنش)
+                        with db_manager.unit_of_work():
+                            for data_id in transferred_ids:
+                                if db_manager.mark_as_transferred(data_id):
+                                    total_stats["marked_transferred"] += 1
+                                else:
+                                    total_stats["errors"] += 1
                     
                 except Exception as e:
                     self.error.emit(f"خطا در {sheet_name}: {str(e)}")
@@ -331,17 +328,16 @@ class TransferToStage2Dialog(QDialog):
                 continue
             
             # نام شیت
-            self.sheets_table.setItem(i, 0, QTableWidgetItem(sheet_config['name']))
+            self.sheets_table.setItem(i, 0, QTableWidgetItem(sheet_config.name))
             
-            # تعداد داده‌های منتقل نشده
-            all_data = self.db_manager.get_extracted_data(sheet_id, include_exported=True)
-            non_transferred = [row for row in all_data if row.get('transferred') != 1]
+            # تعداد داده‌های منتقل نشده (از شمارنده‌های شیت، بدون خواندن داده‌ها)
+            non_transferred = self.db_manager.count_non_transferred_data(sheet_id)
             
-            self.sheets_table.setItem(i, 1, QTableWidgetItem(f"{len(non_transferred)} ردیف"))
-            total_rows += len(non_transferred)
+            self.sheets_table.setItem(i, 1, QTableWidgetItem(f"{non_transferred} ردیف"))
+            total_rows += non_transferred
             
             # وضعیت
-            if len(non_transferred) > 0:
+            if non_transferred > 0:
                 status = "✅ آماده انتقال"
             else:
                 status = "⚠️ همه منتقل شده"
@@ -41,6 +41,15 @@ class MainWindow(QMainWindow):
         self.logger = app_logger
         self.init_ui()
         self.load_statistics()
+        self.start_outbox_drainer()
+    
+    def start_outbox_drainer(self):
+        """شروع ارسال پس‌زمینه علامت‌گذاری‌های در انتظار (پس از شکست یا راه‌اندازی مجدد)"""
+        try:
+            from app.core.sheets_outbox import start_background_drainer
+            start_background_drainer()
+        except Exception as e:
+            self.logger.warning(f"⚠️ صف علامت‌گذاری راه‌اندازی نشد: {str(e)}")
     
     def init_ui(self):
         """راه‌اندازی رابط کاربری"""
@@ -811,6 +820,8 @@ class MainWindow(QMainWindow):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
+            from app.core.sheets_outbox import stop_background_drainer
+            stop_background_drainer()
             self.logger.info("برنامه بسته شد")
             event.accept()
         else:
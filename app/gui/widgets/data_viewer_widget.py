@@ -5,7 +5,7 @@
 
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QScrollArea, QFrame, QCheckBox,
-                             QMessageBox, QGridLayout)
+                             QMessageBox, QGridLayout, QLineEdit)
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont
 from app.utils.ui_constants import COLORS
@@ -149,6 +149,29 @@ class DataViewerWidget(QWidget):
         refresh_btn.clicked.connect(self.load_sheets)
         layout.addWidget(refresh_btn)
         
+        # جستجو در داده‌های همه شیت‌ها
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("🔍 جستجو در داده‌ها (نام، ایمیل، تلفن، کد...)")
+        self.search_input.setMinimumWidth(280)
+        self.search_input.returnPressed.connect(self.search_all_data)
+        layout.addWidget(self.search_input)
+        
+        search_btn = QPushButton("🔍 جستجو")
+        search_btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {COLORS['primary']};
+                color: white;
+                border: none;
+                border-radius: 6px;
+                padding: 10px 20px;
+            }}
+            QPushButton:hover {{
+                background-color: {COLORS['accent']};
+            }}
+        """)
+        search_btn.clicked.connect(self.search_all_data)
+        layout.addWidget(search_btn)
+        
         layout.addStretch()
         
         # دکمه انتخاب همه
@@ -613,6 +636,13 @@ class DataViewerWidget(QWidget):
         dialog.exec()
         self.load_sheets()  # Refresh
     
+    def search_all_data(self):
+        """جستجوی متن کامل در داده‌های همه شیت‌ها"""
+        from app.gui.dialogs.data_search_dialog import DataSearchDialog
+        dialog = DataSearchDialog(self.search_input.text(), self)
+        dialog.exec()
+        self.load_sheets()  # Refresh
+    
     def open_sheet_details(self, stat):
         """متد سازگار با نسخه قبلی"""
         self.show_sheet_details(stat['sheet_config_id'])
@@ -11,6 +11,7 @@ from PyQt6.QtGui import QFont
 
 from app.core.database import db_manager
 from app.core.google_sheets import GoogleSheetExtractor
+from app.core.extraction_scheduler import ExtractionScheduler
 from app.core.logger import app_logger
 from app.models import ProcessLog
 from app.utils.ui_constants import (
@@ -27,11 +28,14 @@ class ExtractionThread(QThread):
     stats_update = pyqtSignal(dict)  # آمار لحظه‌ای
     finished = pyqtSignal(bool, str, dict)
     
-    def __init__(self, selected_sheet_ids=None):
+    def __init__(self, selected_sheet_ids=None, force=False, resume=False):
         super().__init__()
         self.logger = app_logger
         self.extractor = GoogleSheetExtractor()
         self.selected_sheet_ids = selected_sheet_ids
+        self.force = force  # استخراج کامل بدون توجه به اثر انگشت تغییرات
+        self.resume = resume  # ادامه آخرین اجرای نیمه‌کاره از نقاط بازیابی
+        self.run_id = None
         self.is_cancelled = False
     
     def cancel(self):
@@ -80,7 +84,7 @@ class ExtractionThread(QThread):
             total_updated = 0
             total_errors = 0
             total_extracted_rows = 0
-            all_duplicates = []
+            total_duplicates = 0
             
             # استخراج از هر شیت
             for idx, config in enumerate(configs):
@@ -135,10 +139,10 @@ class ExtractionThread(QThread):
                         total_extracted_rows += extracted
                         
                         # گزارش تکراری‌ها
-                        duplicates = stats.get('duplicates', [])
+                        duplicates = stats.get('duplicates', 0)
                         if duplicates:
-                            all_duplicates.extend(duplicates)
-                            self.log.emit(f"  ⚠️ {len(duplicates)} ردیف تکراری شناسایی شد", "warning")
+                            total_duplicates += duplicates
+                            self.log.emit(f"  ⚠️ {duplicates} ردیف تکراری شناسایی شد", "warning")
                         
                         # گزارش علامت‌گذاری
                         mark_stats = stats.get('mark_stats', {})
@@ -162,7 +166,7 @@ class ExtractionThread(QThread):
                             'sheets_total': len(configs),
                             'new_records': total_new,
                             'updated_records': total_updated,
-                            'duplicates': len(all_duplicates),
+                            'duplicates': total_duplicates,
                             'errors': total_errors
                         })
                     else:
@@ -191,7 +195,7 @@ class ExtractionThread(QThread):
             self.log.emit(f"📥 ردیف‌های استخراج شده: {total_extracted_rows:,}", "success" if total_extracted_rows > 0 else "warning")
             self.log.emit(f"➕ رکوردهای جدید: {total_new:,}", "success" if total_new > 0 else "info")
             self.log.emit(f"🔄 رکوردهای بروز شده: {total_updated:,}", "info")
-            self.log.emit(f"⚠️  تکراری‌ها (نیاز به بررسی): {len(all_duplicates):,}", "warning" if len(all_duplicates) > 0 else "info")
+            self.log.emit(f"⚠️  تکراری‌ها (نیاز به بررسی): {total_duplicates:,}", "warning" if total_duplicates > 0 else "info")
             self.log.emit(f"❌ خطاها: {total_errors}", "error" if total_errors > 0 else "success")
             
             # محاسبه سرعت
@@ -210,7 +214,7 @@ class ExtractionThread(QThread):
                 'updated_records': total_updated,
                 'total_extracted': total_extracted_rows,
                 'errors': total_errors,
-                'duplicates': all_duplicates,
+                'duplicates': total_duplicates,
                 'duration_seconds': duration
             }
             
@@ -251,8 +255,8 @@ class ExtractionThread(QThread):
             
             # ساخت پیام
             message = f"استخراج از {len(configs)} شیت: {summary['new_records']:,} جدید، {summary['updated_records']:,} بروز شد"
-            if len(summary['duplicates']) > 0:
-                message += f", {len(summary['duplicates'])} تکراری"
+            if summary['duplicates'] > 0:
+                message += f", {summary['duplicates']} تکراری"
             if summary['errors'] > 0:
                 message += f", {summary['errors']} خطا"
             
@@ -273,16 +277,36 @@ class ExtractionThread(QThread):
         except Exception as e:
             self.log.emit(f"⚠️ خطا در ثبت لاگ: {str(e)}", "warning")
     
+    def _start_run(self):
+        """ثبت اجرای جدید یا ادامه آخرین اجرای نیمه‌کاره (شیت‌ها و تنظیمات همان اجرا)"""
+        if self.resume:
+            previous_run = db_manager.get_resumable_extraction_run()
+            if previous_run and db_manager.resume_extraction_run(previous_run.id):
+                self.run_id = previous_run.id
+                self.selected_sheet_ids = previous_run.sheet_ids
+                self.force = bool(previous_run.force)
+                checkpoints = db_manager.get_extraction_checkpoints(previous_run.id)
+                done = sum(1 for checkpoint in checkpoints.values() if checkpoint.status == 'completed')
+                self.log.emit(
+                    f"↩️ ادامه اجرای #{previous_run.id}: {done} شیت قبلاً کامل شده است", "info"
+                )
+                return
+            self.log.emit("ℹ️ اجرای نیمه‌کاره‌ای یافت نشد - اجرای جدید شروع می‌شود", "info")
+        
+        self.run_id = db_manager.create_extraction_run(self.selected_sheet_ids, self.force)
+    
     def run(self):
         """اجرای استخراج"""
         try:
             self.progress.emit(10, "دریافت لیست شیت‌ها...", "#2196F3")
+            self._start_run()
             self.log.emit("🔍 دریافت لیست شیت‌های انتخابی...", "info")
             
             # دریافت شیت‌های فعال
             all_configs = db_manager.get_all_sheet_configs(active_only=True)
             
             if not all_configs:
+                self._finish_run('failed')
                 self.finished.emit(False, "هیچ شیت فعالی یافت نشد!", {})
                 return
             
@@ -290,6 +314,7 @@ class ExtractionThread(QThread):
             if self.selected_sheet_ids:
                 configs = [c for c in all_configs if c.id in self.selected_sheet_ids]
                 if not configs:
+                    self._finish_run('failed')
                     self.finished.emit(False, "هیچ شیتی انتخاب نشده است!", {})
                     return
                 self.log.emit(f"✅ تعداد {len(configs)} شیت انتخاب شده از {len(all_configs)} شیت فعال", "success")
@@ -300,45 +325,82 @@ class ExtractionThread(QThread):
             total_new = 0
             total_updated = 0
             total_errors = 0
-            all_duplicates = []  # تمام تکراری‌ها از همه شیت‌ها
+            total_skipped = 0
+            total_duplicates = 0  # تکراری‌های ثبت شده در duplicate_candidates
+            completed = 0
             
-            # استخراج از هر شیت
-            for idx, config in enumerate(configs):
-                progress_pct = 10 + int((idx / len(configs)) * 80)
+            # استخراج موازی شیت‌ها (سهمیه API بین workerها مشترک است)
+            scheduler = ExtractionScheduler(self.extractor)
+            self.log.emit(f"🚦 استخراج موازی با {min(scheduler.max_workers, len(configs))} worker", "info")
+            
+            def progress_callback(config, current, total, message):
+                self.sub_progress.emit(current, total, f"{config.name}: {message}")
+            
+            def log_callback(config, message, level):
+                self.log.emit(f"  [{config.name}] {message}", level)
+            
+            def on_result(config, success, message, stats):
+                nonlocal total_new, total_updated, total_errors, total_skipped, total_duplicates, completed
+                completed += 1
+                progress_pct = 10 + int((completed / len(configs)) * 80)
                 self.progress.emit(
                     progress_pct,
-                    f"استخراج از '{config.name}'...",
+                    f"'{config.name}' تمام شد ({completed}/{len(configs)})",
                     "#4CAF50"
                 )
-                self.log.emit(f"\n📊 شروع استخراج از '{config.name}'...", "info")
                 
-                try:
-                    # استخراج (بدون بروزرسانی خودکار)
-                    success, message, stats = self.extractor.extract_and_save(config.id, auto_update=False)
-                    
-                    if success:
-                        total_new += stats.get('new_records', 0)
-                        total_updated += stats.get('updated_records', 0)
-                        
-                        # جمع‌آوری تکراری‌ها
-                        duplicates = stats.get('duplicates', [])
-                        if duplicates:
-                            all_duplicates.extend(duplicates)
-                            self.log.emit(f"  ⚠️ {len(duplicates)} ردیف تکراری شناسایی شد", "warning")
-                        
-                        self.log.emit(
-                            f"  ✅ موفق: {stats.get('new_records', 0)} جدید، "
-                            f"{stats.get('updated_records', 0)} بروز شد",
-                            "success"
-                        )
-                    else:
-                        total_errors += 1
-                        self.log.emit(f"  ❌ خطا: {message}", "error")
+                if stats.get('cancelled'):
+                    self.log.emit(f"  ⛔ [{config.name}] لغو شد", "warning")
+                    return
                 
-                except Exception as e:
+                if stats.get('skipped'):
+                    total_skipped += 1
+                    self.log.emit(f"  ⏭️ [{config.name}] {message}", "info")
+                    return
+                
+                if success:
+                    total_new += stats.get('new_records', 0)
+                    total_updated += stats.get('updated_records', 0)
+                    
+                    # جمع‌آوری تکراری‌ها
+                    duplicates = stats.get('duplicates', 0)
+                    if duplicates:
+                        total_duplicates += duplicates
+                        self.log.emit(f"  ⚠️ [{config.name}] {duplicates} ردیف تکراری شناسایی شد", "warning")
+                    
+                    self.log.emit(
+                        f"  ✅ [{config.name}] موفق: {stats.get('new_records', 0)} جدید، "
+                        f"{stats.get('updated_records', 0)} بروز شد",
+                        "success"
+                    )
+                else:
                     total_errors += 1
-                    self.log.emit(f"  ❌ خطا: {str(e)}", "error")
-                    self.logger.error(f"خطا در استخراج از {config.name}: {str(e)}")
+                    self.log.emit(f"  ❌ [{config.name}] خطا: {message}", "error")
+                
+                self.stats_update.emit({
+                    'sheets_processed': completed,
+                    'sheets_total': len(configs),
+                    'new_records': total_new,
+                    'updated_records': total_updated,
+                    'duplicates': total_duplicates,
+                    'errors': total_errors
+                })
+            
+            scheduler.run(
+                configs,
+                auto_update=False,
+                on_result=on_result,
+                progress_callback=progress_callback,
+                log_callback=log_callback,
+                is_cancelled=lambda: self.is_cancelled,
+                force=self.force,
+                run_id=self.run_id
+            )
+            
+            if self.is_cancelled:
+                self._finish_run('cancelled')
+            else:
+                self._finish_run('failed' if total_errors else 'completed')
             
             # خلاصه نتایج
             self.progress.emit(100, "تمام شد!", "#4CAF50")
@@ -348,15 +410,18 @@ class ExtractionThread(QThread):
                 'new_records': total_new,
                 'updated_records': total_updated,
                 'errors': total_errors,
-                'duplicates': all_duplicates  # لیست کامل تکراری‌ها
+                'skipped': total_skipped,
+                'duplicates': total_duplicates  # تعداد تکراری‌ها (جزئیات در duplicate_candidates)
             }
             
             self.log.emit("\n" + "="*50, "info")
             self.log.emit("📋 خلاصه نتایج:", "info")
             self.log.emit(f"  • شیت‌های پردازش شده: {len(configs)}", "info")
+            if total_skipped:
+                self.log.emit(f"  • شیت‌های بدون تغییر (رد شده): {total_skipped}", "info")
             self.log.emit(f"  • رکوردهای جدید: {total_new:,}", "success" if total_new > 0 else "info")
             self.log.emit(f"  • رکوردهای بروز شده: {total_updated:,}", "info")
-            self.log.emit(f"  • تکراری‌ها (نیاز به بررسی): {len(all_duplicates):,}", "warning" if len(all_duplicates) > 0 else "info")
+            self.log.emit(f"  • تکراری‌ها (نیاز به بررسی): {total_duplicates:,}", "warning" if total_duplicates > 0 else "info")
             self.log.emit(f"  • خطاها: {total_errors}", "error" if total_errors > 0 else "success")
             self.log.emit("="*50, "info")
             
@@ -367,8 +432,8 @@ class ExtractionThread(QThread):
                 
                 status = "SUCCESS" if (total_new > 0 or total_updated > 0) and total_errors == 0 else "PARTIAL" if total_errors > 0 else "WARNING"
                 message = f"استخراج از {len(configs)} شیت: {total_new} جدید، {total_updated} بروز شد"
-                if len(all_duplicates) > 0:
-                    message += f", {len(all_duplicates)} تکراری"
+                if total_duplicates > 0:
+                    message += f", {total_duplicates} تکراری"
                 if total_errors > 0:
                     message += f", {total_errors} خطا"
                 
@@ -382,7 +447,7 @@ class ExtractionThread(QThread):
                         'total_configs': len(configs),
                         'new_records': total_new,
                         'updated_records': total_updated,
-                        'duplicates': len(all_duplicates),
+                        'duplicates': total_duplicates,
                         'errors': total_errors
                     }
                 )
@@ -393,10 +458,10 @@ class ExtractionThread(QThread):
             except Exception as log_error:
                 self.log.emit(f"⚠️ خطا در ثبت لاگ: {log_error}", "warning")
             
-            if total_new > 0 or total_updated > 0 or all_duplicates:
+            if total_new > 0 or total_updated > 0 or total_duplicates:
                 msg = f"✅ استخراج موفق!\n{total_new:,} رکورد جدید، {total_updated:,} بروز شد"
-                if all_duplicates:
-                    msg += f"\n⚠️ {len(all_duplicates)} ردیف تکراری نیاز به بررسی دارد"
+                if total_duplicates:
+                    msg += f"\n⚠️ {total_duplicates} ردیف تکراری نیاز به بررسی دارد"
                 self.finished.emit(True, msg, summary)
             else:
                 self.finished.emit(
@@ -407,7 +472,15 @@ class ExtractionThread(QThread):
         
         except Exception as e:
             self.logger.error(f"خطای بحرانی در استخراج: {str(e)}")
+            self._finish_run('failed')
             self.finished.emit(False, f"❌ خطا: {str(e)}", {})
+    
+    def _finish_run(self, status):
+        """ثبت وضعیت پایانی اجرا (اجرای ناتمام بعداً قابل ادامه است)"""
+        if self.run_id:
+            db_manager.finish_extraction_run(self.run_id, status)
+            if status != 'completed':
+                self.log.emit("↩️ این اجرا با دکمه «ادامه اجرای قبلی» از آخرین نقطه بازیابی ادامه می‌یابد", "info")
 
 
 class ExtractionWidget(QWidget):
@@ -583,6 +656,29 @@ class ExtractionWidget(QWidget):
         self.start_btn.clicked.connect(self.start_extraction)
         action_layout.addWidget(self.start_btn)
         
+        # ادامه آخرین اجرای لغو شده یا قطع شده از نقاط بازیابی
+        self.resume_btn = QPushButton("↩️ ادامه اجرای قبلی")
+        self.resume_btn.setFixedHeight(36)
+        self.resume_btn.setToolTip("شیت‌های کامل شده رد می‌شوند و بقیه از آخرین ردیف ذخیره شده ادامه می‌یابند")
+        self.resume_btn.setStyleSheet("font-size: 9pt;")
+        self.resume_btn.setEnabled(False)
+        self.resume_btn.clicked.connect(self.resume_extraction)
+        action_layout.addWidget(self.resume_btn)
+        
+        # تکراری‌های در انتظار بررسی (از اجراهای قبلی هم باقی می‌مانند)
+        self.duplicates_btn = QPushButton("⚠️ تکراری‌ها")
+        self.duplicates_btn.setFixedHeight(36)
+        self.duplicates_btn.setStyleSheet("font-size: 9pt;")
+        self.duplicates_btn.setEnabled(False)
+        self.duplicates_btn.clicked.connect(self.handle_duplicates)
+        action_layout.addWidget(self.duplicates_btn)
+        
+        # استخراج کامل حتی برای شیت‌هایی که از آخرین همگام‌سازی تغییر نکرده‌اند
+        self.force_full_checkbox = QCheckBox("🔁 استخراج کامل")
+        self.force_full_checkbox.setToolTip("شیت‌های بدون تغییر هم دوباره بررسی شوند")
+        self.force_full_checkbox.setStyleSheet("font-size: 9pt;")
+        action_layout.addWidget(self.force_full_checkbox)
+        
         # پیشرفت با نوار بزرگ‌تر و فونت درشت‌تر
         progress_container = QVBoxLayout()
         progress_container.setSpacing(4)
@@ -761,9 +857,25 @@ class ExtractionWidget(QWidget):
                 f"✅ خروجی گرفته شده: {stats.get('exported_records', 0):,}    •    "
                 f"⏳ در انتظار: {stats.get('pending_records', 0):,}"
             )
+            self.update_resume_button()
+            
+            pending_duplicates = db_manager.get_duplicate_candidates_count()
+            self.duplicates_btn.setText(f"⚠️ تکراری‌ها ({pending_duplicates:,})")
+            self.duplicates_btn.setEnabled(pending_duplicates > 0)
         except Exception as e:
             self.stats_label.setText(f"❌ خطا در بارگذاری آمار: {str(e)}")
     
+    def update_resume_button(self):
+        """فعال کردن دکمه ادامه فقط اگر اجرای نیمه‌کاره‌ای وجود داشته باشد"""
+        running = not self.start_btn.isEnabled()
+        previous_run = None if running else db_manager.get_resumable_extraction_run()
+        self.resume_btn.setEnabled(previous_run is not None)
+        if previous_run:
+            self.resume_btn.setToolTip(
+                f"ادامه اجرای #{previous_run.id} ({previous_run.status}) - "
+                "شیت‌های کامل شده رد می‌شوند و بقیه از آخرین ردیف ذخیره شده ادامه می‌یابند"
+            )
+    
     def start_extraction(self):
         """شروع استخراج با باز کردن پنجره لاگ زنده"""
         # بررسی شیت‌های فعال
@@ -818,7 +930,39 @@ class ExtractionWidget(QWidget):
         self.progress_bar.setValue(0)
         
         # ایجاد thread با شیت‌های انتخابی
-        self.extraction_thread = ExtractionThread(selected_sheet_ids=selected_sheet_ids)
+        self._run_thread(ExtractionThread(
+            selected_sheet_ids=selected_sheet_ids,
+            force=self.force_full_checkbox.isChecked()
+        ))
+    
+    def resume_extraction(self):
+        """ادامه آخرین اجرای نیمه‌کاره از نقاط بازیابی"""
+        previous_run = db_manager.get_resumable_extraction_run()
+        if not previous_run:
+            QMessageBox.information(self, "ادامه اجرا", "اجرای نیمه‌کاره‌ای یافت نشد.")
+            self.update_resume_button()
+            return
+        
+        reply = QMessageBox.question(
+            self,
+            "تایید",
+            f"آیا می‌خواهید اجرای #{previous_run.id} را از آخرین نقطه بازیابی ادامه دهید؟",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        
+        self.start_btn.setEnabled(False)
+        self.start_btn.setText("⏳ در حال استخراج...")
+        self.log_text.clear()
+        self.progress_bar.setValue(0)
+        
+        self._run_thread(ExtractionThread(resume=True))
+    
+    def _run_thread(self, thread):
+        """اتصال سیگنال‌ها و شروع thread استخراج"""
+        self.extraction_thread = thread
+        self.resume_btn.setEnabled(False)
         
         # اتصال سیگنال‌ها
         self.extraction_thread.progress.connect(self.on_progress)
@@ -884,25 +1028,18 @@ class ExtractionWidget(QWidget):
         self.load_stats()
         
         # بررسی تکراری‌ها
-        if success and summary and 'duplicates' in summary:
-            duplicates = summary.get('duplicates', [])
+        if success and summary and summary.get('duplicates'):
+            reply = QMessageBox.warning(
+                self,
+                "⚠️ تشخیص داده‌های تکراری",
+                f"تعداد {summary['duplicates']} ردیف تکراری شناسایی شد!\n\n"
+                f"این ردیف‌ها قبلاً استخراج شده‌اند و در Google Sheet ویرایش شده‌اند.\n"
+                f"آیا می‌خواهید آن‌ها را بررسی کنید؟",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
             
-            if duplicates:
-                # نمایش پیام هشدار
-                from app.gui.dialogs.duplicate_conflict_dialog import DuplicateConflictDialog
-                
-                reply = QMessageBox.warning(
-                    self,
-                    "⚠️ تشخیص داده‌های تکراری",
-                    f"تعداد {len(duplicates)} ردیف تکراری شناسایی شد!\n\n"
-                    f"این ردیف‌ها قبلاً استخراج شده‌اند و در Google Sheet ویرایش شده‌اند.\n"
-                    f"آیا می‌خواهید آن‌ها را بررسی کنید؟",
-                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-                )
-                
-                if reply == QMessageBox.StandardButton.Yes:
-                    # نمایش Dialog برای هر تکراری
-                    self.handle_duplicates(duplicates)
+            if reply == QMessageBox.StandardButton.Yes:
+                self.handle_duplicates()
         
         # نمایش پیام نهایی
         if success:
@@ -910,62 +1047,16 @@ class ExtractionWidget(QWidget):
         else:
             QMessageBox.warning(self, "هشدار", message)
     
-    def handle_duplicates(self, duplicates: list):
-        """مدیریت تکراری‌ها"""
-        from app.gui.dialogs.duplicate_conflict_dialog import DuplicateConflictDialog
-        
-        updated_count = 0
-        skipped_count = 0
-        
-        for dup in duplicates:
-            # نمایش Dialog
-            dialog = DuplicateConflictDialog(
-                existing_data=dup['existing_data'],
-                new_data=dup['new_data'],
-                row_number=dup['row_number'],
-                parent=self
-            )
-            
-            result = dialog.exec()
-            
-            if result == dialog.DialogCode.Accepted:
-                choice = dialog.get_user_choice()
-                
-                if choice == 'update':
-                    # بروزرسانی در دیتابیس
-                    success, saved_data, is_new, message = db_manager.save_sales_data(
-                        sheet_config_id=dup['sheet_config_id'],
-                        row_number=dup['row_number'],
-                        unique_key=dup['unique_key'],
-                        data=dup['new_data'],
-                        update_if_exists=True
-                    )
-                    
-                    if success:
-                        updated_count += 1
-                        self.log_text.append(f"  ✅ ردیف {dup['row_number']} بروزرسانی شد")
-                        
-                        # علامت‌گذاری در Google Sheet
-                        try:
-                            from app.core.google_sheets import GoogleSheetExtractor
-                            extractor = GoogleSheetExtractor()
-                            extractor.mark_as_extracted(
-                                sheet_url=dup['sheet_url'],
-                                worksheet_name=dup['worksheet_name'] or 'Sheet1',
-                                row_number=dup['row_number'],
-                                extracted_column=dup['extracted_column']
-                            )
-                        except Exception as e:
-                            self.log_text.append(f"    ⚠️ خطا در علامت‌گذاری: {str(e)}")
-                    else:
-                        self.log_text.append(f"  ❌ خطا در بروزرسانی ردیف {dup['row_number']}: {message}")
-                
-                elif choice == 'skip':
-                    skipped_count += 1
-                    self.log_text.append(f"  ⏭️ ردیف {dup['row_number']} نادیده گرفته شد")
-            else:
-                # لغو شد
-                skipped_count += 1
+    def handle_duplicates(self):
+        """مدیریت تکراری‌ها (صفحه به صفحه از جدول duplicate_candidates)"""
+        from app.gui.dialogs.duplicate_candidates_dialog import DuplicateCandidatesDialog
+        
+        dialog = DuplicateCandidatesDialog(parent=self)
+        dialog.log_message.connect(self.log_text.append)
+        dialog.exec()
+        
+        updated_count = dialog.updated_count
+        skipped_count = dialog.skipped_count
         
         # خلاصه نهایی
         self.log_text.append("\n" + "="*50)
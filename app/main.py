@@ -52,11 +52,28 @@ class GTLandApplication:
         
         # بررسی اتصال دیتابیس
         try:
-            from app.models import SessionLocal
+            from app.models import SessionLocal, init_db
             from sqlalchemy import text
             db = SessionLocal()
             db.execute(text("SELECT 1"))
             db.close()
+            # ایجاد جداول جدید (جداول موجود تغییر نمی‌کنند)
+            init_db()
+            # ستون content_hash دیتابیس‌های قدیمی (hash رکوردها هنگام استخراج محاسبه می‌شود)
+            from migrate_add_content_hash import migrate as migrate_content_hash
+            migrate_content_hash(backfill=False)
+            # ایندکس‌های صفحه‌بندی keyset داده‌های فروش
+            from migrate_add_browse_indexes import migrate as migrate_browse_indexes
+            migrate_browse_indexes()
+            # کلیدهای ایندکس شده داده JSON هر شیت
+            from migrate_add_indexed_fields import migrate as migrate_indexed_fields
+            migrate_indexed_fields()
+            # hash محتوای ردیف‌های صف علامت‌گذاری
+            from migrate_add_outbox_content_hashes import migrate as migrate_outbox_content_hashes
+            migrate_outbox_content_hashes()
+            # hash پایه خلاصه تفاوت تکراری‌ها
+            from migrate_add_duplicate_base_hash import migrate as migrate_duplicate_base_hash
+            migrate_duplicate_base_hash()
             self.logger.success("✅ اتصال به دیتابیس برقرار است.")
         except Exception as e:
             errors.append(f"❌ خطا در اتصال به دیتابیس: {str(e)}")
@@ -1,17 +1,23 @@
 """
 مدل‌های دیتابیس
 """
-from .base import Base, engine, SessionLocal, get_db, init_db, drop_db
+from .base import Base, engine, SessionLocal, WriteSessionLocal, get_db, init_db, drop_db
 from .sheet_config import SheetConfig
 from .sales_data import SalesData
 from .export_template import ExportTemplate
 from .process_log import ProcessLog
 from .export_log import ExportLog
+from .sheet_write_outbox import SheetWriteOutbox
+from .sheet_sync_state import SheetSyncState
+from .extraction_run import ExtractionRun, ExtractionCheckpoint
+from .duplicate_candidate import DuplicateCandidate
+from .sheet_stats import SheetStats
 
 __all__ = [
     'Base',
     'engine',
     'SessionLocal',
+    'WriteSessionLocal',
     'get_db',
     'init_db',
     'drop_db',
@@ -20,4 +26,10 @@ __all__ = [
     'ExportTemplate',
     'ProcessLog',
     'ExportLog',
+    'SheetWriteOutbox',
+    'SheetSyncState',
+    'ExtractionRun',
+    'ExtractionCheckpoint',
+    'DuplicateCandidate',
+    'SheetStats',
 ]
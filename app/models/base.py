@@ -7,6 +7,8 @@ from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from .sqlite_profile import apply_sqlite_profile
+
 load_dotenv()
 
 # Base برای تمام مدل‌ها
@@ -29,6 +31,8 @@ if DATABASE_URL.startswith('sqlite'):
         echo=False,  # برای دیباگ روی True قرار دهید
         connect_args={"check_same_thread": False}  # برای SQLite
     )
+    # WAL، synchronous و کش - پروفایل با SQLITE_PROFILE انتخاب می‌شود
+    apply_sqlite_profile(engine)
 else:
     # تنظیمات PostgreSQL
     engine = create_engine(
@@ -48,6 +52,14 @@ SessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
+# Session تراکنش‌های نوشتنی (روی SQLite با BEGIN IMMEDIATE - ن.ک. sqlite_profile)
+WriteSessionLocal = sessionmaker(
+    bind=engine.execution_options(sqlite_begin='IMMEDIATE'),
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 
 def get_db():
     """
@@ -68,6 +80,14 @@ def init_db():
     ایجاد تمام جداول در دیتابیس
     """
     Base.metadata.create_all(bind=engine)
+    
+    # trigger های شمارنده‌های هر شیت (و پر کردن اولیه آن‌ها)
+    from .sheet_stats import install_sheet_stats
+    install_sheet_stats(engine)
+    
+    # جدول جستجوی متن کامل داده‌ها و trigger های آن (و پر کردن اولیه)
+    from .sales_data_fts import install_sales_data_fts
+    install_sales_data_fts(engine)
 
 
 def drop_db():
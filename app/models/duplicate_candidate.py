@@ -0,0 +1,83 @@
+"""
+مدل ردیف‌های تکراری در انتظار بررسی کاربر
+"""
+from sqlalchemy import Column, Integer, String, TIMESTAMP, JSON, ForeignKey, Index
+from sqlalchemy.sql import func
+from .base import Base
+
+
+class DuplicateCandidate(Base):
+    """
+    جدول موقت تکراری‌های شناسایی شده هنگام استخراج
+
+    به جای نگه‌داری داده کامل قدیم و جدید در حافظه، فقط شناسه رکورد موجود و خلاصه
+    تفاوت‌ها (مقدار جدید فیلدهای تغییر یافته) ذخیره می‌شود؛ داده کامل هنگام بررسی
+    از روی رکورد موجود بازسازی می‌شود. base_hash داده رکورد موجود را هنگام ثبت نگه
+    می‌دارد؛ اگر رکورد پس از آن تغییر کرده باشد بازسازی معتبر نیست.
+    """
+    __tablename__ = 'duplicate_candidates'
+
+    # ستون‌های اصلی
+    id = Column(Integer, primary_key=True, index=True)
+    sheet_config_id = Column(
+        Integer,
+        ForeignKey('sheet_configs.id', ondelete='CASCADE'),
+        nullable=False,
+        comment='شناسه تنظیمات شیت'
+    )
+    existing_id = Column(
+        Integer,
+        ForeignKey('sales_data.id', ondelete='CASCADE'),
+        nullable=True,
+        comment='شناسه رکورد موجود در دیتابیس'
+    )
+    run_id = Column(Integer, nullable=True, comment='شناسه اجرای استخراج')
+    row_number = Column(Integer, nullable=False, comment='شماره ردیف در شیت')
+    unique_key = Column(String(500), unique=True, nullable=False, comment='کلید یکتا')
+
+    # خلاصه تفاوت‌ها
+    changes = Column(JSON, nullable=True, comment='مقدار جدید فیلدهای تغییر یافته: {"فیلد": "مقدار"}')
+    removed_fields = Column(JSON, nullable=True, comment='فیلدهایی که در داده جدید وجود ندارند')
+    changed_fields = Column(Integer, default=0, comment='تعداد فیلدهای متفاوت')
+    base_hash = Column(String(32), nullable=True, comment='hash داده رکورد موجود هنگام ثبت (پایه خلاصه تفاوت‌ها)')
+
+    # وضعیت
+    status = Column(
+        String(20),
+        nullable=False,
+        default='pending',
+        comment='وضعیت: pending | updated | skipped'
+    )
+
+    # تاریخ‌ها
+    created_at = Column(TIMESTAMP, server_default=func.now(), comment='زمان شناسایی')
+    resolved_at = Column(TIMESTAMP, nullable=True, comment='زمان تصمیم کاربر')
+
+    # ایندکس‌ها
+    __table_args__ = (
+        Index('idx_duplicate_status_sheet', 'status', 'sheet_config_id'),
+    )
+
+    def __repr__(self):
+        return (
+            f"<DuplicateCandidate(id={self.id}, row={self.row_number}, "
+            f"changed={self.changed_fields}, status='{self.status}')>"
+        )
+
+    def to_dict(self):
+        """تبدیل به دیکشنری"""
+        return {
+            'id': self.id,
+            'sheet_config_id': self.sheet_config_id,
+            'existing_id': self.existing_id,
+            'run_id': self.run_id,
+            'row_number': self.row_number,
+            'unique_key': self.unique_key,
+            'changes': self.changes,
+            'removed_fields': self.removed_fields,
+            'changed_fields': self.changed_fields,
+            'base_hash': self.base_hash,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
+        }
@@ -0,0 +1,115 @@
+"""
+مدل اجراهای استخراج و نقاط بازیابی (checkpoint) هر شیت
+"""
+from sqlalchemy import Column, Integer, String, Boolean, TIMESTAMP, JSON, ForeignKey, Index
+from sqlalchemy.sql import func
+from .base import Base
+
+
+class ExtractionRun(Base):
+    """
+    جدول اجراهای استخراج
+
+    هر بار اجرای استخراج (از رابط کاربری یا زمان‌بند) یک ردیف دارد؛ اجرایی که لغو شده یا
+    با بسته شدن برنامه نیمه‌کاره مانده، با وضعیت running/cancelled قابل ادامه است.
+    """
+    __tablename__ = 'extraction_runs'
+
+    # ستون‌های اصلی
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(
+        String(20),
+        nullable=False,
+        default='running',
+        index=True,
+        comment='وضعیت: running | completed | cancelled | failed'
+    )
+    sheet_ids = Column(JSON, nullable=True, comment='شناسه شیت‌های انتخاب شده (None = همه شیت‌های فعال)')
+    force = Column(Boolean, default=False, comment='استخراج کامل بدون توجه به اثر انگشت')
+    resumed_count = Column(Integer, default=0, comment='تعداد دفعات ادامه اجرا')
+
+    # تاریخ‌ها
+    started_at = Column(TIMESTAMP, server_default=func.now(), comment='زمان شروع')
+    finished_at = Column(TIMESTAMP, nullable=True, comment='زمان پایان')
+
+    def __repr__(self):
+        return f"<ExtractionRun(id={self.id}, status='{self.status}')>"
+
+    def to_dict(self):
+        """تبدیل به دیکشنری"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'sheet_ids': self.sheet_ids,
+            'force': self.force,
+            'resumed_count': self.resumed_count,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class ExtractionCheckpoint(Base):
+    """
+    جدول نقطه بازیابی هر شیت در یک اجرای استخراج
+
+    پس از هر بسته ذخیره شده و هر ارسال علامت‌گذاری بروز می‌شود تا اجرای قطع شده
+    از آخرین نقطه پایدار ادامه یابد.
+    """
+    __tablename__ = 'extraction_checkpoints'
+
+    # ستون‌های اصلی
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(
+        Integer,
+        ForeignKey('extraction_runs.id', ondelete='CASCADE'),
+        nullable=False,
+        comment='شناسه اجرای استخراج'
+    )
+    sheet_config_id = Column(
+        Integer,
+        ForeignKey('sheet_configs.id', ondelete='CASCADE'),
+        nullable=False,
+        comment='شناسه تنظیمات شیت'
+    )
+    status = Column(
+        String(20),
+        nullable=False,
+        default='pending',
+        comment='وضعیت: pending | running | completed | failed'
+    )
+
+    # پیشرفت
+    fingerprint = Column(String(255), nullable=True, comment='اثر انگشت شیت در شروع استخراج')
+    last_persisted_row = Column(Integer, nullable=True, comment='آخرین شماره ردیف ذخیره شده')
+    persisted_rows = Column(Integer, default=0, comment='تعداد ردیف‌های ذخیره شده')
+    marked_rows = Column(Integer, default=0, comment='تعداد ردیف‌های علامت‌گذاری شده')
+    stats = Column(JSON, nullable=True, comment='آمار نهایی شیت')
+
+    # تاریخ‌ها
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), comment='زمان آخرین بروزرسانی')
+
+    # ایندکس‌ها
+    __table_args__ = (
+        Index('idx_checkpoint_run_sheet', 'run_id', 'sheet_config_id', unique=True),
+    )
+
+    def __repr__(self):
+        return (
+            f"<ExtractionCheckpoint(run_id={self.run_id}, sheet_config_id={self.sheet_config_id}, "
+            f"status='{self.status}', last_row={self.last_persisted_row})>"
+        )
+
+    def to_dict(self):
+        """تبدیل به دیکشنری"""
+        return {
+            'id': self.id,
+            'run_id': self.run_id,
+            'sheet_config_id': self.sheet_config_id,
+            'status': self.status,
+            'fingerprint': self.fingerprint,
+            'last_persisted_row': self.last_persisted_row,
+            'persisted_rows': self.persisted_rows,
+            'marked_rows': self.marked_rows,
+            'stats': self.stats,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
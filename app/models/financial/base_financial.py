@@ -9,6 +9,8 @@ from sqlalchemy.orm import sessionmaker
 import os
 from pathlib import Path
 
+from app.models.sqlite_profile import apply_sqlite_profile
+
 # Base برای تمام مدل‌های مالی
 FinancialBase = declarative_base()
 
@@ -30,6 +32,7 @@ if FINANCIAL_DB_PATH.startswith('sqlite'):
         echo=False,
         connect_args={"check_same_thread": False}
     )
+    apply_sqlite_profile(financial_engine)
 else:
     # برای PostgreSQL
     financial_engine = create_engine(
@@ -28,6 +28,7 @@ class SalesData(Base):
     
     # داده‌های اصلی
     data = Column(JSON, nullable=False, comment='داده‌های خام به صورت JSON')
+    content_hash = Column(String(32), nullable=True, comment='hash محتوای ستون‌های کلیدی (تشخیص تغییرات)')
     
     # وضعیت خروجی
     is_exported = Column(Boolean, default=False, index=True, comment='آیا خروجی گرفته شده؟')
@@ -63,6 +64,9 @@ class SalesData(Base):
         Index('idx_sales_data_exported', 'is_exported'),
         Index('idx_sales_data_export_type', 'export_type'),
         Index('idx_sales_data_extracted_at', 'extracted_at'),
+        Index('idx_sales_data_sheet_hash', 'sheet_config_id', 'content_hash'),
+        Index('idx_sales_data_sheet_exported_id', 'sheet_config_id', 'is_exported', 'id'),
+        Index('idx_sales_data_sheet_updated_id', 'sheet_config_id', 'is_updated', 'id'),
         UniqueConstraint('sheet_config_id', 'row_number', name='uq_sheet_row'),
     )
     
@@ -76,6 +80,7 @@ class SalesData(Base):
             'sheet_config_id': self.sheet_config_id,
             'row_number': self.row_number,
             'unique_key': self.unique_key,
+            'content_hash': self.content_hash,
             'is_exported': self.is_exported,
             'export_type': self.export_type,
             'exported_at': self.exported_at.isoformat() if self.exported_at else None,
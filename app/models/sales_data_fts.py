@@ -0,0 +1,150 @@
+"""
+جستجوی متن کامل (FTS5) روی مقادیر داده‌های فروش
+
+جدول مجازی sales_data_fts برای هر رکورد sales_data یک سند دارد (rowid = sales_data.id) که
+از مقادیر متنی و عددی داده JSON ساخته می‌شود. trigger های روی sales_data سند را در همان
+تراکنش درج، بروزرسانی و حذف، بروز نگه می‌دارند؛ جستجو بدون خواندن رکوردها در پایتون انجام
+می‌شود و نتیجه به ترتیب رتبه (bm25) برمی‌گردد.
+
+حروف عربی «ي» و «ك» هم در سند و هم در عبارت جستجو به «ی» و «ک» تبدیل می‌شوند.
+"""
+from typing import Optional
+
+from sqlalchemy import column, table, text
+from sqlalchemy.exc import OperationalError
+
+
+FTS_TABLE = 'sales_data_fts'
+
+# جدول سبک برای ساخت کوئری (عضو metadata نیست؛ create_all آن را نمی‌سازد)
+sales_data_fts = table(FTS_TABLE, column('rowid'), column('content'), column('rank'))
+
+_CHAR_NORMALIZATION = (('ي', 'ی'), ('ك', 'ک'))
+
+
+def _document_sql(row: str) -> str:
+    """عبارت SQL متن سند یک ردیف sales_data (مقادیر متنی/عددی JSON با فاصله)"""
+    document = (
+        f"(SELECT group_concat(value, ' ') FROM json_each("
+        f"CASE WHEN json_valid({row}.data) THEN {row}.data ELSE '{{}}' END"
+        f") WHERE type IN ('text', 'integer', 'real'))"
+    )
+    for source, target in _CHAR_NORMALIZATION:
+        document = f"replace({document}, '{source}', '{target}')"
+    return document
+
+
+_CREATE_FTS_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+    USING fts5(content, tokenize = 'unicode61 remove_diacritics 2')
+"""
+
+_INSERT_NEW = f"INSERT INTO {FTS_TABLE} (rowid, content) VALUES (NEW.id, {_document_sql('NEW')});"
+_DELETE_OLD = f"DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id;"
+
+SALES_DATA_FTS_TRIGGERS = {
+    'trg_sales_data_fts_insert': f"""
+        CREATE TRIGGER trg_sales_data_fts_insert AFTER INSERT ON sales_data
+        BEGIN {_INSERT_NEW} END
+    """,
+    'trg_sales_data_fts_update': f"""
+        CREATE TRIGGER trg_sales_data_fts_update AFTER UPDATE OF data ON sales_data
+        WHEN OLD.data IS NOT NEW.data
+        BEGIN {_DELETE_OLD} {_INSERT_NEW} END
+    """,
+    'trg_sales_data_fts_delete': f"""
+        CREATE TRIGGER trg_sales_data_fts_delete AFTER DELETE ON sales_data
+        BEGIN {_DELETE_OLD} END
+    """,
+}
+
+_REBUILD_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, content)
+    SELECT sales_data.id, {_document_sql('sales_data')} FROM sales_data
+"""
+
+
+def build_match_query(search_text: str) -> Optional[str]:
+    """
+    تبدیل متن ورودی کاربر به عبارت MATCH امن FTS5
+
+    هر کلمه به صورت عبارت نقل‌قول شده با جستجوی پیشوندی می‌آید و کلمات با AND ترکیب
+    می‌شوند؛ «ali@gmail» همان توکن‌های پشت سر هم سند را پیدا می‌کند و علائم ورودی
+    خطای نحوی FTS5 ایجاد نمی‌کنند.
+
+    Returns:
+        عبارت MATCH یا None اگر کلمه‌ای نباشد
+    """
+    for source, target in _CHAR_NORMALIZATION:
+        search_text = (search_text or '').replace(source, target)
+
+    terms = []
+    for word in search_text.split():
+        word = word.replace('"', ' ').strip()
+        if word:
+            terms.append(f'"{word}"*')
+    return ' '.join(terms) or None
+
+
+def has_sales_data_fts(bind) -> bool:
+    """آیا جدول FTS روی این دیتابیس وجود دارد؟ (فقط SQLite)"""
+    if bind.dialect.name != 'sqlite':
+        return False
+    with bind.connect() as connection:
+        return connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first() is not None
+
+
+def rebuild_sales_data_fts(connection) -> int:
+    """
+    بازسازی کامل اسناد FTS از روی sales_data (داخل تراکنش connection)
+
+    Returns:
+        تعداد اسناد
+    """
+    connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    connection.execute(text(_REBUILD_SQL))
+    connection.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"))
+    return connection.execute(text(f"SELECT COUNT(*) FROM {FTS_TABLE}")).scalar()
+
+
+def optimize_sales_data_fts(connection) -> None:
+    """ادغام b-tree های ایندکس FTS (پس از درج/حذف‌های زیاد جستجو سریع‌تر می‌شود)"""
+    connection.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"))
+
+
+def install_sales_data_fts(engine) -> bool:
+    """
+    ایجاد جدول FTS و trigger های آن (در صورت نبود) و پر کردن اولیه اسناد
+
+    اگر SQLite با FTS5 کامپایل نشده باشد کاری انجام نمی‌شود و جستجو به LIKE برمی‌گردد.
+
+    Returns:
+        True اگر در این فراخوانی ایجاد و پر شد
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    with engine.begin() as connection:
+        existing = {
+            row[0] for row in connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+            )
+        }
+        if FTS_TABLE in existing and set(SALES_DATA_FTS_TRIGGERS) <= existing:
+            return False
+
+        try:
+            connection.execute(text(_CREATE_FTS_SQL))
+        except OperationalError:
+            # no such module: fts5
+            return False
+
+        for name, ddl in SALES_DATA_FTS_TRIGGERS.items():
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            connection.execute(text(ddl))
+        rebuild_sales_data_fts(connection)
+
+    return True
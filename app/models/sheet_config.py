@@ -51,6 +51,13 @@ class SheetConfig(Base):
         comment='لیست ستون‌هایی که باید استخراج شوند (None = همه ستون‌ها)'
     )
     
+    # کلیدهای داده JSON با ایندکس عبارتی (فیلتر سریع بدون پیمایش کل جدول)
+    indexed_fields = Column(
+        JSON,
+        nullable=True,
+        comment='لیست کلیدهای data که ایندکس json_extract دارند: ["CODE", "TR_ID"]'
+    )
+    
     # تنظیمات پیشرفته
     skip_rows = Column(Integer, default=0, comment='تعداد ردیف‌های ابتدایی که باید رد شوند')
     max_rows = Column(Integer, nullable=True, comment='حداکثر تعداد ردیف‌های قابل استخراج')
@@ -97,6 +104,7 @@ class SheetConfig(Base):
             'ready_column': self.ready_column,
             'extracted_column': self.extracted_column,
             'unique_key_columns': self.unique_key_columns,
+            'indexed_fields': self.indexed_fields,
             'skip_rows': self.skip_rows,
             'max_rows': self.max_rows,
             'filters': self.filters,
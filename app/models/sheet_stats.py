@@ -0,0 +1,171 @@
+"""
+مدل شمارنده‌های آماری هر شیت (نگهداری شده هنگام نوشتن)
+"""
+from sqlalchemy import Column, Integer, TIMESTAMP, ForeignKey, text
+from .base import Base
+
+
+class SheetStats(Base):
+    """
+    جدول شمارنده‌های هر شیت
+
+    با trigger های روی sales_data در همان تراکنش درج، بروزرسانی و حذف رکوردها بروز
+    می‌شود؛ آمار داشبورد و کارت‌های شیت بدون شمارش کل sales_data خوانده می‌شود.
+    last_extract با حذف رکورد کم نمی‌شود (rebuild_sheet_stats مقدار دقیق را بازمی‌سازد).
+    """
+    __tablename__ = 'sheet_stats'
+
+    sheet_config_id = Column(
+        Integer,
+        ForeignKey('sheet_configs.id', ondelete='CASCADE'),
+        primary_key=True,
+        comment='شناسه تنظیمات شیت'
+    )
+
+    # شمارنده‌ها
+    total = Column(Integer, nullable=False, default=0, comment='تعداد کل')
+    exported = Column(Integer, nullable=False, default=0, comment='export شده')
+    not_exported = Column(Integer, nullable=False, default=0, comment='export نشده')
+    need_reexport = Column(Integer, nullable=False, default=0, comment='export شده و بروزرسانی شده')
+    updated = Column(Integer, nullable=False, default=0, comment='بروزرسانی شده')
+    transferred = Column(Integer, nullable=False, default=0, comment='منتقل شده به Stage 2')
+    last_extract = Column(TIMESTAMP, nullable=True, comment='آخرین استخراج')
+
+    def __repr__(self):
+        return f"<SheetStats(sheet_config_id={self.sheet_config_id}, total={self.total})>"
+
+    def to_dict(self):
+        """تبدیل به دیکشنری"""
+        return {
+            'sheet_config_id': self.sheet_config_id,
+            'total': self.total,
+            'exported': self.exported,
+            'not_exported': self.not_exported,
+            'need_reexport': self.need_reexport,
+            'updated': self.updated,
+            'transferred': self.transferred,
+            'last_extract': self.last_extract.isoformat() if self.last_extract else None,
+        }
+
+
+# ==================== Trigger ها (SQLite) ====================
+
+def _contribution(row: str) -> str:
+    """سهم یک ردیف sales_data در شمارنده‌ها (ترتیب ستون‌های _COUNTER_COLUMNS)"""
+    return (
+        f"1, {row}.is_exported IS 1, {row}.is_exported IS 0, "
+        f"({row}.is_exported IS 1 AND {row}.is_updated IS 1), "
+        f"{row}.is_updated IS 1, {row}.transferred IS 1"
+    )
+
+
+_COUNTER_COLUMNS = ('total', 'exported', 'not_exported', 'need_reexport', 'updated', 'transferred')
+
+_UPSERT_NEW = f"""
+    INSERT INTO sheet_stats (sheet_config_id, {', '.join(_COUNTER_COLUMNS)}, last_extract)
+    VALUES (NEW.sheet_config_id, {_contribution('NEW')}, NEW.extracted_at)
+    ON CONFLICT(sheet_config_id) DO UPDATE SET
+        {', '.join(f'{c} = {c} + excluded.{c}' for c in _COUNTER_COLUMNS)},
+        last_extract = CASE
+            WHEN last_extract IS NULL OR excluded.last_extract > last_extract THEN excluded.last_extract
+            ELSE last_extract
+        END;
+"""
+
+_SUBTRACT_OLD = f"""
+    UPDATE sheet_stats SET
+        {', '.join(f'{c} = {c} - ({v})' for c, v in zip(_COUNTER_COLUMNS, _contribution('OLD').split(', ')))}
+    WHERE sheet_config_id = OLD.sheet_config_id;
+"""
+
+SHEET_STATS_TRIGGERS = {
+    'trg_sales_data_stats_insert': f"""
+        CREATE TRIGGER trg_sales_data_stats_insert AFTER INSERT ON sales_data
+        BEGIN {_UPSERT_NEW} END
+    """,
+    'trg_sales_data_stats_update': f"""
+        CREATE TRIGGER trg_sales_data_stats_update
+        AFTER UPDATE OF sheet_config_id, is_exported, is_updated, transferred, extracted_at ON sales_data
+        WHEN OLD.sheet_config_id IS NOT NEW.sheet_config_id
+            OR OLD.is_exported IS NOT NEW.is_exported
+            OR OLD.is_updated IS NOT NEW.is_updated
+            OR OLD.transferred IS NOT NEW.transferred
+            OR OLD.extracted_at IS NOT NEW.extracted_at
+        BEGIN {_SUBTRACT_OLD} {_UPSERT_NEW} END
+    """,
+    'trg_sales_data_stats_delete': f"""
+        CREATE TRIGGER trg_sales_data_stats_delete AFTER DELETE ON sales_data
+        BEGIN {_SUBTRACT_OLD} END
+    """,
+    'trg_sheet_configs_stats_delete': """
+        CREATE TRIGGER trg_sheet_configs_stats_delete AFTER DELETE ON sheet_configs
+        BEGIN DELETE FROM sheet_stats WHERE sheet_config_id = OLD.id; END
+    """,
+}
+
+_AGGREGATE_SQL = """
+    SELECT
+        sheet_config_id,
+        COUNT(*) AS total,
+        SUM(is_exported IS 1) AS exported,
+        SUM(is_exported IS 0) AS not_exported,
+        SUM(is_exported IS 1 AND is_updated IS 1) AS need_reexport,
+        SUM(is_updated IS 1) AS updated,
+        SUM(transferred IS 1) AS transferred,
+        MAX(extracted_at) AS last_extract
+    FROM sales_data
+    GROUP BY sheet_config_id
+"""
+
+_REBUILD_SQL = f"""
+    INSERT INTO sheet_stats (sheet_config_id, {', '.join(_COUNTER_COLUMNS)}, last_extract)
+    {_AGGREGATE_SQL}
+"""
+
+
+def is_sheet_stats_supported(bind) -> bool:
+    """
+    آیا شمارنده‌ها روی این دیتابیس با trigger نگهداری می‌شوند؟
+
+    فقط SQLite؛ روی دیتابیس‌های دیگر آمار با یک کوئری GROUP BY روی sales_data محاسبه می‌شود.
+    """
+    return bind.dialect.name == 'sqlite'
+
+
+def rebuild_sheet_stats(connection) -> int:
+    """
+    بازسازی کامل شمارنده‌ها از روی sales_data (داخل تراکنش connection)
+
+    Returns:
+        تعداد شیت‌های دارای داده
+    """
+    connection.execute(text("DELETE FROM sheet_stats"))
+    connection.execute(text(_REBUILD_SQL))
+    return connection.execute(text("SELECT COUNT(*) FROM sheet_stats WHERE total > 0")).scalar()
+
+
+def install_sheet_stats(engine) -> bool:
+    """
+    ایجاد trigger های شمارنده‌ها (در صورت نبود) و پر کردن اولیه sheet_stats
+
+    Returns:
+        True اگر trigger ها در این فراخوانی ایجاد و شمارنده‌ها بازسازی شدند
+    """
+    if not is_sheet_stats_supported(engine):
+        return False
+
+    with engine.begin() as connection:
+        existing = {
+            row[0] for row in connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            )
+        }
+        if set(SHEET_STATS_TRIGGERS) <= existing:
+            return False
+
+        for name, ddl in SHEET_STATS_TRIGGERS.items():
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            connection.execute(text(ddl))
+        rebuild_sheet_stats(connection)
+
+    return True
@@ -0,0 +1,49 @@
+"""
+مدل وضعیت همگام‌سازی شیت‌ها (اثر انگشت تغییرات)
+"""
+from sqlalchemy import Column, Integer, String, Boolean, TIMESTAMP, ForeignKey
+from sqlalchemy.sql import func
+from .base import Base
+
+
+class SheetSyncState(Base):
+    """
+    جدول اثر انگشت آخرین همگام‌سازی هر شیت
+
+    اگر اثر انگشت فعلی شیت با مقدار ذخیره شده برابر باشد و اجرای قبلی کامل شده باشد،
+    استخراج آن شیت به طور کامل رد می‌شود.
+    """
+    __tablename__ = 'sheet_sync_states'
+
+    # ستون‌های اصلی
+    id = Column(Integer, primary_key=True, index=True)
+    sheet_config_id = Column(
+        Integer,
+        ForeignKey('sheet_configs.id', ondelete='CASCADE'),
+        nullable=False,
+        unique=True,
+        comment='شناسه تنظیمات شیت'
+    )
+
+    # اثر انگشت
+    fingerprint = Column(String(255), nullable=True, comment='اثر انگشت تغییرات شیت')
+    last_run_completed = Column(Boolean, default=False, comment='آیا اجرای قبلی کامل شد؟')
+
+    # تاریخ‌ها
+    checked_at = Column(TIMESTAMP, server_default=func.now(), comment='تاریخ آخرین بررسی')
+
+    def __repr__(self):
+        return (
+            f"<SheetSyncState(sheet_config_id={self.sheet_config_id}, "
+            f"completed={self.last_run_completed})>"
+        )
+
+    def to_dict(self):
+        """تبدیل به دیکشنری"""
+        return {
+            'id': self.id,
+            'sheet_config_id': self.sheet_config_id,
+            'fingerprint': self.fingerprint,
+            'last_run_completed': self.last_run_completed,
+            'checked_at': self.checked_at.isoformat() if self.checked_at else None,
+        }
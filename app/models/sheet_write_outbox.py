@@ -0,0 +1,92 @@
+"""
+مدل صف پایدار علامت‌گذاری Google Sheets (Outbox)
+"""
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, JSON, ForeignKey, Index
+from sqlalchemy.sql import func
+from .base import Base
+
+
+class SheetWriteOutbox(Base):
+    """
+    جدول عملیات علامت‌گذاری در انتظار
+
+    هر ردیف یک بازه پیوسته از ردیف‌های شیت است که در دیتابیس ذخیره شده‌اند
+    ولی هنوز در ستون "استخراج شده" علامت نخورده‌اند. hash محتوای هر ردیف هنگام ذخیره
+    نگه داشته می‌شود تا اگر پیش از علامت‌گذاری ردیفی درج، حذف یا ویرایش شد، ردیف اشتباه
+    علامت نخورد.
+    """
+    __tablename__ = 'sheet_write_outbox'
+
+    # ستون‌های اصلی
+    id = Column(Integer, primary_key=True, index=True)
+    sheet_config_id = Column(
+        Integer,
+        ForeignKey('sheet_configs.id', ondelete='CASCADE'),
+        nullable=False,
+        comment='شناسه تنظیمات شیت'
+    )
+
+    # مقصد علامت‌گذاری
+    sheet_url = Column(Text, nullable=False, comment='URL گوگل شیت')
+    worksheet_name = Column(String(255), nullable=False, comment='نام ورک‌شیت')
+    extracted_column = Column(String(100), nullable=False, comment='ستون "استخراج شده"')
+
+    # بازه ردیف‌ها
+    start_row = Column(Integer, nullable=False, comment='ردیف شروع')
+    end_row = Column(Integer, nullable=False, comment='ردیف پایان')
+    content_hashes = Column(
+        JSON,
+        nullable=True,
+        comment='hash محتوای ردیف‌های بازه به ترتیب (None = ثبت شده پیش از این ستون، بدون بررسی)'
+    )
+
+    # وضعیت تلاش‌ها
+    attempts = Column(Integer, default=0, nullable=False, comment='تعداد تلاش‌های ناموفق')
+    last_error = Column(Text, nullable=True, comment='آخرین خطا')
+    next_attempt_at = Column(TIMESTAMP, nullable=True, comment='زمان تلاش بعدی')
+
+    # تاریخ‌ها
+    created_at = Column(TIMESTAMP, server_default=func.now(), comment='تاریخ ایجاد')
+
+    # ایندکس‌ها
+    __table_args__ = (
+        Index('idx_outbox_target', 'sheet_config_id', 'worksheet_name', 'extracted_column'),
+        Index('idx_outbox_next_attempt', 'next_attempt_at'),
+    )
+
+    @property
+    def row_count(self) -> int:
+        """تعداد ردیف‌های این بازه"""
+        return self.end_row - self.start_row + 1
+
+    def row_content_hashes(self):
+        """
+        Yields:
+            (شماره ردیف, hash محتوای ذخیره شده یا None)
+        """
+        hashes = self.content_hashes or []
+        for offset, row_number in enumerate(range(self.start_row, self.end_row + 1)):
+            yield row_number, hashes[offset] if offset < len(hashes) else None
+
+    def __repr__(self):
+        return (
+            f"<SheetWriteOutbox(id={self.id}, sheet_config_id={self.sheet_config_id}, "
+            f"rows={self.start_row}-{self.end_row}, attempts={self.attempts})>"
+        )
+
+    def to_dict(self):
+        """تبدیل به دیکشنری"""
+        return {
+            'id': self.id,
+            'sheet_config_id': self.sheet_config_id,
+            'sheet_url': self.sheet_url,
+            'worksheet_name': self.worksheet_name,
+            'extracted_column': self.extracted_column,
+            'start_row': self.start_row,
+            'end_row': self.end_row,
+            'content_hashes': self.content_hashes,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
@@ -0,0 +1,138 @@
+"""
+پروفایل اتصال SQLite (PRAGMA های هر اتصال)
+
+پروفایل با متغیر SQLITE_PROFILE انتخاب می‌شود و از طریق رویداد connect روی هر
+اتصال جدید Engine اعمال می‌شود:
+
+- balanced (پیش‌فرض): WAL، synchronous=NORMAL، کش و mmap بزرگ‌تر، جداول موقت در حافظه
+  (خواندن رابط کاربری پشت نوشتن thread استخراج منتظر نمی‌ماند و هر commit یک fsync کامل ندارد)
+- safe: WAL با synchronous=FULL (دوام بیشتر در قطع برق)
+- legacy: حالت قبلی SQLite (rollback journal)
+
+SQLITE_BUSY_TIMEOUT (میلی‌ثانیه) مقدار busy_timeout پروفایل را تغییر می‌دهد؛ workerهای موازی
+استخراج همزمان می‌نویسند و هر نوشتن تا این مدت پشت قفل نوشتن دیگری منتظر می‌ماند.
+"""
+import os
+from typing import Dict, Optional
+
+from sqlalchemy import event, text
+
+
+# ترتیب اعمال مهم است: journal_mode قبل از synchronous
+SQLITE_PROFILES: Dict[str, Dict[str, object]] = {
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,  # KiB (منفی) = 64 MB
+        'mmap_size': 268435456,  # 256 MB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000,  # میلی‌ثانیه
+    },
+    'safe': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16384,  # 16 MB
+        'mmap_size': 0,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000,
+    },
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+    },
+}
+
+SQLITE_PROFILE_LABELS = {
+    'balanced': 'متعادل (WAL + synchronous=NORMAL) - پیشنهادی',
+    'safe': 'امن (WAL + synchronous=FULL)',
+    'legacy': 'قدیمی (rollback journal)',
+}
+
+DEFAULT_SQLITE_PROFILE = 'balanced'
+
+
+def get_sqlite_profile_name() -> str:
+    """نام پروفایل انتخاب شده (مقدار نامعتبر = پیش‌فرض)"""
+    name = os.getenv('SQLITE_PROFILE', DEFAULT_SQLITE_PROFILE).strip().lower()
+    return name if name in SQLITE_PROFILES else DEFAULT_SQLITE_PROFILE
+
+
+def apply_sqlite_profile(engine, profile: Optional[str] = None) -> str:
+    """
+    ثبت رویداد connect برای اعمال PRAGMA های پروفایل روی هر اتصال جدید
+
+    Args:
+        engine: Engine دیتابیس SQLite
+        profile: نام پروفایل (پیش‌فرض: SQLITE_PROFILE)
+
+    Returns:
+        نام پروفایل اعمال شده
+    """
+    name = profile if profile in SQLITE_PROFILES else get_sqlite_profile_name()
+    pragmas = dict(SQLITE_PROFILES[name])
+    busy_timeout = os.getenv('SQLITE_BUSY_TIMEOUT', '').strip()
+    if busy_timeout.isdigit():
+        pragmas['busy_timeout'] = int(busy_timeout)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+        # BEGIN را خود SQLAlchemy می‌فرستد (رویداد begin)؛ مدیریت تراکنش pysqlite
+        # SAVEPOINT را خارج از تراکنش اجرا و هر RELEASE را commit می‌کند. savepoint های
+        # bulk_upsert_sales_data (تکرار ردیف به ردیف بسته خطادار) و unit of work به این وابسته‌اند
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def _begin_transaction(connection):
+        # sqlite_begin='IMMEDIATE' (WriteSessionLocal): قفل نوشتن از ابتدای تراکنش گرفته
+        # می‌شود و نویسنده‌های همزمان به جای خطای فوری تا busy_timeout منتظر می‌مانند
+        mode = connection.get_execution_options().get('sqlite_begin')
+        connection.exec_driver_sql(f"BEGIN {mode}" if mode else "BEGIN")
+
+    engine.sqlite_profile = name
+    return name
+
+
+def describe_sqlite_connection(engine) -> Dict[str, object]:
+    """
+    مقادیر فعلی PRAGMA ها روی یک اتصال (برای نمایش در آمار دیتابیس)
+
+    Returns:
+        {'profile', 'journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store', 'busy_timeout'}
+    """
+    synchronous_names = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}
+    temp_store_names = {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'}
+
+    info = {'profile': getattr(engine, 'sqlite_profile', 'legacy')}
+    with engine.connect() as connection:
+        for pragma in ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store', 'busy_timeout'):
+            value = connection.execute(text(f"PRAGMA {pragma}")).scalar()
+            if pragma == 'synchronous':
+                value = synchronous_names.get(value, value)
+            elif pragma == 'temp_store':
+                value = temp_store_names.get(value, value)
+            info[pragma] = value
+    return info
+
+
+def checkpoint_wal(engine, mode: str = 'TRUNCATE') -> bool:
+    """
+    انتقال محتوای فایل WAL به فایل اصلی دیتابیس
+
+    پیش از کپی فایل دیتابیس (پشتیبان/آرشیو/بازیابی) لازم است؛ در غیر این صورت
+    تراکنش‌هایی که هنوز در فایل -wal هستند در کپی وجود ندارند.
+
+    Returns:
+        True اگر checkpoint کامل انجام شد (یا دیتابیس در حالت WAL نیست)
+    """
+    with engine.connect() as connection:
+        if str(connection.execute(text("PRAGMA journal_mode")).scalar()).lower() != 'wal':
+            return True
+        busy, _, _ = connection.execute(text(f"PRAGMA wal_checkpoint({mode})")).fetchone()
+        return busy == 0
@@ -43,6 +43,45 @@ class ChangeDetector:
         """
         from app.utils.unique_key_generator import generate_content_hash
         
+        # ساخت نقشه hash برای داده‌های قدیمی
+        old_hash_map = {}  # {hash: (row_num, data)}
+        for item in old_data:
+            content_hash = generate_content_hash(item['data'], unique_columns)
+            old_hash_map[content_hash] = (item['row_number'], item['data'])
+        
+        return self._compare(old_hash_map, new_data, unique_columns)
+    
+    def detect_changes_by_hash(
+        self,
+        old_hashes: Dict[str, int],  # hash ذخیره شده -> شماره ردیف (از دیتابیس)
+        new_data: List[Dict],  # داده‌های جدید از Google Sheet
+        unique_columns: Optional[List[str]] = None
+    ) -> Tuple[List[RowChange], Dict]:
+        """
+        تشخیص تغییرات فقط بر اساس hash ذخیره شده رکوردهای قبلی
+        
+        داده‌های JSON قدیمی خوانده و دوباره hash نمی‌شوند؛ old_data در تغییرات حاصل None است.
+        
+        Args:
+            old_hashes: نگاشت content_hash -> row_number
+            new_data: داده‌های جدید (در صورت وجود content_hash از همان استفاده می‌شود)
+            unique_columns: ستون‌های کلیدی برای تطبیق
+            
+        Returns:
+            (لیست تغییرات, آمار)
+        """
+        old_hash_map = {content_hash: (row_number, None) for content_hash, row_number in old_hashes.items()}
+        return self._compare(old_hash_map, new_data, unique_columns)
+    
+    def _compare(
+        self,
+        old_hash_map: Dict[str, Tuple[int, Optional[Dict]]],
+        new_data: List[Dict],
+        unique_columns: Optional[List[str]]
+    ) -> Tuple[List[RowChange], Dict]:
+        """مقایسه نقشه hash قدیمی با داده‌های جدید"""
+        from app.utils.unique_key_generator import generate_content_hash
+        
         changes = []
         stats = {
             'added': 0,
@@ -52,16 +91,10 @@ class ChangeDetector:
             'unchanged': 0
         }
         
-        # ساخت نقشه hash برای داده‌های قدیمی
-        old_hash_map = {}  # {hash: (row_num, data)}
-        for item in old_data:
-            content_hash = generate_content_hash(item['data'], unique_columns)
-            old_hash_map[content_hash] = (item['row_number'], item['data'])
-        
         # ساخت نقشه hash برای داده‌های جدید
         new_hash_map = {}  # {hash: (row_num, data)}
         for item in new_data:
-            content_hash = generate_content_hash(item['data'], unique_columns)
+            content_hash = item.get('content_hash') or generate_content_hash(item['data'], unique_columns)
             new_hash_map[content_hash] = (item['row_number'], item['data'])
         
         # پیدا کردن ردیف‌های حذف شده
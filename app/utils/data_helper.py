@@ -46,12 +46,15 @@ class DataHelper:
             session = db_manager.get_session()
             configs = session.query(SheetConfig).all()
             
+            # تعداد رکوردها از شمارنده‌های هر شیت
+            record_counts = {
+                stat['sheet_config_id']: stat['total']
+                for stat in db_manager.get_all_sheets_statistics()
+            }
+            
             result = []
             for config in configs:
-                # شمارش رکوردها
-                record_count = session.query(SalesData)\
-                    .filter(SalesData.sheet_config_id == config.id)\
-                    .count()
+                record_count = record_counts.get(config.id, 0)
                 
                 result.append({
                     'id': config.id,
@@ -178,25 +181,12 @@ class DataHelper:
             دیکشنری آمار
         """
         try:
-            session = db_manager.get_session()
+            stats = db_manager.get_sheet_statistics(sheet_config_id)
+            total_count = stats['total']
+            exported_count = stats['exported']
+            updated_count = stats['updated_count']
             
-            total_count = session.query(SalesData)\
-                .filter(SalesData.sheet_config_id == sheet_config_id)\
-                .count()
-            
-            exported_count = session.query(SalesData)\
-                .filter(
-                    SalesData.sheet_config_id == sheet_config_id,
-                    SalesData.is_exported == True
-                )\
-                .count()
-            
-            updated_count = session.query(SalesData)\
-                .filter(
-                    SalesData.sheet_config_id == sheet_config_id,
-                    SalesData.is_updated == True
-                )\
-                .count()
+            session = db_manager.get_session()
             
             # خواندن نمونه برای شمارش ستون‌ها
             sample = session.query(SalesData)\
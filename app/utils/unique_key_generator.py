@@ -3,7 +3,8 @@
 """
 import hashlib
 import json
-from typing import Dict, List, Optional
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
 
 
 def generate_unique_key(
@@ -129,3 +130,201 @@ def compare_data_content(data1: Dict, data2: Dict, ignore_keys: List[str] = None
     hash2 = generate_content_hash(clean_data2)
     
     return hash1 == hash2
+
+
+# ==================== Batch Key Generation ====================
+
+# حالت compat: خروجی دقیقاً برابر generate_unique_key / generate_content_hash (MD5)
+# حالت fast: hash غیررمزنگاری 64 بیتی (xxhash در صورت نصب، در غیر این صورت blake2b)
+#            کلیدها با حالت compat متفاوت هستند؛ فقط برای دیتابیس جدید استفاده شود
+KEY_HASH_COMPAT = 'compat'
+KEY_HASH_FAST = 'fast'
+
+try:
+    import xxhash
+except ImportError:  # وابستگی اختیاری
+    xxhash = None
+
+_encode_string = json.encoder.encode_basestring
+
+
+def get_key_hash_mode() -> str:
+    """حالت hash کلیدها از تنظیمات (UNIQUE_KEY_HASH، پیش‌فرض compat)"""
+    mode = os.getenv('UNIQUE_KEY_HASH', KEY_HASH_COMPAT).strip().lower()
+    return mode if mode in (KEY_HASH_COMPAT, KEY_HASH_FAST) else KEY_HASH_COMPAT
+
+
+def _encode_value(value) -> str:
+    """JSON یک مقدار مشابه json.dumps(ensure_ascii=False, separators=(',', ':'))"""
+    if type(value) is str:
+        return _encode_string(value)
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def _md5_16(payload: str) -> str:
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _fast_16(payload: str) -> str:
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(payload.encode('utf-8'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class UniqueKeyBatch:
+    """
+    ساخت دسته‌ای کلید یکتا و hash محتوا برای ردیف‌های یک شیت
+    
+    ترتیب و موقعیت ستون‌های کلیدی یک بار از روی هدرها محاسبه می‌شود و هر ردیف بدون
+    ساخت دیکشنری و بدون json.dumps کامل به رشته canonical تبدیل می‌شود. در حالت compat
+    خروجی بایت به بایت با generate_unique_key و generate_content_hash برابر است
+    (hash کلید و hash محتوا یکسان هستند و یک بار محاسبه می‌شوند).
+    
+    Example:
+        batch = UniqueKeyBatch(5, headers, ['Order ID'])
+        for unique_key, content_hash in batch.keys_for_values(rows):
+            ...
+    """
+    
+    def __init__(
+        self,
+        sheet_config_id: int,
+        headers: Optional[List[str]] = None,
+        unique_columns: Optional[List[str]] = None,
+        mode: Optional[str] = None
+    ):
+        """
+        Args:
+            sheet_config_id: شناسه تنظیمات شیت
+            headers: نام ستون‌ها به ترتیب مقادیر هر ردیف (برای ردیف‌های دیکشنری اختیاری)
+            unique_columns: ستون‌هایی که برای یکتایی استفاده می‌شوند (None = کل ردیف)
+            mode: 'compat' یا 'fast' (پیش‌فرض: UNIQUE_KEY_HASH)
+        """
+        self.sheet_config_id = sheet_config_id
+        self.mode = mode or get_key_hash_mode()
+        self._hash = _fast_16 if self.mode == KEY_HASH_FAST else _md5_16
+        self._key_prefix = f"{sheet_config_id}_"
+        self._unique_columns = unique_columns or None
+        
+        self.columns: Optional[List[str]] = None
+        self._indexes: List[int] = []
+        self._max_index = -1
+        self._prefixes: List[str] = []
+        
+        if headers is not None:
+            # مانند ساخت دیکشنری ردیف: برای نام تکراری، اولین ستون معتبر است
+            first_index = {}
+            for idx, header in enumerate(headers):
+                first_index.setdefault(header, idx)
+            if self._unique_columns:
+                columns = {col for col in self._unique_columns if col in first_index}
+            else:
+                columns = set(first_index)
+            self._set_columns(sorted(columns), first_index)
+        elif self._unique_columns:
+            self.columns = sorted(set(self._unique_columns))
+            self._prefixes = self._column_prefixes(self.columns)
+    
+    @staticmethod
+    def _column_prefixes(columns: List[str]) -> List[str]:
+        return [('{' if i == 0 else ',') + _encode_string(col) + ':' for i, col in enumerate(columns)]
+    
+    def _set_columns(self, columns: List[str], first_index: Dict[str, int]):
+        self.columns = columns
+        self._indexes = [first_index[col] for col in columns]
+        self._max_index = max(self._indexes, default=-1)
+        self._prefixes = self._column_prefixes(columns)
+    
+    # ==================== Serialization ====================
+    
+    def _serialize(self, prefixes: List[str], values: List) -> str:
+        if self.mode == KEY_HASH_FAST:
+            try:
+                return '\x1f'.join(values)
+            except TypeError:
+                return '\x1f'.join(value if type(value) is str else _encode_value(value) for value in values)
+        if not prefixes:
+            return '{}'
+        try:
+            # مسیر سریع: همه مقادیر رشته هستند (encode_basestring برای غیر رشته TypeError می‌دهد)
+            return ''.join(map(str.__add__, prefixes, map(_encode_string, values))) + '}'
+        except TypeError:
+            return ''.join([prefix + _encode_value(value) for prefix, value in zip(prefixes, values)]) + '}'
+    
+    def hash_values(self, values: List) -> str:
+        """hash یک ردیف از لیست مقادیر (به ترتیب headers)"""
+        if len(values) > self._max_index:
+            projected = [values[idx] for idx in self._indexes]
+        else:
+            width = len(values)
+            projected = [values[idx] if idx < width else '' for idx in self._indexes]
+        return self._hash(self._serialize(self._prefixes, projected))
+    
+    def hash_record(self, data: Dict) -> str:
+        """hash یک ردیف از دیکشنری داده (ستون‌های ناموجود در ردیف در نظر گرفته نمی‌شوند)"""
+        if self.columns is None:
+            columns = sorted(data)
+            prefixes = self._column_prefixes(columns)
+        else:
+            try:
+                return self._hash(self._serialize(self._prefixes, [data[col] for col in self.columns]))
+            except KeyError:
+                columns = [col for col in self.columns if col in data]
+                prefixes = self._column_prefixes(columns)
+        return self._hash(self._serialize(prefixes, [data[col] for col in columns]))
+    
+    def make_key(self, row_hash: str, row_number: Optional[int] = None) -> str:
+        """کلید یکتا از hash ردیف (فرمت generate_unique_key)"""
+        if row_number:
+            return f"{self._key_prefix}{row_hash}_r{row_number}"
+        return f"{self._key_prefix}{row_hash}"
+    
+    # ==================== Batch ====================
+    
+    def keys_for_values(self, rows: Iterable[Tuple[int, List]]) -> List[Tuple[str, str]]:
+        """
+        Args:
+            rows: (شماره ردیف, لیست مقادیر)
+            
+        Returns:
+            لیست (unique_key, content_hash)
+        """
+        indexes, max_index = self._indexes, self._max_index
+        prefixes, serialize, hash_payload = self._prefixes, self._serialize, self._hash
+        key_prefix = self._key_prefix
+        
+        result = []
+        append = result.append
+        for row_number, values in rows:
+            if len(values) > max_index:
+                projected = [values[idx] for idx in indexes]
+            else:
+                width = len(values)
+                projected = [values[idx] if idx < width else '' for idx in indexes]
+            row_hash = hash_payload(serialize(prefixes, projected))
+            if row_number:
+                append((f"{key_prefix}{row_hash}_r{row_number}", row_hash))
+            else:
+                append((f"{key_prefix}{row_hash}", row_hash))
+        return result
+    
+    def keys_for_records(self, records: Iterable[Dict]) -> List[Tuple[str, str]]:
+        """
+        Args:
+            records: لیست {'row_number', 'data'} (خروجی extract_ready_rows)
+            
+        Returns:
+            لیست (unique_key, content_hash)
+        """
+        hash_record, key_prefix = self.hash_record, self._key_prefix
+        
+        result = []
+        append = result.append
+        for record in records:
+            row_hash = hash_record(record['data'])
+            row_number = record['row_number']
+            if row_number:
+                append((f"{key_prefix}{row_hash}_r{row_number}", row_hash))
+            else:
+                append((f"{key_prefix}{row_hash}", row_hash))
+        return result
@@ -0,0 +1,166 @@
+"""
+بنچمارک استخراج: extract_and_save و mark_rows_as_extracted روی Google Sheets جعلی
+================================================================================
+
+بدون credentials و بدون اتصال اینترنت اجرا می‌شود (FakeSheetsClient) و برای هر اندازه
+شیت سرعت (ردیف در ثانیه) و تعداد درخواست‌های API را گزارش می‌دهد.
+
+Usage:
+    python benchmark_extraction.py
+    python benchmark_extraction.py --sizes 1000 10000 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# دیتابیس موقت - باید قبل از import مدل‌ها تنظیم شود
+_work_dir = tempfile.mkdtemp(prefix="gtland_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_work_dir, 'bench.db').as_posix()}"
+os.environ["SHEETS_SNAPSHOT_CACHE"] = "false"
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import logging
+
+from app.core.logger import app_logger
+from app.core.fake_sheets import FakeSheetsClient, generate_sales_grid
+from app.core.google_sheets import GoogleSheetExtractor
+from app.core.rate_limiter import SheetsRateLimiter
+from app.core.batch_tuning import AdaptiveBatchSizer
+from app.models import SessionLocal, SheetConfig, init_db
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def build_extractor(client: FakeSheetsClient, quota: float) -> GoogleSheetExtractor:
+    """extractor متصل به کلاینت جعلی با محدودکننده و کنترل‌کننده بچ مستقل"""
+    return GoogleSheetExtractor(
+        client=client,
+        rate_limiter=SheetsRateLimiter(quota, quota),
+        batch_sizer=AdaptiveBatchSizer(state_file=str(Path(_work_dir, 'batch_tuning.json')))
+    )
+
+
+def create_sheet_config(name: str, sheet_url: str) -> int:
+    """ایجاد تنظیمات شیت بنچمارک"""
+    db = SessionLocal()
+    config = SheetConfig(
+        name=name,
+        sheet_url=sheet_url,
+        worksheet_name="Sheet1",
+        ready_column="Ready",
+        extracted_column="Extracted",
+        unique_key_columns=["Order ID"],
+    )
+    db.add(config)
+    db.commit()
+    config_id = config.id
+    db.close()
+    return config_id
+
+
+def format_calls(client: FakeSheetsClient) -> str:
+    return ", ".join(f"{method}={count}" for method, count in sorted(client.calls.items()))
+
+
+def bench_extract_and_save(rows: int, args) -> dict:
+    """بنچمارک کامل استخراج و ذخیره"""
+    client = FakeSheetsClient(latency=args.latency, error_rate=args.error_rate, quota_per_minute=args.fake_quota)
+    sheet_url = client.add_worksheet(f"bench-extract-{rows}", "Sheet1", generate_sales_grid(rows, seed=rows))
+    config_id = create_sheet_config(f"bench_extract_{rows}", sheet_url)
+    extractor = build_extractor(client, args.quota)
+
+    started = time.perf_counter()
+    success, message, stats = extractor.extract_and_save(config_id, auto_update=True)
+    elapsed = time.perf_counter() - started
+
+    processed = stats.get('total_rows', 0)
+    return {
+        'name': 'extract_and_save',
+        'rows': rows,
+        'processed': processed,
+        'seconds': elapsed,
+        'rows_per_sec': processed / elapsed if elapsed else 0,
+        'api_calls': client.total_calls,
+        'calls': format_calls(client),
+        'ok': success,
+        'message': message,
+    }
+
+
+def bench_mark_rows(rows: int, args) -> dict:
+    """بنچمارک علامت‌گذاری همه ردیف‌ها"""
+    client = FakeSheetsClient(
+        latency=args.latency,
+        latency_per_1k_cells=args.latency_per_1k_cells,
+        error_rate=args.error_rate,
+        quota_per_minute=args.fake_quota
+    )
+    grid = generate_sales_grid(rows, ready_ratio=1.0, extracted_ratio=0.0, seed=rows)
+    sheet_url = client.add_worksheet(f"bench-mark-{rows}", "Sheet1", grid)
+    extractor = build_extractor(client, args.quota)
+
+    # هر دهمین ردیف رد می‌شود تا بازه‌های ناپیوسته (حالت واقعی‌تر) ساخته شوند
+    row_numbers = [row for row in range(2, rows + 2) if row % 10 != 0]
+
+    started = time.perf_counter()
+    success, message, stats = extractor.mark_rows_as_extracted(sheet_url, "Sheet1", row_numbers, "Extracted")
+    elapsed = time.perf_counter() - started
+
+    return {
+        'name': 'mark_rows_as_extracted',
+        'rows': rows,
+        'processed': stats.get('success', 0),
+        'seconds': elapsed,
+        'rows_per_sec': stats.get('success', 0) / elapsed if elapsed else 0,
+        'api_calls': client.total_calls,
+        'calls': format_calls(client),
+        'ok': success and stats.get('failed', 0) == 0,
+        'message': message,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="بنچمارک استخراج روی Google Sheets جعلی")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="تعداد ردیف‌ها")
+    parser.add_argument("--latency", type=float, default=0.0, help="تأخیر هر درخواست (ثانیه)")
+    parser.add_argument("--latency-per-1k-cells", type=float, default=0.0, help="تأخیر نوشتن به ازای 1000 سلول")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="احتمال خطای 5xx هر درخواست")
+    parser.add_argument("--fake-quota", type=int, default=None, help="سهمیه دقیقه‌ای کلاینت جعلی (429)")
+    parser.add_argument("--quota", type=float, default=100000, help="سهمیه محدودکننده نرخ برنامه در دقیقه")
+    parser.add_argument("--only", choices=["extract", "mark"], default=None, help="فقط یک بنچمارک")
+    parser.add_argument("--verbose", action="store_true", help="نمایش لاگ‌های برنامه")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        app_logger.logger.remove()
+
+    init_db()
+
+    results = []
+    for rows in args.sizes:
+        if args.only in (None, "extract"):
+            logger.info(f"⏱️ extract_and_save - {rows:,} ردیف...")
+            results.append(bench_extract_and_save(rows, args))
+        if args.only in (None, "mark"):
+            logger.info(f"⏱️ mark_rows_as_extracted - {rows:,} ردیف...")
+            results.append(bench_mark_rows(rows, args))
+
+    logger.info("")
+    logger.info(f"{'benchmark':<24}{'rows':>9}{'processed':>11}{'seconds':>10}{'rows/sec':>11}{'api calls':>11}  ok")
+    logger.info("-" * 82)
+    for result in results:
+        logger.info(
+            f"{result['name']:<24}{result['rows']:>9,}{result['processed']:>11,}{result['seconds']:>10.2f}"
+            f"{result['rows_per_sec']:>11,.0f}{result['api_calls']:>11}  {'✅' if result['ok'] else '❌'}"
+        )
+        logger.info(f"{'':<24}{result['calls']}")
+    logger.info(f"\n📁 فایل‌های موقت: {_work_dir}")
+
+
+if __name__ == "__main__":
+    main()
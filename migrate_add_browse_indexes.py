@@ -0,0 +1,42 @@
+"""
+Migration: ایندکس‌های مرور صفحه به صفحه داده‌های فروش
+=======================================================
+
+ایندکس‌های (sheet_config_id, is_exported, id) و (sheet_config_id, is_updated, id) را به
+دیتابیس‌های قدیمی اضافه می‌کند تا صفحه‌بندی keyset با فیلتر وضعیت Export/بروزرسانی
+بدون پیمایش کل داده‌های شیت انجام شود.
+"""
+from sqlalchemy import text
+from app.models import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+INDEXES = {
+    'idx_sales_data_sheet_exported_id': 'sales_data (sheet_config_id, is_exported, id)',
+    'idx_sales_data_sheet_updated_id': 'sales_data (sheet_config_id, is_updated, id)',
+}
+
+
+def migrate():
+    """ایجاد ایندکس‌ها (قابل اجرای چندباره)"""
+
+    try:
+        with engine.begin() as connection:
+            for name, definition in INDEXES.items():
+                connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}"))
+                logger.info(f"✅ ایندکس {name}")
+
+        logger.info("✅ Migration با موفقیت انجام شد!")
+
+    except Exception as e:
+        logger.error(f"❌ خطا در Migration: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("شروع Migration...")
+    migrate()
+    logger.info("پایان Migration")
@@ -0,0 +1,61 @@
+"""
+Migration: اضافه کردن ستون content_hash به جدول sales_data
+===========================================================
+
+ستون hash محتوای ستون‌های کلیدی و ایندکس (sheet_config_id, content_hash) را اضافه می‌کند
+و hash رکوردهای موجود هر شیت را محاسبه می‌کند تا تشخیص تغییرات بدون خواندن JSON انجام شود.
+"""
+from sqlalchemy import inspect, text
+from app.models import engine, SheetConfig, SessionLocal
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate(backfill: bool = True):
+    """اضافه کردن ستون و ایندکس جدید (قابل اجرای چندباره)"""
+
+    try:
+        columns = [column['name'] for column in inspect(engine).get_columns('sales_data')]
+        logger.info(f"ستون‌های موجود: {columns}")
+
+        with engine.begin() as connection:
+            if 'content_hash' not in columns:
+                logger.info("اضافه کردن ستون: content_hash")
+                connection.execute(text("ALTER TABLE sales_data ADD COLUMN content_hash VARCHAR(32)"))
+                logger.info("✅ ستون content_hash اضافه شد")
+            else:
+                logger.info("⏭️ ستون content_hash قبلاً وجود دارد")
+
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_sales_data_sheet_hash "
+                "ON sales_data (sheet_config_id, content_hash)"
+            ))
+
+        if backfill:
+            # محاسبه hash رکوردهای موجود
+            from app.core.database import db_manager
+
+            session = SessionLocal()
+            try:
+                configs = session.query(SheetConfig.id, SheetConfig.unique_key_columns).all()
+            finally:
+                session.close()
+
+            total = 0
+            for config_id, unique_columns in configs:
+                total += db_manager.backfill_content_hashes(config_id, unique_columns)
+            logger.info(f"✅ hash محتوای {total} رکورد محاسبه شد")
+
+        logger.info("✅ Migration با موفقیت انجام شد!")
+
+    except Exception as e:
+        logger.error(f"❌ خطا در Migration: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("شروع Migration...")
+    migrate()
+    logger.info("پایان Migration")
@@ -0,0 +1,41 @@
+"""
+Migration: اضافه کردن ستون base_hash به جدول duplicate_candidates
+==================================================================
+
+hash داده رکورد موجود هنگام ثبت تکراری را نگه می‌دارد؛ اگر رکورد پس از آن تغییر کند، داده
+جدید بازسازی شده از خلاصه تفاوت‌ها معتبر نیست و تکراری بررسی نمی‌شود. تکراری‌های موجود
+(بدون hash) تا استخراج دوباره شیت قابل بررسی نیستند.
+"""
+from sqlalchemy import inspect, text
+from app.models import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """اضافه کردن ستون جدید (قابل اجرای چندباره)"""
+
+    try:
+        columns = [column['name'] for column in inspect(engine).get_columns('duplicate_candidates')]
+
+        if 'base_hash' not in columns:
+            logger.info("اضافه کردن ستون: base_hash")
+            with engine.begin() as connection:
+                connection.execute(text("ALTER TABLE duplicate_candidates ADD COLUMN base_hash VARCHAR(32)"))
+            logger.info("✅ ستون base_hash اضافه شد")
+        else:
+            logger.info("⏭️ ستون base_hash قبلاً وجود دارد")
+
+        logger.info("✅ Migration با موفقیت انجام شد!")
+
+    except Exception as e:
+        logger.error(f"❌ خطا در Migration: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("شروع Migration...")
+    migrate()
+    logger.info("پایان Migration")
@@ -0,0 +1,46 @@
+"""
+Migration: اضافه کردن ستون indexed_fields به جدول sheet_configs
+================================================================
+
+ستون کلیدهای ایندکس شده داده JSON هر شیت را اضافه می‌کند و ایندکس‌های json_extract
+کلیدهای انتخاب شده را با تنظیمات فعلی همگام می‌کند.
+"""
+from sqlalchemy import inspect, text
+from app.models import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """اضافه کردن ستون و همگام‌سازی ایندکس‌ها (قابل اجرای چندباره)"""
+
+    try:
+        columns = [column['name'] for column in inspect(engine).get_columns('sheet_configs')]
+
+        if 'indexed_fields' not in columns:
+            logger.info("اضافه کردن ستون: indexed_fields")
+            with engine.begin() as connection:
+                connection.execute(text("ALTER TABLE sheet_configs ADD COLUMN indexed_fields JSON"))
+            logger.info("✅ ستون indexed_fields اضافه شد")
+        else:
+            logger.info("⏭️ ستون indexed_fields قبلاً وجود دارد")
+
+        from app.core.database import db_manager
+        success, message = db_manager.sync_json_field_indexes()
+        if not success:
+            raise RuntimeError(message)
+        logger.info(f"✅ {message}")
+
+        logger.info("✅ Migration با موفقیت انجام شد!")
+
+    except Exception as e:
+        logger.error(f"❌ خطا در Migration: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("شروع Migration...")
+    migrate()
+    logger.info("پایان Migration")
@@ -0,0 +1,40 @@
+"""
+Migration: اضافه کردن ستون content_hashes به جدول sheet_write_outbox
+=====================================================================
+
+hash محتوای هر ردیف بازه‌های صف علامت‌گذاری را نگه می‌دارد تا پیش از علامت‌گذاری بررسی
+شود ردیف شیت همان ردیف ذخیره شده است. بازه‌های موجود بدون hash (مانند قبل) علامت می‌خورند.
+"""
+from sqlalchemy import inspect, text
+from app.models import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """اضافه کردن ستون جدید (قابل اجرای چندباره)"""
+
+    try:
+        columns = [column['name'] for column in inspect(engine).get_columns('sheet_write_outbox')]
+
+        if 'content_hashes' not in columns:
+            logger.info("اضافه کردن ستون: content_hashes")
+            with engine.begin() as connection:
+                connection.execute(text("ALTER TABLE sheet_write_outbox ADD COLUMN content_hashes JSON"))
+            logger.info("✅ ستون content_hashes اضافه شد")
+        else:
+            logger.info("⏭️ ستون content_hashes قبلاً وجود دارد")
+
+        logger.info("✅ Migration با موفقیت انجام شد!")
+
+    except Exception as e:
+        logger.error(f"❌ خطا در Migration: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    logger.info("شروع Migration...")
+    migrate()
+    logger.info("پایان Migration")
@@ -0,0 +1,83 @@
+"""
+تنظیمات مشترک تست‌ها
+
+دیتابیس تست یک فایل SQLite موقت است؛ DATABASE_URL باید پیش از import شدن app تنظیم شود.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+TEST_DB_DIR = tempfile.mkdtemp(prefix='gt_land_tests_')
+
+os.environ['DATABASE_URL'] = f"sqlite:///{Path(TEST_DB_DIR) / 'test.db'}"
+os.environ['SHEETS_SNAPSHOT_CACHE'] = 'false'
+sys.path.insert(0, str(ROOT_DIR))
+
+from app.models import Base, engine, init_db  # noqa: E402
+
+
+init_db()
+
+
+@pytest.fixture
+def db_manager():
+    """DatabaseManager روی دیتابیس خالی"""
+    from app.core.database import db_manager as manager
+    
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    
+    return manager
+
+
+@pytest.fixture
+def sheet_config(db_manager):
+    """یک تنظیمات شیت ساده"""
+    success, config, message = db_manager.create_sheet_config({
+        'name': 'فروش',
+        'sheet_url': 'https://docs.google.com/spreadsheets/d/test',
+        'worksheet_name': 'Sheet1',
+    })
+    assert success, message
+    return config
+
+
+@pytest.fixture
+def fake_sheet(db_manager, tmp_path):
+    """
+    شیت فروش جعلی (FakeSheetsClient) با تنظیمات و extractor متصل به آن
+    
+    Returns:
+        تابع (rows, seed) -> (client, worksheet, sheet_config_id, extractor)
+    """
+    from app.core.batch_tuning import AdaptiveBatchSizer
+    from app.core.fake_sheets import FakeSheetsClient, generate_sales_grid
+    from app.core.google_sheets import GoogleSheetExtractor
+    from app.core.rate_limiter import SheetsRateLimiter
+    
+    def create(rows: int = 50, seed: int = 1):
+        client = FakeSheetsClient()
+        sheet_url = client.add_worksheet(f"test-{seed}", 'Sheet1', generate_sales_grid(rows, seed=seed))
+        success, config, message = db_manager.create_sheet_config({
+            'name': f"test_{seed}",
+            'sheet_url': sheet_url,
+            'worksheet_name': 'Sheet1',
+            'ready_column': 'Ready',
+            'extracted_column': 'Extracted',
+            'unique_key_columns': ['Order ID'],
+        })
+        assert success, message
+        extractor = GoogleSheetExtractor(
+            client=client,
+            rate_limiter=SheetsRateLimiter(10000, 10000),
+            batch_sizer=AdaptiveBatchSizer(state_file=str(tmp_path / 'batch_tuning.json'))
+        )
+        worksheet = client.open_by_url(sheet_url).worksheet('Sheet1')
+        return client, worksheet, config.id, extractor
+    
+    return create
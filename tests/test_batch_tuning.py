@@ -0,0 +1,60 @@
+"""
+تست‌های تنظیم تطبیقی اندازه بچ (AIMD)
+"""
+from app.core.batch_tuning import (
+    AdaptiveBatchSizer, ERROR_OTHER, ERROR_SERVER, ERROR_THROTTLED, ERROR_TIMEOUT, classify_sheets_error
+)
+
+
+class _ApiError(Exception):
+    def __init__(self, code: int, message: str = ''):
+        super().__init__(message or f"APIError {code}")
+        self.code = code
+
+
+def _sizer(tmp_path, **kwargs) -> AdaptiveBatchSizer:
+    options = dict(initial_size=1000, min_size=50, max_size=2000, additive_step=500)
+    options.update(kwargs)
+    return AdaptiveBatchSizer(state_file=str(tmp_path / 'tuning.json'), **options)
+
+
+def test_classify_sheets_error():
+    assert classify_sheets_error(_ApiError(429)) == ERROR_THROTTLED
+    assert classify_sheets_error(_ApiError(503)) == ERROR_SERVER
+    assert classify_sheets_error(TimeoutError("read timed out")) == ERROR_TIMEOUT
+    assert classify_sheets_error(_ApiError(400, "Invalid range")) == ERROR_OTHER
+
+
+def test_additive_increase_only_for_full_fast_batches(tmp_path):
+    sizer = _sizer(tmp_path)
+    
+    sizer.record_success('book', cells=1000, latency=1.0)
+    assert sizer.current_size('book') == 1500
+    # بچ ناقص یا کند اندازه را بزرگ نمی‌کند
+    sizer.record_success('book', cells=200, latency=1.0)
+    sizer.record_success('book', cells=1500, latency=60.0)
+    assert sizer.current_size('book') == 1500
+    
+    sizer.record_success('book', cells=1500, latency=1.0)
+    sizer.record_success('book', cells=2000, latency=1.0)
+    assert sizer.current_size('book') == 2000
+
+
+def test_multiplicative_decrease(tmp_path):
+    sizer = _sizer(tmp_path)
+    
+    assert sizer.record_failure('book', ERROR_THROTTLED) == 500
+    assert sizer.record_failure('book', ERROR_OTHER) == 500
+    for _ in range(10):
+        sizer.record_failure('book', ERROR_TIMEOUT)
+    assert sizer.current_size('book') == 50
+    # Spreadsheet دیگر مستقل است
+    assert sizer.current_size('other') == 1000
+
+
+def test_learned_size_persists(tmp_path):
+    sizer = _sizer(tmp_path)
+    sizer.record_failure('book', ERROR_SERVER)
+    sizer.save()
+    
+    assert _sizer(tmp_path).current_size('book') == 500
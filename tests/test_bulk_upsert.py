@@ -0,0 +1,106 @@
+"""
+تست‌های ذخیره دسته‌ای (bulk_upsert_sales_data)
+"""
+import pytest
+
+from app.core.sheet_key_index import SheetKeyIndex
+from app.models import SalesData
+
+
+def _row(row_number: int, key: str, **data) -> dict:
+    return {
+        'row_number': row_number,
+        'unique_key': key,
+        'data': {'Order ID': key, **data},
+        'content_hash': f"hash-{key}-{sorted(data.items())}",
+    }
+
+
+def _stored(db_manager, sheet_config_id: int) -> dict:
+    db = db_manager.get_session()
+    rows = {
+        item.unique_key: (item.row_number, item.data)
+        for item in db.query(SalesData).filter_by(sheet_config_id=sheet_config_id)
+    }
+    db.close()
+    return rows
+
+
+def _keys(rows) -> list:
+    return sorted(row['unique_key'] for row in rows)
+
+
+def test_new_duplicate_and_update(db_manager, sheet_config):
+    success, result, _ = db_manager.bulk_upsert_sales_data(sheet_config.id, [_row(2, 'a'), _row(3, 'b')])
+    assert success and _keys(result['new']) == ['a', 'b']
+    
+    success, result, _ = db_manager.bulk_upsert_sales_data(
+        sheet_config.id, [_row(2, 'a', price=2), _row(4, 'c')]
+    )
+    assert _keys(result['new']) == ['c']
+    assert _keys(result['duplicates']) == ['a']
+    assert result['duplicates'][0]['existing_data'] == {'Order ID': 'a'}
+    
+    success, result, _ = db_manager.bulk_upsert_sales_data(
+        sheet_config.id, [_row(2, 'a', price=2)], update_existing=True
+    )
+    assert _keys(result['updated']) == ['a']
+    assert _stored(db_manager, sheet_config.id)['a'][1] == {'Order ID': 'a', 'price': 2}
+
+
+def test_constraint_violation_falls_back_to_single_rows(db_manager, sheet_config):
+    db_manager.bulk_upsert_sales_data(sheet_config.id, [_row(2, 'a')])
+    
+    # ردیف 2 شیت قبلاً با کلید دیگری ذخیره شده (uq_sheet_row)
+    success, result, _ = db_manager.bulk_upsert_sales_data(
+        sheet_config.id, [_row(3, 'b'), _row(2, 'conflict'), _row(4, 'c')]
+    )
+    assert success
+    assert _keys(result['new']) == ['b', 'c']
+    assert _keys(result['failed']) == ['conflict']
+    assert set(_stored(db_manager, sheet_config.id)) == {'a', 'b', 'c'}
+
+
+def test_fallback_inside_unit_of_work(db_manager, sheet_config):
+    db_manager.bulk_upsert_sales_data(sheet_config.id, [_row(2, 'a')])
+    
+    with db_manager.unit_of_work():
+        success, result, _ = db_manager.bulk_upsert_sales_data(
+            sheet_config.id, [_row(3, 'b'), _row(2, 'conflict')]
+        )
+        assert success and _keys(result['new']) == ['b']
+    
+    assert set(_stored(db_manager, sheet_config.id)) == {'a', 'b'}
+
+
+def test_fallback_savepoints_stay_inside_transaction(db_manager, sheet_config):
+    db_manager.bulk_upsert_sales_data(sheet_config.id, [_row(2, 'a')])
+    
+    # RELEASE هر savepoint نباید تراکنش بیرونی را commit کند
+    with pytest.raises(RuntimeError):
+        with db_manager.unit_of_work():
+            db_manager.bulk_upsert_sales_data(sheet_config.id, [_row(3, 'b'), _row(2, 'conflict')])
+            raise RuntimeError('boom')
+    
+    assert set(_stored(db_manager, sheet_config.id)) == {'a'}
+
+
+def test_concurrently_inserted_key_is_not_counted_as_new(db_manager, sheet_config):
+    # ایندکس کلیدها پیش از درج همان کلید توسط نوشتن دیگری بارگذاری شده است
+    stale_index = SheetKeyIndex(sheet_config.id)
+    db_manager.bulk_upsert_sales_data(sheet_config.id, [_row(2, 'a')])
+    
+    success, result, _ = db_manager.bulk_upsert_sales_data(
+        sheet_config.id, [_row(2, 'a', price=5), _row(3, 'b')], key_index=stale_index
+    )
+    assert success
+    assert _keys(result['new']) == ['b']
+    assert _keys(result['duplicates']) == ['a']
+    assert result['duplicates'][0]['existing_data'] == {'Order ID': 'a'}
+    assert 'a' not in stale_index
+    
+    success, result, _ = db_manager.bulk_upsert_sales_data(
+        sheet_config.id, [_row(2, 'a', price=5)], update_existing=True, key_index=SheetKeyIndex(sheet_config.id)
+    )
+    assert _keys(result['new']) == [] and _keys(result['updated']) == ['a']
+    assert _stored(db_manager, sheet_config.id)['a'][1] == {'Order ID': 'a', 'price': 5}
@@ -0,0 +1,50 @@
+"""
+تست‌های جدول تکراری‌های در انتظار بررسی
+"""
+from app.models import DuplicateCandidate
+
+
+def _row(row_number: int, key: str, **data) -> dict:
+    return {
+        'row_number': row_number,
+        'unique_key': key,
+        'data': {'Order ID': key, **data},
+        'content_hash': f"hash-{key}-{sorted(data.items())}",
+    }
+
+
+def _stage(db_manager, sheet_config, **data) -> int:
+    db_manager.bulk_upsert_sales_data(sheet_config.id, [_row(2, 'a', price=1, note='x')])
+    success, result, _ = db_manager.bulk_upsert_sales_data(sheet_config.id, [_row(2, 'a', **data)])
+    assert success and len(result['duplicates']) == 1
+    assert db_manager.stage_duplicate_candidates(sheet_config.id, result['duplicates']) == 1
+    
+    db = db_manager.get_session()
+    candidate_id = db.query(DuplicateCandidate.id).filter_by(unique_key='a').scalar()
+    db.close()
+    return candidate_id
+
+
+def test_detail_rebuilds_incoming_row(db_manager, sheet_config):
+    candidate_id = _stage(db_manager, sheet_config, price=2)
+    
+    detail = db_manager.get_duplicate_candidate_detail(candidate_id)
+    assert not detail['stale']
+    assert detail['existing_data'] == {'Order ID': 'a', 'price': 1, 'note': 'x'}
+    assert detail['new_data'] == {'Order ID': 'a', 'price': 2}
+
+
+def test_detail_is_stale_after_existing_row_changes(db_manager, sheet_config):
+    candidate_id = _stage(db_manager, sheet_config, price=2)
+    existing_id = db_manager.get_duplicate_candidate_detail(candidate_id)['existing_id']
+    
+    # ویرایش رکورد موجود پس از ثبت تکراری: خلاصه تفاوت دیگر روی این داده معتبر نیست
+    db_manager.update_sales_data(existing_id, {'data': {'Order ID': 'a', 'price': 5, 'note': 'y'}})
+    assert db_manager.get_duplicate_candidate_detail(candidate_id)['stale']
+    
+    # ثبت دوباره در استخراج بعدی پایه را بروز می‌کند
+    _, result, _ = db_manager.bulk_upsert_sales_data(sheet_config.id, [_row(2, 'a', price=2)])
+    db_manager.stage_duplicate_candidates(sheet_config.id, result['duplicates'])
+    detail = db_manager.get_duplicate_candidate_detail(candidate_id)
+    assert not detail['stale']
+    assert detail['new_data'] == {'Order ID': 'a', 'price': 2}
@@ -0,0 +1,105 @@
+"""
+تست‌های نقطه بازیابی extract_and_save (ادامه اجرای قطع شده از آخرین ردیف ذخیره شده)
+"""
+from collections import Counter
+
+from app.core.database import DatabaseManager
+
+EXTRACTED_COL = 9
+
+
+def ready_rows(worksheet):
+    return {
+        index for index, row in enumerate(worksheet.grid[1:], start=2)
+        if row[7] == 'TRUE' and row[8] != 'TRUE'
+    }
+
+
+def test_interrupted_run_resumes_from_checkpoint(fake_sheet, db_manager, monkeypatch):
+    client, worksheet, config_id, extractor = fake_sheet(rows=200)
+    extractor.read_window_rows = 20
+    expected = ready_rows(worksheet)
+
+    persisted = []
+    fetched = []
+    marked = Counter()
+    upsert = DatabaseManager.bulk_upsert_sales_data
+    write = worksheet._write
+    iter_batches = extractor.iter_ready_row_batches
+
+    def spy_upsert(self, sheet_config_id, rows, *args, **kwargs):
+        if interrupt_after is not None and len(persisted) >= interrupt_after:
+            raise RuntimeError("اتصال قطع شد")
+        persisted.append([row['row_number'] for row in rows])
+        return upsert(self, sheet_config_id, rows, *args, **kwargs)
+
+    def spy_iter_batches(*args, **kwargs):
+        for batch in iter_batches(*args, **kwargs):
+            fetched.extend(row['row_number'] for row in batch)
+            yield batch
+
+    def spy_write(row, col, value):
+        if col == EXTRACTED_COL:
+            marked[row] += 1
+        write(row, col, value)
+
+    monkeypatch.setattr(DatabaseManager, 'bulk_upsert_sales_data', spy_upsert)
+    monkeypatch.setattr(extractor, 'iter_ready_row_batches', spy_iter_batches)
+    monkeypatch.setattr(worksheet, '_write', spy_write)
+
+    # اجرای اول پس از ذخیره دو بسته قطع می‌شود
+    interrupt_after = 2
+    run_id = db_manager.create_extraction_run([config_id])
+    success, _, _ = extractor.extract_and_save(config_id, auto_update=True, run_id=run_id)
+    assert not success
+    db_manager.finish_extraction_run(run_id, 'failed')
+
+    checkpoint = db_manager.get_extraction_checkpoints(run_id)[config_id]
+    first_run_rows = [row for batch in persisted for row in batch]
+    assert checkpoint.status == 'failed'
+    assert checkpoint.last_persisted_row == max(first_run_rows)
+    assert checkpoint.persisted_rows == len(first_run_rows)
+
+    # ادامه همان اجرا
+    interrupt_after = None
+    previous_run = db_manager.get_resumable_extraction_run()
+    assert previous_run.id == run_id
+    assert db_manager.resume_extraction_run(run_id)
+
+    persisted.clear()
+    fetched.clear()
+    success, _, stats = extractor.extract_and_save(config_id, auto_update=True, run_id=run_id)
+    assert success
+    db_manager.finish_extraction_run(run_id, 'completed')
+
+    resumed_rows = [row for batch in persisted for row in batch]
+    assert stats['resumed_from_row'] == checkpoint.last_persisted_row
+    assert min(resumed_rows) > checkpoint.last_persisted_row
+    assert fetched and min(fetched) > checkpoint.last_persisted_row
+    assert sorted(first_run_rows + resumed_rows) == sorted(expected)
+    assert stats['new_records'] == len(resumed_rows)
+    assert len(db_manager.get_sales_data_by_sheet_config(config_id)) == len(expected)
+
+    # هر ردیف دقیقاً یک بار علامت خورده است
+    assert set(marked) == expected
+    assert set(marked.values()) == {1}
+
+    checkpoint = db_manager.get_extraction_checkpoints(run_id)[config_id]
+    assert checkpoint.status == 'completed'
+    assert checkpoint.persisted_rows == len(expected)
+    assert checkpoint.marked_rows == len(expected)
+    assert db_manager.get_resumable_extraction_run() is None
+
+
+def test_completed_sheet_is_skipped_on_resume(fake_sheet, db_manager):
+    client, worksheet, config_id, extractor = fake_sheet()
+    run_id = db_manager.create_extraction_run([config_id])
+    assert extractor.extract_and_save(config_id, auto_update=True, run_id=run_id)[0]
+    db_manager.finish_extraction_run(run_id, 'cancelled')
+
+    assert db_manager.get_resumable_extraction_run().id == run_id
+    assert db_manager.resume_extraction_run(run_id)
+    client.reset_stats()
+    success, _, stats = extractor.extract_and_save(config_id, auto_update=True, run_id=run_id)
+    assert success and stats.get('skipped')
+    assert 'batch_get' not in client.calls
@@ -0,0 +1,56 @@
+"""
+تست‌های زمان‌بند استخراج موازی
+"""
+import threading
+
+from app.core.batch_tuning import AdaptiveBatchSizer
+from app.core.extraction_scheduler import ExtractionScheduler
+from app.core.fake_sheets import FakeSheetsClient, generate_sales_grid
+from app.core.google_sheets import GoogleSheetExtractor
+from app.core.rate_limiter import SheetsRateLimiter
+
+
+def test_each_worker_uses_its_own_extractor(db_manager, tmp_path, monkeypatch):
+    client = FakeSheetsClient()
+    configs = []
+    for index in range(4):
+        sheet_url = client.add_worksheet(f"sched-{index}", 'Sheet1', generate_sales_grid(30, seed=index))
+        success, config, message = db_manager.create_sheet_config({
+            'name': f"sched_{index}",
+            'sheet_url': sheet_url,
+            'worksheet_name': 'Sheet1',
+            'ready_column': 'Ready',
+            'extracted_column': 'Extracted',
+            'unique_key_columns': ['Order ID'],
+        })
+        assert success, message
+        configs.append(config)
+    
+    template = GoogleSheetExtractor(
+        client=client,
+        rate_limiter=SheetsRateLimiter(10000, 10000),
+        batch_sizer=AdaptiveBatchSizer(state_file=str(tmp_path / 'batch_tuning.json'))
+    )
+    
+    used = {}
+    extract_and_save = GoogleSheetExtractor.extract_and_save
+    
+    def record_extractor(self, *args, **kwargs):
+        used.setdefault(threading.get_ident(), set()).add(id(self))
+        assert self is not template
+        assert self.rate_limiter is template.rate_limiter and self.batch_sizer is template.batch_sizer
+        assert self.metadata_cache is not template.metadata_cache
+        return extract_and_save(self, *args, **kwargs)
+    
+    monkeypatch.setattr(GoogleSheetExtractor, 'extract_and_save', record_extractor)
+    
+    results = []
+    completed = ExtractionScheduler(template, max_workers=2).run(
+        configs, auto_update=True,
+        on_result=lambda config, success, message, stats: results.append(success)
+    )
+    
+    assert completed == len(configs) and all(results)
+    # یک extractor برای هر thread worker و بین jobهای همان worker
+    assert all(len(extractors) == 1 for extractors in used.values())
+    assert len({extractor for extractors in used.values() for extractor in extractors}) == len(used)
@@ -0,0 +1,40 @@
+"""
+تست‌های اثر انگشت همگام‌سازی extract_and_save (رد کردن شیت بدون تغییر)
+"""
+from app.core.database import DatabaseManager
+
+
+def test_own_mark_back_is_not_a_change(fake_sheet):
+    client, worksheet, config_id, extractor = fake_sheet()
+    
+    success, _, stats = extractor.extract_and_save(config_id, auto_update=True)
+    assert success and stats['new_records']
+    
+    success, _, stats = extractor.extract_and_save(config_id, auto_update=True)
+    assert success and stats.get('skipped')
+
+
+def test_foreign_edit_during_extraction_is_not_folded_in(fake_sheet, monkeypatch):
+    client, worksheet, config_id, extractor = fake_sheet()
+    enqueue = DatabaseManager.enqueue_sheet_writes
+    
+    def enqueue_after_foreign_edit(self, *args, **kwargs):
+        # کاربر دیگری پس از خواندن شیت و پیش از علامت‌گذاری ردیفی را ویرایش می‌کند
+        worksheet.update_acell('C2', 'edited by someone else')
+        return enqueue(self, *args, **kwargs)
+    
+    monkeypatch.setattr(DatabaseManager, 'enqueue_sheet_writes', enqueue_after_foreign_edit)
+    assert extractor.extract_and_save(config_id, auto_update=True)[0]
+    monkeypatch.undo()
+    
+    success, _, stats = extractor.extract_and_save(config_id, auto_update=True)
+    assert success and not stats.get('skipped')
+
+
+def test_changed_sheet_is_extracted_again(fake_sheet):
+    client, worksheet, config_id, extractor = fake_sheet()
+    assert extractor.extract_and_save(config_id, auto_update=True)[0]
+    
+    worksheet.update_acell('C2', 'edited')
+    success, _, stats = extractor.extract_and_save(config_id, auto_update=True)
+    assert success and not stats.get('skipped')
@@ -0,0 +1,60 @@
+"""
+تست‌های جستجوی متن کامل (FTS5)
+"""
+import pytest
+
+from app.models import SalesData, engine
+from app.models.sales_data_fts import build_match_query, has_sales_data_fts
+
+
+pytestmark = pytest.mark.skipif(not has_sales_data_fts(engine), reason="SQLite بدون FTS5")
+
+
+def _insert(db_manager, sheet_config_id: int, rows: dict):
+    success, _, message = db_manager.bulk_upsert_sales_data(sheet_config_id, [
+        {'row_number': n, 'unique_key': key, 'data': data, 'content_hash': key}
+        for n, (key, data) in enumerate(rows.items(), start=2)
+    ])
+    assert success, message
+
+
+def _search(db_manager, text: str) -> set:
+    ids, _ = db_manager.search_sales_data(text)
+    return {item.unique_key for item in db_manager.get_sales_data_by_ids(ids)}
+
+
+def test_build_match_query():
+    assert build_match_query('ali@gmail "x"') == '"ali@gmail"* "x"*'
+    assert build_match_query('علي') == '"علی"*'
+    assert build_match_query('   ') is None
+
+
+def test_search_words_prefix_and_arabic_letters(db_manager, sheet_config):
+    _insert(db_manager, sheet_config.id, {
+        'a': {'Customer': 'علی رضایی', 'Email': 'ali@gmail.com', 'Qty': 3},
+        'b': {'Customer': 'كريم', 'Email': 'karim@yahoo.com', 'Qty': 12345},
+        'c': {'Customer': 'Ali Karimi', 'Email': 'ak@example.com'},
+    })
+    
+    assert _search(db_manager, 'ali@gmail') == {'a'}
+    assert _search(db_manager, 'علي رضا') == {'a'}
+    assert _search(db_manager, 'کریم') == {'b'}
+    assert _search(db_manager, '12345') == {'b'}
+    assert _search(db_manager, 'ali') == {'a', 'c'}
+    assert db_manager.get_sales_data_search_count('ali') == 2
+
+
+def test_index_follows_update_and_delete(db_manager, sheet_config):
+    _insert(db_manager, sheet_config.id, {'a': {'Customer': 'Sara'}, 'b': {'Customer': 'Sara Noor'}})
+    ids, _ = db_manager.search_sales_data('sara')
+    assert len(ids) == 2
+    
+    db = db_manager.get_session()
+    row_a = db.query(SalesData.id).filter_by(unique_key='a').scalar()
+    row_b = db.query(SalesData.id).filter_by(unique_key='b').scalar()
+    db.close()
+    db_manager.update_sales_data(row_a, {'data': {'Customer': 'Mina'}})
+    db_manager.delete_sales_data(row_b)
+    
+    assert _search(db_manager, 'sara') == set()
+    assert _search(db_manager, 'mina') == {'a'}
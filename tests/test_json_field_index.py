@@ -0,0 +1,87 @@
+"""
+تست‌های فیلتر و ایندکس کلیدهای داده JSON
+"""
+from sqlalchemy import text
+
+from app.core.json_field_index import (
+    build_json_filters, json_field_index_name, json_number_index_name, sync_json_field_indexes
+)
+from app.models import SalesData, engine
+
+
+def _indexed_sheet(db_manager, fields):
+    success, config, message = db_manager.create_sheet_config({
+        'name': 'کدها',
+        'sheet_url': 'https://docs.google.com/spreadsheets/d/codes',
+        'worksheet_name': 'Sheet1',
+        'indexed_fields': fields,
+    })
+    assert success, message
+    return config
+
+
+def _insert(db_manager, sheet_config_id: int, values: list):
+    rows = [
+        {'row_number': n, 'unique_key': f"k{n}", 'data': data, 'content_hash': f"h{n}"}
+        for n, data in enumerate(values, start=2)
+    ]
+    success, _, message = db_manager.bulk_upsert_sales_data(sheet_config_id, rows)
+    assert success, message
+
+
+def _codes(rows) -> list:
+    return sorted(row.data['CODE'] for row in rows)
+
+
+def test_numeric_range_compares_numbers(db_manager):
+    config = _indexed_sheet(db_manager, ['CODE'])
+    _insert(db_manager, config.id, [{'CODE': str(n)} for n in range(50)] + [{'CODE': ''}, {'CODE': 'x'}])
+    
+    page, _ = db_manager.get_sales_data_page(sheet_config_id=config.id, limit=100, field_filters=[('CODE', '>=', '45')])
+    assert _codes(page) == ['45', '46', '47', '48', '49']
+    
+    rows = db_manager.find_sales_data([('CODE', 'between', ('8', '11'))], config.id)
+    assert _codes(rows) == ['10', '11', '8', '9']
+    assert _codes(db_manager.find_sales_data([('CODE', '<', 2)], config.id)) == ['0', '1']
+
+
+def test_text_range_and_equality(db_manager):
+    config = _indexed_sheet(db_manager, ['Date', 'CODE'])
+    _insert(db_manager, config.id, [
+        {'Date': '1403/01/05', 'CODE': '7'},
+        {'Date': '1403/02/01', 'CODE': 7},
+        {'Date': '1402/12/29', 'CODE': '07'},
+    ])
+    
+    rows = db_manager.find_sales_data([('Date', 'between', ('1403/01/01', '1403/01/31'))], config.id)
+    assert [row.data['Date'] for row in rows] == ['1403/01/05']
+    # برابری متن و عدد را یکسان می‌داند ولی "07" متن دیگری است
+    assert len(db_manager.find_sales_data([('CODE', '=', '7')], config.id)) == 2
+    assert len(db_manager.find_sales_data([('CODE', 'in', ['9', 7])], config.id)) == 2
+    assert len(db_manager.find_sales_data([('CODE', '!=', '7')], config.id)) == 1
+
+
+def test_sync_creates_and_drops_indexes(db_manager):
+    def indexes():
+        with engine.connect() as connection:
+            return {row[0] for row in connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_sales_data_json_%'")
+            )}
+    
+    created, _ = sync_json_field_indexes(engine, ['CODE', 'نام'])
+    assert {json_field_index_name('نام'), json_number_index_name('نام')} <= indexes()
+    
+    _, dropped = sync_json_field_indexes(engine, ['CODE'])
+    assert json_field_index_name('نام') in dropped and json_number_index_name('نام') in dropped
+    assert indexes() == {json_field_index_name('CODE'), json_number_index_name('CODE')}
+
+
+def test_range_query_uses_number_index(db_manager):
+    sync_json_field_indexes(engine, ['CODE'])
+    condition = build_json_filters([('CODE', '>=', '45')])
+    
+    query = db_manager.get_session().query(SalesData.id).filter(condition)
+    sql = str(query.statement.compile(engine, compile_kwargs={'literal_binds': True}))
+    with engine.connect() as connection:
+        plan = ' '.join(str(row[-1]) for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    assert json_number_index_name('CODE') in plan
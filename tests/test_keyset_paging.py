@@ -0,0 +1,49 @@
+"""
+تست‌های صفحه‌بندی keyset داده‌های فروش
+"""
+def _insert(db_manager, sheet_config_id: int, count: int):
+    rows = [
+        {'row_number': n, 'unique_key': f"k{n}", 'data': {'Order ID': f"k{n}", 'Price': n}, 'content_hash': f"h{n}"}
+        for n in range(2, count + 2)
+    ]
+    success, _, message = db_manager.bulk_upsert_sales_data(sheet_config_id, rows)
+    assert success, message
+
+
+def test_pages_cover_all_rows_once(db_manager, sheet_config):
+    _insert(db_manager, sheet_config.id, 23)
+    
+    pages, after_id, has_more = [], None, True
+    while has_more:
+        page, has_more = db_manager.get_sales_data_page(sheet_config_id=sheet_config.id, after_id=after_id, limit=5)
+        pages.append([item.id for item in page])
+        after_id = page[-1].id
+    
+    ids = [data_id for page in pages for data_id in page]
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert ids == sorted(ids, reverse=True)
+    assert len(set(ids)) == 23
+
+
+def test_previous_page_with_before_id(db_manager, sheet_config):
+    _insert(db_manager, sheet_config.id, 12)
+    
+    first, _ = db_manager.get_sales_data_page(sheet_config_id=sheet_config.id, limit=5)
+    second, _ = db_manager.get_sales_data_page(sheet_config_id=sheet_config.id, after_id=first[-1].id, limit=5)
+    back, has_more = db_manager.get_sales_data_page(sheet_config_id=sheet_config.id, before_id=second[0].id, limit=5)
+    
+    assert [item.id for item in back] == [item.id for item in first]
+    assert not has_more
+
+
+def test_page_respects_status_filter(db_manager, sheet_config):
+    _insert(db_manager, sheet_config.id, 10)
+    page, _ = db_manager.get_sales_data_page(sheet_config_id=sheet_config.id, limit=3)
+    db_manager.mark_as_exported([item.id for item in page], 'type1')
+    
+    exported, has_more = db_manager.get_sales_data_page('exported', sheet_config.id, limit=10)
+    not_exported, _ = db_manager.get_sales_data_page('not_exported', sheet_config.id, limit=10)
+    
+    assert {item.id for item in exported} == {item.id for item in page} and not has_more
+    assert len(not_exported) == 7
+    assert db_manager.get_sales_data_filter_count('not_exported', sheet_config.id) == 7
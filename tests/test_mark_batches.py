@@ -0,0 +1,43 @@
+"""
+تست‌های ادغام ردیف‌های علامت‌گذاری در بازه‌ها و بچ‌ها
+"""
+from collections import deque
+
+from app.core.google_sheets import GoogleSheetExtractor, coalesce_row_ranges
+
+
+def test_coalesce_row_ranges():
+    assert coalesce_row_ranges([2, 3, 4, 7, 9, 10]) == [(2, 4), (7, 7), (9, 10)]
+    assert coalesce_row_ranges([5]) == [(5, 5)]
+    assert coalesce_row_ranges([]) == []
+
+
+def test_take_runs_splits_run_at_cell_limit():
+    pending = deque([(2, 4), (7, 12), (20, 20)])
+    
+    assert GoogleSheetExtractor._take_runs(pending, 5) == [(2, 4), (7, 8)]
+    assert list(pending) == [(9, 12), (20, 20)]
+    assert GoogleSheetExtractor._take_runs(pending, 5) == [(9, 12), (20, 20)]
+    assert not pending
+
+
+def test_take_runs_takes_at_least_one_row():
+    pending = deque([(2, 3)])
+    assert GoogleSheetExtractor._take_runs(pending, 0) == [(2, 2)]
+    assert list(pending) == [(3, 3)]
+
+
+def test_mark_rows_coalesces_into_batch_update(fake_sheet):
+    client, worksheet, config_id, extractor = fake_sheet(rows=30)
+    rows = [2, 3, 4, 10, 11, 20]
+    column = worksheet.grid[0].index('Extracted')
+    for line in worksheet.grid[1:]:
+        line[column] = ''
+    
+    client.reset_stats()
+    success, _, stats = extractor.mark_rows_as_extracted(worksheet.spreadsheet.url, 'Sheet1', rows, 'Extracted')
+    
+    assert success and stats['success'] == len(rows)
+    assert client.calls['batch_update'] == 1
+    marked = [number for number in range(2, len(worksheet.grid) + 1) if worksheet.grid[number - 1][column]]
+    assert marked == rows
@@ -0,0 +1,110 @@
+"""
+تست‌های اجرای مرحله‌ای (StagedPipeline)
+"""
+import itertools
+import threading
+
+import pytest
+
+from app.core.pipeline import PipelineStage, StagedPipeline
+
+
+def _pipeline() -> StagedPipeline:
+    return StagedPipeline(queue_size=2, poll_interval=0.05)
+
+
+def test_items_flow_through_stages_in_order():
+    saved = []
+    stats = _pipeline().run(
+        PipelineStage('fetch', None), lambda: ([n, n] for n in range(10)),
+        [
+            PipelineStage('double', lambda item: [value * 2 for value in item]),
+            PipelineStage('save', saved.append, finish=lambda: saved.append('done')),
+        ]
+    )
+    
+    assert saved == [[n * 2, n * 2] for n in range(10)] + ['done']
+    assert stats['fetch']['items'] == 10 and stats['fetch']['rows'] == 20
+    assert stats['save']['items'] == 10
+
+
+def test_stage_error_propagates_and_stops_source():
+    produced = []
+    
+    def source():
+        for n in itertools.count():
+            produced.append(n)
+            yield [n]
+    
+    def fail(item):
+        if item[0] == 3:
+            raise ValueError("bad batch")
+        return item
+    
+    finished = []
+    with pytest.raises(ValueError, match="bad batch"):
+        _pipeline().run(
+            PipelineStage('fetch', None), source,
+            [PipelineStage('key', fail), PipelineStage('save', lambda item: None, finish=lambda: finished.append(1))]
+        )
+    
+    # منبع بی‌پایان پس از خطا متوقف شده و finish مرحله بعد اجرا نشده
+    assert len(produced) < 20
+    assert not finished
+
+
+def test_source_error_propagates():
+    def source():
+        yield [1]
+        raise RuntimeError("read failed")
+    
+    finished = []
+    with pytest.raises(RuntimeError, match="read failed"):
+        _pipeline().run(
+            PipelineStage('fetch', None), source,
+            [PipelineStage('save', lambda item: None, finish=lambda: finished.append(1))]
+        )
+    assert not finished
+
+
+def test_logs_are_delivered_on_caller_thread():
+    pipeline = _pipeline()
+    caller = threading.get_ident()
+    received = []
+    
+    def process(item):
+        pipeline.log(f"item {item[0]}")
+        return None
+    
+    pipeline.run(
+        PipelineStage('fetch', None), lambda: ([n] for n in range(3)),
+        [PipelineStage('save', process)],
+        log_callback=lambda message, level: received.append((message, threading.get_ident()))
+    )
+    
+    assert [message for message, _ in received] == ['item 0', 'item 1', 'item 2']
+    assert all(ident == caller for _, ident in received)
+
+
+def test_backpressure_bounds_read_ahead():
+    release = threading.Event()
+    produced = []
+    
+    def source():
+        for n in range(50):
+            produced.append(n)
+            yield [n]
+    
+    def slow(item):
+        release.wait(5)
+    
+    def on_tick(stages):
+        # مرحله کند هنوز اولین بسته را پردازش می‌کند: منبع فقط به اندازه صف جلو می‌رود
+        # (بسته در حال پردازش + صف + بسته منتظر put)
+        if not release.is_set() and len(produced) >= 3:
+            assert len(produced) <= 1 + pipeline.queue_size + 1
+            release.set()
+    
+    pipeline = _pipeline()
+    pipeline.run(PipelineStage('fetch', None), source, [PipelineStage('save', slow)], on_tick=on_tick)
+    assert release.is_set() and len(produced) == 50
@@ -0,0 +1,84 @@
+"""
+تست‌های محدودکننده نرخ (Token Bucket)
+"""
+import threading
+
+import pytest
+
+from app.core import rate_limiter
+from app.core.rate_limiter import SheetsRateLimiter, TokenBucket
+
+
+class _Clock:
+    """ساعت جعلی: sleep فقط زمان را جلو می‌برد"""
+    
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+    
+    def monotonic(self) -> float:
+        return self.now
+    
+    def sleep(self, seconds: float):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    return clock
+
+
+def test_burst_then_refill(clock):
+    bucket = TokenBucket(rate_per_minute=60, capacity=3)
+    
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() == pytest.approx(1.0)
+    
+    clock.now += 2.5
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == pytest.approx(0.5)
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+    clock.now += 3600
+    
+    assert [bucket.try_acquire() for _ in range(3)][2] > 0
+
+
+def test_acquire_waits_for_token(clock):
+    bucket = TokenBucket(rate_per_minute=120, capacity=1)
+    
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert clock.slept == [pytest.approx(0.5)]
+
+
+def test_read_and_write_quotas_are_separate(clock):
+    limiter = SheetsRateLimiter(read_per_minute=6, write_per_minute=600)
+    
+    assert limiter.acquire(SheetsRateLimiter.READ) == 0.0
+    assert limiter.acquire(SheetsRateLimiter.READ) == pytest.approx(10.0)
+    assert limiter.acquire(SheetsRateLimiter.WRITE) == 0.0
+
+
+def test_concurrent_acquire_never_exceeds_capacity():
+    bucket = TokenBucket(rate_per_minute=1, capacity=50)
+    granted = []
+    
+    def worker():
+        for _ in range(20):
+            if bucket.try_acquire() == 0.0:
+                granted.append(1)
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(granted) == 50
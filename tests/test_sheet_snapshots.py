@@ -0,0 +1,80 @@
+"""
+تست‌های snapshot محلی worksheetها
+"""
+import pytest
+
+from app.core.fake_sheets import FakeSheetsClient
+from app.core.google_sheets import GoogleSheetExtractor
+from app.core.rate_limiter import SheetsRateLimiter
+from app.core.sheet_snapshots import WorksheetSnapshotStore
+
+
+URL = 'https://docs.google.com/spreadsheets/d/book/edit'
+GRID = [['Order ID', 'نام'], ['1', 'علی'], ['2', ''], ['3', 'x "y"']]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return WorksheetSnapshotStore(str(tmp_path / 'snapshots'))
+
+
+def test_round_trip(store):
+    assert store.save_grid(URL, 'Sales', 'v1', GRID)
+    
+    assert store.has(URL, 'Sales', 'v1')
+    assert store.load_grid(URL, 'Sales', 'v1') == GRID
+    assert list(store.iter_rows(URL, 'Sales')) == list(enumerate(GRID, start=1))
+
+
+def test_fingerprint_mismatch(store):
+    store.save_grid(URL, 'Sales', 'v1', GRID)
+    
+    assert not store.has(URL, 'Sales', 'v2')
+    assert not store.has(URL, 'Sales', None)
+    assert store.load_grid(URL, 'Sales', 'v2') is None
+    assert not store.save_grid(URL, 'Sales', None, GRID)
+
+
+def test_worksheet_names_are_exact(store):
+    store.save_grid(URL, 'Sales', 'v1', GRID)
+    store.save_grid(URL, 'sales', 'v1', [['Code'], ['A']])
+    
+    assert store.load_grid(URL, 'Sales', 'v1') == GRID
+    assert store.load_grid(URL, 'sales', 'v1') == [['Code'], ['A']]
+    assert not store.has(URL, 'SALES', 'v1')
+
+
+def test_aborted_stream_keeps_previous_snapshot(store):
+    store.save_grid(URL, 'Sales', 'v1', GRID)
+    
+    with pytest.raises(RuntimeError):
+        with store.writer(URL, 'Sales', 'v2') as writer:
+            writer.write_row(1, GRID[0])
+            raise RuntimeError("download failed")
+    
+    assert not writer.tmp_path.exists()
+    assert not store.has(URL, 'Sales', 'v2')
+    assert store.load_grid(URL, 'Sales', 'v1') == GRID
+
+
+def test_partially_consumed_reader_is_not_saved(store):
+    client = FakeSheetsClient()
+    sheet_url = client.add_worksheet('book', 'Sales', [list(row) for row in GRID])
+    extractor = GoogleSheetExtractor(
+        client=client, rate_limiter=SheetsRateLimiter(10000, 10000), snapshot_store=store
+    )
+    worksheet = client.open_by_url(sheet_url).worksheet('Sales')
+    fingerprint = extractor.get_spreadsheet_modified_time(sheet_url)
+    
+    rows = extractor._iter_sheet_rows(sheet_url, 'Sales', worksheet, 2)
+    assert next(rows) == (2, ['1', 'علی'])
+    rows.close()
+    assert not store.has(sheet_url, 'Sales', fingerprint)
+    
+    assert list(extractor._iter_sheet_rows(sheet_url, 'Sales', worksheet, 2)) == list(enumerate(GRID[1:], start=2))
+    assert store.has(sheet_url, 'Sales', fingerprint)
+    
+    # خواندن دوم از snapshot (بدون دانلود)
+    client.reset_stats()
+    assert extractor.get_all_data(sheet_url, 'Sales') == GRID
+    assert set(client.calls) == {'get_lastUpdateTime'}
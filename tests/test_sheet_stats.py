@@ -0,0 +1,86 @@
+"""
+تست‌های شمارنده‌های sheet_stats (نگه‌داری با trigger)
+"""
+from app.models import SalesData, SheetStats
+
+
+def _insert(db_manager, sheet_config_id: int, count: int, prefix: str = 'k'):
+    rows = [
+        {'row_number': n, 'unique_key': f"{prefix}{n}", 'data': {'Order ID': f"{prefix}{n}"}, 'content_hash': f"h{n}"}
+        for n in range(2, count + 2)
+    ]
+    success, _, message = db_manager.bulk_upsert_sales_data(sheet_config_id, rows)
+    assert success, message
+
+
+def _expected(db_manager) -> dict:
+    """شمارش مستقیم از sales_data"""
+    db = db_manager.get_session()
+    expected = {}
+    for item in db.query(SalesData):
+        counts = expected.setdefault(item.sheet_config_id, {
+            'total': 0, 'exported': 0, 'not_exported': 0, 'need_reexport': 0, 'updated': 0, 'transferred': 0
+        })
+        counts['total'] += 1
+        counts['exported' if item.is_exported else 'not_exported'] += 1
+        counts['need_reexport'] += bool(item.is_exported and item.is_updated)
+        counts['updated'] += bool(item.is_updated)
+        counts['transferred'] += item.transferred == 1
+    db.close()
+    return expected
+
+
+def _counters(db_manager) -> dict:
+    db = db_manager.get_session()
+    counters = {
+        stats.sheet_config_id: {
+            'total': stats.total, 'exported': stats.exported, 'not_exported': stats.not_exported,
+            'need_reexport': stats.need_reexport, 'updated': stats.updated, 'transferred': stats.transferred,
+        }
+        for stats in db.query(SheetStats).filter(SheetStats.total > 0)
+    }
+    db.close()
+    return counters
+
+
+def test_counters_follow_writes(db_manager, sheet_config):
+    _insert(db_manager, sheet_config.id, 10)
+    page, _ = db_manager.get_sales_data_page(sheet_config_id=sheet_config.id, limit=4)
+    ids = [item.id for item in page]
+    assert _counters(db_manager) == _expected(db_manager)
+    
+    db_manager.mark_as_exported(ids, 'type1')
+    db_manager.update_sales_data(ids[0], {'data': {'Order ID': 'changed'}, 'is_updated': True})
+    db_manager.mark_as_transferred(ids[1])
+    db_manager.delete_sales_data(ids[2])
+    
+    counters = _counters(db_manager)
+    assert counters == _expected(db_manager)
+    assert counters[sheet_config.id]['total'] == 9
+    assert counters[sheet_config.id]['need_reexport'] == 1
+
+
+def test_statistics_and_rebuild_match_direct_count(db_manager, sheet_config):
+    _insert(db_manager, sheet_config.id, 6)
+    success, other, _ = db_manager.create_sheet_config({
+        'name': 'دیگر', 'sheet_url': 'https://docs.google.com/spreadsheets/d/other', 'worksheet_name': 'Sheet1',
+    })
+    assert success
+    _insert(db_manager, other.id, 3, prefix='o')
+    db_manager.delete_sheet_data(sheet_config.id)
+    _insert(db_manager, sheet_config.id, 2, prefix='n')
+    
+    expected = _expected(db_manager)
+    assert _counters(db_manager) == expected
+    
+    db = db_manager.get_session()
+    db.query(SheetStats).update({'total': 999})
+    db.commit()
+    db.close()
+    assert db_manager.rebuild_sheet_stats()[0]
+    assert _counters(db_manager) == expected
+    
+    db = db_manager.get_session()
+    stats = {row['sheet_config_id']: row['total'] for row in db_manager._query_sheet_statistics(db)}
+    db.close()
+    assert stats == {sheet_id: counts['total'] for sheet_id, counts in expected.items()}
@@ -0,0 +1,100 @@
+"""
+تست‌های صف پایدار علامت‌گذاری (Outbox)
+"""
+from app.core.google_sheets import GoogleSheetExtractor
+from app.core.sheets_outbox import SheetWriteOutboxDrainer, merge_runs
+
+READY, EXTRACTED = 7, 8
+
+
+def _queued_rows(grid) -> list:
+    """ردیف‌های آماده و علامت نخورده (شماره ردیف شیت)"""
+    return [
+        row_number for row_number, row in enumerate(grid[1:], start=2)
+        if row[READY] == 'TRUE' and not row[EXTRACTED]
+    ]
+
+
+def _enqueue(db_manager, extractor, worksheet, config_id, rows):
+    config = db_manager.get_sheet_config(config_id)
+    hashes = extractor.read_row_content_hashes(config, config.sheet_url, 'Sheet1', rows)
+    db_manager.enqueue_sheet_writes(
+        config_id, config.sheet_url, 'Sheet1', 'Extracted', merge_runs([(row, row) for row in rows]),
+        content_hashes=hashes
+    )
+    return config
+
+
+def test_merge_runs():
+    assert merge_runs([(2, 4), (5, 6), (3, 3), (9, 9)]) == [(2, 6), (9, 9)]
+    assert merge_runs([]) == []
+
+
+def test_drain_marks_unchanged_rows(db_manager, fake_sheet):
+    client, worksheet, config_id, extractor = fake_sheet()
+    rows = _queued_rows(worksheet.grid)[:5]
+    _enqueue(db_manager, extractor, worksheet, config_id, rows)
+    
+    stats = SheetWriteOutboxDrainer(extractor=extractor).drain(config_id, due_only=False)
+    
+    assert stats['success'] == len(rows) and stats['dropped'] == 0
+    assert all(worksheet.grid[row - 1][EXTRACTED] for row in rows)
+    assert db_manager.get_pending_sheet_writes_count(config_id) == 0
+
+
+def test_drain_drops_rows_shifted_after_enqueue(db_manager, fake_sheet):
+    client, worksheet, config_id, extractor = fake_sheet()
+    rows = _queued_rows(worksheet.grid)[:5]
+    _enqueue(db_manager, extractor, worksheet, config_id, rows)
+    
+    # کاربر پیش از علامت‌گذاری یک ردیف بالای شیت درج می‌کند
+    worksheet.grid.insert(1, ['ORD-NEW', '2025-01-01', 'Customer', 'Apple 10$', '1', '10', '10', 'TRUE', ''])
+    
+    stats = SheetWriteOutboxDrainer(extractor=extractor).drain(config_id, due_only=False)
+    
+    assert stats['dropped'] == len(rows) and stats['success'] == 0
+    assert not any(worksheet.grid[row - 1][EXTRACTED] for row in rows)
+    assert db_manager.get_pending_sheet_writes_count(config_id) == 0
+
+
+def test_failed_mark_keeps_content_hashes(db_manager, fake_sheet, monkeypatch):
+    client, worksheet, config_id, extractor = fake_sheet()
+    rows = _queued_rows(worksheet.grid)[:3]
+    _enqueue(db_manager, extractor, worksheet, config_id, rows)
+    
+    def fail(self, sheet_url, worksheet_name, row_numbers, *args, **kwargs):
+        return False, 'timeout', {'failed_runs': merge_runs([(row, row) for row in row_numbers])}
+    
+    monkeypatch.setattr(GoogleSheetExtractor, 'mark_rows_as_extracted', fail)
+    stats = SheetWriteOutboxDrainer(extractor=extractor).drain(config_id, due_only=False)
+    
+    assert stats['failed'] == len(rows)
+    entries = db_manager.get_pending_sheet_writes(config_id, due_only=False)
+    assert sorted(row for entry in entries for row, content_hash in entry.row_content_hashes() if content_hash) == rows
+
+
+def test_extraction_reprocesses_queued_rows_that_changed(db_manager, fake_sheet, monkeypatch):
+    client, worksheet, config_id, extractor = fake_sheet()
+    
+    def fail(self, sheet_url, worksheet_name, row_numbers, *args, **kwargs):
+        return False, 'timeout', {'failed_runs': merge_runs([(row, row) for row in row_numbers])}
+    
+    monkeypatch.setattr(GoogleSheetExtractor, 'mark_rows_as_extracted', fail)
+    success, _, stats = extractor.extract_and_save(config_id, auto_update=True)
+    assert success and stats['new_records']
+    monkeypatch.undo()
+    
+    # ردیف در صف، پیش از علامت‌گذاری ویرایش می‌شود
+    edited_row = _queued_rows(worksheet.grid)[0]
+    worksheet.grid[edited_row - 1][0] = 'ORD-EDITED'
+    count_before = db_manager.get_sales_data_count()
+    
+    success, _, stats = extractor.extract_and_save(config_id, auto_update=True, force=True)
+    
+    # ردیف ویرایش شده دوباره پردازش شده (نه رد شده به عنوان «در صف»)؛ رکورد قبلی همان ردیف شیت
+    # را دارد، پس ذخیره نمی‌شود و با محتوای قدیمی هم علامت نمی‌خورد
+    assert success and stats['mark_stats']['dropped'] == 1
+    assert stats['total_rows'] == 1
+    assert db_manager.get_sales_data_count() == count_before
+    assert not worksheet.grid[edited_row - 1][EXTRACTED]
+    assert db_manager.get_pending_sheet_writes_count(config_id) == 0
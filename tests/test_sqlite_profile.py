@@ -0,0 +1,68 @@
+"""
+تست‌های پروفایل اتصال SQLite
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.models.sqlite_profile import apply_sqlite_profile, describe_sqlite_connection
+
+
+def _engine(tmp_path, monkeypatch, busy_timeout=None):
+    if busy_timeout is None:
+        monkeypatch.delenv('SQLITE_BUSY_TIMEOUT', raising=False)
+    else:
+        monkeypatch.setenv('SQLITE_BUSY_TIMEOUT', busy_timeout)
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    apply_sqlite_profile(engine, 'balanced')
+    return engine
+
+
+def test_profile_pragmas(tmp_path, monkeypatch):
+    info = describe_sqlite_connection(_engine(tmp_path, monkeypatch))
+    assert info['profile'] == 'balanced'
+    assert str(info['journal_mode']).lower() == 'wal'
+    assert info['busy_timeout'] == 10000
+
+
+def test_busy_timeout_override(tmp_path, monkeypatch):
+    info = describe_sqlite_connection(_engine(tmp_path, monkeypatch, '30000'))
+    assert info['busy_timeout'] == 30000
+
+
+def test_savepoint_release_does_not_commit(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, monkeypatch)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+    
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        with connection.begin_nested():
+            connection.execute(text("INSERT INTO items (id) VALUES (1)"))
+        transaction.rollback()
+    
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM items")).scalar() == 0
+
+
+def test_write_transaction_takes_lock_at_begin(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, monkeypatch, '100')
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+    
+    # تراکنش عادی (DEFERRED) با خواندن قفل نوشتن نمی‌گیرد
+    with engine.connect() as reader, engine.connect() as other:
+        with reader.begin():
+            reader.execute(text("SELECT COUNT(*) FROM items"))
+            with other.begin():
+                other.execute(text("INSERT INTO items (id) VALUES (1)"))
+    
+    # تراکنش نوشتنی از BEGIN قفل را نگه می‌دارد و نویسنده دیگر منتظر می‌ماند
+    writer_engine = engine.execution_options(sqlite_begin='IMMEDIATE')
+    with writer_engine.connect() as writer, engine.connect() as other:
+        with writer.begin():
+            writer.execute(text("SELECT COUNT(*) FROM items"))
+            with pytest.raises(OperationalError, match='locked'):
+                with other.begin():
+                    other.execute(text("INSERT INTO items (id) VALUES (2)"))
+            writer.execute(text("INSERT INTO items (id) VALUES (3)"))
@@ -0,0 +1,103 @@
+"""
+تست‌های خواننده‌های جریانی داده‌های فروش (iter_*)
+"""
+import pytest
+from sqlalchemy.exc import OperationalError
+
+
+def _insert(db_manager, sheet_config_id: int, count: int, prefix: str = 'k', start: int = 2):
+    rows = [
+        {'row_number': n, 'unique_key': f"{prefix}{n}", 'data': {'Order ID': f"{prefix}{n}"}, 'content_hash': f"h{n}"}
+        for n in range(start, start + count)
+    ]
+    success, _, message = db_manager.bulk_upsert_sales_data(sheet_config_id, rows)
+    assert success, message
+
+
+def _ids(batches):
+    return [item.id for batch in batches for item in batch]
+
+
+@pytest.fixture
+def other_config(db_manager):
+    success, config, message = db_manager.create_sheet_config({
+        'name': 'فروش ۲',
+        'sheet_url': 'https://docs.google.com/spreadsheets/d/other',
+        'worksheet_name': 'Sheet1',
+    })
+    assert success, message
+    return config
+
+
+def test_batch_boundaries(db_manager, sheet_config):
+    _insert(db_manager, sheet_config.id, 10)
+
+    for batch_size, sizes in [(3, [3, 3, 3, 1]), (5, [5, 5]), (10, [10]), (50, [10])]:
+        batches = list(db_manager.iter_unexported_data(batch_size=batch_size))
+        ids = _ids(batches)
+        assert [len(batch) for batch in batches] == sizes
+        assert ids == sorted(ids) and len(set(ids)) == 10
+
+    assert list(db_manager.iter_unexported_data(limit=4, batch_size=3))[-1][-1].id == ids[3]
+
+
+def test_empty_result_yields_no_batches(db_manager, sheet_config):
+    assert list(db_manager.iter_unexported_data()) == []
+    assert list(db_manager.iter_all_sales_data()) == []
+
+
+def test_sheet_config_ids_filter(db_manager, sheet_config, other_config):
+    _insert(db_manager, sheet_config.id, 4, prefix='a')
+    _insert(db_manager, other_config.id, 3, prefix='b')
+
+    def sheet_ids(batches):
+        return {item.sheet_config_id for batch in batches for item in batch}
+
+    assert sheet_ids(db_manager.iter_all_sales_data([other_config.id], batch_size=2)) == {other_config.id}
+    assert len(_ids(db_manager.iter_all_sales_data([other_config.id]))) == 3
+    assert len(_ids(db_manager.iter_all_sales_data())) == 7
+    assert len(_ids(db_manager.iter_all_sales_data([]))) == 7
+    assert len(_ids(db_manager.iter_sales_data_by_export_status(False, [sheet_config.id]))) == 4
+    assert _ids(db_manager.iter_updated_sales_data([sheet_config.id])) == []
+
+
+def test_only_non_transferred(db_manager, sheet_config):
+    _insert(db_manager, sheet_config.id, 6)
+    ids = _ids(db_manager.iter_extracted_data(sheet_config.id))
+    for data_id in ids[:2]:
+        assert db_manager.mark_as_transferred(data_id)
+
+    remaining = _ids(db_manager.iter_extracted_data(sheet_config.id, only_non_transferred=True, batch_size=2))
+    assert remaining == ids[2:]
+    assert _ids(db_manager.iter_extracted_data(sheet_config.id)) == ids
+
+
+def test_max_id_caps_unexported(db_manager, sheet_config):
+    _insert(db_manager, sheet_config.id, 5)
+    ids = _ids(db_manager.iter_unexported_data())
+
+    # رکوردهای استخراج شده پس از گذر اول در گذر دوم دیده نمی‌شوند
+    _insert(db_manager, sheet_config.id, 3, prefix='late', start=100)
+    assert _ids(db_manager.iter_unexported_data(max_id=ids[-1], batch_size=2)) == ids
+    assert _ids(db_manager.iter_unexported_data(max_id=ids[1])) == ids[:2]
+    assert len(_ids(db_manager.iter_unexported_data())) == 8
+
+
+def test_database_error_propagates(db_manager, sheet_config, monkeypatch):
+    _insert(db_manager, sheet_config.id, 3)
+    closed = []
+
+    class FailingSession:
+        def execute(self, statement):
+            raise OperationalError(str(statement), {}, Exception("database is locked"))
+
+        def close(self):
+            closed.append(True)
+
+    monkeypatch.setattr(db_manager, 'get_session', lambda write=False: FailingSession())
+
+    with pytest.raises(OperationalError):
+        list(db_manager.iter_unexported_data())
+    with pytest.raises(OperationalError):
+        list(db_manager.iter_extracted_data(sheet_config.id, only_non_transferred=True))
+    assert closed == [True, True]
@@ -0,0 +1,76 @@
+"""
+تست‌های ساخت دسته‌ای کلید یکتا (UniqueKeyBatch)
+"""
+import random
+
+import pytest
+
+from app.utils.unique_key_generator import (
+    KEY_HASH_COMPAT, KEY_HASH_FAST, UniqueKeyBatch, generate_content_hash, generate_unique_key
+)
+
+
+HEADERS = ['Order ID', 'نام مشتری', 'Price', 'Note', 'Order ID', 'Empty']
+
+VALUES = [
+    'A-1', 'علی "رضایی"', '12,500', 'line\nbreak \\ tab\t', 'ignored', '',
+    'ي ك ۱۲۳', '😀', ' padded ', '</script>', 'x', 'y',
+]
+
+
+def _rows(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    rows = []
+    for row_number in range(2, count + 2):
+        width = rng.randint(1, len(HEADERS))
+        rows.append((row_number, [rng.choice(VALUES) for _ in range(width)]))
+    return rows
+
+
+def _as_dict(values) -> dict:
+    data = {}
+    for idx, header in enumerate(HEADERS):
+        data.setdefault(header, values[idx] if idx < len(values) else '')
+    return data
+
+
+@pytest.mark.parametrize('unique_columns', [None, ['Order ID'], ['Price', 'نام مشتری', 'Missing']])
+def test_compat_values_match_generate_unique_key(unique_columns):
+    batch = UniqueKeyBatch(5, headers=HEADERS, unique_columns=unique_columns, mode=KEY_HASH_COMPAT)
+    rows = _rows(300)
+    
+    for (row_number, values), (unique_key, content_hash) in zip(rows, batch.keys_for_values(rows)):
+        data = _as_dict(values)
+        assert unique_key == generate_unique_key(5, data, unique_columns, row_number)
+        assert content_hash == generate_content_hash(data, unique_columns)
+
+
+@pytest.mark.parametrize('unique_columns', [None, ['Order ID', 'Qty']])
+def test_compat_records_match_generate_unique_key(unique_columns):
+    batch = UniqueKeyBatch(9, unique_columns=unique_columns, mode=KEY_HASH_COMPAT)
+    records = [
+        {'row_number': 2, 'data': {'Order ID': 'A-1', 'Qty': 3, 'Price': 1.5}},
+        {'row_number': 3, 'data': {'Order ID': 'ب', 'Qty': None, 'Tags': ['x', 'ی']}},
+        {'row_number': 4, 'data': {'Qty': True}},
+        {'row_number': None, 'data': {'Order ID': 'C', 'Qty': '4'}},
+    ]
+    
+    for record, (unique_key, content_hash) in zip(records, batch.keys_for_records(records)):
+        assert unique_key == generate_unique_key(9, record['data'], unique_columns, record['row_number'])
+        assert content_hash == generate_content_hash(record['data'], unique_columns)
+
+
+def test_fast_mode_is_stable_and_distinct():
+    rows = _rows(50)
+    fast = UniqueKeyBatch(5, headers=HEADERS, unique_columns=['Order ID'], mode=KEY_HASH_FAST)
+    compat = UniqueKeyBatch(5, headers=HEADERS, unique_columns=['Order ID'], mode=KEY_HASH_COMPAT)
+    
+    keys = fast.keys_for_values(rows)
+    assert keys == fast.keys_for_values(rows)
+    assert keys != compat.keys_for_values(rows)
+    assert all(len(content_hash) == 16 for _, content_hash in keys)
+    # مقادیر یکسان ستون کلیدی = hash یکسان
+    by_value = {}
+    for (_, values), (_, content_hash) in zip(rows, keys):
+        by_value.setdefault(values[0], set()).add(content_hash)
+    assert all(len(hashes) == 1 for hashes in by_value.values())
@@ -0,0 +1,123 @@
+"""
+تست‌های unit of work (یک تراکنش برای چند فراخوانی DatabaseManager)
+"""
+import inspect
+
+import pytest
+
+from app.core.database import DatabaseManager
+from app.core.logger import app_logger
+from app.models import ProcessLog, SalesData
+from app.utils.constants import ProcessStatus, ProcessType
+
+
+def _config_data(name: str) -> dict:
+    return {'name': name, 'sheet_url': 'https://docs.google.com/spreadsheets/d/test'}
+
+
+def _config_names(db_manager) -> set:
+    return {config.name for config in db_manager.get_all_sheet_configs()}
+
+
+def test_commits_all_calls_together(db_manager):
+    with db_manager.unit_of_work():
+        assert db_manager.create_sheet_config(_config_data('a'))[0]
+        assert db_manager.create_sheet_config(_config_data('b'))[0]
+    
+    assert _config_names(db_manager) == {'a', 'b'}
+
+
+def test_exception_rolls_back_whole_unit(db_manager):
+    with pytest.raises(RuntimeError):
+        with db_manager.unit_of_work():
+            assert db_manager.create_sheet_config(_config_data('a'))[0]
+            raise RuntimeError('boom')
+    
+    assert _config_names(db_manager) == set()
+
+
+def test_failed_method_does_not_poison_unit(db_manager):
+    _, first, _ = db_manager.create_sheet_config(_config_data('one'))
+    _, second, _ = db_manager.create_sheet_config(_config_data('two'))
+    
+    with db_manager.unit_of_work():
+        # نقض UNIQUE روی name؛ متد خطا را می‌گیرد و False برمی‌گرداند
+        success, _ = db_manager.update_sheet_config(second.id, {'name': 'one'})
+        assert not success
+        
+        assert db_manager.create_sheet_config(_config_data('three'))[0]
+        assert _config_names(db_manager) == {'one', 'two', 'three'}
+    
+    assert _config_names(db_manager) == {'one', 'two', 'three'}
+
+
+def test_failed_raw_session_is_rolled_back_on_next_call(db_manager, sheet_config):
+    with db_manager.unit_of_work():
+        db = db_manager.get_session()
+        db.add(SalesData(sheet_config_id=sheet_config.id, row_number=2, unique_key='k', data={}))
+        db.add(SalesData(sheet_config_id=sheet_config.id, row_number=3, unique_key='k', data={}))
+        with pytest.raises(Exception):
+            db.flush()
+        
+        assert db_manager.create_sheet_config(_config_data('after'))[0]
+    
+    assert 'after' in _config_names(db_manager)
+    assert db_manager.get_sales_data_count() == 0
+
+
+def test_mark_as_transferred_in_unit(db_manager, sheet_config):
+    db = db_manager.get_session()
+    row = SalesData(sheet_config_id=sheet_config.id, row_number=2, unique_key='k', data={})
+    db.add(row)
+    db.commit()
+    db.close()
+    
+    with db_manager.unit_of_work():
+        assert db_manager.mark_as_transferred(row.id)
+    
+    db = db_manager.get_session()
+    assert db.get(SalesData, row.id).transferred == 1
+    db.close()
+
+
+def _process_logs(db_manager) -> list:
+    db = db_manager.get_session()
+    messages = [log.message for log in db.query(ProcessLog).order_by(ProcessLog.id)]
+    db.close()
+    return messages
+
+
+def test_process_logs_survive_rollback(db_manager):
+    with pytest.raises(RuntimeError):
+        with db_manager.unit_of_work():
+            assert db_manager.create_sheet_config(_config_data('a'))[0]
+            # لاگ تا پایان unit of work در صف می‌ماند
+            assert _process_logs(db_manager) == []
+            raise RuntimeError('boom')
+    
+    assert _config_names(db_manager) == set()
+    assert any("'a'" in message for message in _process_logs(db_manager))
+
+
+def test_process_started_inside_unit(db_manager):
+    with db_manager.unit_of_work():
+        log_id = app_logger.start_process(ProcessType.EXTRACT, 'شروع')
+        app_logger.complete_process(log_id, ProcessStatus.SUCCESS, 'پایان')
+    
+    db = db_manager.get_session()
+    log = db.query(ProcessLog).one()
+    db.close()
+    assert log.status == ProcessStatus.SUCCESS.value and log.message == 'پایان'
+    assert log.completed_at is not None
+
+
+def test_session_methods_are_scoped_explicitly():
+    # هر متدی که get_session را مستقیم فراخوانی می‌کند باید محدوده unit of work داشته باشد
+    for name, method in vars(DatabaseManager).items():
+        if not inspect.isfunction(method) or name in ('get_session', 'unit_of_work'):
+            continue
+        source = inspect.getsource(inspect.unwrap(method)).split('\n', 1)[1]
+        if 'get_session(' in source and not inspect.isgeneratorfunction(inspect.unwrap(method)):
+            assert hasattr(method, '__wrapped__'), name
+        elif name.startswith('iter_'):
+            assert not hasattr(method, '__wrapped__'), name
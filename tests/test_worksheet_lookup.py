@@ -0,0 +1,34 @@
+"""
+تست‌های پیدا کردن worksheet با کش متادیتا
+"""
+from app.core.fake_sheets import FakeSheetsClient
+from app.core.google_sheets import GoogleSheetExtractor
+from app.core.rate_limiter import SheetsRateLimiter
+
+
+def _extractor():
+    client = FakeSheetsClient()
+    client.add_worksheet('book', 'Sales', [['Order ID', 'Price'], ['1', '10']])
+    sheet_url = client.add_worksheet('book', 'sales', [['Code'], ['A']])
+    client.add_worksheet('book', 'Archive', [['Order ID'], ['2']])
+    return GoogleSheetExtractor(client=client, rate_limiter=SheetsRateLimiter(10000, 10000)), sheet_url
+
+
+def test_headers_and_data_match_exact_title():
+    extractor, sheet_url = _extractor()
+    
+    assert extractor.get_headers(sheet_url, 'sales') == ['Code']
+    assert extractor.get_headers(sheet_url, 'Sales') == ['Order ID', 'Price']
+    assert extractor.get_all_data(sheet_url, 'sales') == [['Code'], ['A']]
+    # نام با حالت حروف متفاوت (مانند sheet.worksheet) یافت نمی‌شود
+    assert extractor.get_headers(sheet_url, 'ARCHIVE') == []
+    assert extractor.get_all_data(sheet_url, 'ARCHIVE') == []
+
+
+def test_case_insensitive_lookup_does_not_leak_into_exact_lookup():
+    extractor, sheet_url = _extractor()
+    
+    # استخراج و علامت‌گذاری نام را case-insensitive پیدا می‌کنند
+    assert extractor._resolve_worksheet(sheet_url, 'archive').title == 'Archive'
+    assert extractor.get_headers(sheet_url, 'archive') == []
+    assert extractor.get_headers(sheet_url, 'Archive') == ['Order ID']